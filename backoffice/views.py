@@ -2,13 +2,11 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.core.paginator import Paginator
 from django.db.models import Count, Q
 from django.shortcuts import render
-from django.http import HttpResponse
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.html import format_html
 
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+from exportaciones.xlsx import LOTE, Hoja, respuesta_xlsx
 
 from convocatorias.models import Convocatoria, Postulacion
 from exencion.models import Exencion
@@ -106,14 +104,12 @@ def nomina_registro(request):
     })
 
 
-@staff_member_required
-def nomina_registro_excel(request):
-    q = (request.GET.get("q") or "").strip()
+def libro_padron_registro(parametros):
+    """(nombre de archivo, hojas) del padrón completo, filtrado por `q`.
+    Lo usan la descarga directa y las exportaciones en segundo plano."""
+    q = (parametros.get("q") or "").strip()
     humanas_qs, juridicas_qs = _filtrar_personas(q)  # B: helper reutilizado
 
-    wb = Workbook()
-    wb.remove(wb.active)
-
     def fmt(v):
         if v is None:
             return ""
@@ -132,26 +128,25 @@ def nomina_registro_excel(request):
     def field_names(model_cls):
         return [getattr(f, "attname", f.name) for f in model_cls._meta.fields]
 
-    def write_sheet(title, qs, model_cls):
-        ws = wb.create_sheet(title=title)
-        names = field_names(model_cls)
-        ws.append(names + ["user_email"])
-        for obj in qs:
+    def filas(qs, names):
+        for obj in qs.iterator(chunk_size=LOTE):
             row = [fmt(getattr(obj, n, "")) for n in names]
             row.append(getattr(obj.user, "email", "") if obj.user_id else "")
-            ws.append(row)
-        for i, h in enumerate(names + ["user_email"], 1):
-            ws.column_dimensions[get_column_letter(i)].width = min(max(len(str(h)) + 2, 14), 45)
+            yield row
 
-    write_sheet("Personas Humanas",   humanas_qs,   PersonaHumana)
-    write_sheet("Personas Jurídicas", juridicas_qs, PersonaJuridica)
+    def sheet(title, qs, model_cls):
+        names = field_names(model_cls)
+        return Hoja(title, filas(qs, names), encabezados=names + ["user_email"], total=qs.count)
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="padron_registro_completo.xlsx"'
-    wb.save(response)
-    return response
+    return "padron_registro_completo.xlsx", [
+        sheet("Personas Humanas",   humanas_qs,   PersonaHumana),
+        sheet("Personas Jurídicas", juridicas_qs, PersonaJuridica),
+    ]
+
+
+@staff_member_required
+def nomina_registro_excel(request):
+    return respuesta_xlsx(*libro_padron_registro(request.GET))
 
 
 # ============================================================
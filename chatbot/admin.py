@@ -1,8 +1,10 @@
 from django.contrib import admin
-from django.db.models import Count
+from django.db.models import Count, Q, Sum
 from django.utils.html import format_html
 
-from .models import Nodo, Opcion, PalabraClave, ConfiguracionChatbot, ConsultaLog
+from .models import (
+    Nodo, Opcion, PalabraClave, ConfiguracionChatbot, ConsultaLog, ConsultaResumenDiario,
+)
 
 
 # ============================================================
@@ -111,3 +113,50 @@ class ConsultaLogAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+# ============================================================
+# RESUMEN DIARIO DE CONSULTAS (reportes)
+# ============================================================
+@admin.register(ConsultaResumenDiario)
+class ConsultaResumenDiarioAdmin(admin.ModelAdmin):
+    """Reportes sobre el resumen diario: nunca lee el log crudo."""
+    list_display  = ("fecha", "texto_normalizado", "encontrado", "keyword_matcheada", "cantidad")
+    list_filter   = ("encontrado", "fecha")
+    search_fields = ("texto_normalizado", "keyword_matcheada")
+    ordering      = ("-fecha", "-cantidad")
+    date_hierarchy = "fecha"
+    readonly_fields = ("fecha", "texto_normalizado", "keyword_matcheada", "encontrado", "cantidad")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        cl = getattr(response, "context_data", {}).get("cl")
+        if cl is None:
+            return response
+
+        # Los totales respetan los filtros y la búsqueda activos en el listado
+        qs = cl.queryset.order_by()
+        totales = qs.aggregate(
+            total=Sum("cantidad"),
+            no_encontradas=Sum("cantidad", filter=Q(encontrado=False)),
+        )
+        response.context_data["totales"] = totales
+        response.context_data["top_no_encontradas"] = (
+            qs.filter(encontrado=False)
+            .values("texto_normalizado")
+            .annotate(total=Sum("cantidad"))
+            .order_by("-total", "texto_normalizado")[:20]
+        )
+        response.context_data["top_keywords"] = (
+            qs.filter(encontrado=True)
+            .values("keyword_matcheada")
+            .annotate(total=Sum("cantidad"))
+            .order_by("-total", "keyword_matcheada")[:20]
+        )
+        return response
@@ -0,0 +1,128 @@
+"""
+Corrección de errores de tipeo para el matcher del chatbot.
+
+Solo se usa cuando la búsqueda exacta no encontró nada. Cada palabra de la
+consulta que no está en el vocabulario de las palabras clave se reemplaza
+por la palabra del vocabulario más cercana (distancia de Levenshtein
+acotada) y la consulta corregida vuelve a pasar por el matcher exacto. Así
+"exencion impositva" se resuelve como "exencion impositiva", con el mismo
+criterio de palabra completa y de desempate.
+
+El vocabulario se indexa en un árbol BK, que descarta por desigualdad
+triangular la mayor parte de las comparaciones.
+"""
+import re
+
+_PALABRA = re.compile(r"\w+")
+
+
+def levenshtein(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(
+                anterior[j] + 1,
+                actual[j - 1] + 1,
+                anterior[j - 1] + (ca != cb),
+            ))
+        anterior = actual
+    return anterior[-1]
+
+
+def distancia_maxima(palabra):
+    """Errores tolerados según el largo: las palabras cortas no se corrigen."""
+    if len(palabra) < 5:
+        return 0
+    if len(palabra) < 9:
+        return 1
+    return 2
+
+
+class ArbolBK:
+    """Árbol BK sobre distancia de Levenshtein. Cada nodo: (palabra, {distancia: hijo})."""
+
+    def __init__(self, palabras=()):
+        self._raiz = None
+        self._cantidad = 0
+        for palabra in sorted(set(palabras)):
+            self._agregar(palabra)
+
+    def __len__(self):
+        return self._cantidad
+
+    def _agregar(self, palabra):
+        if self._raiz is None:
+            self._raiz = (palabra, {})
+            self._cantidad = 1
+            return
+        nodo = self._raiz
+        while True:
+            d = levenshtein(palabra, nodo[0])
+            if d == 0:
+                return
+            hijo = nodo[1].get(d)
+            if hijo is None:
+                nodo[1][d] = (palabra, {})
+                self._cantidad += 1
+                return
+            nodo = hijo
+
+    def buscar(self, palabra, maximo):
+        """Lista de (distancia, palabra) con distancia <= maximo."""
+        if self._raiz is None:
+            return []
+        encontradas = []
+        pendientes = [self._raiz]
+        while pendientes:
+            candidata, hijos = pendientes.pop()
+            d = levenshtein(palabra, candidata)
+            if d <= maximo:
+                encontradas.append((d, candidata))
+            for dist_hijo, hijo in hijos.items():
+                if d - maximo <= dist_hijo <= d + maximo:
+                    pendientes.append(hijo)
+        return encontradas
+
+
+class Corrector:
+    """Corrige palabras de una consulta normalizada contra un vocabulario fijo."""
+
+    def __init__(self, vocabulario):
+        self._vocabulario = frozenset(vocabulario)
+        self._arbol = ArbolBK(self._vocabulario)
+
+    def __len__(self):
+        return len(self._vocabulario)
+
+    def corregir_palabra(self, palabra):
+        if palabra in self._vocabulario:
+            return palabra
+        maximo = distancia_maxima(palabra)
+        if not maximo:
+            return palabra
+        # Misma inicial: los errores de tipeo casi nunca están en la primera letra
+        # y evita correcciones absurdas entre palabras cortas.
+        candidatas = [
+            (d, c) for d, c in self._arbol.buscar(palabra, maximo) if c[0] == palabra[0]
+        ]
+        return min(candidatas)[1] if candidatas else palabra
+
+    def corregir(self, texto_normalizado):
+        """Texto corregido, o None si no hubo nada para corregir."""
+        cambios = False
+
+        def _reemplazo(m):
+            nonlocal cambios
+            corregida = self.corregir_palabra(m.group(0))
+            cambios = cambios or corregida != m.group(0)
+            return corregida
+
+        corregido = _PALABRA.sub(_reemplazo, texto_normalizado)
+        return corregido if cambios else None
+
+
+def vocabulario(textos):
+    return {p for texto in textos for p in _PALABRA.findall(texto)}
@@ -0,0 +1,79 @@
+"""
+Estructuras del chatbot derivadas de la base y cacheadas por proceso.
+
+Cada worker arma en memoria lo que necesita para responder sin consultar la
+base (matcher de palabras clave, grafo de nodos, ...). La vigencia de esas
+copias se controla con un token de versión guardado en el cache de Django:
+las señales de models.py lo renuevan ante cualquier cambio y cada proceso
+reconstruye su copia cuando el token que tiene ya no coincide.
+
+El token tiene que vivir en un cache compartido por todos los workers
+(CACHES con Redis, ver config/base.py); con el cache en memoria local la
+invalidación alcanzaría solo al proceso que guardó el cambio.
+"""
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+_PREFIJO = "chatbot:version:"
+
+
+def version(nombre):
+    """Token de versión vigente para el conjunto de datos `nombre`."""
+    clave = _PREFIJO + nombre
+    token = cache.get(clave)
+    if token is None:
+        cache.add(clave, uuid.uuid4().hex, timeout=None)
+        token = cache.get(clave)
+    return token
+
+
+def invalidar(nombre):
+    """
+    Renueva el token: todas las copias en memoria quedan vencidas.
+
+    Dentro de una transacción se renueva también al confirmarla: un worker
+    que reconstruya antes del commit ve los datos viejos y los guardaría con
+    el token nuevo hasta el próximo cambio.
+    """
+    _renovar(nombre)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _renovar(nombre))
+
+
+def _renovar(nombre):
+    cache.set(_PREFIJO + nombre, uuid.uuid4().hex, timeout=None)
+
+
+class CacheLocal:
+    """
+    Valor construido una vez por proceso y reconstruido cuando cambia la
+    versión de `nombre`. `construir` no recibe argumentos y debe devolver
+    una estructura inmutable (se comparte entre threads).
+    """
+
+    def __init__(self, nombre, construir):
+        self.nombre = nombre
+        self._construir = construir
+        self._lock = threading.Lock()
+        self._valor = None
+        self._version = None
+
+    def obtener(self):
+        token = version(self.nombre)
+        if self._valor is not None and self._version == token:
+            return self._valor
+        with self._lock:
+            if self._valor is None or self._version != token:
+                # La versión se lee antes de construir: si alguien invalida
+                # mientras tanto, el próximo pedido vuelve a construir.
+                self._valor = self._construir()
+                self._version = token
+            return self._valor
+
+    def descartar(self):
+        with self._lock:
+            self._valor = None
+            self._version = None
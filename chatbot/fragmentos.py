@@ -0,0 +1,51 @@
+"""
+Fragmentos HTML del chatbot, pre-renderizados y cacheados por nodo.
+
+Las respuestas AJAX solo devuelven las entradas nuevas de la conversación;
+el cliente las agrega al final del chat. El mensaje y las opciones de cada
+nodo no dependen del usuario, así que se renderizan una vez y se cachean con
+la versión del grafo en la clave: al editar el árbol desde el admin cambia
+la versión y los fragmentos viejos dejan de usarse.
+
+La versión es la de la foto del grafo que se está usando (Grafo.version), no
+la vigente en el cache: un worker con la foto vieja no puede guardar HTML
+viejo bajo el token nuevo, y no hay una lectura del token por fragmento.
+"""
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+_TIMEOUT = 60 * 60 * 24
+
+
+def _clave(grafo, nombre):
+    return f"chatbot:fragmento:{grafo.version}:{nombre}"
+
+
+def fragmento_nodo(grafo, nodo):
+    """{"mensaje": html, "opciones": html} del nodo."""
+    clave = _clave(grafo, nodo.id)
+    fragmento = cache.get(clave)
+    if fragmento is None:
+        fragmento = {
+            "mensaje": html_bot(nodo.mensaje),
+            "opciones": render_to_string("chatbot/_opciones.html", {"opciones": nodo.opciones}),
+        }
+        cache.set(clave, fragmento, _TIMEOUT)
+    return fragmento
+
+
+def fragmento_no_encontrado(grafo):
+    clave = _clave(grafo, "no_encontrado")
+    fragmento = cache.get(clave)
+    if fragmento is None:
+        fragmento = html_bot(grafo.mensaje_no_encontrado)
+        cache.set(clave, fragmento, _TIMEOUT)
+    return fragmento
+
+
+def html_bot(texto):
+    return render_to_string("chatbot/_mensaje_bot.html", {"texto": texto})
+
+
+def html_usuario(texto):
+    return render_to_string("chatbot/_mensaje_usuario.html", {"texto": texto})
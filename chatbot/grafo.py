@@ -0,0 +1,94 @@
+"""
+Foto inmutable del árbol de decisión del chatbot (Nodo → Opcion).
+
+El árbol son unas pocas decenas de filas que solo cambian cuando el staff
+lo edita desde el admin, así que se carga completo una vez por proceso y la
+navegación se resuelve en memoria. Las señales de models.py invalidan la
+foto al guardar o borrar un Nodo, una Opcion o la ConfiguracionChatbot; el
+token de versión está en el cache compartido, así que cada worker
+reconstruye la suya en el próximo pedido.
+"""
+from collections import namedtuple
+
+from .cache import CacheLocal, version
+from .models import ConfiguracionChatbot, Nodo, Opcion
+
+MENSAJE_NO_ENCONTRADO = (
+    "No estoy seguro de haber entendido. "
+    "Podés reformular la consulta o elegir una de las opciones disponibles."
+)
+
+NodoGrafo = namedtuple(
+    "NodoGrafo", ["id", "nombre", "slug", "mensaje", "es_inicio", "activo", "opciones"],
+)
+OpcionGrafo = namedtuple(
+    "OpcionGrafo", ["id", "texto", "nodo_origen_id", "nodo_destino_id", "orden"],
+)
+
+
+class Grafo:
+    """
+    Nodos indexados por id y por slug, con sus opciones ya ordenadas.
+    `version` es el token vigente al leer las filas (clave de los fragmentos).
+    """
+
+    def __init__(self, nodos, opciones, mensaje_no_encontrado=None, version=None):
+        self.version = version
+        opciones = sorted(opciones, key=lambda o: (o.orden, o.id))
+        salientes = {}
+        for o in opciones:
+            salientes.setdefault(o.nodo_origen_id, []).append(o)
+
+        self._nodos = {
+            n.id: n._replace(opciones=tuple(salientes.get(n.id, ())))
+            for n in nodos
+        }
+        self._por_slug = {n.slug: n for n in self._nodos.values()}
+        self._opciones = {o.id: o for o in opciones}
+
+        # Mismo criterio que Nodo.objects.filter(es_inicio=True, activo=True).first()
+        inicios = sorted(
+            (n for n in self._nodos.values() if n.es_inicio and n.activo),
+            key=lambda n: (n.nombre, n.id),
+        )
+        self.inicio = inicios[0] if inicios else None
+        self.mensaje_no_encontrado = mensaje_no_encontrado or MENSAJE_NO_ENCONTRADO
+
+    def __len__(self):
+        return len(self._nodos)
+
+    def nodo(self, nodo_id):
+        return self._nodos.get(nodo_id)
+
+    def nodo_por_slug(self, slug):
+        return self._por_slug.get(slug)
+
+    def opcion(self, opcion_id):
+        return self._opciones.get(opcion_id)
+
+
+def _construir_grafo():
+    # Antes de las consultas: si el árbol cambia mientras tanto, los
+    # fragmentos quedan bajo un token que ya venció.
+    token = version("grafo")
+    nodos = [
+        NodoGrafo(*fila, opciones=())
+        for fila in Nodo.objects.values_list(
+            "id", "nombre", "slug", "mensaje", "es_inicio", "activo",
+        )
+    ]
+    opciones = [
+        OpcionGrafo(*fila)
+        for fila in Opcion.objects.values_list(
+            "id", "texto", "nodo_origen_id", "nodo_destino_id", "orden",
+        )
+    ]
+    config = ConfiguracionChatbot.get()
+    return Grafo(nodos, opciones, config.mensaje_no_encontrado if config else None, version=token)
+
+
+_grafo = CacheLocal("grafo", _construir_grafo)
+
+
+def obtener_grafo():
+    return _grafo.obtener()
@@ -0,0 +1,117 @@
+"""
+Historial de la conversación guardado en la sesión, en formato compacto.
+
+En lugar de guardar el HTML de cada mensaje del bot, cada entrada es un par
+[tipo, dato] que se rehidrata desde el grafo en memoria al renderizar:
+
+    ["b", nodo_id]     mensaje del nodo
+    ["n", nodo_id]     mensaje de "no encontrado" (nodo_id: nodo de inicio)
+    ["o", opcion_id]   el usuario eligió una opción (se muestra su texto)
+    ["u", texto]       el usuario escribió una consulta
+
+Las consultas escritas son el único texto libre y se guardan recortadas.
+Las sesiones con el formato anterior ({"tipo", "texto", "nodo_id"}) se
+convierten al leerlas; para reconocer sus mensajes de "no encontrado" (que
+llevaban el id del nodo de inicio) hace falta el grafo.
+El historial es un buffer circular: al superar MAX_ENTRADAS se descartan
+las más viejas.
+"""
+from collections import deque
+
+from .grafo import MENSAJE_NO_ENCONTRADO
+
+CLAVE_SESION = "chat_historial"
+MAX_ENTRADAS = 50
+MAX_TEXTO_USUARIO = 500
+
+BOT = "b"
+NO_ENCONTRADO = "n"
+OPCION = "o"
+USUARIO = "u"
+
+
+class Historial:
+
+    def __init__(self, entradas=()):
+        self._entradas = deque(entradas, maxlen=MAX_ENTRADAS)
+
+    @classmethod
+    def de_sesion(cls, session, grafo):
+        entradas = []
+        for entrada in session.get(CLAVE_SESION) or []:
+            if isinstance(entrada, dict):
+                entrada = _convertir_formato_anterior(entrada, grafo)
+            if entrada:
+                entradas.append(tuple(entrada))
+        return cls(entradas)
+
+    def guardar(self, session):
+        session[CLAVE_SESION] = [list(e) for e in self._entradas]
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __iter__(self):
+        return iter(self._entradas)
+
+    # ── Escritura ────────────────────────────────────────────
+    def agregar_bot(self, nodo):
+        self._entradas.append((BOT, nodo.id))
+
+    def agregar_no_encontrado(self, nodo):
+        self._entradas.append((NO_ENCONTRADO, nodo.id if nodo else None))
+
+    def agregar_opcion(self, opcion):
+        self._entradas.append((OPCION, opcion.id))
+
+    def agregar_usuario(self, texto):
+        self._entradas.append((USUARIO, texto[:MAX_TEXTO_USUARIO]))
+
+    def quitar(self, cantidad):
+        """Saca hasta `cantidad` entradas del final. Devuelve cuántas sacó."""
+        quitadas = 0
+        while self._entradas and quitadas < cantidad:
+            self._entradas.pop()
+            quitadas += 1
+        return quitadas
+
+    def reiniciar(self, nodo):
+        self._entradas.clear()
+        self.agregar_bot(nodo)
+
+    # ── Lectura ──────────────────────────────────────────────
+    def ultimo_nodo(self, grafo):
+        """Nodo de la última entrada del bot que siga existiendo, o el de inicio."""
+        for tipo, dato in reversed(self._entradas):
+            if tipo in (BOT, NO_ENCONTRADO) and dato:
+                nodo = grafo.nodo(dato)
+                if nodo:
+                    return nodo
+        return grafo.inicio
+
+    def mensajes(self, grafo):
+        """Entradas rehidratadas ({"tipo", "texto"}) para el template."""
+        mensajes = []
+        for tipo, dato in self._entradas:
+            if tipo == BOT:
+                nodo = grafo.nodo(dato)
+                if nodo:
+                    mensajes.append({"tipo": "bot", "texto": nodo.mensaje})
+            elif tipo == NO_ENCONTRADO:
+                mensajes.append({"tipo": "bot", "texto": grafo.mensaje_no_encontrado})
+            elif tipo == OPCION:
+                opcion = grafo.opcion(dato)
+                if opcion:
+                    mensajes.append({"tipo": "usuario", "texto": opcion.texto})
+            elif tipo == USUARIO:
+                mensajes.append({"tipo": "usuario", "texto": dato})
+        return mensajes
+
+
+def _convertir_formato_anterior(entrada, grafo):
+    # Sesiones abiertas antes del formato compacto: {"tipo", "texto", "nodo_id"}
+    if entrada.get("tipo") == "bot":
+        if entrada.get("texto") in (grafo.mensaje_no_encontrado, MENSAJE_NO_ENCONTRADO):
+            return (NO_ENCONTRADO, entrada.get("nodo_id"))
+        return (BOT, entrada["nodo_id"]) if entrada.get("nodo_id") else None
+    return (USUARIO, (entrada.get("texto") or "")[:MAX_TEXTO_USUARIO])
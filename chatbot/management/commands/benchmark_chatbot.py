@@ -0,0 +1,136 @@
+"""
+Benchmark offline del matcher del chatbot, sin HTTP.
+
+Reproduce un corpus de consultas con la misma lógica de buscar_consulta
+(matcher exacto y, si no encuentra, aproximado) y reporta latencia
+(p50/p95/p99), consultas por segundo, tasa de aciertos y cuántas respuestas
+cambian respecto de la keyword esperada.
+
+Fuentes:
+  log   (default) texto_consulta de ConsultaLog; se compara contra la
+        keyword_matcheada guardada en su momento. Usa las palabras clave
+        activas de la base.
+  json  las palabras clave de chatbot_datos.json, como consulta y como
+        respuesta esperada. El matcher se arma con el mismo archivo, así que
+        no hace falta tener la base cargada.
+
+Ejemplos:
+  manage.py benchmark_chatbot
+  manage.py benchmark_chatbot --limite 5000 --solo-exacto
+  manage.py benchmark_chatbot --fuente json --detalle
+"""
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.matcher import MatcherPalabrasClave, normalizar_texto
+from chatbot.models import ConsultaLog, PalabraClave
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = "Mide latencia y calidad del matcher del chatbot reproduciendo consultas históricas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fuente", choices=["log", "json"], default="log",
+                            help="Corpus a reproducir. Default: log.")
+        parser.add_argument("--archivo", type=str,
+                            help="Ruta al JSON de datos (fuente json). Default: chatbot_datos.json.")
+        parser.add_argument("--limite", type=int,
+                            help="Reproducir solo las N consultas más recientes (fuente log).")
+        parser.add_argument("--repeticiones", type=int, default=1,
+                            help="Veces que se reproduce el corpus completo. Default: 1.")
+        parser.add_argument("--solo-exacto", action="store_true", dest="solo_exacto",
+                            help="No usar la corrección de errores de tipeo.")
+        parser.add_argument("--detalle", action="store_true",
+                            help="Listar todas las respuestas que cambian (por defecto, las primeras 10).")
+
+    def handle(self, *args, **opts):
+        if opts["repeticiones"] < 1:
+            raise CommandError("--repeticiones debe ser al menos 1.")
+
+        inicio = time.perf_counter()
+        if opts["fuente"] == "json":
+            matcher, corpus = self._desde_json(opts["archivo"])
+        else:
+            matcher, corpus = self._desde_log(opts["limite"])
+        armado_ms = (time.perf_counter() - inicio) * 1000
+
+        if not corpus:
+            self.stdout.write("No hay consultas para reproducir.")
+            return
+
+        buscar = matcher.buscar if opts["solo_exacto"] else matcher.resolver
+
+        latencias = []
+        aciertos = 0
+        cambios = []
+        total_inicio = time.perf_counter()
+        for repeticion in range(opts["repeticiones"]):
+            for texto, esperada in corpus:
+                t0 = time.perf_counter()
+                mejor = buscar(normalizar_texto(texto))
+                latencias.append(time.perf_counter() - t0)
+
+                # La calidad se mide una sola vez; las repeticiones son para la latencia
+                if repeticion:
+                    continue
+                obtenida = mejor.texto if mejor else None
+                if obtenida:
+                    aciertos += 1
+                if obtenida != esperada:
+                    cambios.append((texto, esperada, obtenida))
+        total = time.perf_counter() - total_inicio
+
+        latencias.sort()
+        n = len(latencias)
+        self.stdout.write(f"Corpus: {len(corpus)} consultas × {opts['repeticiones']} "
+                          f"— vocabulario: {len(matcher)} keywords (armado en {armado_ms:.1f} ms)")
+        self.stdout.write(
+            "Latencia: "
+            f"p50 {percentil(latencias, 50) * 1000:.3f} ms · "
+            f"p95 {percentil(latencias, 95) * 1000:.3f} ms · "
+            f"p99 {percentil(latencias, 99) * 1000:.3f} ms"
+        )
+        self.stdout.write(f"Consultas por segundo: {n / total:.0f}" if total else "Consultas por segundo: —")
+        self.stdout.write(f"Aciertos: {aciertos}/{len(corpus)} ({aciertos / len(corpus):.1%})")
+
+        estilo = self.style.WARNING if cambios else self.style.SUCCESS
+        self.stdout.write(estilo(f"Respuestas que cambian: {len(cambios)}/{len(corpus)}"))
+        for texto, esperada, obtenida in (cambios if opts["detalle"] else cambios[:10]):
+            self.stdout.write(f"  «{texto[:60]}»: {esperada or '—'} → {obtenida or '—'}")
+
+    def _desde_log(self, limite):
+        matcher = MatcherPalabrasClave(
+            PalabraClave.objects.filter(activo=True)
+            .values_list("texto", "prioridad", "nodo_destino_id")
+        )
+        qs = ConsultaLog.objects.order_by("-fecha").values_list("texto_consulta", "keyword_matcheada")
+        if limite:
+            qs = qs[:limite]
+        return matcher, [(texto, keyword or None) for texto, keyword in qs.iterator(chunk_size=2000)]
+
+    def _desde_json(self, archivo):
+        ruta = Path(archivo) if archivo else Path(settings.BASE_DIR) / "chatbot_datos.json"
+        try:
+            datos = json.loads(ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer {ruta}: {e}")
+
+        palabras = [
+            (d["fields"]["texto"], d["fields"].get("prioridad", 1), d["fields"]["nodo_destino"])
+            for d in datos
+            if d.get("model") == "chatbot.palabraclave" and d["fields"].get("activo", True)
+        ]
+        corpus = [(texto, normalizar_texto(texto)) for texto, _, _ in palabras]
+        return MatcherPalabrasClave(palabras), corpus
@@ -0,0 +1,67 @@
+"""
+Resume el log de consultas del chatbot en la tabla diaria (ConsultaResumenDiario).
+
+Los reportes del admin leen solo del resumen. Con --retener-dias también se
+depura el log crudo anterior a esa cantidad de días (nunca días sin resumir).
+
+Uso manual:
+    python manage.py resumir_consultas
+    python manage.py resumir_consultas --desde 2026-01-01        # recalcular desde una fecha
+    python manage.py resumir_consultas --retener-dias 90         # y borrar log crudo de más de 90 días
+
+Configurar en cron (ej. cada día a las 3):
+    0 3 * * * /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py resumir_consultas --retener-dias 90
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot import resumen
+
+
+class Command(BaseCommand):
+    help = "Agrupa las consultas del chatbot por día y, opcionalmente, depura el log crudo."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde",
+            type=str,
+            help="Recalcular desde esta fecha (AAAA-MM-DD). Default: retoma donde quedó.",
+        )
+        parser.add_argument(
+            "--retener-dias",
+            type=int,
+            dest="retener_dias",
+            help="Borra del log crudo las consultas con más de N días (ya resumidas).",
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options["desde"]:
+            try:
+                desde = date.fromisoformat(options["desde"])
+            except ValueError:
+                raise CommandError("--desde debe tener formato AAAA-MM-DD.")
+
+        retener = options["retener_dias"]
+        if retener is not None and retener < 1:
+            raise CommandError("--retener-dias debe ser al menos 1.")
+
+        dias = resumen.dias_pendientes(desde)
+        resumidos = 0
+        filas = 0
+        for dia in dias:
+            escritas = resumen.resumir_dia(dia)
+            if escritas is not None:
+                resumidos += 1
+                filas += escritas
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Días resumidos: {resumidos}. Filas de resumen: {filas}."
+        ))
+
+        if retener is not None:
+            borradas = resumen.depurar_log(retener)
+            self.stdout.write(self.style.SUCCESS(
+                f"Consultas crudas borradas (más de {retener} días): {borradas}."
+            ))
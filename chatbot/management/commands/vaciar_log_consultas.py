@@ -0,0 +1,32 @@
+"""
+Guarda en la base las consultas del chatbot que quedaron en cola.
+
+Las consultas se registran en lote desde un hilo de fondo (chatbot/registro.py).
+Si la cola está en Redis (CHATBOT_LOG_REDIS_URL) y un worker murió sin
+vaciarla, este comando persiste lo que quedó pendiente.
+
+Uso manual:
+    python manage.py vaciar_log_consultas
+
+Configurar en cron (ej. cada 10 minutos):
+    */10 * * * * /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py vaciar_log_consultas
+"""
+
+from django.core.management.base import BaseCommand
+
+from chatbot.registro import obtener_registro
+
+
+class Command(BaseCommand):
+    help = "Persiste las consultas del chatbot pendientes en la cola de registro."
+
+    def handle(self, *args, **options):
+        registro = obtener_registro()
+        pendientes = len(registro.cola)
+
+        if not pendientes:
+            self.stdout.write("No hay consultas pendientes.")
+            return
+
+        guardadas = registro.vaciar()
+        self.stdout.write(self.style.SUCCESS(f"Listo. Consultas guardadas: {guardadas}."))
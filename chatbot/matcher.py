@@ -0,0 +1,100 @@
+"""
+Búsqueda de palabras clave del chatbot.
+
+Las palabras clave activas se normalizan y se compilan una sola vez por
+proceso en una única expresión regular. La expresión se reconstruye cuando
+se guarda o borra una PalabraClave (ver señales en models.py).
+
+Si la búsqueda exacta no encuentra nada, `buscar_aproximado` corrige los
+errores de tipeo contra el vocabulario de las keywords (ver aproximado.py).
+"""
+import re
+import unicodedata
+from collections import namedtuple
+
+from .aproximado import Corrector, vocabulario
+from .cache import CacheLocal
+from .models import PalabraClave
+
+Coincidencia = namedtuple("Coincidencia", ["texto", "prioridad", "nodo_id"])
+
+
+def normalizar_texto(texto):
+    texto = texto.lower().strip()
+    texto = unicodedata.normalize("NFD", texto)
+    texto = texto.encode("ascii", "ignore").decode("utf-8")
+    return texto
+
+
+def _orden(coincidencia):
+    # Mismo criterio que el max() original: mayor prioridad, luego la
+    # keyword más larga; ante empate, la primera alfabéticamente (orden
+    # del queryset ["-prioridad", "texto"]).
+    return (-coincidencia.prioridad, -len(coincidencia.texto), coincidencia.texto)
+
+
+class MatcherPalabrasClave:
+    """
+    Alternación única `(?=\\b(kw1|kw2|...)\\b)` sobre las keywords ordenadas
+    de mejor a peor. El lookahead no consume texto, así que se evalúa en
+    cada posición y encuentra también keywords superpuestas; en cada
+    posición la primera alternativa que matchea es la mejor de esa posición.
+    """
+
+    def __init__(self, palabras):
+        por_texto = {}
+        for texto, prioridad, nodo_id in palabras:
+            texto = normalizar_texto(texto or "")
+            if not texto:
+                continue
+            nueva = Coincidencia(texto, prioridad, nodo_id)
+            actual = por_texto.get(texto)
+            if actual is None or _orden(nueva) < _orden(actual):
+                por_texto[texto] = nueva
+
+        self._por_texto = por_texto
+        self._corrector = Corrector(vocabulario(por_texto))
+        if por_texto:
+            alternativas = "|".join(
+                re.escape(c.texto) for c in sorted(por_texto.values(), key=_orden)
+            )
+            self._patron = re.compile(r"(?=\b(" + alternativas + r")\b)")
+        else:
+            self._patron = None
+
+    def __len__(self):
+        return len(self._por_texto)
+
+    def buscar(self, texto_normalizado):
+        """Devuelve la mejor Coincidencia para el texto, o None."""
+        if self._patron is None:
+            return None
+        mejor = None
+        for m in self._patron.finditer(texto_normalizado):
+            candidata = self._por_texto[m.group(1)]
+            if mejor is None or _orden(candidata) < _orden(mejor):
+                mejor = candidata
+        return mejor
+
+    def buscar_aproximado(self, texto_normalizado):
+        """Como `buscar`, tolerando errores de tipeo. Pensado para cuando `buscar` no encontró."""
+        corregido = self._corrector.corregir(texto_normalizado)
+        return self.buscar(corregido) if corregido else None
+
+    def resolver(self, texto_normalizado):
+        """Lógica completa de buscar_consulta: exacta y, si no hay, aproximada."""
+        return self.buscar(texto_normalizado) or self.buscar_aproximado(texto_normalizado)
+
+
+def _construir_matcher():
+    filas = PalabraClave.objects.filter(activo=True).values_list(
+        "texto", "prioridad", "nodo_destino_id",
+    )
+    return MatcherPalabrasClave(filas)
+
+
+_matcher = CacheLocal("palabras_clave", _construir_matcher)
+
+
+def obtener_matcher():
+    return _matcher.obtener()
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0006_configuracion_y_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='consultalog',
+            name='fecha',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0007_consultalog_fecha_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('texto_normalizado', models.CharField(max_length=500)),
+                ('keyword_matcheada', models.CharField(blank=True, default='', max_length=100)),
+                ('encontrado', models.BooleanField(default=False)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de consultas',
+                'verbose_name_plural': 'Resumen diario de consultas',
+                'ordering': ['-fecha', '-cantidad'],
+                'indexes': [models.Index(fields=['encontrado', 'fecha'], name='chatbot_res_encontrado_fecha'), models.Index(fields=['texto_normalizado', 'fecha'], name='chatbot_res_texto_fecha'), models.Index(fields=['keyword_matcheada', 'fecha'], name='chatbot_res_keyword_fecha')],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'texto_normalizado', 'keyword_matcheada', 'encontrado'), name='chatbot_resumen_unico_por_dia')],
+            },
+        ),
+    ]
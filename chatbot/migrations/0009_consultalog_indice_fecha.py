@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0008_consultaresumendiario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consultalog',
+            index=models.Index(fields=['fecha'], name='chatbot_log_fecha'),
+        ),
+    ]
@@ -2,6 +2,11 @@ import unicodedata
 
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidar
 
 
 def _normalizar(texto):
@@ -123,13 +128,71 @@ class ConsultaLog(models.Model):
         related_name="consultas_log",
     )
     encontrado        = models.BooleanField(default=False)
-    fecha             = models.DateTimeField(auto_now_add=True)
+    # default (no auto_now_add): el registro asíncrono inserta en lote y
+    # conserva la hora real de la consulta (ver registro.py).
+    fecha             = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ["-fecha"]
         verbose_name = "Consulta registrada"
         verbose_name_plural = "Consultas registradas"
+        indexes = [
+            # resumen diario y purga del log, por rango de fecha (resumen.py)
+            models.Index(fields=["fecha"], name="chatbot_log_fecha"),
+        ]
 
     def __str__(self):
         ok = "✓" if self.encontrado else "✗"
         return f"{ok} «{self.texto_consulta[:50]}» — {self.fecha:%d/%m/%Y %H:%M}"
+
+
+
+# ============================================================
+# RESUMEN DIARIO DE CONSULTAS
+# ============================================================
+class ConsultaResumenDiario(models.Model):
+    """
+    Consultas agrupadas por día, texto normalizado, keyword y resultado.
+    Lo llena el comando resumir_consultas; los reportes leen solo de acá,
+    así el log crudo puede depurarse sin perder la historia.
+    """
+    fecha             = models.DateField()
+    texto_normalizado = models.CharField(max_length=500)
+    keyword_matcheada = models.CharField(max_length=100, blank=True, default="")
+    encontrado        = models.BooleanField(default=False)
+    cantidad          = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-fecha", "-cantidad"]
+        verbose_name = "Resumen diario de consultas"
+        verbose_name_plural = "Resumen diario de consultas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fecha", "texto_normalizado", "keyword_matcheada", "encontrado"],
+                name="chatbot_resumen_unico_por_dia",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["encontrado", "fecha"], name="chatbot_res_encontrado_fecha"),
+            models.Index(fields=["texto_normalizado", "fecha"], name="chatbot_res_texto_fecha"),
+            models.Index(fields=["keyword_matcheada", "fecha"], name="chatbot_res_keyword_fecha"),
+        ]
+
+    def __str__(self):
+        ok = "✓" if self.encontrado else "✗"
+        return f"{self.fecha:%d/%m/%Y} {ok} «{self.texto_normalizado[:50]}» × {self.cantidad}"
+
+
+# ============================================================
+# SEÑALES — invalidación de cachés en memoria
+# ============================================================
+@receiver([post_save, post_delete], sender=PalabraClave)
+def invalidar_matcher_palabras_clave(sender, **kwargs):
+    invalidar("palabras_clave")
+
+
+@receiver([post_save, post_delete], sender=Nodo)
+@receiver([post_save, post_delete], sender=Opcion)
+@receiver([post_save, post_delete], sender=ConfiguracionChatbot)
+def invalidar_grafo(sender, **kwargs):
+    invalidar("grafo")
@@ -0,0 +1,237 @@
+"""
+Registro asíncrono de consultas del chatbot (ConsultaLog).
+
+La vista encola cada consulta y responde enseguida; un hilo de fondo las
+inserta con bulk_create en lotes, cuando se junta CHATBOT_LOG_LOTE consultas
+o cada CHATBOT_LOG_INTERVALO segundos, lo que ocurra primero. Al terminar
+el proceso se vacía lo pendiente.
+
+La cola vive en memoria del proceso, salvo que se configure
+CHATBOT_LOG_REDIS_URL: en ese caso se guarda en una lista de Redis y lo que
+quede tras una caída se recupera con `manage.py vaciar_log_consultas`.
+La cola en memoria guarda como máximo CHATBOT_LOG_MAXIMO consultas: con la
+base caída, las que llegan de más se descartan (y se avisa en el log) en
+lugar de hacer crecer el worker sin límite.
+
+Un lote se lee sin sacarlo de la cola y se descarta recién cuando el insert
+confirmó: si bulk_create falla, las consultas quedan para el próximo intento.
+Un solo consumidor vacía la cola a la vez (lock del proceso o de Redis).
+
+Con CHATBOT_LOG_SINCRONO = True se vuelve al insert directo (útil en
+desarrollo o para depurar).
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ConsultaLog, Nodo
+
+logger = logging.getLogger(__name__)
+
+_CLAVE_REDIS = "chatbot:consultas_log"
+
+
+# ============================================================
+# COLAS
+# ============================================================
+class ColaMemoria:
+    # Cada cuántas consultas descartadas se repite el aviso en el log
+    AVISO_CADA = 1000
+
+    def __init__(self, maximo=10000):
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._consumidor = threading.Lock()
+        self.maximo = maximo
+        self.descartadas = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def agregar(self, item):
+        # Se descarta la nueva y no la más vieja: el lote en curso se lee
+        # desde el principio y se saca recién después del insert.
+        with self._lock:
+            if len(self._items) < self.maximo:
+                self._items.append(item)
+                return
+            self.descartadas += 1
+            descartadas = self.descartadas
+        if (descartadas - 1) % self.AVISO_CADA == 0:
+            logger.warning(
+                "Cola de consultas del chatbot llena (%s): descartada %r (%s descartadas en total)",
+                self.maximo, item["texto_consulta"], descartadas,
+            )
+
+    def bloqueo(self):
+        return self._consumidor
+
+    def leer(self, cantidad):
+        with self._lock:
+            return [self._items[i] for i in range(min(cantidad, len(self._items)))]
+
+    def descartar(self, cantidad):
+        with self._lock:
+            for _ in range(cantidad):
+                self._items.popleft()
+
+
+class ColaRedis:
+    def __init__(self, url, clave=_CLAVE_REDIS):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._clave = clave
+
+    def __len__(self):
+        return self._redis.llen(self._clave)
+
+    def agregar(self, item):
+        self._redis.rpush(self._clave, json.dumps(item))
+
+    def bloqueo(self):
+        # Entre procesos: los hilos de cada worker y vaciar_log_consultas
+        return self._redis.lock(self._clave + ":consumidor", timeout=300)
+
+    def leer(self, cantidad):
+        crudos = self._redis.lrange(self._clave, 0, cantidad - 1)
+        return [json.loads(c) for c in crudos]
+
+    def descartar(self, cantidad):
+        # Los productores agregan al final: el principio es lo que se leyó
+        self._redis.ltrim(self._clave, cantidad, -1)
+
+
+# ============================================================
+# REGISTRO
+# ============================================================
+class RegistroConsultas:
+    """
+    Junta consultas en `cola` y las persiste por lotes. El hilo de fondo se
+    arranca con la primera consulta (y de nuevo si el proceso se forkeó,
+    como hacen los workers de gunicorn con --preload).
+    """
+
+    def __init__(self, cola, lote=100, intervalo=5.0):
+        self.cola = cola
+        self.lote = lote
+        self.intervalo = intervalo
+        self._despertar = threading.Event()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+
+    def registrar(self, texto_consulta, keyword_matcheada, nodo_id, encontrado):
+        self.cola.agregar({
+            "texto_consulta": texto_consulta[:500],
+            "keyword_matcheada": keyword_matcheada,
+            "nodo_destino_id": nodo_id,
+            "encontrado": encontrado,
+            "fecha": timezone.now().isoformat(),
+        })
+        self._asegurar_hilo()
+        if len(self.cola) >= self.lote:
+            self._despertar.set()
+
+    def vaciar(self):
+        """Persiste todo lo pendiente en la cola. Devuelve cuántas filas escribió."""
+        total = 0
+        with self.cola.bloqueo():
+            while True:
+                items = self.cola.leer(self.lote)
+                if not items:
+                    return total
+                with transaction.atomic():
+                    total += self._guardar(items)
+                self.cola.descartar(len(items))
+
+    def _guardar(self, items):
+        # Un nodo pudo borrarse mientras la consulta esperaba en la cola:
+        # se replica el SET_NULL de la FK en vez de romper el lote entero.
+        ids = {i["nodo_destino_id"] for i in items if i["nodo_destino_id"]}
+        vigentes = set(Nodo.objects.filter(id__in=ids).values_list("id", flat=True))
+        filas = [
+            ConsultaLog(
+                texto_consulta=i["texto_consulta"],
+                keyword_matcheada=i["keyword_matcheada"],
+                nodo_destino_id=i["nodo_destino_id"] if i["nodo_destino_id"] in vigentes else None,
+                encontrado=i["encontrado"],
+                fecha=parse_datetime(i["fecha"]),
+            )
+            for i in items
+        ]
+        ConsultaLog.objects.bulk_create(filas)
+        return len(filas)
+
+    def _asegurar_hilo(self):
+        if self._pid == os.getpid() and self._hilo and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._hilo and self._hilo.is_alive():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(
+                target=self._bucle, name="chatbot-consultas-log", daemon=True,
+            )
+            self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                self.vaciar()
+            except Exception:
+                logger.exception("No se pudo guardar un lote de consultas del chatbot")
+            finally:
+                connection.close()
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def obtener_registro():
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                url = getattr(settings, "CHATBOT_LOG_REDIS_URL", None)
+                _registro = RegistroConsultas(
+                    ColaRedis(url) if url else ColaMemoria(
+                        maximo=getattr(settings, "CHATBOT_LOG_MAXIMO", 10000),
+                    ),
+                    lote=getattr(settings, "CHATBOT_LOG_LOTE", 100),
+                    intervalo=getattr(settings, "CHATBOT_LOG_INTERVALO", 5.0),
+                )
+    return _registro
+
+
+def registrar_consulta(texto_consulta, keyword_matcheada, nodo_id, encontrado):
+    if getattr(settings, "CHATBOT_LOG_SINCRONO", False):
+        ConsultaLog.objects.create(
+            texto_consulta=texto_consulta[:500],
+            keyword_matcheada=keyword_matcheada,
+            nodo_destino_id=nodo_id,
+            encontrado=encontrado,
+        )
+        return
+    obtener_registro().registrar(texto_consulta, keyword_matcheada, nodo_id, encontrado)
+
+
+@atexit.register
+def _vaciar_al_salir():
+    if _registro is None:
+        return
+    try:
+        _registro.vaciar()
+    except Exception:
+        logger.exception("No se pudieron guardar las consultas pendientes del chatbot")
@@ -0,0 +1,97 @@
+"""
+Resumen diario de las consultas del chatbot.
+
+Agrupa ConsultaLog por día (hora local), texto normalizado, keyword y
+encontrado/no encontrado en ConsultaResumenDiario. Cada día se recalcula
+completo desde el log crudo, así que correr el resumen dos veces da el mismo
+resultado. Un día cuyo log crudo ya fue depurado se deja como está.
+
+Lo usan el comando resumir_consultas y los tests.
+"""
+import re
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .matcher import normalizar_texto
+from .models import ConsultaLog, ConsultaResumenDiario
+
+_ESPACIOS = re.compile(r"\s+")
+_PUNTUACION_BORDES = "¿?¡!.,;:\"'()"
+
+
+def normalizar_consulta(texto):
+    """Agrupa variantes triviales: mayúsculas, tildes, espacios y signos en los bordes."""
+    texto = _ESPACIOS.sub(" ", normalizar_texto(texto or ""))
+    return texto.strip(_PUNTUACION_BORDES + " ")[:500]
+
+
+def _inicio_del_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def resumir_dia(dia):
+    """Recalcula el resumen de `dia`. Devuelve filas escritas, o None si no había log."""
+    desde = _inicio_del_dia(dia)
+    hasta = _inicio_del_dia(dia + timedelta(days=1))
+    filas = (
+        ConsultaLog.objects
+        .filter(fecha__gte=desde, fecha__lt=hasta)
+        .values_list("texto_consulta", "keyword_matcheada", "encontrado")
+        .iterator(chunk_size=2000)
+    )
+    conteo = Counter(
+        (normalizar_consulta(texto), keyword or "", encontrado)
+        for texto, keyword, encontrado in filas
+    )
+    if not conteo:
+        return None
+
+    with transaction.atomic():
+        ConsultaResumenDiario.objects.filter(fecha=dia).delete()
+        ConsultaResumenDiario.objects.bulk_create([
+            ConsultaResumenDiario(
+                fecha=dia,
+                texto_normalizado=texto,
+                keyword_matcheada=keyword,
+                encontrado=encontrado,
+                cantidad=cantidad,
+            )
+            for (texto, keyword, encontrado), cantidad in conteo.items()
+        ], batch_size=1000)
+    return len(conteo)
+
+
+def dias_pendientes(desde=None, hasta=None):
+    """
+    Días a resumir. Sin `desde`, retoma un día antes del último ya resumido
+    (ese pudo quedar a medias y el registro en lote puede traer consultas
+    atrasadas) o, si no hay resumen, en la primera consulta.
+    """
+    hasta = hasta or timezone.localdate()
+    if desde is None:
+        ultimo = ConsultaResumenDiario.objects.aggregate(m=Max("fecha"))["m"]
+        desde = ultimo - timedelta(days=1) if ultimo else None
+    if desde is None:
+        primera = ConsultaLog.objects.aggregate(m=Min("fecha"))["m"]
+        if primera is None:
+            return []
+        desde = timezone.localdate(primera)
+    return [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+
+
+def depurar_log(dias_retencion, hoy=None):
+    """
+    Borra el log crudo anterior a `dias_retencion` días. Nunca borra días que
+    todavía no tienen resumen. Devuelve filas borradas.
+    """
+    ultimo = ConsultaResumenDiario.objects.aggregate(m=Max("fecha"))["m"]
+    if ultimo is None:
+        return 0
+    hoy = hoy or timezone.localdate()
+    corte = _inicio_del_dia(min(hoy - timedelta(days=dias_retencion), ultimo))
+    borradas, _ = ConsultaLog.objects.filter(fecha__lt=corte).delete()
+    return borradas
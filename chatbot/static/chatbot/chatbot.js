@@ -69,8 +69,9 @@ function agregarMensajeUsuario(texto) {
     const chatBody = document.getElementById("chatbot-body");
     if (!chatBody) return;
 
+    // Provisorio: se reemplaza por la versión del servidor al llegar la respuesta
     const userWrapper = document.createElement("div");
-    userWrapper.className = "d-flex justify-content-end mb-3 mensaje-fade";
+    userWrapper.className = "d-flex justify-content-end mb-3 mensaje-fade js-pendiente";
     userWrapper.innerHTML = `
         <div class="user-message">
             <div class="mensaje-texto"></div>
@@ -102,77 +103,114 @@ function agregarTyping() {
     return botWrapper;
 }
 
-function activarChatbot() {
-    const links = document.querySelectorAll(".chatbot-option-link");
+/*
+ * El servidor responde solo con lo nuevo:
+ *   reiniciar      → borrar toda la conversación antes de agregar
+ *   quitar         → cantidad de mensajes a sacar del final ("volver")
+ *   mensajes       → HTML de las entradas nuevas, en orden
+ *   opciones_html  → bloque de opciones del nodo actual
+ *   max_mensajes   → tope de mensajes visibles (igual al de la sesión)
+ */
+function aplicarRespuesta(data) {
+    const chatBody = document.getElementById("chatbot-body");
+    if (!chatBody) return;
 
-    links.forEach(link => {
-        link.addEventListener("click", function (e) {
-            e.preventDefault();
+    chatBody
+        .querySelectorAll(".js-typing-wrapper, .js-pendiente, .chatbot-options")
+        .forEach(el => el.remove());
 
-            const url = this.getAttribute("href");
-            const texto = this.textContent.trim();
-            const container = document.getElementById("chatbot-widget-container");
+    let mensajes = Array.from(chatBody.querySelectorAll(".chatbot-mensaje"));
 
-            agregarMensajeUsuario(texto);
-            agregarTyping();
-            scrollInicialOIntercambio();
+    if (data.reiniciar) {
+        mensajes.forEach(el => el.remove());
+    } else if (data.quitar) {
+        mensajes.slice(-data.quitar).forEach(el => el.remove());
+    }
 
-            document.querySelectorAll(".chatbot-option-link").forEach(btn => {
-                btn.style.pointerEvents = "none";
-                btn.style.opacity = "0.6";
-            });
+    chatBody.insertAdjacentHTML("beforeend", data.mensajes.join("") + data.opciones_html);
 
-            fetch(url, {
-                headers: {
-                    "X-Requested-With": "XMLHttpRequest"
-                }
-            })
-                .then(response => response.json())
-                .then(data => {
-                    setTimeout(() => {
-                        container.innerHTML = data.widget_html;
-                        activarChatbot();
-                        prepararChatVisible();
-                        scrollInicialOIntercambio();
-                    }, 450);
-                })
-                .catch(() => {
-                    window.location.href = url;
-                });
-        });
+    mensajes = chatBody.querySelectorAll(".chatbot-mensaje");
+    for (let i = 0; i < mensajes.length - data.max_mensajes; i++) {
+        mensajes[i].remove();
+    }
+}
+
+function bloquearOpciones() {
+    document.querySelectorAll(".chatbot-option-link").forEach(btn => {
+        btn.style.pointerEvents = "none";
+        btn.style.opacity = "0.6";
     });
+}
 
-    const navButtons = document.querySelectorAll(".chatbot-nav-btn");
+function elegirOpcion(link) {
+    const url = link.getAttribute("href");
+    const texto = link.textContent.trim();
 
-    navButtons.forEach(btn => {
-        btn.addEventListener("click", function (e) {
-            e.preventDefault();
+    agregarMensajeUsuario(texto);
+    agregarTyping();
+    scrollInicialOIntercambio();
+    bloquearOpciones();
+
+    fetch(url, {
+        headers: {
+            "X-Requested-With": "XMLHttpRequest"
+        }
+    })
+        .then(response => response.json())
+        .then(data => {
+            setTimeout(() => {
+                aplicarRespuesta(data);
+                scrollInicialOIntercambio();
+            }, 450);
+        })
+        .catch(() => {
+            window.location.href = url;
+        });
+}
 
-            const url = this.getAttribute("href");
-            const action = this.dataset.chatAction;
-            const container = document.getElementById("chatbot-widget-container");
+function navegar(btn) {
+    const url = btn.getAttribute("href");
+    const action = btn.dataset.chatAction;
+
+    fetch(url, {
+        headers: {
+            "X-Requested-With": "XMLHttpRequest"
+        }
+    })
+        .then(response => response.json())
+        .then(data => {
+            aplicarRespuesta(data);
+            prepararChatVisible();
+
+            if (action === "inicio") {
+                scrollChatToBottom(true);
+            } else {
+                scrollInicialOIntercambio();
+            }
+        })
+        .catch(() => {
+            window.location.href = url;
+        });
+}
 
-            fetch(url, {
-                headers: {
-                    "X-Requested-With": "XMLHttpRequest"
-                }
-            })
-                .then(response => response.json())
-                .then(data => {
-                    container.innerHTML = data.widget_html;
-                    activarChatbot();
-                    prepararChatVisible();
+function activarChatbot() {
+    // Delegación: los botones que llegan en respuestas nuevas ya quedan activos
+    const container = document.getElementById("chatbot-widget-container");
+    if (!container) return;
 
-                    if (action === "inicio") {
-                        scrollChatToBottom(true);
-                    } else {
-                        scrollInicialOIntercambio();
-                    }
-                })
-                .catch(() => {
-                    window.location.href = url;
-                });
-        });
+    container.addEventListener("click", function (e) {
+        const opcion = e.target.closest(".chatbot-option-link");
+        if (opcion) {
+            e.preventDefault();
+            elegirOpcion(opcion);
+            return;
+        }
+
+        const nav = e.target.closest(".chatbot-nav-btn");
+        if (nav) {
+            e.preventDefault();
+            navegar(nav);
+        }
     });
 
     const form = document.getElementById("chatbot-form");
@@ -183,7 +221,6 @@ function activarChatbot() {
 
             const input = document.getElementById("chatbot-input");
             const texto = input.value.trim();
-            const container = document.getElementById("chatbot-widget-container");
 
             if (!texto) return;
 
@@ -204,9 +241,7 @@ function activarChatbot() {
                 .then(response => response.json())
                 .then(data => {
                     setTimeout(() => {
-                        container.innerHTML = data.widget_html;
-                        activarChatbot();
-                        prepararChatVisible();
+                        aplicarRespuesta(data);
                         scrollInicialOIntercambio();
                     }, 450);
                 })
@@ -215,4 +250,4 @@ function activarChatbot() {
                 });
         });
     }
-}
\ No newline at end of file
+}
@@ -1,3 +1,505 @@
-from django.test import TestCase
+import multiprocessing
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from chatbot.cache import CacheLocal, invalidar
+from chatbot.fragmentos import fragmento_nodo
+from chatbot.grafo import obtener_grafo
+from chatbot.historial import CLAVE_SESION, MAX_ENTRADAS, Historial
+from chatbot.matcher import MatcherPalabrasClave, obtener_matcher
+from chatbot import resumen
+from chatbot.aproximado import ArbolBK, Corrector, levenshtein
+from chatbot.models import (
+    ConfiguracionChatbot, ConsultaLog, ConsultaResumenDiario, Nodo, Opcion, PalabraClave,
+)
+from chatbot.registro import ColaMemoria, RegistroConsultas
+
+
+def crear_nodo(slug, es_inicio=False, mensaje=None):
+    return Nodo.objects.create(
+        nombre=slug.replace("-", " ").title(),
+        slug=slug,
+        mensaje=mensaje or f"<p>{slug}</p>",
+        es_inicio=es_inicio,
+    )
+
+
+class MatcherPalabrasClaveTest(TestCase):
+    def test_palabra_completa_no_substring(self):
+        m = MatcherPalabrasClave([("idea", 1, 1)])
+        self.assertIsNotNone(m.buscar("plan idea 2026"))
+        self.assertIsNone(m.buscar("ideal"))
+
+    def test_prioridad_y_luego_longitud(self):
+        m = MatcherPalabrasClave([
+            ("exencion", 1, 1),
+            ("exencion impositiva", 1, 2),
+            ("registro", 5, 3),
+        ])
+        self.assertEqual(m.buscar("exencion impositiva").nodo_id, 2)
+        self.assertEqual(m.buscar("exencion impositiva y registro").nodo_id, 3)
+
+    def test_encuentra_keywords_superpuestas(self):
+        # "plan idea" consume "idea"; igual debe verse "idea fomento".
+        m = MatcherPalabrasClave([("plan idea", 1, 1), ("idea fomento", 5, 2)])
+        self.assertEqual(m.buscar("plan idea fomento").nodo_id, 2)
+
+    def test_empate_desempata_alfabeticamente(self):
+        m = MatcherPalabrasClave([("curso", 2, 1), ("cuota", 2, 2)])
+        self.assertEqual(m.buscar("cuota del curso").texto, "cuota")
+
+
+class AproximadoTest(TestCase):
+    def test_arbol_bk_encuentra_lo_mismo_que_fuerza_bruta(self):
+        palabras = ["exencion", "impositiva", "registro", "rebate", "cursos", "curso", "convocatoria"]
+        arbol = ArbolBK(palabras)
+        for consulta in ("impositva", "curzos", "regitro", "rebote"):
+            esperado = sorted((levenshtein(consulta, p), p) for p in palabras if levenshtein(consulta, p) <= 2)
+            self.assertEqual(sorted(arbol.buscar(consulta, 2)), esperado)
+
+    def test_corrige_solo_palabras_largas_y_con_misma_inicial(self):
+        corrector = Corrector(["exencion", "impositiva", "cash"])
+        self.assertEqual(corrector.corregir("exencion impositva"), "exencion impositiva")
+        self.assertIsNone(corrector.corregir("caso"))
+        self.assertIsNone(corrector.corregir("xmpositiva"))
+
+    def test_matcher_aproximado_usa_el_desempate_exacto(self):
+        m = MatcherPalabrasClave([("impositiva", 1, 1), ("exencion impositiva", 1, 2)])
+        self.assertIsNone(m.buscar("exencion impositva"))
+        self.assertEqual(m.buscar_aproximado("exencion impositva").nodo_id, 2)
+
+
+CACHE_COMPARTIDO = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="test_cache_chatbot_"),
+    }
+}
+
+
+def en_otro_proceso(copia, accion):
+    """
+    Forkea un worker que ya tiene `copia` construida, corre `accion` en este
+    proceso y devuelve si el worker reconstruyó su copia al pedirla.
+    """
+    ctx = multiprocessing.get_context("fork")
+    listo, seguir = ctx.Event(), ctx.Event()
+    recibe, envia = ctx.Pipe(duplex=False)
+
+    def worker():
+        previa = copia.obtener()
+        listo.set()
+        seguir.wait(10)
+        envia.send(copia.obtener() is not previa)
+
+    proceso = ctx.Process(target=worker)
+    proceso.start()
+    try:
+        listo.wait(10)
+        accion()
+        seguir.set()
+        return recibe.recv()
+    finally:
+        proceso.join(10)
+
+
+class InvalidacionEntreProcesosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.copia = CacheLocal("prueba", object)
+
+    @override_settings(CACHES=CACHE_COMPARTIDO)
+    def test_con_cache_compartido_el_otro_worker_reconstruye(self):
+        cache.clear()
+        self.assertTrue(en_otro_proceso(self.copia, lambda: invalidar("prueba")))
+
+    def test_con_cache_local_el_otro_worker_no_se_entera(self):
+        # Por esto prod usa Redis: en memoria local cada worker tiene su token.
+        self.assertFalse(en_otro_proceso(self.copia, lambda: invalidar("prueba")))
+
+    @override_settings(CACHES=CACHE_COMPARTIDO)
+    def test_editar_el_arbol_invalida_el_grafo_de_otro_worker(self):
+        cache.clear()
+        nodo = crear_nodo("cursos")
+        # Misma versión que chatbot.grafo, sin consultar la base desde el fork
+        grafo = CacheLocal("grafo", object)
+
+        def editar():
+            nodo.mensaje = "<p>Nuevo</p>"
+            nodo.save()
+
+        self.assertTrue(en_otro_proceso(grafo, editar))
+        self.assertTrue(en_otro_proceso(grafo, lambda: ConfiguracionChatbot.objects.create()))
+
+    def test_se_renueva_otra_vez_al_confirmar_la_transaccion(self):
+        self.copia.obtener()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            invalidar("prueba")
+        intermedia = self.copia.obtener()
+        for callback in callbacks:
+            callback()
+        self.assertIsNot(self.copia.obtener(), intermedia)
+
+
+class MatcherInvalidacionTest(TestCase):
+    def setUp(self):
+        # El rollback entre tests no dispara señales: arrancar sin copias viejas.
+        cache.clear()
+        self.nodo = crear_nodo("cursos")
+
+    def test_se_reconstruye_al_guardar_y_borrar(self):
+        self.assertIsNone(obtener_matcher().buscar("cursos de formacion"))
+        kw = PalabraClave.objects.create(texto="Formación", nodo_destino=self.nodo)
+        self.assertEqual(obtener_matcher().buscar("cursos de formacion").nodo_id, self.nodo.id)
+        kw.delete()
+        self.assertIsNone(obtener_matcher().buscar("cursos de formacion"))
+
+    def test_inactivas_no_matchean(self):
+        kw = PalabraClave.objects.create(texto="curso", nodo_destino=self.nodo)
+        kw.activo = False
+        kw.save()
+        self.assertIsNone(obtener_matcher().buscar("curso"))
+
+
+@override_settings(CHATBOT_LOG_SINCRONO=True)
+class BuscarConsultaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.inicio = crear_nodo("menu-principal", es_inicio=True)
+        self.exencion = crear_nodo("exencion-impositiva")
+        PalabraClave.objects.create(texto="exención", nodo_destino=self.exencion)
+
+    def test_registra_consulta_encontrada(self):
+        resp = self.client.post(reverse("chatbot_buscar"), {"consulta": "¿Cómo pido la EXENCIÓN?"})
+        self.assertEqual(resp.status_code, 200)
+        log = ConsultaLog.objects.get()
+        self.assertTrue(log.encontrado)
+        self.assertEqual(log.keyword_matcheada, "exencion")
+        self.assertEqual(log.nodo_destino, self.exencion)
+
+    def test_tolera_errores_de_tipeo(self):
+        self.client.post(reverse("chatbot_buscar"), {"consulta": "exencoin"})
+        self.client.post(reverse("chatbot_buscar"), {"consulta": "quiero la excencion"})
+        log = ConsultaLog.objects.get(texto_consulta="quiero la excencion")
+        self.assertTrue(log.encontrado)
+        self.assertEqual(log.nodo_destino, self.exencion)
+
+    def test_registra_consulta_no_encontrada(self):
+        self.client.post(reverse("chatbot_buscar"), {"consulta": "cash rebate"})
+        log = ConsultaLog.objects.get()
+        self.assertFalse(log.encontrado)
+        self.assertIsNone(log.keyword_matcheada)
+        self.assertEqual(log.nodo_destino, self.inicio)
+
+
+# Sesión en cookie firmada: así los conteos miden solo las consultas del chatbot.
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+class GrafoTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.inicio = crear_nodo("menu-principal", es_inicio=True)
+        self.cursos = crear_nodo("cursos")
+        self.segunda = Opcion.objects.create(
+            nodo_origen=self.inicio, nodo_destino=self.cursos, texto="Segunda", orden=2,
+        )
+        self.primera = Opcion.objects.create(
+            nodo_origen=self.inicio, nodo_destino=self.cursos, texto="Primera", orden=1,
+        )
+
+    def test_opciones_preordenadas_y_slug(self):
+        grafo = obtener_grafo()
+        self.assertEqual(grafo.inicio.id, self.inicio.id)
+        self.assertEqual([o.texto for o in grafo.inicio.opciones], ["Primera", "Segunda"])
+        self.assertEqual(grafo.nodo_por_slug("cursos").id, self.cursos.id)
+
+    def test_navegacion_sin_consultas_sql(self):
+        ajax = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+        self.client.get(reverse("chatbot_inicio"), **ajax)
+        with self.assertNumQueries(0):
+            self.client.get(reverse("ver_nodo", args=[self.primera.id]), **ajax)
+            resp = self.client.get(reverse("chatbot_volver"), **ajax)
+        self.assertIn("Segunda", resp.json()["opciones_html"])
+
+    def test_opcion_inexistente_404(self):
+        resp = self.client.get(reverse("ver_nodo", args=[9999]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_cambios_en_admin_invalidan(self):
+        obtener_grafo()
+        self.cursos.mensaje = "<p>Nuevo texto</p>"
+        self.cursos.save()
+        self.assertEqual(obtener_grafo().nodo(self.cursos.id).mensaje, "<p>Nuevo texto</p>")
+        self.segunda.delete()
+        self.assertEqual(len(obtener_grafo().inicio.opciones), 1)
+        ConfiguracionChatbot.objects.create(mensaje_no_encontrado="Sin respuesta")
+        self.assertEqual(obtener_grafo().mensaje_no_encontrado, "Sin respuesta")
+
+
+class RegistroConsultasTest(TestCase):
+    def setUp(self):
+        # Sin hilo de fondo: el test decide cuándo se vacía la cola.
+        patcher = mock.patch.object(RegistroConsultas, "_asegurar_hilo")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registro = RegistroConsultas(ColaMemoria(), lote=2)
+        self.nodo = crear_nodo("cursos")
+
+    def test_encola_y_guarda_en_lotes(self):
+        for texto in ("uno", "dos", "tres"):
+            self.registro.registrar(texto, None, self.nodo.id, False)
+        self.assertEqual(ConsultaLog.objects.count(), 0)
+        self.assertEqual(self.registro.vaciar(), 3)
+        self.assertEqual(
+            sorted(ConsultaLog.objects.values_list("texto_consulta", flat=True)),
+            ["dos", "tres", "uno"],
+        )
+        self.assertEqual(len(self.registro.cola), 0)
+
+    def test_conserva_fecha_de_la_consulta(self):
+        antes = timezone.now() - timedelta(hours=1)
+        with mock.patch("chatbot.registro.timezone.now", return_value=antes):
+            self.registro.registrar("vieja", None, None, False)
+        self.registro.vaciar()
+        self.assertEqual(ConsultaLog.objects.get().fecha, antes)
+
+    def test_nodo_borrado_queda_nulo(self):
+        self.registro.registrar("cursos", "cursos", self.nodo.id, True)
+        self.nodo.delete()
+        self.registro.vaciar()
+        self.assertIsNone(ConsultaLog.objects.get().nodo_destino)
+
+    def test_lote_fallido_queda_en_la_cola(self):
+        for texto in ("uno", "dos", "tres"):
+            self.registro.registrar(texto, None, None, False)
+        with mock.patch.object(RegistroConsultas, "_guardar", autospec=True,
+                               side_effect=[2, RuntimeError("base caída")]):
+            with self.assertRaises(RuntimeError):
+                self.registro.vaciar()
+        # El primer lote se confirmó (mock) y se descartó; el segundo sigue
+        self.assertEqual(len(self.registro.cola), 1)
+        self.assertEqual(self.registro.vaciar(), 1)
+        self.assertEqual(ConsultaLog.objects.get().texto_consulta, "tres")
+        self.assertEqual(len(self.registro.cola), 0)
+
+    def test_cola_en_memoria_acotada(self):
+        cola = ColaMemoria(maximo=2)
+        registro = RegistroConsultas(cola, lote=10)
+        with self.assertLogs("chatbot.registro", "WARNING") as logs:
+            for texto in ("uno", "dos", "tres", "cuatro"):
+                registro.registrar(texto, None, None, False)
+        self.assertEqual(len(cola), 2)
+        self.assertEqual(cola.descartadas, 2)
+        self.assertIn("'tres'", logs.output[0])
+        # Se conservan las primeras: el lote en curso no se altera
+        registro.vaciar()
+        self.assertEqual(
+            sorted(ConsultaLog.objects.values_list("texto_consulta", flat=True)), ["dos", "uno"],
+        )
+
+    def test_comando_vacia_pendientes(self):
+        self.registro.registrar("pendiente", None, None, False)
+        salida = StringIO()
+        with mock.patch("chatbot.management.commands.vaciar_log_consultas.obtener_registro",
+                        return_value=self.registro):
+            call_command("vaciar_log_consultas", stdout=salida)
+        self.assertIn("Consultas guardadas: 1", salida.getvalue())
+        self.assertEqual(ConsultaLog.objects.count(), 1)
+
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+class RespuestaIncrementalTest(TestCase):
+    ajax = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+    def setUp(self):
+        cache.clear()
+        self.inicio = crear_nodo("menu-principal", es_inicio=True)
+        self.cursos = crear_nodo("cursos", mensaje="<p>Cursos vigentes</p>")
+        self.opcion = Opcion.objects.create(
+            nodo_origen=self.inicio, nodo_destino=self.cursos, texto="Ver cursos",
+        )
+        self.client.get(reverse("chatbot_inicio"), **self.ajax)
+
+    def _ver_cursos(self):
+        return self.client.get(reverse("ver_nodo", args=[self.opcion.id]), **self.ajax).json()
+
+    def test_solo_devuelve_entradas_nuevas(self):
+        for _ in range(5):
+            data = self._ver_cursos()
+        self.assertEqual(len(data["mensajes"]), 2)
+        self.assertIn("Ver cursos", data["mensajes"][0])
+        self.assertIn("Cursos vigentes", data["mensajes"][1])
+        self.assertFalse(data["reiniciar"])
+
+    def test_volver_quita_dos_entradas(self):
+        self._ver_cursos()
+        data = self.client.get(reverse("chatbot_volver"), **self.ajax).json()
+        self.assertEqual(data["quitar"], 2)
+        self.assertEqual(data["mensajes"], [])
+        self.assertIn("Ver cursos", data["opciones_html"])
+
+    def test_inicio_reinicia(self):
+        data = self.client.get(reverse("chatbot_inicio"), **self.ajax).json()
+        self.assertTrue(data["reiniciar"])
+        self.assertEqual(len(data["mensajes"]), 1)
+
+    def test_fragmento_se_renueva_al_editar_nodo(self):
+        self._ver_cursos()
+        self.cursos.mensaje = "<p>Inscripciones cerradas</p>"
+        self.cursos.save()
+        self.assertIn("Inscripciones cerradas", self._ver_cursos()["mensajes"][1])
+
+    def test_foto_vieja_no_pisa_el_fragmento_nuevo(self):
+        # Un worker que todavía responde con la foto anterior del grafo
+        vieja = obtener_grafo()
+        self.cursos.mensaje = "<p>Inscripciones cerradas</p>"
+        self.cursos.save()
+        fragmento_nodo(vieja, vieja.nodo(self.cursos.id))
+        self.assertIn("Inscripciones cerradas", self._ver_cursos()["mensajes"][1])
+
+    def test_sin_ajax_renderiza_pagina_completa(self):
+        resp = self.client.get(reverse("ver_nodo", args=[self.opcion.id]))
+        self.assertContains(resp, "Cursos vigentes")
+        self.assertContains(resp, "chatbot-form")
+
+
+class HistorialTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.inicio = crear_nodo("menu-principal", es_inicio=True, mensaje="<p>" + "x" * 2000 + "</p>")
+        self.cursos = crear_nodo("cursos", mensaje="<p>Cursos vigentes</p>")
+        self.opcion = Opcion.objects.create(
+            nodo_origen=self.inicio, nodo_destino=self.cursos, texto="Ver cursos",
+        )
+
+    def test_buffer_circular_acotado(self):
+        historial = Historial()
+        grafo = obtener_grafo()
+        for _ in range(MAX_ENTRADAS):
+            historial.agregar_opcion(grafo.opcion(self.opcion.id))
+            historial.agregar_bot(grafo.nodo(self.cursos.id))
+        self.assertEqual(len(historial), MAX_ENTRADAS)
+
+    def test_sesion_guarda_ids_y_no_html(self):
+        grafo = obtener_grafo()
+        historial = Historial()
+        historial.reiniciar(grafo.inicio)
+        historial.agregar_opcion(grafo.opcion(self.opcion.id))
+        historial.agregar_bot(grafo.nodo(self.cursos.id))
+        sesion = {}
+        historial.guardar(sesion)
+        self.assertEqual(sesion[CLAVE_SESION], [
+            ["b", self.inicio.id], ["o", self.opcion.id], ["b", self.cursos.id],
+        ])
+        mensajes = Historial.de_sesion(sesion, grafo).mensajes(grafo)
+        self.assertEqual(mensajes[1], {"tipo": "usuario", "texto": "Ver cursos"})
+        self.assertEqual(mensajes[2], {"tipo": "bot", "texto": "<p>Cursos vigentes</p>"})
+
+    def test_convierte_sesiones_con_formato_anterior(self):
+        sesion = {CLAVE_SESION: [
+            {"tipo": "bot", "texto": "<p>viejo</p>", "nodo_id": self.inicio.id},
+            {"tipo": "usuario", "texto": "hola"},
+        ]}
+        historial = Historial.de_sesion(sesion, obtener_grafo())
+        self.assertEqual(list(historial), [("b", self.inicio.id), ("u", "hola")])
+
+    def test_convierte_no_encontrado_con_formato_anterior(self):
+        ConfiguracionChatbot.objects.create(mensaje_no_encontrado="No entendí.")
+        grafo = obtener_grafo()
+        sesion = {CLAVE_SESION: [
+            {"tipo": "bot", "texto": "<p>inicio</p>", "nodo_id": self.inicio.id},
+            {"tipo": "usuario", "texto": "asdf"},
+            {"tipo": "bot", "texto": "No entendí.", "nodo_id": self.inicio.id},
+        ]}
+        historial = Historial.de_sesion(sesion, grafo)
+        self.assertEqual(list(historial)[-1], ("n", self.inicio.id))
+        self.assertEqual(historial.mensajes(grafo)[-1], {"tipo": "bot", "texto": "No entendí."})
+        self.assertEqual(historial.ultimo_nodo(grafo).id, self.inicio.id)
+
+    def test_pagina_completa_rehidrata_desde_el_grafo(self):
+        self.client.get(reverse("chatbot_inicio"))
+        resp = self.client.get(reverse("ver_nodo", args=[self.opcion.id]))
+        self.assertContains(resp, "Ver cursos")
+        self.assertContains(resp, "Cursos vigentes")
+
+
+class ResumenConsultasTest(TestCase):
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.ayer = self.hoy - timedelta(days=1)
+
+    def _log(self, texto, dia, keyword=None):
+        return ConsultaLog.objects.create(
+            texto_consulta=texto,
+            keyword_matcheada=keyword,
+            encontrado=keyword is not None,
+            fecha=resumen._inicio_del_dia(dia) + timedelta(hours=12),
+        )
+
+    def test_agrupa_por_dia_y_texto_normalizado(self):
+        self._log("¿Cash Rebate?", self.ayer)
+        self._log("cash   rebate", self.ayer)
+        self._log("exención", self.ayer, keyword="exencion")
+        self._log("cash rebate", self.hoy)
+        call_command("resumir_consultas", stdout=StringIO())
+
+        fila = ConsultaResumenDiario.objects.get(fecha=self.ayer, encontrado=False)
+        self.assertEqual((fila.texto_normalizado, fila.cantidad), ("cash rebate", 2))
+        self.assertEqual(ConsultaResumenDiario.objects.filter(fecha=self.hoy).count(), 1)
+
+    def test_recalcular_es_idempotente(self):
+        self._log("cash rebate", self.hoy)
+        call_command("resumir_consultas", stdout=StringIO())
+        self._log("cash rebate", self.hoy)
+        call_command("resumir_consultas", stdout=StringIO())
+        self.assertEqual(ConsultaResumenDiario.objects.get().cantidad, 2)
+
+    def test_retencion_borra_solo_lo_resumido(self):
+        viejo = self.hoy - timedelta(days=40)
+        self._log("vieja", viejo)
+        self._log("nueva", self.hoy)
+        self.assertEqual(resumen.depurar_log(30), 0)  # todavía sin resumen
+
+        call_command("resumir_consultas", "--retener-dias", "30", stdout=StringIO())
+        self.assertEqual(list(ConsultaLog.objects.values_list("texto_consulta", flat=True)), ["nueva"])
+        # El día depurado conserva su resumen aunque se recalcule
+        call_command("resumir_consultas", "--desde", viejo.isoformat(), stdout=StringIO())
+        self.assertTrue(ConsultaResumenDiario.objects.filter(fecha=viejo).exists())
+
+    def test_admin_lee_del_resumen(self):
+        ConsultaResumenDiario.objects.create(
+            fecha=self.hoy, texto_normalizado="cash rebate", encontrado=False, cantidad=7,
+        )
+        admin = User.objects.create_superuser("admin", "admin@test.com", "x")
+        self.client.force_login(admin)
+        resp = self.client.get(reverse("admin:chatbot_consultaresumendiario_changelist"))
+        self.assertContains(resp, "Lo más consultado sin respuesta")
+        self.assertEqual(resp.context["totales"]["no_encontradas"], 7)
+
+
+class BenchmarkChatbotTest(TestCase):
+    def test_reproduce_log_y_reporta_cambios(self):
+        nodo = crear_nodo("exencion-impositiva")
+        PalabraClave.objects.create(texto="exencion", nodo_destino=nodo)
+        ConsultaLog.objects.create(texto_consulta="exención", keyword_matcheada="exencion", encontrado=True)
+        ConsultaLog.objects.create(texto_consulta="exencoin impositiva", encontrado=False)
+        ConsultaLog.objects.create(texto_consulta="excencion", encontrado=False)
+        salida = StringIO()
+        call_command("benchmark_chatbot", stdout=salida)
+        texto = salida.getvalue()
+        self.assertIn("Corpus: 3 consultas", texto)
+        self.assertIn("Aciertos: 2/3", texto)
+        self.assertIn("«excencion»: — → exencion", texto)
+
+    def test_fuente_json(self):
+        salida = StringIO()
+        call_command("benchmark_chatbot", "--fuente", "json", stdout=salida)
+        self.assertIn("p99", salida.getvalue())
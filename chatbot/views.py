@@ -1,101 +1,92 @@
-import re
-import unicodedata
+from django.shortcuts import render
+from django.http import Http404, JsonResponse
 
-from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
-from django.template.loader import render_to_string
+from .fragmentos import fragmento_no_encontrado, fragmento_nodo, html_usuario
+from .grafo import obtener_grafo
+from .historial import MAX_ENTRADAS, Historial
+from .matcher import normalizar_texto, obtener_matcher
+from .registro import registrar_consulta
 
-from .models import Nodo, Opcion, PalabraClave, ConfiguracionChatbot, ConsultaLog
 
-_MAX_HISTORIAL = 50
+def _es_ajax(request):
+    return request.headers.get("X-Requested-With") == "XMLHttpRequest"
 
 
-def normalizar_texto(texto):
-    texto = texto.lower().strip()
-    texto = unicodedata.normalize("NFD", texto)
-    texto = texto.encode("ascii", "ignore").decode("utf-8")
-    return texto
+def _respuesta_incremental(grafo, nodo, mensajes, quitar=0, reiniciar=False):
+    """
+    Respuesta AJAX: solo las entradas nuevas, ya renderizadas. El cliente
+    quita las últimas `quitar` entradas (o todas si `reiniciar`), agrega
+    `mensajes` y reemplaza el bloque de opciones.
+    """
+    return JsonResponse({
+        "reiniciar": reiniciar,
+        "quitar": quitar,
+        "mensajes": mensajes,
+        "opciones_html": fragmento_nodo(grafo, nodo)["opciones"] if nodo else "",
+        "max_mensajes": MAX_ENTRADAS,
+    })
 
 
-def _get_nodo_inicio():
-    return Nodo.objects.filter(es_inicio=True, activo=True).first()
-
-
-def _entry_bot(nodo):
-    return {"tipo": "bot", "texto": nodo.mensaje, "nodo_id": nodo.id}
-
-
-def _nodo_desde_historial(historial):
-    """Devuelve el nodo correspondiente a la última entrada bot del historial."""
-    for entry in reversed(historial):
-        if entry.get("tipo") == "bot":
-            nodo_id = entry.get("nodo_id")
-            if nodo_id:
-                nodo = Nodo.objects.filter(id=nodo_id).first()
-                if nodo:
-                    return nodo
-    return _get_nodo_inicio()
+def _render_completo(request, template, grafo, nodo, historial):
+    contexto = {"nodo": nodo, "historial": historial.mensajes(grafo)}
+    return render(request, template, contexto)
 
 
 def inicio_chatbot(request):
-    nodo = _get_nodo_inicio()
-    historial = [_entry_bot(nodo)]
-    request.session["chat_historial"] = historial
+    grafo = obtener_grafo()
+    nodo = grafo.inicio
+    historial = Historial()
+    historial.reiniciar(nodo)
+    historial.guardar(request.session)
 
-    contexto = {"nodo": nodo, "historial": historial}
+    if _es_ajax(request):
+        return _respuesta_incremental(grafo, nodo, [fragmento_nodo(grafo, nodo)["mensaje"]], reiniciar=True)
 
-    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        widget_html = render_to_string("chatbot/_widget.html", contexto, request=request)
-        return JsonResponse({"widget_html": widget_html})
-
-    return render(request, "chatbot/chat.html", contexto)
+    return _render_completo(request, "chatbot/chat.html", grafo, nodo, historial)
 
 
 def ver_nodo(request, opcion_id):
-    opcion = get_object_or_404(Opcion, id=opcion_id)
-    nodo = opcion.nodo_destino
-
-    historial = request.session.get("chat_historial", [])
-    historial.append({"tipo": "usuario", "texto": opcion.texto})
-    historial.append(_entry_bot(nodo))
-
-    # Limitar tamaño del historial para no saturar la sesión
-    if len(historial) > _MAX_HISTORIAL:
-        historial = historial[-_MAX_HISTORIAL:]
-
-    request.session["chat_historial"] = historial
+    grafo = obtener_grafo()
+    opcion = grafo.opcion(opcion_id)
+    if opcion is None:
+        raise Http404("Opción inexistente")
+    nodo = grafo.nodo(opcion.nodo_destino_id)
 
-    contexto = {"nodo": nodo, "historial": historial}
+    # El historial es un buffer circular: no hace falta recortarlo a mano
+    historial = Historial.de_sesion(request.session, grafo)
+    historial.agregar_opcion(opcion)
+    historial.agregar_bot(nodo)
+    historial.guardar(request.session)
 
-    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        widget_html = render_to_string("chatbot/_widget.html", contexto, request=request)
-        return JsonResponse({"widget_html": widget_html})
+    if _es_ajax(request):
+        mensajes = [html_usuario(opcion.texto), fragmento_nodo(grafo, nodo)["mensaje"]]
+        return _respuesta_incremental(grafo, nodo, mensajes)
 
-    return render(request, "chatbot/chat.html", contexto)
+    return _render_completo(request, "chatbot/chat.html", grafo, nodo, historial)
 
 
 def volver(request):
-    historial = request.session.get("chat_historial", [])
+    grafo = obtener_grafo()
+    historial = Historial.de_sesion(request.session, grafo)
 
-    if len(historial) >= 2:
-        historial = historial[:-2]
+    quitar = historial.quitar(2) if len(historial) >= 2 else 0
 
-    request.session["chat_historial"] = historial
-
-    if historial:
-        nodo = _nodo_desde_historial(historial)
+    if len(historial):
+        nodo = historial.ultimo_nodo(grafo)
+        mensajes = []
+        reiniciar = False
     else:
-        nodo = _get_nodo_inicio()
-        historial = [_entry_bot(nodo)]
-        request.session["chat_historial"] = historial
+        nodo = grafo.inicio
+        historial.reiniciar(nodo)
+        mensajes = [fragmento_nodo(grafo, nodo)["mensaje"]]
+        reiniciar = True
 
-    contexto = {"nodo": nodo, "historial": historial}
+    historial.guardar(request.session)
 
-    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        widget_html = render_to_string("chatbot/_widget.html", contexto, request=request)
-        return JsonResponse({"widget_html": widget_html})
+    if _es_ajax(request):
+        return _respuesta_incremental(grafo, nodo, mensajes, quitar=quitar, reiniciar=reiniciar)
 
-    return render(request, "chatbot/chat.html", contexto)
+    return _render_completo(request, "chatbot/chat.html", grafo, nodo, historial)
 
 
 def buscar_consulta(request):
@@ -105,72 +96,53 @@ def buscar_consulta(request):
     consulta = request.POST.get("consulta", "").strip()
     consulta_normalizada = normalizar_texto(consulta)
 
-    historial = request.session.get("chat_historial", [])
+    grafo = obtener_grafo()
+    historial = Historial.de_sesion(request.session, grafo)
+    mensajes = []
 
     if consulta:
-        historial.append({"tipo": "usuario", "texto": consulta})
-
-    palabras_clave = PalabraClave.objects.filter(activo=True).select_related("nodo_destino")
+        historial.agregar_usuario(consulta)
+        mensajes.append(html_usuario(consulta))
 
-    # B: word boundary — la keyword debe ser una palabra completa, no substring
-    def _matchea(kw_normalizada, texto_normalizado):
-        patron = r'\b' + re.escape(kw_normalizada) + r'\b'
-        return bool(re.search(patron, texto_normalizado))
-
-    coincidencias = [
-        p for p in palabras_clave
-        if p.texto and _matchea(normalizar_texto(p.texto), consulta_normalizada)
-    ]
+    # B: word boundary — la keyword debe ser una palabra completa, no substring.
+    # El matcher ya resuelve el desempate por prioridad y longitud; si no hay
+    # coincidencia exacta, se reintenta corrigiendo errores de tipeo.
+    mejor = obtener_matcher().resolver(consulta_normalizada)
+    nodo = grafo.nodo(mejor.nodo_id) if mejor else None
 
     keyword_matcheada = None
-    if coincidencias:
-        mejor = max(coincidencias, key=lambda p: (p.prioridad, len(normalizar_texto(p.texto))))
+    if nodo:
         keyword_matcheada = mejor.texto
-        nodo = mejor.nodo_destino
-        historial.append(_entry_bot(nodo))
+        historial.agregar_bot(nodo)
+        mensajes.append(fragmento_nodo(grafo, nodo)["mensaje"])
     else:
-        nodo = _get_nodo_inicio()
-        config = ConfiguracionChatbot.get()
-        msg_no_encontrado = (
-            config.mensaje_no_encontrado if config
-            else "No estoy seguro de haber entendido. Podés reformular la consulta o elegir una de las opciones disponibles."
-        )
-        historial.append({
-            "tipo": "bot",
-            "texto": msg_no_encontrado,
-            "nodo_id": nodo.id if nodo else None,
-        })
+        nodo = grafo.inicio
+        historial.agregar_no_encontrado(nodo)
+        mensajes.append(fragmento_no_encontrado(grafo))
 
-    # F: registrar consulta
+    # F: registrar consulta (se persiste en lote, fuera del request)
     if consulta:
-        ConsultaLog.objects.create(
-            texto_consulta=consulta[:500],
-            keyword_matcheada=keyword_matcheada,
-            nodo_destino=nodo,
-            encontrado=bool(coincidencias),
+        registrar_consulta(
+            consulta,
+            keyword_matcheada,
+            nodo.id if nodo else None,
+            keyword_matcheada is not None,
         )
 
-    if len(historial) > _MAX_HISTORIAL:
-        historial = historial[-_MAX_HISTORIAL:]
+    historial.guardar(request.session)
 
-    request.session["chat_historial"] = historial
-
-    contexto = {"nodo": nodo, "historial": historial}
-
-    widget_html = render_to_string("chatbot/_widget.html", contexto, request=request)
-    return JsonResponse({"widget_html": widget_html})
+    return _respuesta_incremental(grafo, nodo, mensajes)
 
 
 def widget_chatbot(request):
-    historial = request.session.get("chat_historial")
+    grafo = obtener_grafo()
+    historial = Historial.de_sesion(request.session, grafo)
 
-    if not historial:
-        nodo = _get_nodo_inicio()
-        historial = [_entry_bot(nodo)]
-        request.session["chat_historial"] = historial
+    if not len(historial):
+        nodo = grafo.inicio
+        historial.reiniciar(nodo)
+        historial.guardar(request.session)
     else:
-        nodo = _nodo_desde_historial(historial)
-
-    contexto = {"nodo": nodo, "historial": historial}
+        nodo = historial.ultimo_nodo(grafo)
 
-    return render(request, "chatbot/_widget_shell.html", contexto)
\ No newline at end of file
+    return _render_completo(request, "chatbot/_widget_shell.html", grafo, nodo, historial)
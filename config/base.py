@@ -40,6 +40,9 @@ INSTALLED_APPS = [
     'exencion',
     "backoffice",
     'chatbot',
+    'estadisticas',
+    'exportaciones',
+    'correos',
 ]
 
 
@@ -48,6 +51,8 @@ INSTALLED_APPS = [
 # ============================================
 
 MIDDLEWARE = [
+    # Primero: mide también las consultas de sesión y autenticación
+    'nueva_web_dav.consultas.MedicionConsultasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -196,3 +201,59 @@ ALLOWED_HOSTS = ["*"]
 
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
+
+
+# ============================================
+# CACHE
+# ============================================
+# El chatbot guarda acá los tokens de versión de sus estructuras en memoria
+# y los fragmentos HTML (chatbot/cache.py): con varios workers el cache
+# tiene que ser compartido para que una edición en el admin llegue a todos.
+# Sin CACHE_REDIS_URL (desarrollo, un solo proceso) queda en memoria local.
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+
+
+# ============================================
+# CHATBOT
+# ============================================
+# Registro de consultas en lote (chatbot/registro.py).
+CHATBOT_LOG_LOTE = 100          # filas por bulk_create
+CHATBOT_LOG_INTERVALO = 5.0     # segundos máximos que espera una consulta en cola
+CHATBOT_LOG_REDIS_URL = os.environ.get("CHATBOT_LOG_REDIS_URL")  # None => cola en memoria
+CHATBOT_LOG_MAXIMO = 10000      # consultas pendientes como máximo en la cola en memoria
+
+
+# ============================================
+# EXPORTACIONES
+# ============================================
+# Exportaciones en segundo plano (exportaciones/trabajos.py).
+# Los archivos tienen datos personales: se guardan fuera de MEDIA_ROOT.
+EXPORTACIONES_DIR = BASE_DIR / "exportaciones_privadas"
+EXPORTACIONES_TTL_HORAS = 24       # vida de un archivo generado
+EXPORTACIONES_REDIS_URL = os.environ.get("EXPORTACIONES_REDIS_URL")  # None => el worker sondea la base
+
+
+# ============================================
+# CORREOS
+# ============================================
+# Cola de correos salientes (correos/cola.py), enviada por enviar_correos.
+CORREOS_LOTE = 50                    # mensajes por conexión SMTP
+CORREOS_MAX_INTENTOS = 6             # después queda en ERROR
+CORREOS_ESPERA_BASE_SEGUNDOS = 60    # espera del primer reintento; se duplica en cada uno
+CORREOS_RETENCION_DIAS = 30          # los enviados se borran pasado este plazo
+
+
+# ============================================
+# CONSULTAS SQL POR REQUEST
+# ============================================
+# Medición de consultas (nueva_web_dav/consultas.py).
+CONSULTAS_HEADER = True        # resumen en el header X-Consultas-SQL
+CONSULTAS_UMBRAL = 50          # más consultas que esto => warning en el log
+CONSULTAS_UMBRAL_MS = 500      # más tiempo de SQL que esto => warning en el log
@@ -11,6 +11,16 @@ from .secrets import (
 # ======================================================
 
 DEBUG = False
+# El resumen de consultas no se expone: solo se loguean los requests pesados
+CONSULTAS_HEADER = False
+
+# Varios workers: el cache tiene que ser compartido (ver CACHE en base.py)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_REDIS_URL or "redis://127.0.0.1:6379/1",
+    }
+}
 
 ALLOWED_HOSTS = [
     "127.0.0.1",
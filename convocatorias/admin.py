@@ -4,8 +4,9 @@ from django.utils.text import slugify
 from django.utils.html import format_html, mark_safe, escape
 from django.urls import reverse
 
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+from exportaciones.xlsx import LOTE, Hoja, respuesta_xlsx
+from exportaciones.zips import respuesta_zip
+from correos import cola
 
 from django.conf import settings
 from django.contrib import messages
@@ -14,11 +15,10 @@ from django.shortcuts import render
 from django.template.loader import render_to_string
 from django.utils import timezone
 
-from . import depuracion
+from . import depuracion, documentacion, paquetes, transiciones
 
 import io
 import os
-import zipfile
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -27,9 +27,8 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable, Image
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 
-from registro_audiovisual.models import PersonaHumana, PersonaJuridica
-
 from .models import (
+    CambioEstadoPostulacion,
     Convocatoria,
     MiembroJurado,
     Postulacion,
@@ -206,6 +205,25 @@ class PostulacionDocumentoInline(admin.TabularInline):
 
 
 
+# ============================================================
+#  HISTORIAL DE ESTADOS (INLINE, solo lectura)
+# ============================================================
+class CambioEstadoPostulacionInline(admin.TabularInline):
+    model = CambioEstadoPostulacion
+    extra = 0
+    can_delete = False
+    verbose_name_plural = "Historial de estados"
+    fields = ("fecha", "estado_anterior", "estado", "origen", "usuario")
+    readonly_fields = fields
+    ordering = ("fecha",)
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # ============================================================
 #  POSTULACIONES
 # ============================================================
@@ -326,7 +344,7 @@ class PostulacionAdmin(FiltrosPersistentesMixin, admin.ModelAdmin):
         "documentacion_depurada",
     )
 
-    inlines = [IntegrantePostulacionInline, PostulacionDocumentoInline]
+    inlines = [IntegrantePostulacionInline, PostulacionDocumentoInline, CambioEstadoPostulacionInline]
 
     # ==================================================
     # FIELDSETS DINÁMICOS (línea libre: oculta “Datos del proyecto”)
@@ -404,55 +422,48 @@ class PostulacionAdmin(FiltrosPersistentesMixin, admin.ModelAdmin):
     # ==================================================
     # SISTEMA DE EMAILS POR CAMBIO DE ESTADO
     # ==================================================
-    _EMAIL_POR_ESTADO = {
-        "enviado":           ("convocatorias/email_postulacion_enviada.html", "Tu postulación fue recibida"),
-        "admitido":          ("convocatorias/email_admitido.html",            "Tu postulación fue admitida"),
-        "no_admitido":       ("convocatorias/email_no_admitido.html",         "Tu postulación no fue admitida"),
-        "evaluacion_jurado": ("convocatorias/email_evaluacion_jurado.html",   "Tu postulación está en evaluación"),
-        "seleccionado":      ("convocatorias/email_seleccionado.html",        "Tu proyecto fue seleccionado"),
-        "no_seleccionado":   ("convocatorias/email_no_seleccionado.html",     "Resultado de tu postulación"),
-    }
+    # Templates y asuntos en convocatorias/transiciones.py (EMAIL_POR_ESTADO)
+    def _panel_url(self, request):
+        return request.build_absolute_uri(reverse("usuarios:panel_usuario"))
 
     def _enviar_email_estado(self, request, postulacion):
-        config = self._EMAIL_POR_ESTADO.get(postulacion.estado)
-        if not config:
-            return
-        template, asunto = config
-        user = postulacion.user
-        if not user or not user.email:
-            return
-        convocatoria_titulo = postulacion.convocatoria.titulo if postulacion.convocatoria else ""
-        panel_url = request.build_absolute_uri(reverse("usuarios:panel_usuario"))
-        contexto = {
-            "user": user,
-            "postulacion": postulacion,
-            "convocatoria_titulo": convocatoria_titulo,
-            "panel_url": panel_url,
-            "anio": timezone.now().year,
-        }
-        texto = f"{asunto}\n\nConvocatoria: {convocatoria_titulo or '—'}\n\nIngresá al panel: {panel_url}"
         try:
-            html = render_to_string(template, contexto)
-            email = EmailMultiAlternatives(
-                subject=asunto,
-                body=texto,
-                from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-                to=[user.email],
-            )
-            email.attach_alternative(html, "text/html")
-            email.send(fail_silently=False)
-            messages.success(request, f"Email enviado a {user.email}: {asunto}.")
+            email = transiciones.mensaje_estado(postulacion, self._panel_url(request))
+            if email is None:
+                return
+            cola.encolar(email, origen="postulacion.estado")
+            messages.success(request, f"Email encolado para {email.to[0]}: {email.subject}.")
         except Exception as e:
-            messages.error(request, f"No se pudo enviar el email: {e}")
+            messages.error(request, f"No se pudo encolar el email: {e}")
 
     def save_model(self, request, obj, form, change):
-        estado_anterior = None
-        if change and obj.pk:
-            estado_anterior = Postulacion.objects.filter(pk=obj.pk).values_list("estado", flat=True).first()
+        # El form ya sabe si cambió el estado: no hace falta releerlo de la base
+        cambio_estado = not change or "estado" in form.changed_data
         super().save_model(request, obj, form, change)
-        if obj.estado != estado_anterior:
+        if cambio_estado:
+            CambioEstadoPostulacion.registrar(
+                obj, form.initial.get("estado") if change else "", "admin", request.user,
+            )
             self._enviar_email_estado(request, obj)
 
+    def _informar_transicion(self, request, resultado, etiqueta):
+        """Mensajes del admin para un transiciones.Resultado."""
+        if resultado.cambiadas:
+            texto = f"{len(resultado.cambiadas)} postulación/es marcada/s como {etiqueta}."
+            if resultado.notificadas:
+                texto += f" {resultado.notificadas} aviso/s por email encolado/s."
+            messages.success(request, texto)
+        if resultado.sin_cambios:
+            messages.info(request, f"{len(resultado.sin_cambios)} ya estaba/n como {etiqueta}.")
+        if resultado.invalidas:
+            detalle = ", ".join(f"#{pk} ({estado})" for pk, estado in resultado.invalidas[:20])
+            if len(resultado.invalidas) > 20:
+                detalle += ", …"
+            messages.warning(
+                request,
+                f"{len(resultado.invalidas)} no se pueden pasar a {etiqueta} desde su estado: {detalle}.",
+            )
+
     # ==================================================
     # HELPERS PERSONA (usan el caché del select_related)
     # ==================================================
@@ -551,42 +562,14 @@ class PostulacionAdmin(FiltrosPersistentesMixin, admin.ModelAdmin):
         Crea Rendición SOLO para postulaciones ya 'seleccionado'.
         No modifica el estado de la postulación.
         """
-        creadas = 0
-        ya_existian = 0
-        omitidas = 0
-
-        # optimiza accesos
-        queryset = queryset.select_related("user", "convocatoria")
-
-        for p in queryset:
-            if p.estado != "seleccionado":
-                omitidas += 1
-                continue
-
-            rendicion, created = Rendicion.objects.get_or_create(
-                postulacion=p,
-                defaults={"user": p.user},
-            )
-
-            # si existía pero el user no coincide (raro), lo alineamos
-            if not created and rendicion.user_id != p.user_id:
-                rendicion.user = p.user
-
-            # evento
-            try:
-                if created:
-                    rendicion.add_event("admin", "RENDICION_CREADA", f"Creada desde admin para Postulación {p.id}")
-                else:
-                    rendicion.add_event("admin", "RENDICION_EXISTENTE", f"Ya existía (admin) para Postulación {p.id}")
-                rendicion.save()
-            except Exception:
-                # si algo raro pasa con JSONField no rompemos la acción
-                rendicion.save()
+        seleccionadas = queryset.filter(estado="seleccionado")
+        omitidas = queryset.exclude(estado="seleccionado").count()
 
-            if created:
-                creadas += 1
-            else:
-                ya_existian += 1
+        creadas, ya_existian = transiciones.crear_rendiciones(
+            seleccionadas.values_list("id", flat=True),
+            "RENDICION_CREADA", "Creada desde admin para Postulación {postulacion}",
+            "RENDICION_EXISTENTE", "Ya existía (admin) para Postulación {postulacion}",
+        )
 
         if creadas:
             messages.success(request, f"✅ Rendiciones creadas: {creadas}.")
@@ -602,96 +585,57 @@ class PostulacionAdmin(FiltrosPersistentesMixin, admin.ModelAdmin):
         Marca postulaciones como 'seleccionado' y crea Rendición.
         Útil cuando ya está decidida la selección y querés habilitar rendición de una.
         """
-        actualizadas = 0
-        creadas = 0
-
-        queryset = queryset.select_related("user", "convocatoria")
-
-        for p in queryset:
-            # setea seleccionado si no lo estaba
-            if p.estado != "seleccionado":
-                p.estado = "seleccionado"
-                p.save(update_fields=["estado"])
-                actualizadas += 1
-
-            rendicion, created = Rendicion.objects.get_or_create(
-                postulacion=p,
-                defaults={"user": p.user},
-            )
-            if not created and rendicion.user_id != p.user_id:
-                rendicion.user = p.user
-
-            try:
-                rendicion.add_event("admin", "SELECCIONADO_Y_RENDICION", f"Postulación {p.id} marcada seleccionado y rendición habilitada")
-                rendicion.save()
-            except Exception:
-                rendicion.save()
-
-            if created:
-                creadas += 1
-
-        messages.success(
-            request,
-            f"✅ Postulaciones marcadas como 'seleccionado': {actualizadas}. Rendiciones creadas: {creadas}."
+        resultado = transiciones.aplicar(queryset, "seleccionado", usuario=request.user)
+        creadas, _ = transiciones.crear_rendiciones(
+            resultado.cambiadas + resultado.sin_cambios,
+            "SELECCIONADO_Y_RENDICION",
+            "Postulación {postulacion} marcada seleccionado y rendición habilitada",
         )
+        self._informar_transicion(request, resultado, "SELECCIONADA/S")
+        messages.success(request, f"✅ Rendiciones creadas: {creadas}.")
 
     marcar_seleccionado_y_crear_rendicion.short_description = "🏆 Marcar como SELECCIONADO + crear Rendición"
 
     # ==================================================
     # ACCIONES DE ESTADO CON EMAIL
     # ==================================================
+    # Un UPDATE por acción (convocatorias/transiciones.py); los emails se
+    # encolan y los manda el worker de correos.
+    def _transicion(self, request, queryset, destino, etiqueta, renotificar=False):
+        resultado = transiciones.aplicar(
+            queryset, destino, panel_url=self._panel_url(request), usuario=request.user,
+            renotificar=renotificar,
+        )
+        self._informar_transicion(request, resultado, etiqueta)
+        return resultado
+
     def marcar_ganador_y_notificar(self, request, queryset):
-        for p in queryset.select_related("user", "convocatoria"):
-            if p.estado != "seleccionado":
-                p.estado = "seleccionado"
-                p.save(update_fields=["estado"])
-            self._enviar_email_estado(request, p)
-        self.message_user(request, f"{queryset.count()} proyecto(s) marcado(s) como seleccionado/s y notificado/s.")
+        # Como siempre, vuelve a avisar a las que ya estaban seleccionadas
+        self._transicion(request, queryset, "seleccionado", "SELECCIONADA/S", renotificar=True)
 
     marcar_ganador_y_notificar.short_description = "✉️ Marcar como SELECCIONADO y enviar email"
 
     def marcar_no_seleccionado_y_notificar(self, request, queryset):
-        actualizadas = 0
-        for p in queryset.select_related("user", "convocatoria"):
-            if p.estado != "no_seleccionado":
-                p.estado = "no_seleccionado"
-                p.save(update_fields=["estado"])
-                self._enviar_email_estado(request, p)
-                actualizadas += 1
-        self.message_user(
-            request,
-            f"{actualizadas} postulación/es marcada/s como NO SELECCIONADA/s y notificada/s."
-        )
+        self._transicion(request, queryset, "no_seleccionado", "NO SELECCIONADA/S")
 
     marcar_no_seleccionado_y_notificar.short_description = "🚫 Marcar como NO SELECCIONADO y enviar email"
 
     def marcar_admitido(self, request, queryset):
-        for p in queryset.select_related("user", "convocatoria"):
-            if p.estado != "admitido":
-                p.estado = "admitido"
-                p.save(update_fields=["estado"])
-                self._enviar_email_estado(request, p)
-        self.message_user(request, f"{queryset.count()} postulación/es marcada/s como admitida/s.")
+        self._transicion(request, queryset, "admitido", "admitida/s")
 
     marcar_admitido.short_description = "✅ Marcar como ADMITIDO y notificar"
 
     def marcar_no_admitido(self, request, queryset):
-        for p in queryset.select_related("user", "convocatoria"):
-            if p.estado != "no_admitido":
-                p.estado = "no_admitido"
-                p.save(update_fields=["estado"])
-                self._enviar_email_estado(request, p)
-        self.message_user(request, f"{queryset.count()} postulación/es marcada/s como no admitida/s.")
+        self._transicion(request, queryset, "no_admitido", "no admitida/s")
 
     marcar_no_admitido.short_description = "❌ Marcar como NO ADMITIDO y notificar"
 
     def marcar_evaluacion_jurado(self, request, queryset):
-        for p in queryset.select_related("user", "convocatoria"):
-            if p.estado != "evaluacion_jurado":
-                p.estado = "evaluacion_jurado"
-                p.save(update_fields=["estado"])
-                self._enviar_email_estado(request, p)
-        self.message_user(request, f"{queryset.count()} postulación/es enviada/s a evaluación por jurado.")
+        resultado = self._transicion(request, queryset, "evaluacion_jurado", "en evaluación por jurado")
+        # Los ZIP de documentación los genera preparar_paquetes_documentacion;
+        # solo hacen falta para las que recién llegan al jurado
+        if resultado.cambiadas:
+            paquetes.preparar(Postulacion.objects.filter(pk__in=resultado.cambiadas))
 
     marcar_evaluacion_jurado.short_description = "⚖️ Enviar a EVALUACIÓN POR JURADO y notificar"
 
@@ -699,114 +643,33 @@ class PostulacionAdmin(FiltrosPersistentesMixin, admin.ModelAdmin):
     # ACCIÓN ZIP
     # ==================================================
     def descargar_documentacion_zip(self, request, queryset):
-        if queryset.count() == 1:
-            return self._zip_para_una_postulacion(queryset.first())
-
-        buffer = io.BytesIO()
-        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for p in queryset:
-                zip_bytes, zip_name = self._bytes_zip_para_una_postulacion(p)
-                zf.writestr(zip_name, zip_bytes.getvalue())
-
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type="application/zip")
-        response["Content-Disposition"] = 'attachment; filename="documentacion_postulaciones.zip"'
-        return response
+        seleccion = list(queryset.values_list("id", "convocatoria_id"))
+        convocatorias = {conv_id for _, conv_id in seleccion}
+
+        # Una postulación, o todas las de una convocatoria: paquete pregenerado
+        if len(convocatorias) == 1:
+            convocatoria = Convocatoria.objects.get(pk=convocatorias.pop())
+            if len(seleccion) == 1:
+                return paquetes.respuesta(convocatoria, queryset.select_related("user").get())
+            completos = set(paquetes.postulaciones_del_paquete(convocatoria.pk, "completo")
+                            .values_list("id", flat=True))
+            if completos == {pk for pk, _ in seleccion}:
+                return paquetes.respuesta(convocatoria)
+
+        # Selección arbitraria: se arma mientras se descarga (ver convocatorias/documentacion.py),
+        # con una carpeta por postulación en el mismo ZIP
+        postulaciones = documentacion.postulaciones_con_documentos(queryset)
+        return respuesta_zip(
+            "documentacion_postulaciones.zip",
+            documentacion.entradas(postulaciones, carpetas=True),
+        )
 
     descargar_documentacion_zip.short_description = "📦 Descargar documentación (ZIP)"
 
-    def _agregar_archivo_zip(self, zf, file_field, carpeta, nombre):
-        """Agrega el archivo al ZIP. Devuelve True si se pudo agregar."""
-        if not file_field:
-            return False
-        try:
-            path = getattr(file_field, "path", None)
-            if path and os.path.exists(path):
-                zf.write(path, f"{carpeta}/{nombre}{os.path.splitext(path)[1]}")
-            else:
-                with file_field.open("rb") as f:
-                    zf.writestr(
-                        f"{carpeta}/{nombre}{os.path.splitext(file_field.name)[1]}",
-                        f.read()
-                    )
-            return True
-        except Exception:
-            return False
-
-    def _safe_slug(self, p):
-        base = p.nombre_proyecto or f"postulacion_{p.id}"
-        return slugify(base)[:40] or f"postulacion_{p.id}"
-
-    def _bytes_zip_para_una_postulacion(self, p):
-        buffer = io.BytesIO()
-        name = f"postulacion_{p.id}_{self._safe_slug(p)}.zip"
-        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            self._armar_zip(zf, p)
-        buffer.seek(0)
-        return buffer, name
-
-    def _zip_para_una_postulacion(self, p):
-        buffer = io.BytesIO()
-        name = f"postulacion_{p.id}_{self._safe_slug(p)}.zip"
-        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            self._armar_zip(zf, p)
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type="application/zip")
-        response["Content-Disposition"] = f'attachment; filename="{name}"'
-        return response
-
-    def _armar_zip(self, zf, p):
-        zf.writestr(
-            "README.txt",
-            f"Postulación ID: {p.id}\n"
-            f"Proyecto: {p.nombre_proyecto or '(Sin título)'}\n"
-            f"Usuario: {p.user.username}\n"
-            f"Convocatoria: {p.convocatoria.titulo if p.convocatoria else ''}\n"
-        )
-        faltantes = []
-        for doc in p.documentos.all():
-            # id incluido para que documentos del mismo tipo no se pisen en el ZIP
-            agregado = self._agregar_archivo_zip(
-                zf,
-                doc.archivo,
-                "documentacion",
-                slugify(f"{doc.get_tipo_display()}-{doc.id}")
-            )
-            if not agregado:
-                faltantes.append(
-                    f"- {doc.get_tipo_display()} (id {doc.id}): "
-                    f"{doc.archivo.name if doc.archivo else 'sin archivo'}"
-                )
-        for integrante in p.integrantes.all():
-            carpeta = f"equipo/{integrante.rol.lower()}_{slugify(integrante.nombre_busqueda or str(integrante.id))}"
-            for doc in integrante.documentos.all():
-                agregado = self._agregar_archivo_zip(
-                    zf,
-                    doc.archivo,
-                    carpeta,
-                    slugify(f"{doc.get_tipo_display()}-{doc.id}"),
-                )
-                if not agregado:
-                    faltantes.append(
-                        f"- {carpeta} · {doc.get_tipo_display()} (id {doc.id}): "
-                        f"{doc.archivo.name if doc.archivo else 'sin archivo'}"
-                    )
-        if faltantes:
-            zf.writestr(
-                "FALTANTES.txt",
-                "Documentos que NO se pudieron incluir en este ZIP:\n"
-                + "\n".join(faltantes)
-                + "\n"
-            )
-
     # ==================================================
     # EXPORTAR EXCEL
     # ==================================================
     def exportar_excel_postulaciones(self, request, queryset):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Postulaciones"
-
         headers = [
             "Fecha postulación",
             "Usuario",
@@ -821,35 +684,29 @@ class PostulacionAdmin(FiltrosPersistentesMixin, admin.ModelAdmin):
             "Género (proyecto)",
             "Estado",
         ]
-        ws.append(headers)
 
         queryset = queryset.select_related("user", "convocatoria", "user__persona_humana", "user__persona_juridica")
 
-        for p in queryset:
-            ws.append([
-                p.fecha_envio.strftime("%d/%m/%Y %H:%M") if p.fecha_envio else "",
-                p.user.username,
-                self._presentante_texto(p.user),
-                self._edad_texto(p.user),
-                self._genero_persona_texto(p.user),
-                self._lugar_residencia_texto(p.user),
-                p.convocatoria.titulo if p.convocatoria else "",
-                p.convocatoria.linea if p.convocatoria else "",
-                p.nombre_proyecto or "",
-                p.get_tipo_proyecto_display() if p.tipo_proyecto else "",
-                p.get_genero_display() if p.genero else "",
-                p.get_estado_display() if p.estado else "",
-            ])
-
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 25
-
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        response["Content-Disposition"] = 'attachment; filename="postulaciones.xlsx"'
-        wb.save(response)
-        return response
+        def filas():
+            for p in queryset.iterator(chunk_size=LOTE):
+                yield [
+                    p.fecha_envio.strftime("%d/%m/%Y %H:%M") if p.fecha_envio else "",
+                    p.user.username,
+                    self._presentante_texto(p.user),
+                    self._edad_texto(p.user),
+                    self._genero_persona_texto(p.user),
+                    self._lugar_residencia_texto(p.user),
+                    p.convocatoria.titulo if p.convocatoria else "",
+                    p.convocatoria.linea if p.convocatoria else "",
+                    p.nombre_proyecto or "",
+                    p.get_tipo_proyecto_display() if p.tipo_proyecto else "",
+                    p.get_genero_display() if p.genero else "",
+                    p.get_estado_display() if p.estado else "",
+                ]
+
+        return respuesta_xlsx("postulaciones.xlsx", [
+            Hoja("Postulaciones", filas(), encabezados=headers),
+        ])
 
     exportar_excel_postulaciones.short_description = "📤 Exportar seleccionadas a Excel (.xlsx)"
 
@@ -912,6 +769,7 @@ class ObservacionAdministrativaAdmin(admin.ModelAdmin):
     )
     list_filter = ("subsanada", "tipo_documento")
     search_fields = ("descripcion", "postulacion__nombre_proyecto", "postulacion__id")
+    list_select_related = ("postulacion__user__persona_humana", "postulacion__user__persona_juridica")
 
     # -------------------------
     # LINKS EN LISTADO
@@ -941,8 +799,8 @@ class ObservacionAdministrativaAdmin(admin.ModelAdmin):
             return "—"
 
         user = p.user
-        ph = PersonaHumana.objects.filter(user=user).first()
-        pj = PersonaJuridica.objects.filter(user=user).first()
+        ph = getattr(user, "persona_humana", None)
+        pj = getattr(user, "persona_juridica", None)
 
         if ph:
             url = reverse("admin:registro_audiovisual_personahumana_change", args=[ph.id])
@@ -1048,11 +906,11 @@ class ObservacionAdministrativaAdmin(admin.ModelAdmin):
             )
             if html:
                 email.attach_alternative(html, "text/html")
-            email.send(fail_silently=False)
+            cola.encolar(email, origen="postulacion.subsanacion")
 
-            messages.success(request, f"Email de subsanación enviado a {destinatario}.")
+            messages.success(request, f"Email de subsanación encolado para {destinatario}.")
         except Exception as e:
-            messages.error(request, f"No se pudo enviar el email de subsanación: {e}")
+            messages.error(request, f"No se pudo encolar el email de subsanación: {e}")
 
 
 
@@ -1081,6 +939,11 @@ class RendicionAdmin(admin.ModelAdmin):
         "estado_postulacion",
         "fecha_creacion",
     )
+    list_select_related = (
+        "postulacion__convocatoria",
+        "postulacion__user__persona_humana",
+        "postulacion__user__persona_juridica",
+    )
 
     ordering = ("-fecha_creacion",)
 
@@ -1116,8 +979,8 @@ class RendicionAdmin(admin.ModelAdmin):
             return "—"
 
         user = postulacion.user
-        ph = PersonaHumana.objects.filter(user=user).first()
-        pj = PersonaJuridica.objects.filter(user=user).first()
+        ph = getattr(user, "persona_humana", None)
+        pj = getattr(user, "persona_juridica", None)
 
         if ph:
             url = reverse("admin:registro_audiovisual_personahumana_change", args=[ph.id])
@@ -1330,6 +1193,11 @@ class EvaluacionPostulacionAdmin(admin.ModelAdmin):
     readonly_fields = ("ultima_edicion_por", "fecha_modificacion", "puntaje_total")
     inlines       = [PuntajeCriterioInline]
     actions       = ["marcar_ganador_y_notificar", "descargar_acta_jurado"]
+    list_select_related = ("postulacion__user", "ultima_edicion_por")
+
+    def get_queryset(self, request):
+        # puntaje_total suma los puntajes de cada fila del listado
+        return super().get_queryset(request).prefetch_related("puntajes")
 
     def get_form(self, request, obj=None, **kwargs):
         if obj:
@@ -1355,8 +1223,10 @@ class EvaluacionPostulacionAdmin(admin.ModelAdmin):
         for ev in queryset.select_related("postulacion__user", "postulacion__convocatoria"):
             p = ev.postulacion
             if p.estado != "seleccionado":
+                anterior = p.estado
                 p.estado = "seleccionado"
                 p.save(update_fields=["estado"])
+                CambioEstadoPostulacion.registrar(p, anterior, "admin", request.user)
 
             user = p.user
             if not user or not user.email:
@@ -1381,10 +1251,10 @@ class EvaluacionPostulacionAdmin(admin.ModelAdmin):
                     to=[user.email],
                 )
                 email.attach_alternative(html, "text/html")
-                email.send(fail_silently=False)
-                messages.success(request, f"Email enviado a {user.email}.")
+                cola.encolar(email, origen="postulacion.seleccionado")
+                messages.success(request, f"Email encolado para {user.email}.")
             except Exception as e:
-                messages.error(request, f"Error enviando email a {user.email}: {e}")
+                messages.error(request, f"Error encolando email a {user.email}: {e}")
 
     marcar_ganador_y_notificar.short_description = "Marcar como ganador y enviar email"
 
@@ -1406,7 +1276,10 @@ class EvaluacionPostulacionAdmin(admin.ModelAdmin):
 
         evaluaciones = list(
             queryset
-            .select_related("postulacion")
+            .select_related(
+                "postulacion__user__persona_humana",
+                "postulacion__user__persona_juridica",
+            )
             .prefetch_related("puntajes")
         )
         evaluaciones.sort(key=lambda e: (e.no_puntuar, -(e.puntaje_total or 0)))
@@ -1493,8 +1366,8 @@ class EvaluacionPostulacionAdmin(admin.ModelAdmin):
         for ev in evaluaciones:
             p = ev.postulacion
             user = p.user
-            ph = PersonaHumana.objects.filter(user=user).first()
-            pj = PersonaJuridica.objects.filter(user=user).first()
+            ph = getattr(user, "persona_humana", None)
+            pj = getattr(user, "persona_juridica", None)
             nombre_presentante = (
                 ph.nombre_completo if ph else
                 pj.razon_social if pj else
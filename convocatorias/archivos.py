@@ -0,0 +1,334 @@
+"""Tamaño y huella (sha256) de los archivos subidos, guardados en la fila.
+
+Cada campo de CAMPOS tiene al lado dos columnas, `<campo>_bytes` y
+`<campo>_sha256`, que se completan al subir el archivo (señales pre_save en
+los models.py de cada app). Así:
+- "cuánto espacio libera la depuración" es un Sum() sobre la base, sin
+  consultar el disco archivo por archivo;
+- un archivo que falta en disco no se confunde con uno vacío: `_bytes`
+  queda en null (desconocido) en vez de 0;
+- los archivos subidos dos veces se detectan por la huella (duplicados()).
+
+Las filas anteriores a estas columnas se completan con el comando
+completar_huellas_archivos.
+
+Los documentos personales (DNI, CV, constancias) se suben iguales a muchas
+postulaciones, exenciones e inscripciones. Sus campos usan
+AlmacenamientoDeduplicado: cada contenido se guarda una sola vez en
+compartidos/ con nombre según su sha256, y ArchivoCompartido lleva cuántas
+filas lo usan. Las señales post_delete de siempre (archivo.delete()) restan
+una referencia; el archivo se borra recién con la última. Los documentos
+subidos antes se pasan a compartidos/ con el comando deduplicar_documentos.
+"""
+import hashlib
+import os
+from collections import namedtuple
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+
+# (modelo, campo de archivo)
+CAMPOS = [
+    ("convocatorias.DocumentoPostulacion", "archivo"),
+    ("convocatorias.DocumentoIntegrante",  "archivo"),
+    ("convocatorias.Rendicion",            "planilla_xlsx"),
+    ("exencion.ExencionDocumento",         "archivo"),
+    ("formacion.InscripcionFormacion",     "documentacion"),
+]
+
+# Filas por consulta / bulk_update al completar
+LOTE = 500
+
+Huella = namedtuple("Huella", ["bytes", "sha256"])
+Duplicado = namedtuple("Duplicado", ["sha256", "bytes", "cantidad"])
+
+
+def huella(archivo):
+    """Huella de un File / FieldFile abierto (o abrible), leído por bloques."""
+    sha = hashlib.sha256()
+    tamanio = 0
+    for bloque in archivo.chunks():
+        sha.update(bloque)
+        tamanio += len(bloque)
+    return Huella(tamanio, sha.hexdigest())
+
+
+def registrar(instance, campo):
+    """Para un pre_save: completa `<campo>_bytes` / `<campo>_sha256` si el
+    archivo se acaba de subir, o los limpia si se quitó."""
+    archivo = getattr(instance, campo)
+    if not archivo:
+        setattr(instance, f"{campo}_bytes", None)
+        setattr(instance, f"{campo}_sha256", "")
+        return
+    if archivo._committed:
+        return  # ya estaba guardado: no cambió
+    h = huella(archivo.file)
+    # El storage recibe este mismo objeto al guardar: no vuelve a leerlo
+    archivo.file._huella = h
+    setattr(instance, f"{campo}_bytes", h.bytes)
+    setattr(instance, f"{campo}_sha256", h.sha256)
+
+
+# ──────────────────────────────────────────────────────────────
+# Almacenamiento deduplicado
+# ──────────────────────────────────────────────────────────────
+
+class AlmacenamientoDeduplicado(FileSystemStorage):
+    """MEDIA_ROOT, pero cada contenido una sola vez: compartidos/ab/cd/<sha256><ext>.
+
+    - save() devuelve el nombre del contenido; si ya existía no escribe nada
+      y solo suma una referencia.
+    - delete() resta una referencia y borra el archivo con la última. Antes
+      de borrar verifica en la base que ninguna fila lo siga usando (si el
+      contador quedó desfasado, lo corrige y no borra).
+    - Los nombres fuera de compartidos/ (subidos antes) se borran como
+      siempre: tienen un solo dueño.
+    """
+    CARPETA = "compartidos"
+
+    def nombre_compartido(self, sha256, nombre_original):
+        ext = os.path.splitext(nombre_original)[1].lower()
+        return f"{self.CARPETA}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+    def es_compartido(self, nombre):
+        return bool(nombre) and nombre.startswith(f"{self.CARPETA}/")
+
+    def _guardar(self, nombre, sha256, bytes_, contenido):
+        """Suma una referencia a `nombre`; escribe `contenido` solo si
+        todavía no está en disco. Devuelve (nombre, si se escribió)."""
+        Compartido = apps.get_model("convocatorias", "ArchivoCompartido")
+        with transaction.atomic():
+            compartido, _ = Compartido.objects.select_for_update().get_or_create(
+                nombre=nombre, defaults={"sha256": sha256, "bytes": bytes_},
+            )
+            escrito = not self.exists(nombre)
+            if escrito:
+                guardado = super()._save(nombre, contenido)
+                if guardado != nombre:
+                    # Otro proceso lo escribió entre exists() y _save(): sobra la copia
+                    super().delete(guardado)
+            Compartido.objects.filter(pk=compartido.pk).update(referencias=F("referencias") + 1)
+        return nombre, escrito
+
+    def _save(self, name, content):
+        h = getattr(content, "_huella", None) or huella(content)
+        return self._guardar(self.nombre_compartido(h.sha256, name), h.sha256, h.bytes, content)[0]
+
+    def incorporar(self, nombre, sha256, bytes_):
+        """Copia a compartidos/ un archivo subido antes (`nombre`) y le suma
+        una referencia. No borra el original. Devuelve (nombre nuevo, si
+        hubo que escribirlo)."""
+        with self.open(nombre, "rb") as contenido:
+            return self._guardar(self.nombre_compartido(sha256, nombre), sha256, bytes_, contenido)
+
+    def delete(self, name):
+        if not self.es_compartido(name):
+            return super().delete(name)
+        Compartido = apps.get_model("convocatorias", "ArchivoCompartido")
+        with transaction.atomic():
+            compartido = Compartido.objects.select_for_update().filter(nombre=name).first()
+            if compartido is not None and compartido.referencias > 1:
+                Compartido.objects.filter(pk=compartido.pk).update(referencias=F("referencias") - 1)
+                return
+            restantes = referencias(name)
+            if restantes:
+                sha256 = os.path.splitext(os.path.basename(name))[0]
+                Compartido.objects.update_or_create(nombre=name, defaults={
+                    "sha256": sha256, "bytes": self.size(name), "referencias": restantes,
+                })
+                return
+            if compartido is not None:
+                compartido.delete()
+            super().delete(name)
+
+
+def almacenamiento_documentos():
+    return AlmacenamientoDeduplicado()
+
+
+def campos_compartidos():
+    """(modelo, campo) de CAMPOS que guardan en AlmacenamientoDeduplicado."""
+    return [
+        (modelo, campo) for modelo, campo in campos()
+        if isinstance(modelo._meta.get_field(campo).storage, AlmacenamientoDeduplicado)
+    ]
+
+
+def referencias(nombre):
+    """Filas que usan el archivo compartido `nombre`."""
+    sha256 = os.path.splitext(os.path.basename(nombre))[0]
+    return sum(
+        modelo._default_manager.filter(**{f"{campo}_sha256": sha256, campo: nombre}).count()
+        for modelo, campo in campos_compartidos()
+    )
+
+
+# ──────────────────────────────────────────────────────────────
+# Pasar a compartidos/ lo subido antes
+# ──────────────────────────────────────────────────────────────
+
+def sin_compartir(modelo, campo):
+    """Filas con huella cuyo archivo sigue fuera de compartidos/."""
+    return (
+        modelo._default_manager
+        .exclude(**{f"{campo}_sha256": ""})
+        .exclude(**{f"{campo}__startswith": f"{AlmacenamientoDeduplicado.CARPETA}/"})
+        .exclude(**{campo: ""}).exclude(**{f"{campo}__isnull": True})
+    )
+
+
+def _en_uso(nombres):
+    """Los `nombres` que alguna fila de los campos deduplicados usa."""
+    en_uso = set()
+    for modelo, campo in campos_compartidos():
+        en_uso.update(
+            modelo._default_manager.filter(**{f"{campo}__in": nombres}).values_list(campo, flat=True)
+        )
+    return en_uso
+
+
+def ahorro_estimado():
+    """(filas sin compartir, bytes que se liberarían al compartirlas)."""
+    grupos = {}
+    filas = 0
+    for modelo, campo in campos_compartidos():
+        for fila in (
+            sin_compartir(modelo, campo).values(f"{campo}_sha256")
+            .annotate(cantidad=Count("pk"), bytes=Max(f"{campo}_bytes")).order_by()
+        ):
+            grupo = grupos.setdefault(fila[f"{campo}_sha256"], [0, fila["bytes"] or 0])
+            grupo[0] += fila["cantidad"]
+            filas += fila["cantidad"]
+
+    huellas = list(grupos)
+    Compartido = apps.get_model("convocatorias", "ArchivoCompartido")
+    ya_compartidas = set()
+    for inicio in range(0, len(huellas), LOTE):
+        ya_compartidas.update(
+            Compartido.objects.filter(sha256__in=huellas[inicio:inicio + LOTE])
+            .values_list("sha256", flat=True)
+        )
+    # Cada contenido queda una vez, salvo que ya esté en compartidos/
+    liberables = sum(
+        bytes_ * (cantidad if sha256 in ya_compartidas else cantidad - 1)
+        for sha256, (cantidad, bytes_) in grupos.items()
+    )
+    return filas, liberables
+
+
+def compartir(modelo, campo, lote=LOTE):
+    """Pasa a compartidos/ los archivos de las filas sin compartir y borra
+    los originales. Devuelve (filas pasadas, faltantes en disco, bytes
+    liberados)."""
+    storage = modelo._meta.get_field(campo).storage
+    pasadas = faltantes = liberados = 0
+    ultimo = 0
+    while True:
+        filas = list(
+            sin_compartir(modelo, campo).filter(pk__gt=ultimo).order_by("pk")
+            .values_list("pk", campo, f"{campo}_sha256", f"{campo}_bytes")[:lote]
+        )
+        if not filas:
+            return pasadas, faltantes, liberados
+        originales = []
+        for pk, nombre, sha256, bytes_ in filas:
+            try:
+                nuevo, escrito = storage.incorporar(nombre, sha256, bytes_)
+            except FileNotFoundError:
+                faltantes += 1
+                continue
+            # Solo si la fila sigue apuntando al mismo archivo
+            if modelo._default_manager.filter(pk=pk, **{campo: nombre}).update(**{campo: nuevo}):
+                originales.append((nombre, bytes_))
+                pasadas += 1
+                liberados -= bytes_ if escrito else 0
+            else:
+                storage.delete(nuevo)
+        # El original se borra solo si ninguna otra fila lo usa
+        en_uso = _en_uso([nombre for nombre, _ in originales])
+        for nombre, bytes_ in originales:
+            if nombre not in en_uso:
+                storage.delete(nombre)
+                liberados += bytes_
+        ultimo = filas[-1][0]
+
+
+# ──────────────────────────────────────────────────────────────
+# Completar filas viejas
+# ──────────────────────────────────────────────────────────────
+
+def pendientes(modelo, campo):
+    """Filas con archivo cuya huella todavía no se calculó."""
+    return (
+        modelo._default_manager
+        .filter(**{f"{campo}_bytes__isnull": True})
+        .exclude(**{campo: ""}).exclude(**{f"{campo}__isnull": True})
+    )
+
+
+def completar(modelo, campo, lote=LOTE):
+    """Calcula la huella de las filas pendientes leyendo cada archivo.
+    Las que no tienen el archivo en disco quedan pendientes.
+    Devuelve (completadas, faltantes)."""
+    completadas = faltantes = 0
+    ultimo = 0
+    while True:
+        filas = list(pendientes(modelo, campo).filter(pk__gt=ultimo).order_by("pk")[:lote])
+        if not filas:
+            return completadas, faltantes
+        listas = []
+        for fila in filas:
+            archivo = getattr(fila, campo)
+            try:
+                archivo.open("rb")
+                try:
+                    h = huella(archivo)
+                finally:
+                    archivo.close()
+            except (FileNotFoundError, OSError):
+                faltantes += 1
+                continue
+            setattr(fila, f"{campo}_bytes", h.bytes)
+            setattr(fila, f"{campo}_sha256", h.sha256)
+            listas.append(fila)
+        modelo._default_manager.bulk_update(listas, [f"{campo}_bytes", f"{campo}_sha256"])
+        completadas += len(listas)
+        ultimo = filas[-1].pk
+
+
+def campos():
+    """(modelo, campo) de CAMPOS, con el modelo ya resuelto."""
+    return [(apps.get_model(etiqueta), campo) for etiqueta, campo in CAMPOS]
+
+
+# ──────────────────────────────────────────────────────────────
+# Consultas
+# ──────────────────────────────────────────────────────────────
+
+def total_bytes(queryset, campo="archivo"):
+    """Bytes de los archivos de `queryset` según la base (sin tocar el disco)."""
+    return queryset.aggregate(total=Sum(f"{campo}_bytes"))["total"] or 0
+
+
+def sin_tamano(queryset, campo="archivo"):
+    """Filas con archivo pero sin tamaño registrado (faltan en disco o
+    todavía no se completaron)."""
+    return queryset.filter(**{f"{campo}_bytes__isnull": True}).exclude(**{campo: ""}).count()
+
+
+def duplicados(modelo, campo):
+    """Huellas que aparecen en más de una fila, de la más repetida a la menos."""
+    return [
+        Duplicado(fila[f"{campo}_sha256"], fila["bytes"], fila["cantidad"])
+        for fila in (
+            modelo._default_manager
+            .exclude(**{f"{campo}_sha256": ""})
+            .values(f"{campo}_sha256")
+            .annotate(cantidad=Count("pk"), bytes=Sum(f"{campo}_bytes"))
+            .filter(cantidad__gt=1)
+            .order_by("-cantidad", f"{campo}_sha256")
+        )
+    ]
@@ -4,10 +4,36 @@ Compartida por el comando `depurar_documentacion` y la acción del admin.
 Borra ARCHIVOS (documentos de postulación e integrantes); los DATOS de
 las postulaciones nunca se tocan, así las estadísticas históricas quedan
 intactas.
+
+La depuración de fin de año alcanza decenas de miles de documentos, así
+que se procesa por lotes de LOTE filas (en orden de id):
+- Los tamaños salen de la base (archivo_bytes, ver archivos.py), sin
+  consultar el disco.
+- Cada lote se borra en su propia transacción corta, con un DELETE por
+  tabla (sin señales por fila), y sus archivos se anotan en la cola
+  ArchivoPorBorrar dentro de la misma transacción.
+- Después del commit de cada lote se eliminan los archivos de la cola
+  (un documento compartido con otras filas solo pierde una referencia,
+  ver archivos.py) y se marcan las postulaciones de ese lote que
+  quedaron sin documentos.
+
+Cada lote confirmado es un punto de control: si la corrida se corta, lo
+borrado queda borrado, y la siguiente empieza por vaciar la cola y sigue
+con los documentos que quedaban. Un archivo que no se pudo eliminar (error
+de disco o de permisos) deja su fila en la cola para la próxima corrida.
 """
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 
-from .models import Postulacion, DocumentoPostulacion, DocumentoIntegrante
+from .models import (
+    ArchivoPorBorrar, DocumentoIntegrante, DocumentoPostulacion, PaqueteDocumentacion,
+    Postulacion,
+)
+
+logger = logging.getLogger(__name__)
 
 ESTADOS_GANADOR = {"seleccionado", "finalizado"}
 
@@ -16,12 +42,22 @@ TIPOS_VALIDOS = (
     | {v for v, _ in DocumentoIntegrante.TIPOS}
 )
 
+# Filas por lote (y por transacción)
+LOTE = 500
+
 
-def _tamano(field_file):
+def _borrar_archivo(nombre):
+    """True si el archivo ya no está. Con un error de disco devuelve False
+    y el archivo queda en la cola; cualquier otro error se propaga."""
+    # Mismo storage en las dos tablas de documentos
     try:
-        return field_file.size
-    except Exception:
-        return 0  # el archivo ya no existe en disco
+        DocumentoPostulacion._meta.get_field("archivo").storage.delete(nombre)
+    except FileNotFoundError:
+        pass  # ya no estaba: lo que importa es que no quede
+    except OSError:
+        logger.warning("No se pudo eliminar %s; queda en la cola", nombre, exc_info=True)
+        return False
+    return True
 
 
 def postulaciones_depurables(convocatorias=None, incluir_ganadores=False,
@@ -61,47 +97,129 @@ def documentos_de(postulaciones, tipos=None):
     return docs_post, docs_int
 
 
-def resumen(postulaciones, tipos=None):
-    """Qué borraría la depuración, sin borrar nada."""
+# ──────────────────────────────────────────────────────────────
+# Lotes
+# ──────────────────────────────────────────────────────────────
+
+def _fuentes(postulaciones, tipos):
+    """(queryset, campo de la postulación, campo del título de la
+    convocatoria) de cada tabla."""
     docs_post, docs_int = documentos_de(postulaciones, tipos)
+    return [
+        (docs_post, "postulacion_id", "postulacion__convocatoria__titulo"),
+        (docs_int, "integrante__postulacion_id", "integrante__postulacion__convocatoria__titulo"),
+    ]
+
+
+def _lotes(qs, campo_postulacion, lote):
+    """Listas de (id, archivo, postulacion_id, bytes) de a `lote`, por id. Cada
+    lote se pide después de procesar el anterior, así que sirve también
+    mientras se van borrando las filas."""
+    ultimo = 0
+    while True:
+        filas = list(
+            qs.filter(pk__gt=ultimo).order_by("pk")
+            .values_list("pk", "archivo", campo_postulacion, "archivo_bytes")[:lote]
+        )
+        if not filas:
+            return
+        yield filas
+        ultimo = filas[-1][0]
+
+
+def _vaciar(lote):
+    """Elimina del disco los archivos de la cola ArchivoPorBorrar. Solo
+    salen de la cola los que se eliminaron."""
+    cantidad = 0
+    ultimo = 0
+    while True:
+        pendientes = list(
+            ArchivoPorBorrar.objects.filter(pk__gt=ultimo).order_by("pk")
+            .values_list("pk", "nombre")[:lote]
+        )
+        if not pendientes:
+            return cantidad
+        eliminados = []
+        try:
+            for pk, nombre in pendientes:
+                if _borrar_archivo(nombre):
+                    eliminados.append(pk)
+        finally:
+            # También si un error corta el lote: lo ya eliminado no se repite
+            ArchivoPorBorrar.objects.filter(pk__in=eliminados).delete()
+        cantidad += len(eliminados)
+        ultimo = pendientes[-1][0]
+
+
+def _borrar_lote(modelo, filas):
+    """Borra las filas y anota sus archivos, en una transacción."""
+    with transaction.atomic():
+        ArchivoPorBorrar.objects.bulk_create(
+            [ArchivoPorBorrar(nombre=fila[1]) for fila in filas if fila[1]]
+        )
+        # DELETE directo, sin cargar instancias ni disparar post_delete por
+        # fila: los archivos van por la cola y los paquetes se invalidan
+        # una vez por lote. Ningún modelo apunta a los documentos.
+        borrados = modelo.objects.filter(pk__in=[fila[0] for fila in filas])
+        borrados._raw_delete(borrados.db)
+        PaqueteDocumentacion.invalidar_varias({fila[2] for fila in filas})
+
+
+def _marcar_sin_documentos(postulacion_ids):
+    sin_docs = (
+        Postulacion.objects.filter(pk__in=postulacion_ids)
+        .exclude(documentos__isnull=False)
+        .exclude(integrantes__documentos__isnull=False)
+    )
+    return sin_docs.update(documentacion_depurada=timezone.now())
 
+
+# ──────────────────────────────────────────────────────────────
+# Resumen y ejecución
+# ──────────────────────────────────────────────────────────────
+
+def resumen(postulaciones, tipos=None):
+    """Qué borraría la depuración, sin borrar nada. Una consulta agrupada
+    por tabla: no se toca el disco. `sin_tamano` cuenta los documentos sin
+    tamaño registrado (no suman a total_bytes)."""
     por_conv = {}
-    for d in docs_post.select_related("postulacion__convocatoria"):
-        titulo = d.postulacion.convocatoria.titulo
-        por_conv[titulo] = por_conv.get(titulo, 0) + 1
-    for d in docs_int.select_related("integrante__postulacion__convocatoria"):
-        titulo = d.integrante.postulacion.convocatoria.titulo
-        por_conv[titulo] = por_conv.get(titulo, 0) + 1
+    total_docs = total_bytes = sin_tamano = 0
+    for qs, _, campo_titulo in _fuentes(postulaciones, tipos):
+        filas = qs.values(campo_titulo).annotate(
+            cantidad=Count("pk"),
+            bytes=Sum("archivo_bytes"),
+            sin_tamano=Count("pk", filter=Q(archivo_bytes__isnull=True)),
+        ).order_by()
+        for fila in filas:
+            titulo = fila[campo_titulo]
+            por_conv[titulo] = por_conv.get(titulo, 0) + fila["cantidad"]
+            total_docs += fila["cantidad"]
+            total_bytes += fila["bytes"] or 0
+            sin_tamano += fila["sin_tamano"]
 
     return {
         "postulaciones": postulaciones.count(),
-        "total_docs": docs_post.count() + docs_int.count(),
-        "total_bytes": sum(_tamano(d.archivo) for d in docs_post)
-                     + sum(_tamano(d.archivo) for d in docs_int),
+        "total_docs": total_docs,
+        "total_bytes": total_bytes,
+        "sin_tamano": sin_tamano,
         "por_conv": sorted(por_conv.items(), key=lambda x: -x[1]),
     }
 
 
-def ejecutar(postulaciones, tipos=None):
-    """Borra los documentos (las señales post_delete eliminan los archivos
-    físicos) y marca las postulaciones que quedaron sin documentación."""
-    docs_post, docs_int = documentos_de(postulaciones, tipos)
-
-    total_docs = docs_post.count() + docs_int.count()
-    total_bytes = sum(_tamano(d.archivo) for d in docs_post) \
-                + sum(_tamano(d.archivo) for d in docs_int)
-
-    ids_afectadas = set(docs_post.values_list("postulacion_id", flat=True)) \
-                  | set(docs_int.values_list("integrante__postulacion_id", flat=True))
-    docs_post.delete()
-    docs_int.delete()
-
-    sin_docs = (
-        Postulacion.objects.filter(pk__in=ids_afectadas)
-        .exclude(documentos__isnull=False)
-        .exclude(integrantes__documentos__isnull=False)
-    )
-    marcadas = sin_docs.update(documentacion_depurada=timezone.now())
+def ejecutar(postulaciones, tipos=None, lote=LOTE):
+    """Borra los documentos por lotes, elimina sus archivos físicos y marca
+    las postulaciones que quedaron sin documentación. Si una corrida
+    anterior quedó cortada, primero termina de eliminar sus archivos."""
+    total_docs = total_bytes = marcadas = 0
+    _vaciar(lote)
+    for qs, campo_postulacion, _ in _fuentes(postulaciones, tipos):
+        for filas in _lotes(qs, campo_postulacion, lote):
+            total_bytes += sum(fila[3] or 0 for fila in filas)
+            _borrar_lote(qs.model, filas)
+            # Ya confirmado el lote: recién ahora se tocan los archivos
+            _vaciar(lote)
+            marcadas += _marcar_sin_documentos({fila[2] for fila in filas})
+            total_docs += len(filas)
 
     return {"total_docs": total_docs, "total_bytes": total_bytes, "marcadas": marcadas}
 
@@ -0,0 +1,218 @@
+"""Paquetes ZIP con la documentación presentada en postulaciones.
+
+Compartido por la acción "Descargar documentación (ZIP)" del admin, las
+descargas del jurado y los paquetes pregenerados (paquetes.py).
+
+Variantes:
+- completo: todo lo presentado (staff).
+- jurado: lo mismo que ve el jurado en su panel: documentos enviados del
+  proyecto (sin el comprobante de CBU) y CV de dirección y producción.
+- jurado_ciego: como jurado, sin el equipo ni datos del presentante.
+
+- Los documentos de todas las postulaciones del paquete se traen con
+  prefetch (una consulta por tabla), sin consultas por integrante.
+- Los archivos se abren con un pool acotado de hilos (LECTORES), hasta
+  VENTANA por delante del que se está escribiendo, para no esperar la
+  apertura del storage de a uno. El contenido no se carga entero: cada
+  archivo se copia al ZIP en bloques (exportaciones.zips.BLOQUE), así la
+  memoria no depende del tamaño de los documentos. El orden de las entradas
+  no depende de qué apertura termina primero.
+- El paquete cierra con MANIFIESTO.csv (ruta, bytes, sha256 de cada
+  documento), calculado sobre los bloques que se escribieron.
+"""
+import hashlib
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db.models import Prefetch
+from django.utils.text import slugify
+
+from exportaciones.zips import Entrada
+
+from .models import DocumentoIntegrante, DocumentoPostulacion, IntegrantePostulacion
+
+LECTORES = 4
+# Archivos abiertos por adelantado como máximo
+VENTANA = 8
+
+Documento = namedtuple("Documento", ["ruta", "archivo", "descripcion"])
+
+
+VARIANTES = ("completo", "jurado", "jurado_ciego")
+
+# Roles cuyo CV ve el jurado (fuera de doble ciego)
+ROLES_JURADO = ["DIRECTOR", "PRODUCTOR"]
+
+
+def variante_jurado(doble_ciego):
+    return "jurado_ciego" if doble_ciego else "jurado"
+
+
+def postulaciones_con_documentos(queryset, variante="completo"):
+    """Lista de postulaciones con los documentos de `variante` e integrantes
+    ya cargados."""
+    documentos = DocumentoPostulacion.objects.order_by("id")
+    integrantes = IntegrantePostulacion.objects.order_by("id")
+    documentos_integrante = DocumentoIntegrante.objects.order_by("id")
+    if variante != "completo":
+        documentos = documentos.filter(estado="ENVIADO").exclude(tipo="COMPROBANTE_CBU")
+        integrantes = integrantes.filter(rol__in=ROLES_JURADO)
+        documentos_integrante = documentos_integrante.filter(tipo="CV_BIOFILMOGRAFIA", estado="ENVIADO")
+    if variante == "jurado_ciego":
+        integrantes = integrantes.none()
+
+    return list(
+        queryset
+        .select_related("user", "convocatoria")
+        .prefetch_related(
+            Prefetch("documentos", queryset=documentos),
+            Prefetch(
+                "integrantes",
+                queryset=integrantes.prefetch_related(
+                    Prefetch("documentos", queryset=documentos_integrante),
+                ),
+            ),
+        )
+        .order_by("id")
+    )
+
+
+def nombre_carpeta(p):
+    base = slugify(p.nombre_proyecto or f"postulacion_{p.id}")[:40] or f"postulacion_{p.id}"
+    return f"postulacion_{p.id}_{base}"
+
+
+def _extension(archivo):
+    return os.path.splitext(archivo.name or "")[1]
+
+
+def _documentos(p, raiz):
+    # id incluido para que documentos del mismo tipo no se pisen en el ZIP
+    for doc in p.documentos.all():
+        nombre = slugify(f"{doc.get_tipo_display()}-{doc.id}")
+        yield Documento(
+            f"{raiz}documentacion/{nombre}{_extension(doc.archivo)}",
+            doc.archivo,
+            f"- {doc.get_tipo_display()} (id {doc.id}): "
+            f"{doc.archivo.name if doc.archivo else 'sin archivo'}",
+        )
+    for integrante in p.integrantes.all():
+        sub = f"equipo/{integrante.rol.lower()}_{slugify(integrante.nombre_busqueda or str(integrante.id))}"
+        for doc in integrante.documentos.all():
+            nombre = slugify(f"{doc.get_tipo_display()}-{doc.id}")
+            yield Documento(
+                f"{raiz}{sub}/{nombre}{_extension(doc.archivo)}",
+                doc.archivo,
+                f"- {sub} · {doc.get_tipo_display()} (id {doc.id}): "
+                f"{doc.archivo.name if doc.archivo else 'sin archivo'}",
+            )
+
+
+class ArchivoConHuella:
+    """Archivo abierto que cuenta los bytes y calcula el sha256 a medida que
+    se lee."""
+
+    def __init__(self, archivo):
+        self._archivo = archivo
+        self._sha256 = hashlib.sha256()
+        self.bytes = 0
+
+    @property
+    def size(self):
+        return self._archivo.size
+
+    def read(self, n=-1):
+        bloque = self._archivo.read(n)
+        self._sha256.update(bloque)
+        self.bytes += len(bloque)
+        return bloque
+
+    def close(self):
+        self._archivo.close()
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+
+def _abrir(archivo):
+    """ArchivoConHuella abierto, o None si no se puede abrir."""
+    if not archivo:
+        return None
+    try:
+        return ArchivoConHuella(archivo.storage.open(archivo.name, "rb"))
+    except Exception:
+        return None
+
+
+def abrir_en_orden(documentos, lectores=LECTORES, ventana=VENTANA):
+    """(documento, ArchivoConHuella o None) en el mismo orden de
+    `documentos`, abriendo en paralelo hasta `ventana` archivos por delante.
+    Quien recibe cada archivo lo cierra."""
+    with ThreadPoolExecutor(max_workers=lectores) as pool:
+        pendientes = deque()
+        try:
+            for doc in documentos:
+                pendientes.append((doc, pool.submit(_abrir, doc.archivo)))
+                if len(pendientes) >= ventana:
+                    doc, futuro = pendientes.popleft()
+                    yield doc, futuro.result()
+            while pendientes:
+                doc, futuro = pendientes.popleft()
+                yield doc, futuro.result()
+        finally:
+            # Descarga cortada: no abrir lo que ya no se va a enviar y cerrar
+            # lo que quedó abierto por adelantado
+            pool.shutdown(cancel_futures=True)
+            for _, futuro in pendientes:
+                if not futuro.cancelled() and futuro.result() is not None:
+                    futuro.result().close()
+
+
+def _readme(p, variante):
+    usuario = f"Usuario: {p.user.username}\n" if variante == "completo" else ""
+    return (
+        f"Postulación ID: {p.id}\n"
+        f"Proyecto: {p.nombre_proyecto or '(Sin título)'}\n"
+        f"{usuario}"
+        f"Convocatoria: {p.convocatoria.titulo if p.convocatoria else ''}\n"
+    )
+
+
+def entradas(postulaciones, carpetas=False, variante="completo"):
+    """Entradas (exportaciones.zips.Entrada) del paquete de `postulaciones`
+    (ya cargadas con postulaciones_con_documentos, con la misma variante).
+    Con `carpetas`, cada postulación va en su propia carpeta."""
+    plan = []
+    for p in postulaciones:
+        raiz = f"{nombre_carpeta(p)}/" if carpetas else ""
+        plan.append((p, raiz, list(_documentos(p, raiz))))
+
+    abiertos = abrir_en_orden(doc for _, _, docs in plan for doc in docs)
+    manifiesto = ["ruta;bytes;sha256"]
+    try:
+        for p, raiz, docs in plan:
+            yield Entrada(f"{raiz}README.txt", _readme(p, variante))
+            faltantes = []
+            for _ in docs:
+                doc, archivo = next(abiertos)
+                if archivo is None:
+                    faltantes.append(doc.descripcion)
+                    continue
+                try:
+                    yield Entrada(doc.ruta, archivo)
+                finally:
+                    archivo.close()
+                # generar_zip ya copió el archivo completo
+                manifiesto.append(f"{doc.ruta};{archivo.bytes};{archivo.sha256}")
+            if faltantes:
+                yield Entrada(
+                    f"{raiz}FALTANTES.txt",
+                    "Documentos que NO se pudieron incluir en este ZIP:\n"
+                    + "\n".join(faltantes)
+                    + "\n"
+                )
+    finally:
+        abiertos.close()
+    yield Entrada("MANIFIESTO.csv", "\n".join(manifiesto) + "\n")
@@ -0,0 +1,257 @@
+"""Archivos huérfanos de media/: existen en disco pero ninguna fila de la
+base los referencia (restos de versiones anteriores, borrados a medias).
+
+Usado por `depurar_documentacion --huerfanos`.
+
+Escaneo:
+- Cada carpeta de primer nivel de MEDIA_ROOT (postulaciones/, exencion/,
+  ...) se recorre en un hilo aparte con os.scandir, que ya trae el tipo de
+  cada entrada; solo se hace stat de los archivos huérfanos.
+- Cada carpeta se compara solo con los campos cuyo upload_to cae ahí
+  (p. ej. postulaciones/ con DocumentoPostulacion y DocumentoIntegrante), y
+  las rutas referenciadas se traen de a una carpeta por vez, filtradas por
+  prefijo: nunca están todas las rutas de la base en memoria.
+- Los campos con upload_to dinámico (callable) se comparan en todas.
+- Los campos deduplicados (archivos.AlmacenamientoDeduplicado) se comparan
+  en su carpeta de siempre (lo subido antes) y en compartidos/. Así se
+  recupera también un archivo compartido escrito en una transacción que
+  después se revirtió: quedó en disco pero ninguna fila lo usa.
+- Los archivos modificados hace menos de EDAD_MINIMA no se informan: el
+  archivo se escribe antes del commit de la fila que lo referencia.
+
+Informe:
+- La simulación guarda el resultado en un informe (ruta_informe(), fuera
+  de media/) para que el --ejecutar siguiente no vuelva a escanear.
+- Antes de borrar, cada archivo del informe se vuelve a verificar: que
+  siga igual en disco (tamaño y fecha) y que siga sin referencias.
+"""
+import json
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import FileField
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .archivos import AlmacenamientoDeduplicado
+
+HILOS = 4
+# Más nuevo que esto puede ser una subida cuya transacción no terminó
+EDAD_MINIMA = timedelta(hours=1)
+# Un informe más viejo que esto no se usa para borrar: se vuelve a escanear
+VIGENCIA_INFORME = timedelta(hours=24)
+# Rutas por consulta al volver a verificar referencias
+LOTE = 1000
+
+Campo = namedtuple("Campo", ["modelo", "nombre", "carpeta"])
+Huerfano = namedtuple("Huerfano", ["ruta", "bytes", "mtime"])
+
+
+def ruta_informe():
+    base = getattr(settings, "EXPORTACIONES_DIR", settings.BASE_DIR / "exportaciones_privadas")
+    return Path(base) / "depuracion" / "huerfanos.json"
+
+
+# ──────────────────────────────────────────────────────────────
+# Campos de archivo que viven en media/
+# ──────────────────────────────────────────────────────────────
+
+def _carpeta(upload_to):
+    """Carpeta de primer nivel de un upload_to fijo ("" si no se sabe)."""
+    if callable(upload_to):
+        return ""
+    # upload_to siempre es una carpeta: "docs" guarda en docs/<archivo>
+    partes = [p for p in str(upload_to).split("%", 1)[0].split("/") if p]
+    return partes[0] if partes else ""
+
+
+def campos_media():
+    """Campos de archivo (FileField / ImageField) guardados en MEDIA_ROOT.
+    Los que usan otro storage (p. ej. las exportaciones privadas) no cuentan."""
+    campos = []
+    for modelo in apps.get_models():
+        for campo in modelo._meta.get_fields():
+            if not isinstance(campo, FileField):
+                continue
+            storage = campo.storage
+            if storage is not default_storage and getattr(storage, "location", None) != default_storage.location:
+                continue
+            campos.append(Campo(modelo, campo.name, _carpeta(campo.upload_to)))
+            if isinstance(storage, AlmacenamientoDeduplicado):
+                campos.append(Campo(modelo, campo.name, storage.CARPETA))
+    return campos
+
+
+def _referenciados(campos, carpeta):
+    """Rutas (normalizadas) referenciadas dentro de `carpeta`."""
+    rutas = set()
+    for campo in campos:
+        if campo.carpeta not in ("", carpeta):
+            continue
+        valores = (
+            campo.modelo._default_manager
+            .filter(**{f"{campo.nombre}__startswith": f"{carpeta}/" if carpeta else ""})
+            .exclude(**{campo.nombre: ""})
+            .values_list(campo.nombre, flat=True)
+            .iterator(chunk_size=5000)
+        )
+        rutas.update(os.path.normpath(v) for v in valores if v)
+    return rutas
+
+
+# ──────────────────────────────────────────────────────────────
+# Escaneo
+# ──────────────────────────────────────────────────────────────
+
+def _recorrer(raiz, relativa, referenciados, limite, recursivo=True):
+    """Huérfanos bajo raiz/relativa (relativa="" solo mira archivos sueltos)
+    modificados antes de `limite` (timestamp)."""
+    huerfanos = []
+    pendientes = [relativa]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            entradas = os.scandir(os.path.join(raiz, actual))
+        except FileNotFoundError:
+            continue
+        with entradas:
+            for entrada in entradas:
+                ruta = os.path.join(actual, entrada.name) if actual else entrada.name
+                if entrada.is_dir(follow_symlinks=False):
+                    if recursivo:
+                        pendientes.append(ruta)
+                    continue
+                if not entrada.is_file(follow_symlinks=False):
+                    continue
+                if os.path.normpath(ruta) in referenciados:
+                    continue
+                st = entrada.stat(follow_symlinks=False)
+                if st.st_mtime > limite:
+                    continue
+                huerfanos.append(Huerfano(os.path.normpath(ruta), st.st_size, st.st_mtime))
+    return huerfanos
+
+
+def escanear(media_root=None, hilos=HILOS):
+    """Lista de Huerfano, ordenada por ruta."""
+    media_root = str(media_root or settings.MEDIA_ROOT)
+    if not os.path.isdir(media_root):
+        return []
+    campos = campos_media()
+    limite = (timezone.now() - EDAD_MINIMA).timestamp()
+
+    with os.scandir(media_root) as entradas:
+        carpetas = sorted(e.name for e in entradas if e.is_dir(follow_symlinks=False))
+
+    # Archivos sueltos en la raíz: solo los pueden referenciar los campos sin carpeta
+    huerfanos = _recorrer(media_root, "", _referenciados(campos, ""), limite, recursivo=False)
+
+    # Las consultas van en este hilo (la conexión a la base no se comparte);
+    # los recorridos en paralelo, con a lo sumo `hilos` carpetas en vuelo
+    # para no tener todas las rutas referenciadas en memoria a la vez.
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        en_vuelo = deque()
+        for carpeta in carpetas:
+            if len(en_vuelo) >= hilos:
+                huerfanos.extend(en_vuelo.popleft().result())
+            en_vuelo.append(pool.submit(_recorrer, media_root, carpeta, _referenciados(campos, carpeta), limite))
+        while en_vuelo:
+            huerfanos.extend(en_vuelo.popleft().result())
+
+    return sorted(huerfanos)
+
+
+# ──────────────────────────────────────────────────────────────
+# Informe
+# ──────────────────────────────────────────────────────────────
+
+def guardar_informe(huerfanos, media_root=None):
+    ruta = ruta_informe()
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(".tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({
+            "generado":   timezone.now().isoformat(),
+            "media_root": str(media_root or settings.MEDIA_ROOT),
+            "archivos":   [list(h) for h in huerfanos],
+        }, f)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def cargar_informe(media_root=None):
+    """(huérfanos, fecha) del último informe, o None si no hay uno vigente
+    para este MEDIA_ROOT."""
+    try:
+        with open(ruta_informe(), encoding="utf-8") as f:
+            datos = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    generado = parse_datetime(datos.get("generado") or "")
+    if (generado is None
+            or datos.get("media_root") != str(media_root or settings.MEDIA_ROOT)
+            or timezone.now() - generado > VIGENCIA_INFORME):
+        return None
+    return [Huerfano(*a) for a in datos["archivos"]], generado
+
+
+def borrar_informe():
+    try:
+        ruta_informe().unlink()
+    except FileNotFoundError:
+        pass
+
+
+# ──────────────────────────────────────────────────────────────
+# Borrado
+# ──────────────────────────────────────────────────────────────
+
+def _siguen_referenciados(campos, rutas):
+    """Las `rutas` que alguna fila referencia hoy."""
+    referenciadas = set()
+    for modelo, nombre in {(c.modelo, c.nombre) for c in campos}:
+        for inicio in range(0, len(rutas), LOTE):
+            referenciadas.update(
+                modelo._default_manager
+                .filter(**{f"{nombre}__in": rutas[inicio:inicio + LOTE]})
+                .values_list(nombre, flat=True)
+            )
+    return {os.path.normpath(r) for r in referenciadas}
+
+
+def borrar(huerfanos, media_root=None):
+    """Borra los huérfanos que siguen igual en disco y sin referencias.
+    Devuelve (cantidad, bytes) de lo borrado."""
+    media_root = str(media_root or settings.MEDIA_ROOT)
+    vigentes = []
+    for h in huerfanos:
+        try:
+            st = os.stat(os.path.join(media_root, h.ruta))
+        except FileNotFoundError:
+            continue
+        if st.st_size == h.bytes and st.st_mtime == h.mtime:
+            vigentes.append(h)
+
+    referenciadas = _siguen_referenciados(campos_media(), [h.ruta for h in vigentes])
+    borrados = []
+    total = 0
+    for h in vigentes:
+        if h.ruta in referenciadas:
+            continue
+        try:
+            os.remove(os.path.join(media_root, h.ruta))
+        except FileNotFoundError:
+            continue
+        borrados.append(h.ruta)
+        total += h.bytes
+    # Un compartido huérfano ya no tiene a quién contarle referencias
+    compartidos = apps.get_model("convocatorias", "ArchivoCompartido").objects
+    for inicio in range(0, len(borrados), LOTE):
+        compartidos.filter(nombre__in=borrados[inicio:inicio + LOTE]).delete()
+    return len(borrados), total
@@ -0,0 +1,51 @@
+"""
+Completa el tamaño y la huella (sha256) de los archivos subidos antes de
+que se registraran al subir (ver convocatorias/archivos.py).
+
+Lee cada archivo pendiente una sola vez; lo que ya tiene huella no se
+vuelve a leer, así que se puede cortar y repetir. Los archivos que faltan
+en disco quedan sin tamaño (no como 0 bytes) y se informan.
+
+Con --duplicados lista además los archivos subidos más de una vez.
+
+Uso manual:
+    python manage.py completar_huellas_archivos
+    python manage.py completar_huellas_archivos --duplicados
+
+Configurar en cron (ej. una vez por noche, hasta que no queden pendientes):
+    0 3 * * * /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py completar_huellas_archivos
+"""
+from django.core.management.base import BaseCommand
+
+from convocatorias import archivos, depuracion
+
+
+class Command(BaseCommand):
+    help = "Registra tamaño y sha256 de los archivos subidos que todavía no los tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--duplicados", action="store_true",
+                            help="Lista los archivos subidos más de una vez (misma huella).")
+
+    def handle(self, *args, **opts):
+        total_faltantes = 0
+        for modelo, campo in archivos.campos():
+            completadas, faltantes = archivos.completar(modelo, campo)
+            total_faltantes += faltantes
+            aviso = f" · {faltantes} sin archivo en disco" if faltantes else ""
+            self.stdout.write(f"{modelo._meta.label}.{campo}: {completadas} completados{aviso}")
+
+            if opts["duplicados"]:
+                for d in archivos.duplicados(modelo, campo):
+                    sobrante = d.bytes - d.bytes // d.cantidad
+                    self.stdout.write(
+                        f"  · {d.sha256[:12]}… subido {d.cantidad} veces "
+                        f"({depuracion.mb(sobrante)} repetidos)"
+                    )
+
+        if total_faltantes:
+            self.stdout.write(self.style.NOTICE(
+                f"{total_faltantes} filas apuntan a archivos que no están en disco: "
+                "quedan sin tamaño registrado."
+            ))
+        self.stdout.write(self.style.SUCCESS("Huellas completadas."))
@@ -0,0 +1,66 @@
+"""
+Pasa los documentos subidos antes del almacenamiento deduplicado a
+compartidos/: cada contenido queda guardado una sola vez y las filas que
+lo usan apuntan al mismo archivo (ver convocatorias/archivos.py).
+
+Por defecto es una SIMULACIÓN: muestra cuántos documentos se pasarían y
+cuánto espacio se liberaría. Solo mueve con --ejecutar.
+
+Antes completa las huellas que falten (como completar_huellas_archivos).
+Cada fila se actualiza por separado y el original se borra recién
+después, así que se puede cortar y repetir. Los archivos que no están en
+disco quedan como están.
+
+Uso manual:
+    python manage.py deduplicar_documentos
+    python manage.py deduplicar_documentos --ejecutar
+"""
+from django.core.management.base import BaseCommand
+
+from convocatorias import archivos, depuracion
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa los documentos ya subidos a compartidos/ (un archivo por contenido). "
+        "Simula por defecto; mueve solo con --ejecutar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ejecutar", action="store_true",
+                            help="Mueve en serio. Sin este flag solo simula.")
+
+    def handle(self, *args, **opts):
+        modo = "EJECUTANDO" if opts["ejecutar"] else "SIMULACIÓN (nada se mueve sin --ejecutar)"
+        self.stdout.write(self.style.WARNING(f"── Deduplicación de documentos · {modo} ──"))
+
+        for modelo, campo in archivos.campos_compartidos():
+            archivos.completar(modelo, campo)
+
+        filas, liberables = archivos.ahorro_estimado()
+        self.stdout.write(
+            f"Documentos fuera de compartidos/: {filas} · "
+            f"Espacio a liberar: {depuracion.mb(liberables)}"
+        )
+        if not filas:
+            self.stdout.write("Nada para mover.")
+            return
+        if not opts["ejecutar"]:
+            self.stdout.write(self.style.SUCCESS(
+                "Simulación terminada. Repetir con --ejecutar para mover."
+            ))
+            return
+
+        total_pasadas = total_faltantes = total_liberados = 0
+        for modelo, campo in archivos.campos_compartidos():
+            pasadas, faltantes, liberados = archivos.compartir(modelo, campo)
+            total_pasadas += pasadas
+            total_faltantes += faltantes
+            total_liberados += liberados
+            self.stdout.write(f"{modelo._meta.label}.{campo}: {pasadas} pasados a compartidos/")
+
+        aviso = f" {total_faltantes} no están en disco y quedaron como estaban." if total_faltantes else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo: {total_pasadas} documentos en compartidos/ "
+            f"({depuracion.mb(total_liberados)} liberados).{aviso}"
+        ))
@@ -15,6 +15,8 @@ Protecciones:
   pase --incluir-ganadores explícitamente.
 - Cada postulación que queda sin documentos se marca con la fecha de
   depuración, visible en el admin.
+- Borra por lotes, cada uno en una transacción corta: si la corrida se
+  corta, repetir el mismo comando retoma donde quedó.
 
 La lógica compartida con la acción del admin vive en
 convocatorias/depuracion.py.
@@ -25,14 +27,12 @@ Ejemplos:
   manage.py depurar_documentacion --conv 5 --ejecutar
   manage.py depurar_documentacion --incluir-ganadores --tipos DNI,CV_BIOFILMOGRAFIA
   manage.py depurar_documentacion --huerfanos          (archivos sin registro en la base)
+  manage.py depurar_documentacion --huerfanos --ejecutar  (borra lo del último informe)
 """
-import os
-
-from django.apps import apps
-from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
 
-from convocatorias import depuracion
+from convocatorias import depuracion, huerfanos
 from convocatorias.models import Convocatoria
 
 
@@ -55,10 +55,12 @@ class Command(BaseCommand):
                             help="Borrado parcial: solo estos tipos de documento (separados por coma).")
         parser.add_argument("--huerfanos", action="store_true",
                             help="Modo aparte: borra archivos de media/ que ninguna fila de la base referencia.")
+        parser.add_argument("--reescanear", action="store_true",
+                            help="Con --huerfanos --ejecutar: escanea de nuevo en vez de usar el último informe.")
 
     def handle(self, *args, **opts):
         if opts["huerfanos"]:
-            self._huerfanos(opts["ejecutar"])
+            self._huerfanos(opts["ejecutar"], opts["reescanear"])
             return
 
         tipos = None
@@ -110,6 +112,11 @@ class Command(BaseCommand):
         )
         for titulo, cant in info["por_conv"]:
             self.stdout.write(f"  · {titulo}: {cant} documentos")
+        if info["sin_tamano"]:
+            self.stdout.write(self.style.NOTICE(
+                f"{info['sin_tamano']} documentos sin tamaño registrado no suman al espacio "
+                "(correr completar_huellas_archivos)."
+            ))
 
         if not opts["incluir_ganadores"] and protegidas.exists():
             self.stdout.write(self.style.NOTICE(
@@ -138,49 +145,46 @@ class Command(BaseCommand):
     # ──────────────────────────────────────────────────────────
     # Archivos huérfanos: existen en media/ pero ninguna fila
     # de la base los referencia (restos de versiones anteriores).
+    # La lógica vive en convocatorias/huerfanos.py.
     # ──────────────────────────────────────────────────────────
-    def _huerfanos(self, ejecutar):
-        referenciados = set()
-        for modelo in apps.get_models():
-            campos = [f for f in modelo._meta.get_fields()
-                      if f.__class__.__name__ in ("FileField", "ImageField")]
-            for campo in campos:
-                for valor in modelo.objects.exclude(**{campo.name: ""}) \
-                                           .values_list(campo.name, flat=True):
-                    if valor:
-                        referenciados.add(os.path.normpath(valor))
-
-        media_root = settings.MEDIA_ROOT
-        huerfanos = []
-        total_bytes = 0
-        for raiz, _dirs, archivos in os.walk(media_root):
-            for nombre in archivos:
-                ruta = os.path.join(raiz, nombre)
-                relativa = os.path.normpath(os.path.relpath(ruta, media_root))
-                if relativa not in referenciados:
-                    huerfanos.append(relativa)
-                    total_bytes += os.path.getsize(ruta)
-
+    def _huerfanos(self, ejecutar, reescanear=False):
         modo = "EJECUTANDO" if ejecutar else "SIMULACIÓN (nada se borra sin --ejecutar)"
         self.stdout.write(self.style.WARNING(f"── Archivos huérfanos · {modo} ──"))
+
+        informe = None if (reescanear or not ejecutar) else huerfanos.cargar_informe()
+        if informe is not None:
+            lista, generado = informe
+            self.stdout.write(
+                f"Usando el informe del {timezone.localtime(generado):%d/%m/%Y %H:%M} "
+                "(--reescanear para escanear de nuevo)."
+            )
+        else:
+            lista = huerfanos.escanear()
+            huerfanos.guardar_informe(lista)
+
+        total_bytes = sum(h.bytes for h in lista)
         self.stdout.write(
-            f"Archivos sin referencia en la base: {len(huerfanos)} · {depuracion.mb(total_bytes)}"
+            f"Archivos sin referencia en la base: {len(lista)} · {depuracion.mb(total_bytes)}"
         )
-        for ruta in huerfanos[:20]:
-            self.stdout.write(f"  · {ruta}")
-        if len(huerfanos) > 20:
-            self.stdout.write(f"  … y {len(huerfanos) - 20} más")
+        for h in lista[:20]:
+            self.stdout.write(f"  · {h.ruta}")
+        if len(lista) > 20:
+            self.stdout.write(f"  … y {len(lista) - 20} más")
 
-        if not huerfanos:
+        if not lista:
+            huerfanos.borrar_informe()
             return
         if not ejecutar:
             self.stdout.write(self.style.SUCCESS(
-                "Simulación terminada. Repetir con --huerfanos --ejecutar para borrar."
+                "Simulación terminada. Repetir con --huerfanos --ejecutar para borrar "
+                "(usa este mismo informe, sin volver a escanear)."
             ))
             return
 
-        for relativa in huerfanos:
-            os.remove(os.path.join(media_root, relativa))
+        cantidad, borrados = huerfanos.borrar(lista)
+        huerfanos.borrar_informe()
+        omitidos = len(lista) - cantidad
+        aviso = f" {omitidos} omitidos porque cambiaron desde el escaneo." if omitidos else ""
         self.stdout.write(self.style.SUCCESS(
-            f"Listo: {len(huerfanos)} archivos huérfanos borrados ({depuracion.mb(total_bytes)} liberados)."
+            f"Listo: {cantidad} archivos huérfanos borrados ({depuracion.mb(borrados)} liberados).{aviso}"
         ))
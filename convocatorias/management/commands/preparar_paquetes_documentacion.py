@@ -0,0 +1,45 @@
+"""
+Genera los ZIP de documentación pregenerados (PaqueteDocumentacion).
+
+Sin opciones genera los paquetes pendientes: los que registró la acción
+"Enviar a evaluación por jurado" del admin, los que se pidieron sin estar
+listos y los que quedaron viejos porque cambió la documentación.
+
+Con --conv registra además, en el momento, los paquetes de todas las
+postulaciones de esa convocatoria que ve el jurado (y el de la convocatoria
+completa), y genera solo los de esa convocatoria.
+
+La lógica vive en convocatorias/paquetes.py.
+
+Uso manual:
+    python manage.py preparar_paquetes_documentacion
+    python manage.py preparar_paquetes_documentacion --conv 5
+
+Configurar en cron (ej. cada 15 minutos):
+    */15 * * * * /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py preparar_paquetes_documentacion
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from convocatorias import paquetes
+from convocatorias.models import ESTADOS_JURADO, Convocatoria, Postulacion
+
+
+class Command(BaseCommand):
+    help = "Genera los ZIP de documentación pendientes para jurado y staff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--conv", type=int,
+                            help="Preparar y generar los paquetes de una convocatoria (id).")
+
+    def handle(self, *args, **opts):
+        convocatorias = None
+        if opts["conv"]:
+            convocatorias = Convocatoria.objects.filter(pk=opts["conv"])
+            if not convocatorias.exists():
+                raise CommandError(f"No existe la convocatoria {opts['conv']}.")
+            paquetes.preparar(Postulacion.objects.filter(
+                convocatoria_id=opts["conv"], estado__in=ESTADOS_JURADO,
+            ))
+
+        cantidad = paquetes.generar_pendientes(convocatorias)
+        self.stdout.write(self.style.SUCCESS(f"Paquetes generados: {cantidad}."))
@@ -17,6 +17,7 @@ from django.utils import timezone
 from django.conf import settings
 
 from convocatorias.models import ObservacionAdministrativa
+from correos import cola
 
 
 class Command(BaseCommand):
@@ -117,17 +118,17 @@ class Command(BaseCommand):
                 )
                 if html:
                     email.attach_alternative(html, "text/html")
-                email.send(fail_silently=False)
+                cola.encolar(email, origen="postulacion.recordatorio")
 
                 self.stdout.write(self.style.SUCCESS(
-                    f"  Enviado a {user.email} — postulación {pid} "
+                    f"  Encolado para {user.email} — postulación {pid} "
                     f"({len(observaciones)} obs pendiente/s)"
                 ))
                 enviados += 1
 
             except Exception as e:
                 self.stdout.write(self.style.ERROR(
-                    f"  Error enviando a {user.email}: {e}"
+                    f"  Error encolando para {user.email}: {e}"
                 ))
                 errores += 1
 
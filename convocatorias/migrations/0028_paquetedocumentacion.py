@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:56
+
+import django.db.models.deletion
+import exportaciones.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convocatorias', '0027_postulacion_documentacion_depurada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaqueteDocumentacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variante', models.CharField(choices=[('completo', 'Completo (staff)'), ('jurado', 'Jurado'), ('jurado_ciego', 'Jurado (doble ciego)')], default='completo', max_length=20)),
+                ('archivo', models.FileField(blank=True, storage=exportaciones.models.almacenamiento_exportaciones, upload_to='paquetes/')),
+                ('tamanio', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('generado', models.DateTimeField(blank=True, null=True)),
+                ('convocatoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paquetes_documentacion', to='convocatorias.convocatoria')),
+                ('postulacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='paquetes_documentacion', to='convocatorias.postulacion')),
+            ],
+            options={
+                'verbose_name': 'Paquete de documentación',
+                'verbose_name_plural': 'Paquetes de documentación',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('postulacion__isnull', False)), fields=('postulacion', 'variante'), name='paquete_unico_por_postulacion'), models.UniqueConstraint(condition=models.Q(('postulacion__isnull', True)), fields=('convocatoria', 'variante'), name='paquete_unico_por_convocatoria')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convocatorias', '0028_paquetedocumentacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoPorBorrar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo por borrar',
+                'verbose_name_plural': 'Archivos por borrar',
+            },
+        ),
+    ]
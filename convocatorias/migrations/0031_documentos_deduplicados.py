@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:05
+
+import convocatorias.archivos
+import convocatorias.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convocatorias', '0030_huellas_archivos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoCompartido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('bytes', models.PositiveBigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo compartido',
+                'verbose_name_plural': 'Archivos compartidos',
+            },
+        ),
+        migrations.AlterField(
+            model_name='documentointegrante',
+            name='archivo',
+            field=models.FileField(storage=convocatorias.archivos.almacenamiento_documentos, upload_to='postulaciones/integrantes/', validators=[convocatorias.validators.validar_documento_admitido, convocatorias.validators.validar_tamano_archivo]),
+        ),
+        migrations.AlterField(
+            model_name='documentopostulacion',
+            name='archivo',
+            field=models.FileField(storage=convocatorias.archivos.almacenamiento_documentos, upload_to='postulaciones/documentos/', validators=[convocatorias.validators.validar_documento_admitido, convocatorias.validators.validar_tamano_archivo]),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def cargar_envios(apps, schema_editor):
+    """Punto de partida del historial: el envío de cada postulación ya
+    presentada, con su fecha_envio. Los cambios anteriores no se conocen."""
+    Postulacion = apps.get_model("convocatorias", "Postulacion")
+    CambioEstadoPostulacion = apps.get_model("convocatorias", "CambioEstadoPostulacion")
+    enviadas = (
+        Postulacion.objects.exclude(estado="borrador").exclude(fecha_envio=None)
+        .values_list("id", "convocatoria_id", "fecha_envio")
+    )
+    lote = []
+    for postulacion_id, convocatoria_id, fecha_envio in enviadas.iterator(chunk_size=1000):
+        lote.append(CambioEstadoPostulacion(
+            postulacion_id=postulacion_id, convocatoria_id=convocatoria_id,
+            estado_anterior="borrador", estado="enviado", fecha=fecha_envio, origen="migracion",
+        ))
+        if len(lote) >= 1000:
+            CambioEstadoPostulacion.objects.bulk_create(lote)
+            lote = []
+    CambioEstadoPostulacion.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convocatorias', '0031_documentos_deduplicados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioEstadoPostulacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(blank=True, max_length=30)),
+                ('estado', models.CharField(choices=[('borrador', 'Borrador'), ('enviado', 'Enviado'), ('revision_admin', 'En revisión administrativa'), ('observado', 'Observado (requiere subsanación)'), ('admitido', 'Admitido'), ('no_admitido', 'No admitido'), ('evaluacion_jurado', 'En evaluación por jurado'), ('seleccionado', 'Seleccionado'), ('no_seleccionado', 'No seleccionado'), ('finalizado', 'Finalizado')], max_length=30)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('origen', models.CharField(choices=[('admin', 'Admin (ficha)'), ('masivo', 'Acción masiva del admin'), ('wizard', 'Envío del postulante'), ('subsanacion', 'Subsanación del postulante'), ('migracion', 'Carga inicial')], max_length=20)),
+                ('convocatoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='convocatorias.convocatoria')),
+                ('postulacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios_estado', to='convocatorias.postulacion')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cambio de estado de postulación',
+                'verbose_name_plural': 'Cambios de estado de postulaciones',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['convocatoria', 'estado', 'fecha'], name='convocatori_convoca_f35ae0_idx'), models.Index(fields=['postulacion', 'fecha'], name='convocatori_postula_c80c6d_idx')],
+            },
+        ),
+        migrations.RunPython(cargar_envios, migrations.RunPython.noop),
+    ]
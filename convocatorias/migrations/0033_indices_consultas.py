@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('convocatorias', '0032_cambioestadopostulacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postulacion',
+            index=models.Index(fields=['convocatoria', 'estado'], name='postulacion_conv_estado'),
+        ),
+        migrations.AddIndex(
+            model_name='postulacion',
+            index=models.Index(fields=['fecha_envio'], name='postulacion_fecha_envio'),
+        ),
+        migrations.AddIndex(
+            model_name='postulacion',
+            index=models.Index(fields=['user', 'convocatoria', 'estado'], name='postulacion_user_conv_estado'),
+        ),
+        migrations.AddIndex(
+            model_name='observacionadministrativa',
+            index=models.Index(condition=models.Q(('subsanada', False)), fields=['fecha_creacion'], name='observacion_pendiente_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='rendicion',
+            index=models.Index(fields=['estado', 'fecha_aprobacion'], name='rendicion_estado_aprobacion'),
+        ),
+    ]
@@ -5,9 +5,12 @@ from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.conf import settings
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from exportaciones.models import almacenamiento_exportaciones
+
+from . import archivos
 from .validators import validar_documento_admitido, validar_tamano_archivo
 
 cbu_validator = RegexValidator(
@@ -261,6 +264,14 @@ class Postulacion(models.Model):
         ordering = ["-fecha_creacion"]
         verbose_name = "Postulación"
         verbose_name_plural = "Postulaciones"
+        indexes = [
+            # listados del backoffice y de estadísticas por convocatoria
+            models.Index(fields=["convocatoria", "estado"], name="postulacion_conv_estado"),
+            # fecha_envio__year se traduce a un BETWEEN sobre la columna
+            models.Index(fields=["fecha_envio"], name="postulacion_fecha_envio"),
+            # borrador en curso del usuario (wizard_inicio)
+            models.Index(fields=["user", "convocatoria", "estado"], name="postulacion_user_conv_estado"),
+        ]
 
     def clean(self):
         super().clean()
@@ -272,6 +283,66 @@ class Postulacion(models.Model):
         return f"{nombre} – {self.user.username}"
 
 
+# Estados en que el jurado asignado ve la postulación
+ESTADOS_JURADO = ["admitido", "evaluacion_jurado", "seleccionado", "no_seleccionado"]
+
+
+# ==========================================
+# HISTORIAL DE ESTADOS DE POSTULACIÓN
+# ==========================================
+class CambioEstadoPostulacion(models.Model):
+    """
+    Bitácora de solo alta: una fila por cada cambio de `Postulacion.estado`.
+    La escriben todos los caminos que cambian el estado (admin, acciones
+    masivas de convocatorias/transiciones.py, wizard, subsanación). Las
+    estadísticas de tiempos del embudo la leen con agregaciones en SQL.
+
+    `convocatoria` está desnormalizada para que el índice
+    (convocatoria, estado, fecha) resuelva los filtros del dashboard sin join.
+    """
+    ORIGENES = [
+        ("admin", "Admin (ficha)"),
+        ("masivo", "Acción masiva del admin"),
+        ("wizard", "Envío del postulante"),
+        ("subsanacion", "Subsanación del postulante"),
+        ("migracion", "Carga inicial"),
+    ]
+
+    postulacion = models.ForeignKey(Postulacion, on_delete=models.CASCADE, related_name="cambios_estado")
+    convocatoria = models.ForeignKey(Convocatoria, on_delete=models.CASCADE, related_name="+")
+    estado_anterior = models.CharField(max_length=30, blank=True)
+    estado = models.CharField(max_length=30, choices=Postulacion.ESTADOS)
+    fecha = models.DateTimeField(default=timezone.now)
+    usuario = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+",
+    )
+    origen = models.CharField(max_length=20, choices=ORIGENES)
+
+    class Meta:
+        verbose_name = "Cambio de estado de postulación"
+        verbose_name_plural = "Cambios de estado de postulaciones"
+        ordering = ["-fecha"]
+        indexes = [
+            models.Index(fields=["convocatoria", "estado", "fecha"]),
+            models.Index(fields=["postulacion", "fecha"]),
+        ]
+
+    def __str__(self):
+        return f"Postulación {self.postulacion_id}: {self.estado_anterior or '—'} → {self.estado}"
+
+    @classmethod
+    def registrar(cls, postulacion, estado_anterior, origen, usuario=None):
+        """Registra el paso de `postulacion` de `estado_anterior` a su estado actual."""
+        return cls.objects.create(
+            postulacion=postulacion,
+            convocatoria_id=postulacion.convocatoria_id,
+            estado_anterior=estado_anterior or "",
+            estado=postulacion.estado,
+            origen=origen,
+            usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+        )
+
+
 # ==========================================
 # DOCUMENTOS DE POSTULACIÓN
 # ==========================================
@@ -346,8 +417,12 @@ class DocumentoPostulacion(models.Model):
 
     archivo = models.FileField(
         upload_to="postulaciones/documentos/",
+        storage=archivos.almacenamiento_documentos,
         validators=[validar_documento_admitido, validar_tamano_archivo],
     )
+    # Tamaño y huella al subir (convocatorias/archivos.py)
+    archivo_bytes  = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    archivo_sha256 = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
 
 
     fecha_subida = models.DateTimeField(auto_now_add=True)
@@ -399,6 +474,18 @@ class ObservacionAdministrativa(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     subsanada = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # pendientes por antigüedad (recordatorio_subsanacion). Parcial: el
+            # booleano como primera columna no sirve en SQLite, que compila
+            # subsanada=False a NOT "subsanada" y no lo usa como igualdad.
+            models.Index(
+                fields=["fecha_creacion"],
+                condition=models.Q(subsanada=False),
+                name="observacion_pendiente_fecha",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.postulacion_id} · {self.get_tipo_documento_display()} · {'OK' if self.subsanada else 'Pendiente'}"
 
@@ -594,8 +681,12 @@ class DocumentoIntegrante(models.Model):
 
     archivo = models.FileField(
         upload_to="postulaciones/integrantes/",
+        storage=archivos.almacenamiento_documentos,
         validators=[validar_documento_admitido, validar_tamano_archivo],
     )
+    # Tamaño y huella al subir (convocatorias/archivos.py)
+    archivo_bytes  = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    archivo_sha256 = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
 
     estado = models.CharField(max_length=10, choices=ESTADOS, default="PENDIENTE")
     fecha_subida = models.DateTimeField(auto_now_add=True)
@@ -652,6 +743,9 @@ class Rendicion(models.Model):
         blank=True, null=True,
         verbose_name="Planilla de rendición (.xlsx)",
     )
+    # Tamaño y huella al subir (convocatorias/archivos.py)
+    planilla_xlsx_bytes  = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    planilla_xlsx_sha256 = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
     observaciones_usuario = models.TextField(blank=True)
     observaciones_admin = models.TextField(blank=True)
 
@@ -690,6 +784,12 @@ class Rendicion(models.Model):
     # Bitácora liviana
     historial = models.JSONField(default=list, blank=True)
 
+    class Meta:
+        indexes = [
+            # impacto económico por año de aprobación (estadísticas)
+            models.Index(fields=["estado", "fecha_aprobacion"], name="rendicion_estado_aprobacion"),
+        ]
+
     def add_event(self, actor, action, detail=""):
         """
         actor: 'usuario' / 'admin' / 'sistema'
@@ -794,6 +894,145 @@ class PuntajeCriterio(models.Model):
         return f"{self.criterio.nombre}: {self.puntaje}"
 
 
+# ==========================================
+# PAQUETES DE DOCUMENTACIÓN PREGENERADOS
+# ==========================================
+class PaqueteDocumentacion(models.Model):
+    """
+    ZIP ya armado con la documentación de una postulación, o de todas las
+    postulaciones de la convocatoria si `postulacion` es null, para servirlo
+    sin volver a leer cada archivo (ver convocatorias/paquetes.py).
+
+    Sin `archivo` = pendiente de generar. Agregar o borrar documentos lo
+    vuelve pendiente (señales al final del módulo); `version` evita que una
+    generación empezada antes de ese cambio lo marque como vigente.
+    """
+    VARIANTES = [
+        ("completo",     "Completo (staff)"),
+        ("jurado",       "Jurado"),
+        ("jurado_ciego", "Jurado (doble ciego)"),
+    ]
+
+    convocatoria = models.ForeignKey(
+        Convocatoria, on_delete=models.CASCADE, related_name="paquetes_documentacion",
+    )
+    postulacion = models.ForeignKey(
+        Postulacion, on_delete=models.CASCADE, null=True, blank=True,
+        related_name="paquetes_documentacion",
+    )
+    variante = models.CharField(max_length=20, choices=VARIANTES, default="completo")
+
+    # Fuera de MEDIA_ROOT: junta documentos personales, se descarga solo por las vistas
+    archivo  = models.FileField(upload_to="paquetes/", storage=almacenamiento_exportaciones, blank=True)
+    tamanio  = models.PositiveBigIntegerField(null=True, blank=True)
+    version  = models.PositiveIntegerField(default=0)
+    generado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Paquete de documentación"
+        verbose_name_plural = "Paquetes de documentación"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["postulacion", "variante"],
+                condition=models.Q(postulacion__isnull=False),
+                name="paquete_unico_por_postulacion",
+            ),
+            models.UniqueConstraint(
+                fields=["convocatoria", "variante"],
+                condition=models.Q(postulacion__isnull=True),
+                name="paquete_unico_por_convocatoria",
+            ),
+        ]
+
+    def __str__(self):
+        destino = f"postulación {self.postulacion_id}" if self.postulacion_id else "convocatoria completa"
+        return f"{self.convocatoria} · {destino} ({self.get_variante_display()})"
+
+    @classmethod
+    def invalidar(cls, postulacion_id, convocatoria_id=None):
+        """Vuelve pendientes los paquetes de la postulación y los de su
+        convocatoria completa, y borra los ZIP ya generados."""
+        if convocatoria_id is None:
+            convocatoria_id = (
+                Postulacion.objects.filter(pk=postulacion_id)
+                .values_list("convocatoria_id", flat=True).first()
+            )
+        cls._invalidar(
+            models.Q(postulacion_id=postulacion_id)
+            | models.Q(convocatoria_id=convocatoria_id, postulacion__isnull=True)
+        )
+
+    @classmethod
+    def invalidar_varias(cls, postulacion_ids):
+        """Como invalidar(), para muchas postulaciones a la vez (borrados
+        masivos que no disparan señales por fila)."""
+        postulacion_ids = list(postulacion_ids)
+        if not postulacion_ids:
+            return
+        convocatoria_ids = set(
+            Postulacion.objects.filter(pk__in=postulacion_ids)
+            .values_list("convocatoria_id", flat=True)
+        )
+        cls._invalidar(
+            models.Q(postulacion_id__in=postulacion_ids)
+            | models.Q(convocatoria_id__in=convocatoria_ids, postulacion__isnull=True)
+        )
+
+    @classmethod
+    def _invalidar(cls, condicion):
+        afectados = cls.objects.filter(condicion)
+        for paquete in afectados.exclude(archivo=""):
+            paquete.archivo.delete(save=False)
+        afectados.update(archivo="", tamanio=None, generado=None, version=models.F("version") + 1)
+
+
+# ==========================================
+# COLA DE BORRADO DE ARCHIVOS
+# ==========================================
+class ArchivoPorBorrar(models.Model):
+    """
+    Archivo de media/ cuya fila ya se borró y que falta eliminar del disco.
+
+    La depuración masiva (convocatorias/depuracion.py) borra las filas en
+    transacciones cortas y anota acá sus archivos en la misma transacción;
+    recién después del commit los elimina. Si la corrida se corta, lo que
+    quedó anotado se elimina al empezar la siguiente: nunca queda un
+    archivo sin fila ni una fila sin archivo.
+    """
+    nombre = models.CharField(max_length=255)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archivo por borrar"
+        verbose_name_plural = "Archivos por borrar"
+
+    def __str__(self):
+        return self.nombre
+
+
+# ==========================================
+# ARCHIVOS COMPARTIDOS (documentos deduplicados)
+# ==========================================
+class ArchivoCompartido(models.Model):
+    """
+    Contenido guardado una sola vez en compartidos/ por
+    AlmacenamientoDeduplicado (convocatorias/archivos.py), con la cantidad
+    de filas que lo usan. El archivo se borra cuando `referencias` llega a 0.
+    """
+    nombre      = models.CharField(max_length=255, unique=True)
+    sha256      = models.CharField(max_length=64, db_index=True)
+    bytes       = models.PositiveBigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    creado      = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archivo compartido"
+        verbose_name_plural = "Archivos compartidos"
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} referencias)"
+
+
 # ==========================================
 # SEÑALES — limpieza de archivos al borrar
 # ==========================================
@@ -828,4 +1067,54 @@ def borrar_planilla_anterior_al_reemplazar(sender, instance, **kwargs):
     except Rendicion.DoesNotExist:
         return
     if anterior and anterior != instance.planilla_xlsx:
-        anterior.delete(save=False)
\ No newline at end of file
+        anterior.delete(save=False)
+
+@receiver(post_delete, sender=PaqueteDocumentacion)
+def borrar_archivo_paquete(sender, instance, **kwargs):
+    if instance.archivo:
+        instance.archivo.delete(save=False)
+
+
+# ==========================================
+# SEÑALES — tamaño y huella al subir
+# ==========================================
+@receiver(pre_save, sender=DocumentoPostulacion)
+@receiver(pre_save, sender=DocumentoIntegrante)
+def registrar_huella_documento(sender, instance, **kwargs):
+    archivos.registrar(instance, "archivo")
+
+
+@receiver(pre_save, sender=Rendicion)
+def registrar_huella_planilla(sender, instance, **kwargs):
+    archivos.registrar(instance, "planilla_xlsx")
+
+
+# ==========================================
+# SEÑALES — paquetes de documentación
+# ==========================================
+# Un documento nuevo, reemplazado, aprobado/rechazado o borrado cambia lo
+# que va en el ZIP de su postulación y en el de la convocatoria completa.
+
+@receiver(post_save, sender=DocumentoPostulacion)
+@receiver(post_delete, sender=DocumentoPostulacion)
+def invalidar_paquetes_documento_postulacion(sender, instance, **kwargs):
+    PaqueteDocumentacion.invalidar(instance.postulacion_id)
+
+
+@receiver(post_save, sender=DocumentoIntegrante)
+@receiver(post_delete, sender=DocumentoIntegrante)
+def invalidar_paquetes_documento_integrante(sender, instance, **kwargs):
+    postulacion_id = (
+        IntegrantePostulacion.objects.filter(pk=instance.integrante_id)
+        .values_list("postulacion_id", flat=True).first()
+    )
+    if postulacion_id:
+        PaqueteDocumentacion.invalidar(postulacion_id)
+
+
+@receiver(post_save, sender=Postulacion)
+def invalidar_paquetes_postulacion(sender, instance, created, **kwargs):
+    # El estado define si entra en el ZIP de la convocatoria para el jurado.
+    # Un borrador nunca está en un paquete.
+    if not created and instance.estado != "borrador":
+        PaqueteDocumentacion.invalidar(instance.pk, instance.convocatoria_id)
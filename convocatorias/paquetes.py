@@ -0,0 +1,168 @@
+"""Paquetes ZIP de documentación pregenerados (PaqueteDocumentacion).
+
+Jurados y staff bajan una y otra vez la misma documentación mientras una
+convocatoria está en evaluación. En vez de volver a leer y comprimir cada
+archivo en cada descarga, el ZIP de cada postulación y el de la convocatoria
+completa se arman una vez y se sirven directo desde el disco.
+
+Ciclo de vida:
+- Al pasar postulaciones a evaluación por jurado (acción del admin) se
+  registran como pendientes los paquetes de esas postulaciones y de su
+  convocatoria: el completo para staff y la variante de jurado que usan
+  las asignaciones (con o sin doble ciego).
+- El comando preparar_paquetes_documentacion genera los pendientes.
+- Una descarga que no encuentra el paquete listo lo arma en vivo (streaming)
+  y lo deja pendiente para la próxima vuelta del comando.
+- Las señales de convocatorias/models.py vuelven pendientes los paquetes
+  cuando cambian los documentos o el estado de una postulación.
+"""
+import tempfile
+
+from django.core.files import File
+from django.db.models import F
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from exportaciones.zips import CONTENT_TYPE_ZIP, generar_zip, respuesta_zip
+
+from . import documentacion
+from .models import (
+    ESTADOS_JURADO, AsignacionJuradoConvocatoria, PaqueteDocumentacion, Postulacion,
+)
+
+
+def postulaciones_del_paquete(convocatoria_id, variante):
+    """Postulaciones que entran en el ZIP de la convocatoria completa."""
+    qs = Postulacion.objects.filter(convocatoria_id=convocatoria_id)
+    if variante == "completo":
+        return qs.exclude(estado="borrador")
+    return qs.filter(estado__in=ESTADOS_JURADO)
+
+
+def variantes_jurado(convocatoria_id):
+    """Variantes de jurado que usan las asignaciones de la convocatoria."""
+    ciegos = set(
+        AsignacionJuradoConvocatoria.objects
+        .filter(convocatoria_id=convocatoria_id)
+        .values_list("doble_ciego", flat=True)
+    )
+    return {documentacion.variante_jurado(ciego) for ciego in ciegos} or {"jurado"}
+
+
+def nombre_descarga(convocatoria, postulacion=None):
+    if postulacion is not None:
+        return f"{documentacion.nombre_carpeta(postulacion)}.zip"
+    return f"documentacion_{slugify(convocatoria.titulo)[:60] or convocatoria.pk}.zip"
+
+
+# ──────────────────────────────────────────────────────────────
+# Registro y generación
+# ──────────────────────────────────────────────────────────────
+
+def registrar(convocatoria_id, postulacion_id=None, variante="completo"):
+    paquete, _ = PaqueteDocumentacion.objects.get_or_create(
+        convocatoria_id=convocatoria_id, postulacion_id=postulacion_id, variante=variante,
+    )
+    return paquete
+
+
+def preparar(postulaciones):
+    """Registra como pendientes los paquetes de `postulaciones` (queryset) y
+    de sus convocatorias. Devuelve cuántos paquetes quedaron registrados."""
+    por_convocatoria = {}
+    for postulacion_id, convocatoria_id in postulaciones.values_list("id", "convocatoria_id"):
+        por_convocatoria.setdefault(convocatoria_id, []).append(postulacion_id)
+
+    cantidad = 0
+    for convocatoria_id, ids in por_convocatoria.items():
+        variantes = {"completo"} | variantes_jurado(convocatoria_id)
+        for variante in variantes:
+            registrar(convocatoria_id, None, variante)
+            cantidad += 1
+            for postulacion_id in ids:
+                registrar(convocatoria_id, postulacion_id, variante)
+                cantidad += 1
+    return cantidad
+
+
+def _entradas(paquete):
+    if paquete.postulacion_id:
+        qs = Postulacion.objects.filter(pk=paquete.postulacion_id)
+        carpetas = False
+    else:
+        qs = postulaciones_del_paquete(paquete.convocatoria_id, paquete.variante)
+        carpetas = True
+    postulaciones = documentacion.postulaciones_con_documentos(qs, paquete.variante)
+    return documentacion.entradas(postulaciones, carpetas=carpetas, variante=paquete.variante)
+
+
+def generar(paquete):
+    """Arma el ZIP de `paquete`. Si mientras tanto cambió la documentación
+    (otra versión), descarta el archivo y el paquete sigue pendiente.
+    Devuelve True si quedó vigente."""
+    version = paquete.version
+    with tempfile.TemporaryFile() as tmp:
+        for bloque in generar_zip(_entradas(paquete)):
+            tmp.write(bloque)
+        tamanio = tmp.tell()
+        tmp.seek(0)
+        nombre = f"{paquete.convocatoria_id}/{paquete.postulacion_id or 'convocatoria'}_{paquete.variante}.zip"
+        nombre = paquete.archivo.field.generate_filename(paquete, nombre)
+        nombre = paquete.archivo.storage.save(nombre, File(tmp))
+
+    vigente = PaqueteDocumentacion.objects.filter(pk=paquete.pk, version=version).update(
+        archivo=nombre, tamanio=tamanio, generado=timezone.now(),
+    )
+    if not vigente:
+        paquete.archivo.storage.delete(nombre)
+        return False
+    if paquete.archivo and paquete.archivo.name != nombre:
+        paquete.archivo.delete(save=False)
+    paquete.refresh_from_db()
+    return True
+
+
+def generar_pendientes(convocatorias=None):
+    """Genera los paquetes pendientes (opcionalmente solo de `convocatorias`).
+    Devuelve cuántos quedaron vigentes."""
+    pendientes = PaqueteDocumentacion.objects.filter(archivo="").order_by(
+        "convocatoria_id", F("postulacion_id").asc(nulls_first=True), "variante",
+    )
+    if convocatorias is not None:
+        pendientes = pendientes.filter(convocatoria__in=convocatorias)
+    return sum(1 for paquete in pendientes if generar(paquete))
+
+
+# ──────────────────────────────────────────────────────────────
+# Descarga
+# ──────────────────────────────────────────────────────────────
+
+def _vigente(convocatoria_id, postulacion_id, variante):
+    """Paquete listo o None. Si no está listo lo deja registrado como
+    pendiente, para que el comando lo genere."""
+    paquete = registrar(convocatoria_id, postulacion_id, variante)
+    if paquete.archivo and paquete.archivo.storage.exists(paquete.archivo.name):
+        return paquete
+    return None
+
+
+def respuesta(convocatoria, postulacion=None, variante="completo"):
+    """Descarga del ZIP de la postulación (o de la convocatoria completa):
+    el paquete pregenerado si está listo, si no armado en vivo."""
+    nombre = nombre_descarga(convocatoria, postulacion)
+    paquete = _vigente(convocatoria.pk, postulacion.pk if postulacion else None, variante)
+    if paquete is not None:
+        return FileResponse(
+            paquete.archivo.open("rb"), as_attachment=True, filename=nombre,
+            content_type=CONTENT_TYPE_ZIP,
+        )
+
+    if postulacion is not None:
+        qs = Postulacion.objects.filter(pk=postulacion.pk)
+    else:
+        qs = postulaciones_del_paquete(convocatoria.pk, variante)
+    postulaciones = documentacion.postulaciones_con_documentos(qs, variante)
+    return respuesta_zip(nombre, documentacion.entradas(
+        postulaciones, carpetas=postulacion is None, variante=variante,
+    ))
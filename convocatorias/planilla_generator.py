@@ -1,29 +1,13 @@
 """
-Genera planillas oficiales IDEA pre-completadas a partir de las plantillas xlsx.
+Genera la planilla oficial pre-completada a partir de la plantilla xlsx que
+la convocatoria sube en ConfiguracionPostulacion.planilla_archivo.
 """
 import io
 import os
 
-from django.conf import settings
 from openpyxl import load_workbook
 
-PLANILLAS_DIR = getattr(
-    settings,
-    "PLANILLAS_OFICIALES_DIR",
-    "/Users/hasguell/Library/CloudStorage/GoogleDrive-federicocasoni@gmail.com"
-    "/Mi unidad/DAV/PROYECTOS 2026/FOMENTO/PLAN IDEA 2026/Planillas oficiales",
-)
-
-PLANILLA_FILES = {
-    "01": "01_ Planilla Oficial_Cortometraje ficcion.xlsx",
-    "02": "02_ Planilla Oficial_Cortometraje coproducción.xlsx",
-    "03": "03_ Planilla Oficial_Desarrollo.xlsx",
-    "04": "04_ Planilla Oficial_Lab corto.xlsx",
-    "05": "05_ Planilla Oficial_Cine en comunidad.xlsx",
-    "06": "06_ Planilla Oficial_Apoyo rodaje.xlsx",
-    "07": "07_ Planilla Oficial_Apoyo finalización.xlsx",
-    "08": "08_ Planilla Oficial_Cash rebate.xlsx",
-}
+HOJA_INICIO = "01_Inicio"
 
 
 def generar_planilla_postulacion(postulacion) -> tuple[bytes, str]:
@@ -33,22 +17,22 @@ def generar_planilla_postulacion(postulacion) -> tuple[bytes, str]:
     del presentante y del proyecto, y la retorna como bytes lista para descargar.
     """
     config = getattr(postulacion.convocatoria, "configuracion", None)
-    template_key = config.planilla_template if config else ""
+    plantilla = config.planilla_archivo if config else None
 
-    if not template_key or template_key not in PLANILLA_FILES:
+    if not plantilla:
         raise ValueError(
             f"La convocatoria '{postulacion.convocatoria.titulo}' "
             "no tiene una planilla oficial configurada."
         )
 
-    template_path = os.path.join(PLANILLAS_DIR, PLANILLA_FILES[template_key])
-    if not os.path.exists(template_path):
+    if not plantilla.storage.exists(plantilla.name):
         raise FileNotFoundError(
-            f"No se encontró el archivo de plantilla: {template_path}"
+            f"No se encontró el archivo de plantilla: {plantilla.name}"
         )
 
-    wb = load_workbook(template_path)
-    ws = wb["01_Inicio"]
+    with plantilla.open("rb") as f:
+        wb = load_workbook(f)
+    ws = wb[HOJA_INICIO] if HOJA_INICIO in wb.sheetnames else wb.active
 
     # Nombre del presentante
     persona = _get_persona(postulacion)
@@ -57,14 +41,9 @@ def generar_planilla_postulacion(postulacion) -> tuple[bytes, str]:
     # Nombre del proyecto
     ws["B5"] = postulacion.nombre_proyecto or ""
 
-    # Parámetros financieros (desde la config de la convocatoria)
-    if config:
-        ws["B8"] = config.beneficio_monto or 0
-        ws["B9"] = config.beneficio_adicional or 0
-        ws["B10"] = float(config.aporte_propio_pct or 0.10)
-
+    base = os.path.splitext(os.path.basename(plantilla.name))[0]
     nombre_archivo = (
-        f"planilla_{template_key}_"
+        f"{base}_"
         f"{(postulacion.nombre_proyecto or 'proyecto').replace(' ', '_')}.xlsx"
     )
 
@@ -1,23 +1,34 @@
+import hashlib
 import os
 import shutil
 import tempfile
+import time
+import zipfile
 from datetime import date, timedelta
-from io import StringIO
+from io import BytesIO, StringIO
+from unittest import mock
 
-from django.contrib.auth.models import Permission, User
+from django.contrib.auth.models import Group, Permission, User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.http import FileResponse
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+from convocatorias import archivos, depuracion, documentacion, huerfanos, paquetes, transiciones
 from convocatorias.models import (
-    Convocatoria, Postulacion, DocumentoPostulacion,
-    IntegrantePostulacion, DocumentoIntegrante, Rendicion,
+    ArchivoCompartido, ArchivoPorBorrar, AsignacionJuradoConvocatoria, CambioEstadoPostulacion, ConfiguracionPostulacion, Convocatoria, Postulacion, DocumentoPostulacion,
+    IntegrantePostulacion, DocumentoIntegrante, PaqueteDocumentacion, Rendicion,
 )
+from correos.models import CorreoSaliente
+from exportaciones.models import VersionDatos
 
 MEDIA_TEST = tempfile.mkdtemp(prefix="test_depuracion_")
+PRIVADO_TEST = tempfile.mkdtemp(prefix="test_privado_")
 
 
 def crear_convocatoria(titulo="Conv cerrada", cerrada=True):
@@ -46,19 +57,26 @@ def crear_postulacion_con_docs(user, conv, estado="no_seleccionado"):
     return p
 
 
+def envejecer(ruta):
+    """Lleva la fecha de `ruta` más atrás que huerfanos.EDAD_MINIMA."""
+    antes = time.time() - 2 * huerfanos.EDAD_MINIMA.total_seconds()
+    os.utime(ruta, (antes, antes))
+
+
 def depurar(*args):
     out = StringIO()
     call_command("depurar_documentacion", *args, stdout=out)
     return out.getvalue()
 
 
-@override_settings(MEDIA_ROOT=MEDIA_TEST)
+@override_settings(MEDIA_ROOT=MEDIA_TEST, EXPORTACIONES_DIR=PRIVADO_TEST)
 class DepurarDocumentacionTest(TestCase):
 
     @classmethod
     def tearDownClass(cls):
         super().tearDownClass()
         shutil.rmtree(MEDIA_TEST, ignore_errors=True)
+        shutil.rmtree(PRIVADO_TEST, ignore_errors=True)
 
     def setUp(self):
         self.user = User.objects.create(username="ana")
@@ -146,6 +164,7 @@ class DepurarDocumentacionTest(TestCase):
         huerfano = os.path.join(MEDIA_TEST, "viejo_sin_registro.pdf")
         with open(huerfano, "wb") as f:
             f.write(b"%PDF- huerfano")
+        envejecer(huerfano)
 
         salida = depurar("--huerfanos")
         self.assertIn("viejo_sin_registro.pdf", salida)
@@ -153,9 +172,321 @@ class DepurarDocumentacionTest(TestCase):
 
         depurar("--huerfanos", "--ejecutar")
         self.assertFalse(os.path.exists(huerfano))
+        self.assertTrue(os.path.exists(referenciado))
         self.assertTrue(os.path.exists(referenciado), "los referenciados no se tocan")
 
 
+@override_settings(MEDIA_ROOT=MEDIA_TEST, EXPORTACIONES_DIR=PRIVADO_TEST)
+class HuerfanosTest(TestCase):
+    def setUp(self):
+        self.addCleanup(huerfanos.borrar_informe)
+        p = crear_postulacion_con_docs(User.objects.create(username="ana"), crear_convocatoria())
+        self.referenciado = DocumentoPostulacion.objects.get(postulacion=p).archivo.name
+        self.huerfano = self._crear("postulaciones/documentos/resto.pdf", b"%PDF- resto")
+        self.suelto = self._crear("otra_app/sub/carpeta/x.txt", b"x")
+
+    def _crear(self, relativa, datos):
+        ruta = os.path.join(MEDIA_TEST, relativa)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as f:
+            f.write(datos)
+        envejecer(ruta)
+        self.addCleanup(lambda: os.path.exists(ruta) and os.remove(ruta))
+        return relativa
+
+    def test_carpeta_de_upload_to(self):
+        self.assertEqual(huerfanos._carpeta("postulaciones/documentos/"), "postulaciones")
+        self.assertEqual(huerfanos._carpeta("docs"), "docs")
+        self.assertEqual(huerfanos._carpeta("%Y/%m/"), "")
+        self.assertEqual(huerfanos._carpeta(lambda i, n: n), "")
+        carpetas = {(c.modelo.__name__, c.carpeta) for c in huerfanos.campos_media()}
+        self.assertIn(("DocumentoIntegrante", "postulaciones"), carpetas)
+        # Storage privado: no vive en media/
+        self.assertNotIn("PaqueteDocumentacion", {m for m, _ in carpetas})
+
+    def test_escaneo_por_carpetas(self):
+        rutas = {h.ruta for h in huerfanos.escanear(hilos=2)}
+        self.assertIn(self.huerfano, rutas)
+        self.assertIn(os.path.normpath(self.suelto), rutas)
+        self.assertNotIn(self.referenciado, rutas)
+
+    def test_ejecutar_usa_el_informe_sin_reescanear(self):
+        depurar("--huerfanos")
+        self.assertTrue(huerfanos.ruta_informe().exists())
+        with mock.patch.object(huerfanos, "escanear", side_effect=AssertionError("reescaneó")):
+            salida = depurar("--huerfanos", "--ejecutar")
+        self.assertIn("Usando el informe", salida)
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_TEST, self.huerfano)))
+        self.assertFalse(huerfanos.ruta_informe().exists())
+
+    def test_no_informa_archivos_recientes(self):
+        reciente = self._crear("postulaciones/documentos/subiendo.pdf", b"%PDF-")
+        os.utime(os.path.join(MEDIA_TEST, reciente))
+        self.assertNotIn(reciente, {h.ruta for h in huerfanos.escanear()})
+
+    def test_compartido_de_una_transaccion_revertida(self):
+        p = Postulacion.objects.get()
+        try:
+            with transaction.atomic():
+                doc = DocumentoPostulacion.objects.create(
+                    postulacion=p, tipo="DOSSIER", archivo=SimpleUploadedFile("d.pdf", b"%PDF- revertido"),
+                )
+                nombre = doc.archivo.name
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        ruta = os.path.join(MEDIA_TEST, nombre)
+        self.assertTrue(os.path.exists(ruta), "el archivo quedó en disco")
+        self.assertFalse(ArchivoCompartido.objects.filter(nombre=nombre).exists())
+        envejecer(ruta)
+
+        self.assertIn(os.path.normpath(nombre), {h.ruta for h in huerfanos.escanear()})
+        depurar("--huerfanos", "--ejecutar")
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_no_borra_lo_que_cambio_desde_el_escaneo(self):
+        depurar("--huerfanos")
+        # Después del escaneo: un archivo cambia y otro pasa a estar referenciado
+        with open(os.path.join(MEDIA_TEST, self.suelto), "ab") as f:
+            f.write(b"mas")
+        DocumentoPostulacion.objects.update(archivo=self.huerfano)
+
+        salida = depurar("--huerfanos", "--ejecutar")
+        self.assertIn("2 omitidos", salida)
+        self.assertTrue(os.path.exists(os.path.join(MEDIA_TEST, self.huerfano)))
+        self.assertTrue(os.path.exists(os.path.join(MEDIA_TEST, self.suelto)))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEST, EXPORTACIONES_DIR=PRIVADO_TEST)
+class DepuracionPorLotesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="ana")
+        self.conv = crear_convocatoria()
+        self.postulaciones = [crear_postulacion_con_docs(self.user, self.conv) for _ in range(3)]
+        self.rutas = [d.archivo.path for d in DocumentoPostulacion.objects.all()] \
+                   + [d.archivo.path for d in DocumentoIntegrante.objects.all()]
+
+    def test_lotes_chicos_borran_todo_y_marcan(self):
+        paquete = paquetes.registrar(self.conv.pk, self.postulaciones[0].pk)
+        qs = depuracion.postulaciones_depurables()
+
+        info = depuracion.resumen(qs)
+        self.assertEqual(info["total_docs"], 6)
+        self.assertEqual(info["por_conv"], [(self.conv.titulo, 6)])
+        self.assertEqual(info["total_bytes"], sum(os.path.getsize(r) for r in self.rutas))
+
+        resultado = depuracion.ejecutar(qs, lote=2)
+
+        self.assertEqual(resultado, {
+            "total_docs": 6, "total_bytes": info["total_bytes"], "marcadas": 3,
+        })
+        self.assertFalse(any(os.path.exists(r) for r in self.rutas))
+        self.assertFalse(ArchivoPorBorrar.objects.exists())
+        # Sin señales por fila, el paquete se invalida igual (una vez por lote)
+        paquete.refresh_from_db()
+        self.assertGreater(paquete.version, 0)
+
+    def test_corrida_cortada_se_retoma(self):
+        qs = depuracion.postulaciones_depurables()
+        vaciar = depuracion._vaciar
+        llamadas = []
+
+        def cortar_despues_del_primer_lote(lote):
+            llamadas.append(1)
+            if len(llamadas) == 2:
+                raise KeyboardInterrupt
+            return vaciar(lote)
+
+        with mock.patch.object(depuracion, "_vaciar", cortar_despues_del_primer_lote):
+            with self.assertRaises(KeyboardInterrupt):
+                depuracion.ejecutar(qs, lote=2)
+
+        # El primer lote quedó confirmado y sus archivos anotados en la cola
+        self.assertEqual(DocumentoPostulacion.objects.count(), 1)
+        pendientes = list(ArchivoPorBorrar.objects.values_list("nombre", flat=True))
+        self.assertEqual(len(pendientes), 2)
+        self.assertTrue(all(os.path.exists(os.path.join(MEDIA_TEST, n)) for n in pendientes))
+
+        resultado = depuracion.ejecutar(qs, lote=2)
+
+        self.assertEqual(resultado["total_docs"], 4)
+        self.assertFalse(any(os.path.exists(r) for r in self.rutas))
+        self.assertFalse(ArchivoPorBorrar.objects.exists())
+        self.assertEqual(
+            Postulacion.objects.filter(documentacion_depurada__isnull=False).count(), 3,
+        )
+
+
+    def test_error_al_borrar_deja_el_archivo_en_la_cola(self):
+        qs = depuracion.postulaciones_depurables()
+        storage = DocumentoPostulacion._meta.get_field("archivo").storage
+        borrar = storage.delete
+        protegido = DocumentoPostulacion.objects.first().archivo.name
+
+        def sin_permiso(nombre):
+            if nombre == protegido:
+                raise PermissionError(nombre)
+            return borrar(nombre)
+
+        with mock.patch.object(storage, "delete", side_effect=sin_permiso), \
+                self.assertLogs("convocatorias.depuracion", "WARNING"):
+            depuracion.ejecutar(qs, lote=2)
+        # Los tres guiones comparten archivo (compartidos/): quedan sus tres filas
+        self.assertEqual(list(ArchivoPorBorrar.objects.values_list("nombre", flat=True)), [protegido] * 3)
+
+        # Otro error: se propaga y la fila sigue en la cola
+        with mock.patch.object(storage, "delete", side_effect=RuntimeError("base")):
+            with self.assertRaises(RuntimeError):
+                depuracion.ejecutar(qs, lote=2)
+        self.assertTrue(ArchivoPorBorrar.objects.filter(nombre=protegido).exists())
+
+        # La próxima corrida lo elimina
+        depuracion.ejecutar(qs, lote=2)
+        self.assertFalse(ArchivoPorBorrar.objects.exists())
+        self.assertFalse(any(os.path.exists(r) for r in self.rutas))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEST)
+class HuellasArchivosTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="ana")
+        self.conv = crear_convocatoria()
+        self.p = crear_postulacion_con_docs(self.user, self.conv)
+        self.doc = DocumentoPostulacion.objects.get(postulacion=self.p)
+
+    def test_registra_tamano_y_huella_al_subir(self):
+        self.assertEqual(self.doc.archivo_bytes, len(b"%PDF- guion"))
+        self.assertEqual(self.doc.archivo_sha256, hashlib.sha256(b"%PDF- guion").hexdigest())
+
+        # Guardar de nuevo sin cambiar el archivo no lo vuelve a leer
+        with mock.patch.object(archivos, "huella", side_effect=AssertionError("releyó")):
+            self.doc.save()
+
+    def test_planilla_reemplazada_y_quitada(self):
+        r = Rendicion.objects.create(postulacion=self.p, user=self.user,
+                                     planilla_xlsx=SimpleUploadedFile("a.xlsx", b"PK uno"))
+        self.assertEqual(r.planilla_xlsx_bytes, 6)
+        r.planilla_xlsx = SimpleUploadedFile("b.xlsx", b"PK otra mas")
+        r.save()
+        self.assertEqual(r.planilla_xlsx_bytes, 11)
+        r.planilla_xlsx = None
+        r.save()
+        self.assertIsNone(r.planilla_xlsx_bytes)
+        self.assertEqual(r.planilla_xlsx_sha256, "")
+
+    def test_completar_filas_viejas(self):
+        DocumentoPostulacion.objects.update(archivo_bytes=None, archivo_sha256="")
+        DocumentoIntegrante.objects.update(archivo_bytes=None, archivo_sha256="")
+        os.remove(DocumentoIntegrante.objects.get().archivo.path)
+
+        info = depuracion.resumen(depuracion.postulaciones_depurables())
+        self.assertEqual((info["total_bytes"], info["sin_tamano"]), (0, 2))
+
+        out = StringIO()
+        call_command("completar_huellas_archivos", stdout=out)
+
+        self.doc.refresh_from_db()
+        self.assertEqual(self.doc.archivo_bytes, len(b"%PDF- guion"))
+        # El que falta en disco queda desconocido, no en 0
+        self.assertIsNone(DocumentoIntegrante.objects.get().archivo_bytes)
+        self.assertIn("1 sin archivo en disco", out.getvalue())
+
+        info = depuracion.resumen(depuracion.postulaciones_depurables())
+        self.assertEqual((info["total_bytes"], info["sin_tamano"]), (len(b"%PDF- guion"), 1))
+
+    def test_duplicados(self):
+        crear_postulacion_con_docs(self.user, self.conv)
+        duplicados = archivos.duplicados(DocumentoPostulacion, "archivo")
+        self.assertEqual(len(duplicados), 1)
+        self.assertEqual(duplicados[0].cantidad, 2)
+        self.assertEqual(duplicados[0].sha256, self.doc.archivo_sha256)
+
+        out = StringIO()
+        call_command("completar_huellas_archivos", "--duplicados", stdout=out)
+        self.assertIn("subido 2 veces", out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEST)
+class ArchivosCompartidosTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="ana")
+        self.conv = crear_convocatoria()
+
+    def _guion(self, p):
+        return DocumentoPostulacion.objects.get(postulacion=p)
+
+    def test_mismo_contenido_un_solo_archivo(self):
+        d1 = self._guion(crear_postulacion_con_docs(self.user, self.conv))
+        d2 = self._guion(crear_postulacion_con_docs(self.user, self.conv))
+
+        self.assertEqual(d1.archivo.name, d2.archivo.name)
+        self.assertTrue(d1.archivo.name.startswith("compartidos/"))
+        self.assertIn(d1.archivo_sha256, d1.archivo.name)
+        compartido = ArchivoCompartido.objects.get(nombre=d1.archivo.name)
+        self.assertEqual(compartido.referencias, 2)
+
+        # La señal post_delete resta una referencia; el archivo sigue
+        d1.delete()
+        self.assertTrue(os.path.exists(d2.archivo.path))
+        compartido.refresh_from_db()
+        self.assertEqual(compartido.referencias, 1)
+
+        nombre, ruta = d2.archivo.name, d2.archivo.path
+        d2.delete()
+        self.assertFalse(os.path.exists(ruta))
+        self.assertFalse(ArchivoCompartido.objects.filter(nombre=nombre).exists())
+
+    def test_contador_desfasado_no_borra_en_uso(self):
+        d1 = self._guion(crear_postulacion_con_docs(self.user, self.conv))
+        d2 = self._guion(crear_postulacion_con_docs(self.user, self.conv))
+        ArchivoCompartido.objects.filter(nombre=d1.archivo.name).update(referencias=1)
+
+        d1.delete()
+
+        self.assertTrue(os.path.exists(d2.archivo.path))
+        self.assertEqual(ArchivoCompartido.objects.get(nombre=d2.archivo.name).referencias, 1)
+
+    def _subido_antes(self, doc, nombre, datos):
+        ruta = os.path.join(MEDIA_TEST, nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as f:
+            f.write(datos)
+        DocumentoPostulacion.objects.filter(pk=doc.pk).update(
+            archivo=nombre, archivo_bytes=None, archivo_sha256="",
+        )
+        return ruta
+
+    def test_deduplicar_documentos_existentes(self):
+        compartido = self._guion(crear_postulacion_con_docs(self.user, self.conv))
+        viejos = [self._guion(crear_postulacion_con_docs(self.user, self.conv)) for _ in range(2)]
+        rutas = [
+            self._subido_antes(doc, f"postulaciones/documentos/viejo_{i}.pdf", b"%PDF- guion")
+            for i, doc in enumerate(viejos)
+        ]
+        ArchivoCompartido.objects.filter(nombre=compartido.archivo.name).update(referencias=1)
+
+        out = StringIO()
+        call_command("deduplicar_documentos", stdout=out)
+        self.assertIn("Documentos fuera de compartidos/: 2", out.getvalue())
+        self.assertIn(depuracion.mb(2 * len(b"%PDF- guion")), out.getvalue())
+        self.assertTrue(all(os.path.exists(r) for r in rutas), "la simulación no mueve nada")
+
+        call_command("deduplicar_documentos", "--ejecutar", stdout=StringIO())
+
+        for doc in viejos:
+            doc.refresh_from_db()
+            self.assertEqual(doc.archivo.name, compartido.archivo.name)
+        self.assertFalse(any(os.path.exists(r) for r in rutas))
+        self.assertEqual(ArchivoCompartido.objects.get(nombre=compartido.archivo.name).referencias, 3)
+
+    def test_subida_calcula_la_huella_una_vez(self):
+        with mock.patch("convocatorias.archivos.huella", wraps=archivos.huella) as calculo:
+            doc = self._guion(crear_postulacion_con_docs(self.user, self.conv))
+        # Un documento de postulación y uno de integrante
+        self.assertEqual(calculo.call_count, 2)
+        self.assertIn(doc.archivo_sha256, doc.archivo.name)
+
+
 @override_settings(MEDIA_ROOT=MEDIA_TEST)
 class DepurarDesdeAdminTest(TestCase):
     URL = None
@@ -225,6 +556,228 @@ class DepurarDesdeAdminTest(TestCase):
         self.assertEqual(self._docs_de(self.ganadora), 2)
 
 
+@override_settings(MEDIA_ROOT=MEDIA_TEST)
+class DescargarDocumentacionZipTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEST, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("root", "root@test.com", "x"))
+        presentante = User.objects.create(username="ana")
+        conv = crear_convocatoria()
+        self.p1 = crear_postulacion_con_docs(presentante, conv)
+        self.p2 = crear_postulacion_con_docs(presentante, conv)
+
+    def _descargar(self, *postulaciones):
+        r = self.client.post(reverse("admin:convocatorias_postulacion_changelist"), {
+            "action": "descargar_documentacion_zip",
+            "_selected_action": [str(p.pk) for p in postulaciones],
+            "index": "0",
+        })
+        self.assertTrue(r.streaming)
+        return zipfile.ZipFile(BytesIO(b"".join(r.streaming_content)))
+
+    def test_una_postulacion(self):
+        zf = self._descargar(self.p1)
+        nombres = zf.namelist()
+        self.assertEqual(nombres[0], "README.txt")
+        guion = next(n for n in nombres if n.startswith("documentacion/"))
+        self.assertEqual(zf.read(guion), b"%PDF- guion")
+        # Los PDF van sin recomprimir
+        self.assertEqual(zf.getinfo(guion).compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(zf.getinfo("README.txt").compress_type, zipfile.ZIP_DEFLATED)
+        self.assertTrue(any(n.startswith("equipo/director_") for n in nombres))
+
+    def test_varias_postulaciones_en_carpetas(self):
+        zf = self._descargar(self.p1, self.p2)
+        nombres = zf.namelist()
+        self.assertFalse(any(n.endswith(".zip") for n in nombres))
+        for p in (self.p1, self.p2):
+            carpeta = f"postulacion_{p.id}_postulacion_{p.id}/"
+            self.assertIn(carpeta + "README.txt", nombres)
+            self.assertTrue(any(n.startswith(carpeta + "documentacion/") for n in nombres))
+
+    def test_manifiesto_con_tamanio_y_sha256(self):
+        zf = self._descargar(self.p1, self.p2)
+        filas = zf.read("MANIFIESTO.csv").decode().splitlines()
+        self.assertEqual(filas[0], "ruta;bytes;sha256")
+        self.assertEqual(len(filas), 1 + 4)
+        for fila in filas[1:]:
+            ruta, tamanio, sha = fila.split(";")
+            datos = zf.read(ruta)
+            self.assertEqual(int(tamanio), len(datos))
+            self.assertEqual(sha, hashlib.sha256(datos).hexdigest())
+
+    def test_documentos_precargados_y_orden_estable(self):
+        qs = Postulacion.objects.filter(pk__in=[self.p1.pk, self.p2.pk])
+        # postulaciones + documentos + integrantes + documentos de integrantes
+        with self.assertNumQueries(4):
+            postulaciones = documentacion.postulaciones_con_documentos(qs)
+            rutas = [e.nombre for e in documentacion.entradas(postulaciones, carpetas=True)]
+        self.assertEqual(rutas, [e.nombre for e in documentacion.entradas(
+            documentacion.postulaciones_con_documentos(qs), carpetas=True)])
+        self.assertEqual(rutas[-1], "MANIFIESTO.csv")
+
+    def test_lectura_paralela_respeta_el_orden(self):
+        class Lento:
+            def __init__(self, demora):
+                self.name, self.demora, self.storage = str(demora), demora, self
+
+            def open(self, name, mode):
+                time.sleep(self.demora)
+                return BytesIO(name.encode())
+
+        docs = [documentacion.Documento(str(i), Lento(d), "") for i, d in enumerate([0.05, 0, 0.02, 0])]
+        abiertos = list(documentacion.abrir_en_orden(docs, lectores=4, ventana=2))
+        self.assertEqual([d.ruta for d, _ in abiertos], ["0", "1", "2", "3"])
+        self.assertEqual([a.read() for _, a in abiertos], [b"0.05", b"0", b"0.02", b"0"])
+
+    def test_documentos_van_al_zip_sin_leerse_enteros(self):
+        qs = Postulacion.objects.filter(pk=self.p1.pk)
+        postulaciones = documentacion.postulaciones_con_documentos(qs)
+        abiertos = []
+        for entrada in documentacion.entradas(postulaciones):
+            if isinstance(entrada.datos, documentacion.ArchivoConHuella):
+                abiertos.append(entrada.datos._archivo)
+        self.assertEqual(len(abiertos), 2)
+        # Sin consumir, entradas() cierra cada archivo al pasar al siguiente
+        self.assertTrue(all(a.closed for a in abiertos))
+
+    def test_descarga_cortada_cierra_los_abiertos_por_adelantado(self):
+        archivos = [BytesIO(b"x") for _ in range(4)]
+
+        class Storage:
+            def __init__(self, f):
+                self.name, self.storage, self.f = "x", self, f
+
+            def open(self, name, mode):
+                return self.f
+
+        docs = [documentacion.Documento(str(i), Storage(f), "") for i, f in enumerate(archivos)]
+        abiertos = documentacion.abrir_en_orden(docs, lectores=2, ventana=3)
+        _, primero = next(abiertos)
+        abiertos.close()
+        primero.close()
+        # Los tres de la ventana se cerraron; el cuarto no llegó a abrirse
+        self.assertEqual([f.closed for f in archivos], [True, True, True, False])
+
+    def test_archivo_faltante_va_al_listado(self):
+        doc = DocumentoPostulacion.objects.get(postulacion=self.p1)
+        os.remove(doc.archivo.path)
+        zf = self._descargar(self.p1)
+        self.assertIn(f"(id {doc.id})", zf.read("FALTANTES.txt").decode())
+        self.assertFalse(any(n.startswith("documentacion/") for n in zf.namelist()))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEST)
+class PaquetesDocumentacionTest(TestCase):
+    def setUp(self):
+        self.privado = tempfile.mkdtemp(prefix="test_paquetes_")
+        self.addCleanup(shutil.rmtree, self.privado, ignore_errors=True)
+        ajustes = override_settings(EXPORTACIONES_DIR=self.privado)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.conv = crear_convocatoria()
+        presentante = User.objects.create(username="ana")
+        self.p1 = crear_postulacion_con_docs(presentante, self.conv, estado="admitido")
+        self.p2 = crear_postulacion_con_docs(presentante, self.conv, estado="admitido")
+        DocumentoPostulacion.objects.update(estado="ENVIADO")
+        DocumentoIntegrante.objects.update(estado="ENVIADO")
+
+    def _accion(self, accion, *postulaciones):
+        return self.client.post(reverse("admin:convocatorias_postulacion_changelist"), {
+            "action": accion,
+            "_selected_action": [str(p.pk) for p in postulaciones],
+            "index": "0",
+        })
+
+    def _zip(self, r):
+        return zipfile.ZipFile(BytesIO(b"".join(r.streaming_content)))
+
+    def test_evaluacion_registra_y_el_comando_genera(self):
+        self.client.force_login(User.objects.create_superuser("root", "root@test.com", "x"))
+        self._accion("marcar_evaluacion_jurado", self.p1, self.p2)
+        # completo + jurado, por postulación y de la convocatoria completa
+        self.assertEqual(PaqueteDocumentacion.objects.filter(archivo="").count(), 6)
+
+        call_command("preparar_paquetes_documentacion", stdout=StringIO())
+        self.assertFalse(PaqueteDocumentacion.objects.filter(archivo="").exists())
+
+        r = self._accion("descargar_documentacion_zip", self.p1, self.p2)
+        self.assertIsInstance(r, FileResponse)
+        self.assertIn(f"postulacion_{self.p2.id}_postulacion_{self.p2.id}/README.txt", self._zip(r).namelist())
+
+        r = self._accion("descargar_documentacion_zip", self.p1)
+        self.assertIsInstance(r, FileResponse)
+        self.assertIn("README.txt", self._zip(r).namelist())
+
+    def test_documento_nuevo_invalida(self):
+        paquetes.preparar(Postulacion.objects.all())
+        paquetes.generar_pendientes()
+        paquete = PaqueteDocumentacion.objects.get(postulacion=self.p1, variante="completo")
+        ruta = paquete.archivo.path
+        self.assertTrue(os.path.exists(ruta))
+
+        DocumentoPostulacion.objects.create(
+            postulacion=self.p1, tipo="PRESUPUESTO",
+            archivo=SimpleUploadedFile("presupuesto.pdf", b"%PDF- p"),
+        )
+        paquete.refresh_from_db()
+        self.assertFalse(paquete.archivo)
+        self.assertFalse(os.path.exists(ruta))
+        self.assertFalse(PaqueteDocumentacion.objects.filter(postulacion=None).exclude(archivo="").exists())
+        # La otra postulación sigue vigente
+        self.assertTrue(PaqueteDocumentacion.objects.get(postulacion=self.p2, variante="completo").archivo)
+
+    def test_generacion_vieja_no_queda_vigente(self):
+        paquete = paquetes.registrar(self.conv.pk, self.p1.pk)
+        PaqueteDocumentacion.invalidar(self.p1.pk)  # llega un cambio mientras se genera
+        self.assertFalse(paquetes.generar(paquete))
+        paquete.refresh_from_db()
+        self.assertFalse(paquete.archivo)
+        self.assertEqual(os.listdir(self.privado + "/paquetes/" + str(self.conv.pk)), [])
+
+    def test_jurado_doble_ciego(self):
+        jurado = User.objects.create(username="jurado")
+        jurado.groups.add(Group.objects.create(name="jurado"))
+        AsignacionJuradoConvocatoria.objects.create(jurado=jurado, convocatoria=self.conv, doble_ciego=True)
+        DocumentoPostulacion.objects.create(
+            postulacion=self.p1, tipo="COMPROBANTE_CBU", estado="ENVIADO",
+            archivo=SimpleUploadedFile("cbu.pdf", b"%PDF- cbu"),
+        )
+        self.client.force_login(jurado)
+
+        r = self.client.get(reverse("usuarios:jurado_descargar_convocatoria", args=[self.conv.pk]))
+        zf = self._zip(r)
+        nombres = zf.namelist()
+        self.assertFalse(any("/equipo/" in n for n in nombres))
+        self.assertFalse(any("comprobante" in n for n in nombres))
+        readme = zf.read(f"postulacion_{self.p1.id}_postulacion_{self.p1.id}/README.txt").decode()
+        self.assertNotIn("ana", readme)
+        self.assertTrue(PaqueteDocumentacion.objects.filter(
+            convocatoria=self.conv, postulacion=None, variante="jurado_ciego", archivo="").exists())
+
+        paquetes.generar_pendientes()
+        r = self.client.get(reverse("usuarios:jurado_descargar_convocatoria", args=[self.conv.pk]))
+        self.assertIsInstance(r, FileResponse)
+
+        r = self.client.get(reverse("usuarios:jurado_descargar_documentacion", args=[self.p1.pk]))
+        self.assertEqual(sorted(n.split("/")[0] for n in self._zip(r).namelist()),
+                         ["MANIFIESTO.csv", "README.txt", "documentacion"])
+
+    def test_jurado_sin_asignacion(self):
+        jurado = User.objects.create(username="jurado")
+        jurado.groups.add(Group.objects.create(name="jurado"))
+        self.client.force_login(jurado)
+        r = self.client.get(reverse("usuarios:jurado_descargar_convocatoria", args=[self.conv.pk]))
+        self.assertEqual(r.status_code, 404)
+        r = self.client.get(reverse("usuarios:jurado_descargar_documentacion", args=[self.p1.pk]))
+        self.assertEqual(r.status_code, 404)
+
+
 @override_settings(MEDIA_ROOT=MEDIA_TEST)
 class BorradoIndividualEnAdminTest(TestCase):
     """Borrado de archivos uno por uno desde el detalle de la postulación."""
@@ -393,3 +946,198 @@ class PlanillaRendicionCleanupTest(TestCase):
         r.planilla_xlsx = None
         r.save()
         self.assertFalse(os.path.exists(archivo))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEST)
+class PlanillaOficialTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="ana", first_name="Ana", last_name="Paz")
+        self.conv = crear_convocatoria(cerrada=False)
+        self.post = Postulacion.objects.create(
+            user=self.user, convocatoria=self.conv, nombre_proyecto="Mi corto"
+        )
+        self.client.force_login(self.user)
+        self.url = reverse("convocatorias:descargar_planilla_oficial", args=[self.post.pk])
+
+    def test_sin_planilla_configurada_vuelve_al_wizard(self):
+        r = self.client.get(self.url)
+        self.assertRedirects(
+            r, reverse("convocatorias:wizard_paso", args=[self.post.pk, "documentacion"]),
+            fetch_redirect_response=False,
+        )
+
+    def test_precompleta_la_plantilla_de_la_convocatoria(self):
+        from openpyxl import Workbook, load_workbook
+
+        wb = Workbook()
+        wb.active.title = "01_Inicio"
+        buffer = BytesIO()
+        wb.save(buffer)
+        config, _ = ConfiguracionPostulacion.objects.get_or_create(convocatoria=self.conv)
+        config.planilla_archivo = SimpleUploadedFile("planilla_corto.xlsx", buffer.getvalue())
+        config.save()
+
+        r = self.client.get(self.url)
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("planilla_corto_Mi_corto.xlsx", r["Content-Disposition"])
+        ws = load_workbook(BytesIO(r.content))["01_Inicio"]
+        self.assertEqual(ws["B4"].value, "Ana Paz")
+        self.assertEqual(ws["B5"].value, "Mi corto")
+
+
+class TransicionesMasivasTest(TestCase):
+    PANEL = "http://testserver/usuarios/panel/"
+
+    def setUp(self):
+        self.conv = crear_convocatoria()
+        self.user = User.objects.create(username="ana", email="ana@test.com")
+
+    def _postulaciones(self, *estados):
+        return [Postulacion.objects.create(user=self.user, convocatoria=self.conv, estado=e) for e in estados]
+
+    def _consultas(self, funcion, *args):
+        with CaptureQueriesContext(connection) as consultas:
+            funcion(*args)
+        return len(consultas)
+
+    def test_aplica_solo_transiciones_validas(self):
+        enviada, observada, borrador, admitida = self._postulaciones(
+            "enviado", "observado", "borrador", "admitido",
+        )
+        qs = Postulacion.objects.filter(convocatoria=self.conv)
+        resultado = transiciones.aplicar(qs, "admitido")
+
+        self.assertCountEqual(resultado.cambiadas, [enviada.pk, observada.pk])
+        self.assertEqual(resultado.sin_cambios, [admitida.pk])
+        self.assertEqual(resultado.invalidas, [(borrador.pk, "borrador")])
+        estados = dict(qs.values_list("id", "estado"))
+        self.assertEqual(estados[enviada.pk], "admitido")
+        self.assertEqual(estados[borrador.pk], "borrador")
+
+        historial = CambioEstadoPostulacion.objects.filter(origen="masivo")
+        self.assertCountEqual(
+            historial.values_list("postulacion_id", "estado_anterior", "estado"),
+            [(enviada.pk, "enviado", "admitido"), (observada.pk, "observado", "admitido")],
+        )
+
+    def test_consultas_no_crecen_con_la_cantidad(self):
+        VersionDatos.incrementar("convocatorias.Postulacion")
+        pocas = self._postulaciones(*["enviado"] * 2)
+        muchas = self._postulaciones(*["enviado"] * 20)
+        self.assertEqual(
+            self._consultas(transiciones.aplicar, Postulacion.objects.filter(pk__in=[p.pk for p in pocas]), "admitido"),
+            self._consultas(transiciones.aplicar, Postulacion.objects.filter(pk__in=[p.pk for p in muchas]), "admitido"),
+        )
+        self.assertEqual(
+            self._consultas(transiciones.crear_rendiciones, [p.pk for p in pocas], "A", "{postulacion}"),
+            self._consultas(transiciones.crear_rendiciones, [p.pk for p in muchas], "A", "{postulacion}"),
+        )
+        self.assertEqual(Rendicion.objects.count(), 22)
+
+    def test_notifica_solo_las_que_cambiaron(self):
+        self._postulaciones("admitido", "evaluacion_jurado")
+        resultado = transiciones.aplicar(
+            Postulacion.objects.filter(convocatoria=self.conv), "no_seleccionado", panel_url=self.PANEL,
+        )
+        self.assertEqual(resultado.notificadas, 2)
+        self.assertEqual(CorreoSaliente.objects.filter(origen="postulacion.estado").count(), 2)
+
+        again = transiciones.aplicar(
+            Postulacion.objects.filter(convocatoria=self.conv), "no_seleccionado", panel_url=self.PANEL,
+        )
+        self.assertEqual(again.notificadas, 0)
+        self.assertEqual(CorreoSaliente.objects.count(), 2)
+
+    def test_crear_rendiciones_en_bloque(self):
+        existente, nueva = self._postulaciones("seleccionado", "seleccionado")
+        Rendicion.objects.create(postulacion=existente, user=self.user)
+        creadas, ya_existian = transiciones.crear_rendiciones(
+            [existente.pk, nueva.pk], "RENDICION_CREADA", "Postulación {postulacion}",
+        )
+        self.assertEqual((creadas, ya_existian), (1, 1))
+        rendicion = Rendicion.objects.get(postulacion=nueva)
+        self.assertEqual(rendicion.historial[0]["detail"], f"Postulación {nueva.pk}")
+        # La que ya existía también queda con el evento en su historial
+        previa = Rendicion.objects.get(postulacion=existente)
+        self.assertEqual(previa.historial[-1]["action"], "RENDICION_CREADA")
+
+    def test_acciones_admin_registran_evento_en_rendiciones_existentes(self):
+        self.client.force_login(User.objects.create_superuser("root", "root@test.com", "x"))
+        p, = self._postulaciones("seleccionado")
+        Rendicion.objects.create(postulacion=p, user=self.user)
+        for accion in ("crear_rendicion_para_seleccionados", "marcar_seleccionado_y_crear_rendicion"):
+            self.client.post(reverse("admin:convocatorias_postulacion_changelist"), {
+                "action": accion, "_selected_action": [str(p.pk)], "index": "0",
+            })
+        historial = Rendicion.objects.get(postulacion=p).historial
+        self.assertEqual(
+            [(e["action"], e["detail"]) for e in historial],
+            [
+                ("RENDICION_EXISTENTE", f"Ya existía (admin) para Postulación {p.pk}"),
+                ("SELECCIONADO_Y_RENDICION", f"Postulación {p.pk} marcada seleccionado y rendición habilitada"),
+            ],
+        )
+
+    def test_accion_admin_marcar_admitido(self):
+        admin_user = User.objects.create_superuser("root", "root@test.com", "x")
+        self.client.force_login(admin_user)
+        enviada, = self._postulaciones("enviado")
+        r = self.client.post(reverse("admin:convocatorias_postulacion_changelist"), {
+            "action": "marcar_admitido",
+            "_selected_action": [str(enviada.pk)],
+            "index": "0",
+        })
+        self.assertEqual(r.status_code, 302)
+        enviada.refresh_from_db()
+        self.assertEqual(enviada.estado, "admitido")
+        self.assertEqual(CorreoSaliente.objects.count(), 1)
+
+    def _accion(self, accion, *postulaciones):
+        if not hasattr(self, "_admin"):
+            self._admin = User.objects.create_superuser("root", "root@test.com", "x")
+        self.client.force_login(self._admin)
+        return self.client.post(reverse("admin:convocatorias_postulacion_changelist"), {
+            "action": accion,
+            "_selected_action": [str(p.pk) for p in postulaciones],
+            "index": "0",
+        })
+
+    def test_marcar_ganador_vuelve_a_notificar_a_las_ya_seleccionadas(self):
+        ya, admitida = self._postulaciones("seleccionado", "admitido")
+        self._accion("marcar_ganador_y_notificar", ya, admitida)
+        admitida.refresh_from_db()
+        self.assertEqual(admitida.estado, "seleccionado")
+        self.assertEqual(CorreoSaliente.objects.filter(origen="postulacion.estado").count(), 2)
+        # El historial solo registra la que cambió
+        self.assertEqual(CambioEstadoPostulacion.objects.filter(origen="masivo").count(), 1)
+
+    def test_seleccionar_solo_desde_estados_permitidos(self):
+        borrador, enviada = self._postulaciones("borrador", "enviado")
+        self._accion("marcar_seleccionado_y_crear_rendicion", borrador, enviada)
+        self.assertEqual(
+            set(Postulacion.objects.values_list("estado", flat=True)), {"borrador", "enviado"},
+        )
+        self.assertFalse(Rendicion.objects.exists())
+
+    @override_settings(MEDIA_ROOT=MEDIA_TEST)
+    def test_paquetes_solo_de_las_que_pasan_a_jurado(self):
+        admitida, ya, borrador = self._postulaciones("admitido", "evaluacion_jurado", "borrador")
+        self._accion("marcar_evaluacion_jurado", admitida, ya, borrador)
+        con_paquete = set(
+            PaqueteDocumentacion.objects.exclude(postulacion=None).values_list("postulacion_id", flat=True)
+        )
+        self.assertEqual(con_paquete, {admitida.pk})
+
+    def test_rendiciones_en_bloque_invalidan_snapshots(self):
+        from estadisticas.models import SnapshotDashboard
+
+        seleccionada, = self._postulaciones("seleccionado")
+        otra = crear_convocatoria("Otra")
+        snapshots = [
+            SnapshotDashboard.objects.create(linea="fomento", convocatoria=c, pendiente=False)
+            for c in (self.conv.pk, otra.pk)
+        ]
+        transiciones.crear_rendiciones([seleccionada.pk], "RENDICION_CREADA", "{postulacion}")
+        for snapshot in snapshots:
+            snapshot.refresh_from_db()
+        self.assertEqual([s.pendiente for s in snapshots], [True, False])
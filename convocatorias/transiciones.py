@@ -0,0 +1,204 @@
+"""Cambios de estado masivos de postulaciones.
+
+Las acciones del admin (admitir, no admitir, pasar a jurado, seleccionar…)
+recorrían el queryset guardando fila por fila, con un get_or_create de
+Rendición por postulación y un mail SMTP en el medio. Cerrar una
+convocatoria con cientos de postulaciones eran miles de consultas.
+
+Acá el cambio se hace en bloque:
+- `aplicar` valida las transiciones contra TRANSICIONES con una sola
+  lectura y cambia el estado con un único UPDATE ... WHERE id IN. El filtro
+  por estado de origen en el UPDATE evita pisar un cambio concurrente.
+  Antes las acciones pasaban cualquier estado al destino (un borrador
+  podía quedar seleccionado); ahora las que no pueden llegar se informan
+  en el admin y no cambian.
+- `crear_rendiciones` crea con bulk_create las rendiciones que faltan y
+  anota el evento en el historial de las que ya existían (bulk_update).
+- Los avisos por mail se encolan todos juntos (correos/cola.py) y los
+  manda el worker de correos.
+- Cada cambio queda en el historial (CambioEstadoPostulacion), también con
+  un solo bulk_create.
+
+Un .update() o un bulk_create no disparan señales: lo que hacían las de
+post_save de Postulacion (paquetes de documentación, snapshots de
+estadísticas, versión de los datos exportables) y de Rendicion (snapshots)
+se hace acá una vez para todo el lote, solo para las filas que cambiaron.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from correos import cola
+from estadisticas.models import SnapshotDashboard
+from exportaciones.models import VersionDatos
+
+from .models import CambioEstadoPostulacion, PaqueteDocumentacion, Postulacion, Rendicion
+
+# Estado destino → estados desde los que se puede llegar con una acción
+# masiva. Un borrador nunca cambia desde el admin: no fue presentado.
+TRANSICIONES = {
+    "admitido":          {"enviado", "revision_admin", "observado", "no_admitido"},
+    "no_admitido":       {"enviado", "revision_admin", "observado", "admitido"},
+    "evaluacion_jurado": {"enviado", "revision_admin", "admitido"},
+    "seleccionado":      {"admitido", "evaluacion_jurado", "no_seleccionado"},
+    "no_seleccionado":   {"admitido", "evaluacion_jurado", "seleccionado"},
+}
+
+EMAIL_POR_ESTADO = {
+    "enviado":           ("convocatorias/email_postulacion_enviada.html", "Tu postulación fue recibida"),
+    "admitido":          ("convocatorias/email_admitido.html",            "Tu postulación fue admitida"),
+    "no_admitido":       ("convocatorias/email_no_admitido.html",         "Tu postulación no fue admitida"),
+    "evaluacion_jurado": ("convocatorias/email_evaluacion_jurado.html",   "Tu postulación está en evaluación"),
+    "seleccionado":      ("convocatorias/email_seleccionado.html",        "Tu proyecto fue seleccionado"),
+    "no_seleccionado":   ("convocatorias/email_no_seleccionado.html",     "Resultado de tu postulación"),
+}
+
+# cambiadas: ids que pasaron al destino; sin_cambios: ids que ya estaban;
+# invalidas: [(id, estado actual)] que no pueden pasar al destino
+Resultado = namedtuple("Resultado", ["cambiadas", "sin_cambios", "invalidas", "notificadas"])
+
+
+# ──────────────────────────────────────────────────────────────
+# Avisos por mail
+# ──────────────────────────────────────────────────────────────
+
+def mensaje_estado(postulacion, panel_url):
+    """Mail que avisa el estado actual de `postulacion`, o None si ese
+    estado no se notifica o no hay destinatario."""
+    config = EMAIL_POR_ESTADO.get(postulacion.estado)
+    user = postulacion.user
+    if not config or not user or not user.email:
+        return None
+    template, asunto = config
+    convocatoria_titulo = postulacion.convocatoria.titulo if postulacion.convocatoria else ""
+    contexto = {
+        "user": user,
+        "postulacion": postulacion,
+        "convocatoria_titulo": convocatoria_titulo,
+        "panel_url": panel_url,
+        "anio": timezone.now().year,
+    }
+    texto = f"{asunto}\n\nConvocatoria: {convocatoria_titulo or '—'}\n\nIngresá al panel: {panel_url}"
+    email = EmailMultiAlternatives(
+        subject=asunto,
+        body=texto,
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
+        to=[user.email],
+    )
+    email.attach_alternative(render_to_string(template, contexto), "text/html")
+    return email
+
+
+def notificar(postulacion_ids, panel_url):
+    """Encola en un solo INSERT los avisos de estado de `postulacion_ids`.
+    Devuelve cuántos se encolaron."""
+    postulaciones = Postulacion.objects.filter(pk__in=postulacion_ids).select_related("user", "convocatoria")
+    mensajes = [m for m in (mensaje_estado(p, panel_url) for p in postulaciones) if m is not None]
+    return cola.encolar_varios(mensajes, origen="postulacion.estado")
+
+
+# ──────────────────────────────────────────────────────────────
+# Transiciones
+# ──────────────────────────────────────────────────────────────
+
+def _despues_de_cambiar(ids, convocatoria_ids):
+    """Lo que harían las señales de post_save de Postulacion, en bloque."""
+    PaqueteDocumentacion.invalidar_varias(ids)
+    SnapshotDashboard.marcar_pendientes(convocatoria_ids)
+    VersionDatos.incrementar_al_confirmar(Postulacion._meta.label)
+
+
+def _registrar_historial(cambiadas, anteriores, destino, usuario):
+    ahora = timezone.now()
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+    CambioEstadoPostulacion.objects.bulk_create([
+        CambioEstadoPostulacion(
+            postulacion_id=pk, convocatoria_id=anteriores[pk][1],
+            estado_anterior=anteriores[pk][0], estado=destino,
+            fecha=ahora, usuario=usuario, origen="masivo",
+        )
+        for pk in cambiadas
+    ])
+
+
+def aplicar(postulaciones, destino, panel_url=None, usuario=None, renotificar=False):
+    """Pasa `postulaciones` (queryset) a `destino` en un solo UPDATE. Solo
+    cambian las que pueden llegar a `destino` según TRANSICIONES. Con
+    `panel_url` encola el aviso por mail de las que cambiaron; con
+    `renotificar`, también el de las que ya estaban en `destino`."""
+    origenes = TRANSICIONES[destino]
+    validas, sin_cambios, invalidas = [], [], []
+    anteriores = {}
+    for pk, estado, convocatoria_id in postulaciones.values_list("id", "estado", "convocatoria_id"):
+        if estado == destino:
+            sin_cambios.append(pk)
+        elif estado in origenes:
+            validas.append(pk)
+            anteriores[pk] = (estado, convocatoria_id)
+        else:
+            invalidas.append((pk, estado))
+
+    cambiadas = []
+    if validas:
+        with transaction.atomic():
+            # El filtro por origen deja afuera una fila que otro admin
+            # cambió entre la lectura y el UPDATE
+            cantidad = Postulacion.objects.filter(pk__in=validas, estado__in=origenes).update(estado=destino)
+            cambiadas = validas
+            if cantidad != len(validas):
+                cambiadas = list(
+                    Postulacion.objects.filter(pk__in=validas, estado=destino).values_list("id", flat=True)
+                )
+            _registrar_historial(cambiadas, anteriores, destino, usuario)
+            _despues_de_cambiar(cambiadas, list({anteriores[pk][1] for pk in cambiadas}))
+        invalidas += [(pk, "modificada") for pk in set(validas) - set(cambiadas)]
+
+    avisar = cambiadas + sin_cambios if renotificar else cambiadas
+    notificadas = notificar(avisar, panel_url) if panel_url and avisar else 0
+    return Resultado(cambiadas, sin_cambios, invalidas, notificadas)
+
+
+def crear_rendiciones(postulacion_ids, accion, detalle, accion_existente=None, detalle_existente=None):
+    """Crea con un bulk_create las rendiciones que faltan para
+    `postulacion_ids` (con el evento `accion` en su historial) y alinea el
+    usuario de las que ya existían. Las que ya existían reciben en su
+    historial el evento `accion_existente` (por defecto, el mismo `accion`),
+    con un bulk_update. Devuelve (creadas, ya_existian)."""
+    postulacion_ids = list(postulacion_ids)
+    existentes = Rendicion.objects.filter(postulacion_id__in=postulacion_ids)
+    previas = list(existentes.only("id", "postulacion_id", "historial"))
+    for rendicion in previas:
+        rendicion.add_event(
+            "admin",
+            accion_existente or accion,
+            (detalle_existente or detalle).format(postulacion=rendicion.postulacion_id),
+        )
+    Rendicion.objects.bulk_update(previas, ["historial"])
+    ya_existian = {r.postulacion_id for r in previas}
+
+    nuevas, convocatoria_ids = [], set()
+    for pk, user_id, convocatoria_id in (
+        Postulacion.objects.filter(pk__in=postulacion_ids)
+        .exclude(pk__in=ya_existian)
+        .values_list("id", "user_id", "convocatoria_id")
+    ):
+        rendicion = Rendicion(postulacion_id=pk, user_id=user_id)
+        rendicion.add_event("admin", accion, detalle.format(postulacion=pk))
+        nuevas.append(rendicion)
+        convocatoria_ids.add(convocatoria_id)
+    Rendicion.objects.bulk_create(nuevas)
+    if convocatoria_ids:
+        # Lo que haría invalidar_snapshots_rendicion en cada post_save
+        SnapshotDashboard.marcar_pendientes(list(convocatoria_ids))
+
+    # Si existía pero el usuario no coincide (raro), se alinea
+    existentes.exclude(user_id=F("postulacion__user_id")).update(
+        user_id=Subquery(Postulacion.objects.filter(pk=OuterRef("postulacion_id")).values("user_id")[:1])
+    )
+    return len(nuevas), len(ya_existian)
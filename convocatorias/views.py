@@ -14,6 +14,7 @@ from django.db.models import Q
 from registro_audiovisual.models import PersonaHumana, PersonaJuridica
 
 from convocatorias.models import (
+    CambioEstadoPostulacion,
     Convocatoria,
     Postulacion,
     DocumentoPostulacion,
@@ -531,8 +532,11 @@ def confirmar_documento_subsanado(request, postulacion_id):
     ahora = timezone.now()
     qs_pendientes.update(estado="ENVIADO", fecha_envio=ahora)
 
+    anterior = postulacion.estado
     postulacion.estado = "revision_admin"
     postulacion.save(update_fields=["estado"])
+    if anterior != postulacion.estado:
+        CambioEstadoPostulacion.registrar(postulacion, anterior, "subsanacion", request.user)
 
     messages.success(request, "La documentación subsanada fue enviada correctamente.")
     return redirect("usuarios:panel_usuario")
@@ -808,8 +812,9 @@ def _paso_productor(request, postulacion, config, ctx):
     es_juridica = isinstance(persona, PersonaJuridica)
     requiere_productor_responsable = es_juridica and bool(config and config.requiere_productor_responsable)
 
-    def doc(tipo):
-        return integrante.documentos.filter(tipo=tipo).first() if integrante else None
+    # Todos los documentos del productor en una consulta (un tipo por integrante)
+    documentos = {d.tipo: d for d in integrante.documentos.all()} if integrante else {}
+    doc = documentos.get
 
     ctx.update({
         "persona":      persona,
@@ -1056,10 +1061,12 @@ def _paso_confirmacion(request, postulacion, config, ctx):
         if form.is_valid():
             with transaction.atomic():
                 ahora = timezone.now()
+                anterior = postulacion.estado
                 postulacion.declaracion_jurada = True
                 postulacion.estado = "enviado"
                 postulacion.fecha_envio = ahora
                 postulacion.save()
+                CambioEstadoPostulacion.registrar(postulacion, anterior, "wizard", request.user)
 
                 postulacion.documentos.filter(estado="PENDIENTE").update(
                     estado="ENVIADO",
@@ -0,0 +1,30 @@
+from django.contrib import admin, messages
+
+from . import cola
+from .models import CorreoSaliente
+
+
+@admin.register(CorreoSaliente)
+class CorreoSalienteAdmin(admin.ModelAdmin):
+    list_display  = ("id", "asunto", "destinatarios_display", "origen", "estado", "intentos", "creado", "enviado")
+    list_filter   = ("estado", "origen")
+    search_fields = ("asunto", "destinatarios")
+    exclude = ("adjuntos",)
+    readonly_fields = [f.name for f in CorreoSaliente._meta.fields if f.name != "adjuntos"] + ["adjuntos_display"]
+    actions = ["reintentar_action"]
+
+    def destinatarios_display(self, obj):
+        return ", ".join(obj.destinatarios)
+    destinatarios_display.short_description = "Para"
+
+    def adjuntos_display(self, obj):
+        return ", ".join(a["nombre"] for a in obj.adjuntos) or "—"
+    adjuntos_display.short_description = "Adjuntos"
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Reintentar envío (correos en error)")
+    def reintentar_action(self, request, queryset):
+        cantidad = cola.reintentar(queryset)
+        self.message_user(request, f"{cantidad} correo(s) vuelven a la cola.", level=messages.SUCCESS)
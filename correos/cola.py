@@ -0,0 +1,220 @@
+"""
+Cola de correos salientes.
+
+Antes cada aviso se mandaba dentro del request (o del comando) que lo
+generaba, abriendo una conexión SMTP por mensaje: una acción masiva del
+admin quedaba esperando el handshake con Gmail por cada destinatario. Ahora
+quien quiere mandar un mail arma el EmailMultiAlternatives de siempre y lo
+pasa a `encolar`; el comando enviar_correos lo manda después.
+
+Envío:
+- Se toman hasta CORREOS_LOTE mensajes vencidos (`proximo_intento`) y se
+  mandan con una sola conexión (`get_connection()`), mensaje por mensaje
+  para registrar el resultado de cada uno.
+- Si un mensaje falla se reintenta con espera creciente
+  (CORREOS_ESPERA_BASE_SEGUNDOS · 2^intentos) hasta CORREOS_MAX_INTENTOS;
+  después queda en ERROR y se puede reintentar desde el admin.
+- Un lote tomado por un worker que se cortó vuelve a la cola (ABANDONO).
+"""
+import base64
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .models import CorreoSaliente
+
+logger = logging.getLogger(__name__)
+
+# un correo ENVIANDO sin resultado después de esto se considera abandonado
+ABANDONO = timedelta(minutes=15)
+# tope de la espera entre reintentos
+ESPERA_MAXIMA = timedelta(hours=6)
+
+
+def _config(nombre, default):
+    return getattr(settings, nombre, default)
+
+
+# ──────────────────────────────────────────────────────────────
+# Encolado (quien genera el aviso)
+# ──────────────────────────────────────────────────────────────
+
+def _correo_de(mensaje, origen):
+    html = next(
+        (contenido for contenido, tipo in getattr(mensaje, "alternatives", []) if tipo == "text/html"),
+        "",
+    )
+    adjuntos = []
+    for adjunto in mensaje.attachments:
+        if not isinstance(adjunto, tuple):
+            raise ValueError("Solo se pueden encolar adjuntos (nombre, contenido, tipo).")
+        nombre, contenido, tipo = adjunto
+        if isinstance(contenido, str):
+            contenido = contenido.encode()
+        adjuntos.append({
+            "nombre": nombre,
+            "tipo": tipo or "application/octet-stream",
+            "contenido": base64.b64encode(contenido).decode("ascii"),
+        })
+
+    return CorreoSaliente(
+        origen=origen,
+        asunto=mensaje.subject,
+        cuerpo=mensaje.body,
+        html=html,
+        remitente=mensaje.from_email or "",
+        destinatarios=list(mensaje.to),
+        cc=list(mensaje.cc),
+        bcc=list(mensaje.bcc),
+        responder_a=list(mensaje.reply_to),
+        adjuntos=adjuntos,
+    )
+
+
+def encolar(mensaje, origen=""):
+    """Guarda `mensaje` (EmailMessage / EmailMultiAlternatives) para que lo
+    mande el worker. Devuelve el CorreoSaliente creado."""
+    correo = _correo_de(mensaje, origen)
+    correo.save()
+    return correo
+
+
+def encolar_varios(mensajes, origen=""):
+    """Como encolar(), para muchos mensajes en un solo INSERT (acciones
+    masivas). Devuelve cuántos se encolaron."""
+    return len(CorreoSaliente.objects.bulk_create([_correo_de(m, origen) for m in mensajes]))
+
+
+def mensaje_de(correo, connection=None):
+    """Reconstruye el EmailMultiAlternatives de `correo`."""
+    mensaje = EmailMultiAlternatives(
+        subject=correo.asunto,
+        body=correo.cuerpo,
+        from_email=correo.remitente or None,
+        to=correo.destinatarios,
+        cc=correo.cc,
+        bcc=correo.bcc,
+        reply_to=correo.responder_a,
+        connection=connection,
+    )
+    if correo.html:
+        mensaje.attach_alternative(correo.html, "text/html")
+    for adjunto in correo.adjuntos:
+        mensaje.attach(adjunto["nombre"], base64.b64decode(adjunto["contenido"]), adjunto["tipo"])
+    return mensaje
+
+
+# ──────────────────────────────────────────────────────────────
+# Envío (worker)
+# ──────────────────────────────────────────────────────────────
+
+def tomar_lote(cantidad=None):
+    """Marca como ENVIANDO hasta `cantidad` correos vencidos y los devuelve.
+    El update condicional evita que dos workers tomen el mismo."""
+    cantidad = cantidad or _config("CORREOS_LOTE", 50)
+    ahora = timezone.now()
+    ids = list(
+        CorreoSaliente.objects
+        .filter(estado="PENDIENTE", proximo_intento__lte=ahora)
+        .order_by("proximo_intento", "pk")
+        .values_list("pk", flat=True)[:cantidad]
+    )
+    tomados = [
+        pk for pk in ids
+        if CorreoSaliente.objects.filter(pk=pk, estado="PENDIENTE").update(estado="ENVIANDO", tomado=ahora)
+    ]
+    return list(CorreoSaliente.objects.filter(pk__in=tomados).order_by("pk"))
+
+
+def espera(intentos):
+    base = timedelta(seconds=_config("CORREOS_ESPERA_BASE_SEGUNDOS", 60))
+    return min(base * 2 ** (intentos - 1), ESPERA_MAXIMA)
+
+
+def _registrar_falla(correo, exc):
+    correo.intentos += 1
+    correo.ultimo_error = f"{type(exc).__name__}: {exc}"
+    if correo.intentos >= _config("CORREOS_MAX_INTENTOS", 6):
+        correo.estado = "ERROR"
+        logger.error("Correo %s descartado tras %s intentos: %s", correo.pk, correo.intentos, correo.ultimo_error)
+    else:
+        correo.estado = "PENDIENTE"
+        correo.proximo_intento = timezone.now() + espera(correo.intentos)
+    correo.save(update_fields=["estado", "intentos", "ultimo_error", "proximo_intento"])
+
+
+def enviar(correos):
+    """Manda `correos` (ya tomados) con una sola conexión SMTP. Devuelve
+    (enviados, fallidos)."""
+    enviados = fallidos = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # Sin servidor no sale ninguno: todo el lote vuelve a la cola
+        logger.warning("No se pudo abrir la conexión SMTP: %s", exc)
+        for correo in correos:
+            _registrar_falla(correo, exc)
+        return 0, len(correos)
+
+    try:
+        for correo in correos:
+            try:
+                connection.send_messages([mensaje_de(correo, connection)])
+            except Exception as exc:
+                _registrar_falla(correo, exc)
+                fallidos += 1
+                # La conexión pudo quedar rota: se reabre para el resto del lote
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    pass
+                continue
+            correo.estado = "ENVIADO"
+            correo.intentos += 1
+            correo.enviado = timezone.now()
+            correo.ultimo_error = ""
+            correo.save(update_fields=["estado", "intentos", "enviado", "ultimo_error"])
+            enviados += 1
+    finally:
+        connection.close()
+    return enviados, fallidos
+
+
+def procesar_pendientes():
+    """Manda todos los correos vencidos, de a un lote por conexión.
+    Devuelve (enviados, fallidos)."""
+    enviados = fallidos = 0
+    while correos := tomar_lote():
+        ok, mal = enviar(correos)
+        enviados += ok
+        fallidos += mal
+    return enviados, fallidos
+
+
+# ──────────────────────────────────────────────────────────────
+# Mantenimiento
+# ──────────────────────────────────────────────────────────────
+
+def reencolar_abandonados():
+    """Vuelve a PENDIENTE los correos ENVIANDO que quedaron colgados."""
+    limite = timezone.now() - ABANDONO
+    return CorreoSaliente.objects.filter(estado="ENVIANDO", tomado__lt=limite).update(estado="PENDIENTE")
+
+
+def reintentar(queryset):
+    """Vuelve a la cola los correos en ERROR de `queryset`, desde cero."""
+    return queryset.filter(estado="ERROR").update(
+        estado="PENDIENTE", intentos=0, proximo_intento=timezone.now(),
+    )
+
+
+def purgar_enviados():
+    """Borra los correos enviados hace más de CORREOS_RETENCION_DIAS.
+    Devuelve cuántos."""
+    limite = timezone.now() - timedelta(days=_config("CORREOS_RETENCION_DIAS", 30))
+    return CorreoSaliente.objects.filter(estado="ENVIADO", enviado__lt=limite).delete()[0]
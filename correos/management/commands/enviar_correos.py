@@ -0,0 +1,54 @@
+"""
+Manda los correos encolados (CorreoSaliente).
+
+Por defecto queda corriendo: manda lo pendiente, espera --intervalo
+segundos y vuelve a empezar. Con --una-vez manda lo pendiente y termina,
+para usarlo desde cron. En cada vuelta también reencola los lotes que
+quedaron colgados y borra los enviados viejos (CORREOS_RETENCION_DIAS).
+
+La lógica vive en correos/cola.py.
+
+Uso manual:
+    python manage.py enviar_correos
+    python manage.py enviar_correos --una-vez
+
+Configurar en cron (si no corre como servicio; ej. cada minuto):
+    * * * * * /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py enviar_correos --una-vez
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from correos import cola
+
+
+class Command(BaseCommand):
+    help = "Manda los correos encolados en lotes, con una conexión SMTP por lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Manda lo pendiente y termina.",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=5.0,
+            help="Segundos de espera entre vueltas (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            cola.reencolar_abandonados()
+            cola.purgar_enviados()
+            enviados, fallidos = cola.procesar_pendientes()
+            if enviados:
+                self.stdout.write(self.style.SUCCESS(f"Correos enviados: {enviados}."))
+            if fallidos:
+                self.stdout.write(self.style.WARNING(f"Correos con falla (se reintentan): {fallidos}."))
+            if options["una_vez"]:
+                if not enviados and not fallidos:
+                    self.stdout.write("No hay correos pendientes.")
+                return
+            time.sleep(options["intervalo"])
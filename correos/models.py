@@ -0,0 +1,49 @@
+from django.db import models
+from django.utils import timezone
+
+
+class CorreoSaliente(models.Model):
+    """
+    Mail pendiente o ya enviado. Todos los avisos del sitio se encolan acá
+    (correos/cola.py) y el comando enviar_correos los manda en lotes,
+    reusando una sola conexión SMTP por lote y reintentando con espera
+    creciente cuando el envío falla.
+    """
+    ESTADOS = [
+        ("PENDIENTE", "Pendiente"),
+        ("ENVIANDO", "Enviando"),
+        ("ENVIADO", "Enviado"),
+        ("ERROR", "Error"),
+    ]
+
+    # Quién lo generó (p. ej. "postulacion.estado"), para filtrar en el admin
+    origen = models.CharField(max_length=50, blank=True, db_index=True)
+
+    asunto        = models.CharField(max_length=255)
+    cuerpo        = models.TextField(blank=True)
+    html          = models.TextField(blank=True)
+    remitente     = models.CharField(max_length=255, blank=True)
+    destinatarios = models.JSONField(default=list)
+    cc            = models.JSONField(default=list, blank=True)
+    bcc           = models.JSONField(default=list, blank=True)
+    responder_a   = models.JSONField(default=list, blank=True)
+    # [{"nombre", "tipo", "contenido" (base64)}]
+    adjuntos      = models.JSONField(default=list, blank=True)
+
+    estado          = models.CharField(max_length=20, choices=ESTADOS, default="PENDIENTE")
+    intentos        = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error    = models.TextField(blank=True)
+
+    creado  = models.DateTimeField(auto_now_add=True)
+    tomado  = models.DateTimeField(null=True, blank=True)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Correo saliente"
+        verbose_name_plural = "Correos salientes"
+        ordering = ["-creado"]
+        indexes = [models.Index(fields=["estado", "proximo_intento"])]
+
+    def __str__(self):
+        return f"{self.asunto} → {', '.join(self.destinatarios)}"
@@ -0,0 +1,77 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from correos import cola
+from correos.models import CorreoSaliente
+
+
+def mensaje(destinatario="ana@test.com", adjunto=False):
+    email = EmailMultiAlternatives(subject="Aviso", body="texto", to=[destinatario])
+    email.attach_alternative("<p>html</p>", "text/html")
+    if adjunto:
+        email.attach("c.pdf", b"%PDF- c", "application/pdf")
+    return email
+
+
+class EncolarTest(TestCase):
+    def test_encolar_no_envia(self):
+        cola.encolar(mensaje(), origen="prueba")
+        self.assertEqual(len(mail.outbox), 0)
+        correo = CorreoSaliente.objects.get()
+        self.assertEqual(correo.estado, "PENDIENTE")
+        self.assertEqual(correo.destinatarios, ["ana@test.com"])
+
+    def test_reconstruye_html_y_adjuntos(self):
+        correo = cola.encolar(mensaje(adjunto=True))
+        reconstruido = cola.mensaje_de(correo)
+        self.assertEqual(reconstruido.alternatives[0][0], "<p>html</p>")
+        self.assertEqual(reconstruido.attachments[0][:2], ("c.pdf", b"%PDF- c"))
+
+
+@override_settings(CORREOS_LOTE=2, CORREOS_MAX_INTENTOS=2)
+class EnvioTest(TestCase):
+    def test_envia_en_lotes_con_una_conexion_por_lote(self):
+        for i in range(3):
+            cola.encolar(mensaje(f"u{i}@test.com"))
+        with mock.patch.object(cola, "get_connection", wraps=cola.get_connection) as conexiones:
+            enviados, fallidos = cola.procesar_pendientes()
+        self.assertEqual((enviados, fallidos), (3, 0))
+        self.assertEqual(conexiones.call_count, 2, "una conexión por lote de 2")
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(CorreoSaliente.objects.exclude(estado="ENVIADO").exists())
+
+    def test_falla_reintenta_con_espera_y_despues_queda_en_error(self):
+        correo = cola.encolar(mensaje())
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages",
+                        side_effect=OSError("smtp caído")):
+            self.assertEqual(cola.procesar_pendientes(), (0, 1))
+            correo.refresh_from_db()
+            self.assertEqual(correo.estado, "PENDIENTE")
+            self.assertGreater(correo.proximo_intento, timezone.now())
+            self.assertIn("smtp caído", correo.ultimo_error)
+
+            # Todavía no venció la espera: no se vuelve a intentar
+            self.assertEqual(cola.procesar_pendientes(), (0, 0))
+
+            CorreoSaliente.objects.filter(pk=correo.pk).update(proximo_intento=timezone.now())
+            cola.procesar_pendientes()
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, "ERROR")
+        self.assertEqual(correo.intentos, 2)
+
+        cola.reintentar(CorreoSaliente.objects.all())
+        self.assertEqual(cola.procesar_pendientes(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_reencola_abandonados(self):
+        correo = cola.encolar(mensaje())
+        CorreoSaliente.objects.filter(pk=correo.pk).update(
+            estado="ENVIANDO", tomado=timezone.now() - cola.ABANDONO - timedelta(minutes=1),
+        )
+        self.assertEqual(cola.reencolar_abandonados(), 1)
+        self.assertEqual(cola.procesar_pendientes(), (1, 0))
@@ -0,0 +1,43 @@
+"""
+Recalcula los snapshots de los dashboards de postulaciones (SnapshotDashboard).
+
+Sin opciones recalcula solo los snapshots que las señales marcaron como
+pendientes. Con --completo recalcula todos: hace falta una vez por día porque
+los rangos etarios dependen de la fecha actual, y cubre los cambios hechos
+con .update() masivos, que no disparan señales.
+
+Uso manual:
+    python manage.py actualizar_estadisticas
+    python manage.py actualizar_estadisticas --completo
+
+Es lo único que recalcula un snapshot ya calculado: el dashboard muestra el
+último cálculo hasta que corre, así que el intervalo es la demora máxima.
+
+Configurar en cron (ej. pendientes cada 5 minutos y completo cada día a las 4):
+    */5 * * * *  /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py actualizar_estadisticas
+    0 4 * * *    /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py actualizar_estadisticas --completo
+"""
+from django.core.management.base import BaseCommand
+
+from estadisticas import snapshots
+from estadisticas.models import SnapshotDashboard
+from estadisticas.views.postulaciones import LINEAS_DASHBOARD
+
+
+class Command(BaseCommand):
+    help = "Recalcula los snapshots pendientes (o todos) de los dashboards de postulaciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--completo",
+            action="store_true",
+            help="Recalcula todos los snapshots, no solo los pendientes.",
+        )
+
+    def handle(self, *args, **options):
+        snapshots.asegurar_base(LINEAS_DASHBOARD)
+        if options["completo"]:
+            SnapshotDashboard.marcar_pendientes()
+
+        cantidad = snapshots.refrescar_pendientes()
+        self.stdout.write(self.style.SUCCESS(f"Snapshots recalculados: {cantidad}."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:40
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('linea', models.CharField(max_length=20)),
+                ('convocatoria', models.PositiveIntegerField(default=0)),
+                ('anio', models.PositiveIntegerField(default=0)),
+                ('tipo', models.CharField(blank=True, default='', max_length=50)),
+                ('solo_ganadores', models.BooleanField(default=False)),
+                ('datos', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('pendiente', models.BooleanField(default=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Snapshot de dashboard',
+                'verbose_name_plural': 'Snapshots de dashboard',
+                'indexes': [models.Index(fields=['convocatoria'], name='estadistica_convoca_e2d1b5_idx'), models.Index(fields=['pendiente'], name='estadistica_pendien_d5e094_idx')],
+                'constraints': [models.UniqueConstraint(fields=('linea', 'convocatoria', 'anio', 'tipo', 'solo_ganadores'), name='snapshot_dashboard_unico')],
+            },
+        ),
+    ]
@@ -1,3 +1,106 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
-# Create your models here.
+from convocatorias.models import Convocatoria, Postulacion, Rendicion
+from registro_audiovisual.models import PersonaHumana
+
+
+class SnapshotDashboard(models.Model):
+    """
+    Agregados precalculados del dashboard de postulaciones para una
+    combinación de filtros. 0 / "" en un filtro = sin filtrar.
+
+    `datos` es el contexto completo que renderiza el dashboard. Las señales
+    de abajo solo lo marcan como pendiente; se recalcula con el comando
+    actualizar_estadisticas (ver estadisticas/snapshots.py).
+    """
+    linea          = models.CharField(max_length=20)
+    convocatoria   = models.PositiveIntegerField(default=0)
+    anio           = models.PositiveIntegerField(default=0)
+    tipo           = models.CharField(max_length=50, blank=True, default="")
+    solo_ganadores = models.BooleanField(default=False)
+
+    datos       = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    pendiente   = models.BooleanField(default=True)
+    # Se incrementa en cada invalidación: un recálculo que empezó antes de
+    # un cambio no puede dejar el snapshot como vigente.
+    version     = models.PositiveIntegerField(default=0)
+    actualizado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Snapshot de dashboard"
+        verbose_name_plural = "Snapshots de dashboard"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["linea", "convocatoria", "anio", "tipo", "solo_ganadores"],
+                name="snapshot_dashboard_unico",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["convocatoria"]),
+            models.Index(fields=["pendiente"]),
+        ]
+
+    def __str__(self):
+        return f"{self.linea} conv={self.convocatoria} año={self.anio} tipo={self.tipo or '-'}"
+
+    @classmethod
+    def marcar_pendientes(cls, convocatorias=None):
+        """
+        Invalida los snapshots afectados por cambios en `convocatorias`
+        (ids o queryset de ids): los de esas convocatorias y los que no
+        filtran por convocatoria. Sin argumento, invalida todos.
+        """
+        qs = cls.objects.all()
+        if convocatorias is not None:
+            qs = qs.filter(Q(convocatoria=0) | Q(convocatoria__in=convocatorias))
+        return qs.update(pendiente=True, version=F("version") + 1)
+
+
+# ==========================================
+# SEÑALES — invalidación de snapshots
+# ==========================================
+# Los .update() masivos no disparan señales: para esos casos (y para el
+# corrimiento de rangos etarios con el paso de los días) está el recálculo
+# completo de actualizar_estadisticas.
+
+@receiver([post_save, post_delete], sender=Postulacion)
+def invalidar_snapshots_postulacion(sender, instance, **kwargs):
+    # Los borradores no cuentan en ningún dashboard y nunca vuelven a serlo
+    if instance.estado == "borrador":
+        return
+    SnapshotDashboard.marcar_pendientes([instance.convocatoria_id])
+
+
+@receiver([post_save, post_delete], sender=Rendicion)
+def invalidar_snapshots_rendicion(sender, instance, **kwargs):
+    SnapshotDashboard.marcar_pendientes(
+        Postulacion.objects.filter(pk=instance.postulacion_id).values("convocatoria_id")
+    )
+
+
+@receiver([post_save, post_delete], sender=PersonaHumana)
+def invalidar_snapshots_persona(sender, instance, **kwargs):
+    convocatorias = list(
+        Postulacion.objects.filter(user_id=instance.user_id)
+        .exclude(estado="borrador")
+        .values_list("convocatoria_id", flat=True)
+        .distinct()
+    )
+    if convocatorias:
+        SnapshotDashboard.marcar_pendientes(convocatorias)
+
+
+@receiver(post_save, sender=Convocatoria)
+def invalidar_snapshots_convocatoria(sender, instance, **kwargs):
+    # Título y línea aparecen en los agregados
+    SnapshotDashboard.marcar_pendientes([instance.pk])
+
+
+@receiver(post_delete, sender=Convocatoria)
+def borrar_snapshots_convocatoria(sender, instance, **kwargs):
+    SnapshotDashboard.objects.filter(convocatoria=instance.pk).delete()
+    SnapshotDashboard.marcar_pendientes([])
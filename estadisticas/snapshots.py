@@ -0,0 +1,118 @@
+"""Snapshots materializados de los dashboards de postulaciones.
+
+Cada combinación de filtros (línea, convocatoria, año, tipo, solo ganadores)
+tiene una fila en SnapshotDashboard con todos los agregados del dashboard ya
+calculados, así que abrir el dashboard cuesta lo mismo con 1 año de historia
+que con 10.
+
+Ciclo de vida:
+- La primera vez que se pide una combinación se calcula y se guarda.
+- Las señales de estadisticas/models.py marcan como pendientes los snapshots
+  afectados cuando cambia una Postulacion, Rendicion, PersonaHumana o
+  Convocatoria.
+- El comando actualizar_estadisticas (cron) recalcula los pendientes fuera
+  del request. Mientras tanto el dashboard sigue mostrando el último cálculo
+  con su fecha: una ráfaga de cambios no dispara un recálculo por visita.
+
+Solo se materializan combinaciones de filtros válidas (tipo de proyecto
+conocido, convocatoria existente); el resto se calcula en el momento sin
+guardar nada, así una URL armada a mano no agrega filas.
+
+Los montos (Decimal) se guardan como texto en el JSON; los templates los
+formatean igual con floatformat.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from convocatorias.models import Convocatoria, Postulacion
+
+from .models import SnapshotDashboard
+
+TIPOS = {valor for valor, _ in Postulacion.TIPO_PROYECTO if valor}
+
+
+def _datos_dashboard(filtros):
+    # Import diferido: views.postulaciones importa este módulo
+    from .views.postulaciones import datos_dashboard
+    datos = datos_dashboard(filtros)
+    # Mismos tipos que al leer de la base, se haya calculado recién o no
+    return json.loads(json.dumps(datos, cls=DjangoJSONEncoder))
+
+
+def _filtros(snapshot):
+    from .views.postulaciones import filtros_dashboard
+    return filtros_dashboard(
+        snapshot.linea,
+        conv=str(snapshot.convocatoria or ""),
+        anio=str(snapshot.anio or ""),
+        tipo=snapshot.tipo,
+        solo_ganadores=snapshot.solo_ganadores,
+    )
+
+
+def clave(linea, filtros):
+    """Campos de SnapshotDashboard para `filtros`, o None si algún filtro
+    no es un valor válido (en ese caso no se materializa)."""
+    conv = filtros.get("conv") or ""
+    anio = filtros.get("anio") or ""
+    tipo = filtros.get("tipo") or ""
+    if (conv and not conv.isdigit()) or (anio and not (anio.isdigit() and len(anio) == 4)):
+        return None
+    if tipo and tipo not in TIPOS:
+        return None
+    if conv and not Convocatoria.objects.filter(pk=int(conv)).exists():
+        return None
+    return {
+        "linea":          linea,
+        "convocatoria":   int(conv or 0),
+        "anio":           int(anio or 0),
+        "tipo":           tipo,
+        "solo_ganadores": bool(filtros.get("solo_ganadores")),
+    }
+
+
+def refrescar(snapshot):
+    """Recalcula `snapshot`. Si mientras tanto llegó otra invalidación, los
+    datos se devuelven pero el snapshot queda pendiente."""
+    version = snapshot.version
+    snapshot.datos = _datos_dashboard(_filtros(snapshot))
+    snapshot.actualizado = timezone.now()
+    vigente = SnapshotDashboard.objects.filter(pk=snapshot.pk, version=version).update(
+        datos=snapshot.datos, actualizado=snapshot.actualizado, pendiente=False,
+    )
+    snapshot.pendiente = not vigente
+    return snapshot
+
+
+def obtener(linea, filtros):
+    """(datos, fecha de cálculo) del dashboard para `filtros`. Un snapshot
+    pendiente que ya tiene datos se devuelve tal cual: lo recalcula el cron."""
+    campos = clave(linea, filtros)
+    if campos is None:
+        return _datos_dashboard(filtros), timezone.now()
+    snapshot, _ = SnapshotDashboard.objects.get_or_create(**campos)
+    if snapshot.actualizado is None:
+        refrescar(snapshot)
+    return snapshot.datos, snapshot.actualizado
+
+
+def refrescar_pendientes():
+    """Recalcula todos los snapshots pendientes. Devuelve cuántos."""
+    cantidad = 0
+    pendientes = SnapshotDashboard.objects.filter(pendiente=True).defer("datos").order_by("pk")
+    for snapshot in pendientes:
+        refrescar(snapshot)
+        cantidad += 1
+    return cantidad
+
+
+def asegurar_base(lineas):
+    """Crea (pendientes) los snapshots sin filtros de cada línea, para que
+    la vista inicial de cada dashboard ya esté calculada."""
+    for linea in lineas:
+        for solo_ganadores in (False, True):
+            SnapshotDashboard.objects.get_or_create(
+                linea=linea, convocatoria=0, anio=0, tipo="", solo_ganadores=solo_ganadores,
+            )
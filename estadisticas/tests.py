@@ -1,15 +1,30 @@
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
+from io import BytesIO, StringIO
 
+import openpyxl
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
 
-from convocatorias.models import Convocatoria, Postulacion, Rendicion
+from chatbot.models import ConsultaLog
+from convocatorias.models import (
+    CambioEstadoPostulacion, Convocatoria, ObservacionAdministrativa, Postulacion, Rendicion,
+)
+from exencion.models import Exencion
 from registro_audiovisual.models import PersonaHumana
 
-from estadisticas.views.comun import conteo, filas_barras, normalizar_localidad, pct, rango
+from estadisticas import snapshots
+from estadisticas.models import SnapshotDashboard
+from estadisticas.views.comun import (
+    _cumple, conteo, edad, filas_barras, normalizar_localidad, pct, rango, rango_sql,
+)
 from estadisticas.views.impacto import impacto, montos_comparados
-from estadisticas.views.postulaciones import agrupar, postulaciones_qs, tasas
+from estadisticas.views.postulaciones import (
+    _demograficos, agrupar, filtros_dashboard, postulaciones_qs, tasas, tiempos_embudo,
+)
 from estadisticas.views.registro import _residencia
 
 
@@ -82,6 +97,39 @@ class PersonasUnicasTest(TestCase):
         crear_postulacion(self.beto, crear_convocatoria("Otra"), estado="borrador")
         self.assertEqual(postulaciones_qs({}).count(), 3)
 
+    def test_demograficos_en_una_consulta_y_sin_registro(self):
+        crear_postulacion(User.objects.create(username="sin_ph"), self.conv)
+        with self.assertNumQueries(1):
+            demograficos = _demograficos(postulaciones_qs({}))
+        self.assertEqual(demograficos["registrados"], 2)
+        datos = agrupar(postulaciones_qs({}))
+        self.assertEqual(datos["presentantes_unicos"], 3)
+        self.assertEqual(datos["sin_registro"], 1)
+        self.assertEqual(dict(datos["residencia"]), {"Salta Capital": 2, "Sin dato": 1})
+        self.assertEqual(dict(datos["genero_persona"]), {"Femenino": 1, "Masculino": 1, "Sin dato": 1})
+        self.assertEqual(datos["rango_etario"][-1], ("Sin dato", 1))
+        for tabla in ("genero_persona", "rango_etario", "residencia"):
+            self.assertEqual(sum(total for _, total in datos[tabla]), datos["presentantes_unicos"])
+
+
+class RangoSqlTest(TestCase):
+    """rango_sql() clasifica igual que rango(edad()), incluidos los cumpleaños."""
+
+    def test_coincide_con_el_calculo_en_python(self):
+        hoy = date.today()
+        nacimientos = [hoy, date(2000, 2, 29), date(1950, 1, 1)]
+        for anios in (17, 18, 30, 31, 50, 51):
+            cumple = _cumple(hoy, anios)
+            nacimientos += [cumple, cumple + timedelta(days=1), cumple - timedelta(days=1)]
+        for i, nacimiento in enumerate(nacimientos):
+            crear_persona(User.objects.create(username=f"u{i}"), nacimiento=nacimiento)
+
+        for p in PersonaHumana.objects.annotate(r=rango_sql()):
+            self.assertEqual(p.r, rango(edad(p)), p.fecha_nacimiento)
+
+    def test_29_de_febrero(self):
+        self.assertEqual(_cumple(date(2028, 2, 29), 18), date(2010, 2, 28))
+
 
 class GanadoresTest(TestCase):
     def test_solo_ganadores_filtra_seleccionado_y_finalizado(self):
@@ -182,6 +230,38 @@ class TasasTest(TestCase):
         self.assertIsNone(resultado["Finalización"]["valor"])
 
 
+class TiemposEmbudoTest(TestCase):
+    def _cambio(self, p, estado, fecha):
+        CambioEstadoPostulacion.objects.create(
+            postulacion=p, convocatoria=p.convocatoria, estado=estado, fecha=fecha, origen="admin",
+        )
+
+    def test_promedio_de_dias_entre_etapas_y_observadas(self):
+        conv = crear_convocatoria()
+        user = User.objects.create(username="ana")
+        rapida = crear_postulacion(user, conv, estado="admitido")
+        lenta = crear_postulacion(user, conv, estado="admitido")
+        sin_admitir = crear_postulacion(user, conv, estado="observado")
+
+        self._cambio(rapida, "enviado", "2026-03-01T12:00:00Z")
+        self._cambio(rapida, "admitido", "2026-03-03T12:00:00Z")
+        self._cambio(lenta, "enviado", "2026-03-01T12:00:00Z")
+        self._cambio(lenta, "observado", "2026-03-02T12:00:00Z")
+        self._cambio(lenta, "revision_admin", "2026-03-05T12:00:00Z")
+        self._cambio(lenta, "admitido", "2026-03-07T12:00:00Z")
+        self._cambio(sin_admitir, "enviado", "2026-03-01T12:00:00Z")
+        self._cambio(sin_admitir, "observado", "2026-03-04T12:00:00Z")
+
+        resultado = tiempos_embudo(postulaciones_qs({}))
+        etapas = {e["nombre"]: e for e in resultado["embudo"]}
+        # (2 + 6) / 2 días; la que no llegó a admitido no cuenta
+        self.assertEqual(etapas["Envío → admisión"]["dias"], 4.0)
+        self.assertEqual(etapas["Envío → admisión"]["detalle"], "2 postulaciones")
+        self.assertEqual(etapas["Observación → nueva revisión"]["dias"], 3.0)
+        self.assertIsNone(etapas["Evaluación → selección"]["dias"])
+        self.assertEqual(resultado["pasaron_por_observado"], 2)
+
+
 class MontosComparadosTest(TestCase):
     def setUp(self):
         self.conv = crear_convocatoria()
@@ -228,6 +308,24 @@ class ExportacionesTest(TestCase):
             r = self.client.get(url)
             self.assertEqual(r.status_code, 200, url)
             self.assertEqual(r["Content-Type"], self.XLSX, url)
+            wb = openpyxl.load_workbook(BytesIO(b"".join(r.streaming_content)))
+            self.assertIn("Resumen", wb.sheetnames, url)
+
+    def test_exportacion_postulaciones_con_datos(self):
+        conv = crear_convocatoria()
+        ana = User.objects.create(username="ana")
+        crear_persona(ana, lugar="otro", otro=" san  pedro")
+        crear_postulacion(ana, conv, estado="seleccionado", nombre_proyecto="Corto")
+        crear_postulacion(User.objects.create(username="sin_ph", email="x@test.com"), conv)
+
+        r = self.client.get("/estadisticas/exportar/")
+        wb = openpyxl.load_workbook(BytesIO(b"".join(r.streaming_content)))
+        filas = list(wb["Postulaciones"].values)
+        self.assertEqual(filas[0][0], "ID")
+        self.assertEqual(len(filas), 3)
+        por_proyecto = {f[2]: f for f in filas[1:]}
+        self.assertEqual(por_proyecto["Corto"][11], "San Pedro")
+        self.assertEqual(por_proyecto[None][7], "x@test.com")
 
 
 class HelpersTest(TestCase):
@@ -253,3 +351,175 @@ class HelpersTest(TestCase):
         self.assertEqual(datos["filas"][0]["display"], 10)
         datos = filas_barras([(2026, Decimal("1234567.89"))], con_pesos=True)
         self.assertEqual(datos["filas"][0]["display"], "$1.234.567")
+
+
+class SnapshotDashboardTest(TestCase):
+    def setUp(self):
+        self.conv = crear_convocatoria()
+        self.user = User.objects.create(username="ana")
+        crear_persona(self.user)
+        crear_postulacion(self.user, self.conv, estado="seleccionado")
+
+    def obtener(self, **kwargs):
+        return snapshots.obtener("fomento", filtros_dashboard("fomento", **kwargs))[0]
+
+    def test_primer_acceso_materializa_y_luego_lee_sin_recalcular(self):
+        self.assertEqual(self.obtener()["total"], 1)
+        snap = SnapshotDashboard.objects.get()
+        self.assertFalse(snap.pendiente)
+        # Leer un snapshot vigente: una sola consulta
+        with self.assertNumQueries(1):
+            self.assertEqual(self.obtener()["total"], 1)
+
+    def test_cambios_marcan_pendiente_y_se_reflejan(self):
+        self.obtener()
+        self.obtener(conv=str(self.conv.pk))
+        otra = crear_convocatoria("Otra")
+        self.obtener(conv=str(otra.pk))
+
+        crear_postulacion(User.objects.create(username="beto"), self.conv)
+        pendientes = set(SnapshotDashboard.objects.filter(pendiente=True)
+                         .values_list("convocatoria", flat=True))
+        # Solo los snapshots sin filtro de convocatoria y los de esa convocatoria
+        self.assertEqual(pendientes, {0, self.conv.pk})
+        snapshots.refrescar_pendientes()
+        self.assertEqual(self.obtener()["total"], 2)
+        self.assertEqual(self.obtener()["presentantes_unicos"], 2)
+
+    def test_pendiente_se_sirve_sin_recalcular_en_el_request(self):
+        self.obtener()
+        crear_postulacion(User.objects.create(username="beto"), self.conv)
+        # El último cálculo, en una consulta; el recálculo queda para el cron
+        with self.assertNumQueries(1):
+            self.assertEqual(self.obtener()["total"], 1)
+        self.assertTrue(SnapshotDashboard.objects.get().pendiente)
+
+    def test_borradores_no_invalidan(self):
+        self.obtener()
+        crear_postulacion(self.user, self.conv, estado="borrador")
+        self.assertFalse(SnapshotDashboard.objects.filter(pendiente=True).exists())
+
+    def test_persona_y_rendicion_invalidan(self):
+        self.obtener()
+        PersonaHumana.objects.filter(user=self.user).get().save()
+        self.assertTrue(SnapshotDashboard.objects.get().pendiente)
+
+        snapshots.refrescar_pendientes()
+        Rendicion.objects.create(postulacion=Postulacion.objects.get(), user=self.user,
+                                 estado="APROBADO", insumos=Decimal("600"),
+                                 fecha_aprobacion=date(2026, 5, 1))
+        snapshots.refrescar_pendientes()
+        datos = self.obtener()
+        self.assertEqual(Decimal(datos["impacto_total"]), Decimal("600"))
+
+    def test_invalidacion_durante_recalculo_deja_pendiente(self):
+        snap = SnapshotDashboard.objects.create(linea="fomento")
+        SnapshotDashboard.marcar_pendientes()
+        snapshots.refrescar(snap)  # version leída antes de la invalidación
+        self.assertTrue(SnapshotDashboard.objects.get().pendiente)
+
+    def test_filtros_invalidos_no_se_materializan(self):
+        self.assertEqual(self.obtener(anio="26")["total"], 0)
+        self.assertEqual(self.obtener(tipo="inventado")["total"], 0)
+        self.assertEqual(self.obtener(conv="999999")["total"], 0)
+        self.assertFalse(SnapshotDashboard.objects.exists())
+        self.obtener(tipo="cine_corto", conv=str(self.conv.pk))
+        self.assertEqual(SnapshotDashboard.objects.count(), 1)
+
+    def test_comando_recalcula_pendientes(self):
+        call_command("actualizar_estadisticas", stdout=StringIO())
+        # Vista inicial de cada línea, con y sin solo ganadores
+        self.assertEqual(SnapshotDashboard.objects.filter(pendiente=False).count(), 4)
+        base = SnapshotDashboard.objects.get(linea="fomento", solo_ganadores=False)
+        self.assertEqual(base.datos["total"], 1)
+
+    def test_dashboard_lee_del_snapshot(self):
+        self.client.force_login(User.objects.create(username="staff", is_staff=True))
+        r = self.client.get("/estadisticas/")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.context["total"], 1)
+        self.assertTrue(SnapshotDashboard.objects.filter(linea="fomento").exists())
+
+
+class IndicesConsultasTest(TestCase):
+    """Las consultas calientes de estadísticas, backoffice, wizard y
+    comandos resuelven por índice. En PostgreSQL se apaga el seq scan: con
+    pocas filas el planificador lo elegiría igual aunque el índice sirva."""
+
+    @classmethod
+    def setUpTestData(cls):
+        convs = [crear_convocatoria(f"Conv {i}") for i in range(3)]
+        users = [User.objects.create(username=f"u{i}") for i in range(20)]
+        estados = ["borrador", "enviado", "admitido", "evaluacion_jurado", "seleccionado"]
+        Postulacion.objects.bulk_create([
+            Postulacion(
+                user=users[i % 20], convocatoria=convs[i % 3], estado=estados[i % 5],
+                fecha_envio=None if i % 5 == 0 else f"{2024 + i % 3}-03-01T12:00:00Z",
+            )
+            for i in range(300)
+        ])
+        postulaciones = list(Postulacion.objects.order_by("pk"))
+        Rendicion.objects.bulk_create([
+            Rendicion(postulacion=p, user_id=p.user_id,
+                      estado="APROBADO" if i % 2 else "ENVIADO",
+                      fecha_aprobacion=date(2024 + i % 3, 5, 1) if i % 2 else None)
+            for i, p in enumerate(postulaciones[:100])
+        ])
+        ObservacionAdministrativa.objects.bulk_create([
+            ObservacionAdministrativa(postulacion=p, tipo_documento="CBU", descripcion="Falta CBU",
+                                      subsanada=bool(i % 2))
+            for i, p in enumerate(postulaciones[:100])
+        ])
+        hoy = date.today()
+        Exencion.objects.bulk_create([
+            Exencion(user=users[i % 20], nombre_razon_social="X", email="x@test.com", cuit="20123456789",
+                     domicilio_fiscal="Calle 1", actividad_dgr="591110",
+                     estado="APROBADA" if i % 2 else "ENVIADA",
+                     fecha_vencimiento=hoy + timedelta(days=i - 50) if i % 2 else None)
+            for i in range(100)
+        ])
+        ahora = timezone.now()
+        ConsultaLog.objects.bulk_create([
+            ConsultaLog(texto_consulta="requisitos", fecha=ahora - timedelta(hours=i))
+            for i in range(300)
+        ])
+        cls.conv, cls.user = convs[0], users[0]
+
+    def assertUsaIndice(self, qs, indice):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # LOCAL: vale hasta el rollback del test
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = qs.explain()
+        self.assertIn(indice, plan, f"La consulta no usa {indice}:\n{plan}")
+
+    def test_postulaciones_por_convocatoria_y_estado(self):
+        qs = Postulacion.objects.filter(convocatoria=self.conv, estado="enviado").order_by()
+        self.assertUsaIndice(qs, "postulacion_conv_estado")
+
+    def test_postulaciones_por_anio_de_envio(self):
+        qs = Postulacion.objects.filter(fecha_envio__year=2025).order_by()
+        self.assertUsaIndice(qs, "postulacion_fecha_envio")
+
+    def test_borrador_del_wizard(self):
+        qs = Postulacion.objects.filter(user=self.user, convocatoria=self.conv, estado="borrador").order_by()
+        self.assertUsaIndice(qs, "postulacion_user_conv_estado")
+
+    def test_rendiciones_aprobadas_por_anio(self):
+        qs = Rendicion.objects.filter(estado="APROBADO", fecha_aprobacion__year=2025)
+        self.assertUsaIndice(qs, "rendicion_estado_aprobacion")
+
+    def test_observaciones_pendientes_antiguas(self):
+        qs = ObservacionAdministrativa.objects.filter(
+            subsanada=False, fecha_creacion__lte=timezone.now() - timedelta(days=7),
+        )
+        self.assertUsaIndice(qs, "observacion_pendiente_fecha")
+
+    def test_exenciones_vigentes(self):
+        qs = Exencion.objects.filter(estado="APROBADA", fecha_vencimiento__gte=date.today()).order_by()
+        self.assertUsaIndice(qs, "exencion_estado_vencimiento")
+
+    def test_log_del_chatbot_por_dia(self):
+        ahora = timezone.now()
+        qs = ConsultaLog.objects.filter(fecha__gte=ahora - timedelta(days=1), fecha__lt=ahora).order_by()
+        self.assertUsaIndice(qs, "chatbot_log_fecha")
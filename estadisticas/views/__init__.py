@@ -6,7 +6,9 @@
 - registro: Registro Audiovisual
 - exenciones: exenciones impositivas
 - formacion: convocatorias de formación
-- comun: helpers compartidos (conteos, rangos etarios, Excel)
+- comun: helpers compartidos (conteos, rangos etarios)
+
+Las exportaciones a Excel se generan en streaming con exportaciones.xlsx.
 """
 from .postulaciones import (
     dashboard, exportar,
@@ -9,10 +9,9 @@ Convención de unidades (ver estadisticas/INDICADORES.md):
 """
 from datetime import date
 
-from django.db.models import Count
+from django.db.models import Case, CharField, Count, Value, When
 
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
+from registro_audiovisual.models import normalizar_localidad
 
 
 RANGOS_ETARIOS = [
@@ -68,47 +67,31 @@ def rango(edad_valor):
     return "Sin dato"
 
 
+def _cumple(hoy, anios):
+    """Fecha de nacimiento de quien cumple `anios` hoy (29/2 → 28/2)."""
+    try:
+        return hoy.replace(year=hoy.year - anios)
+    except ValueError:
+        return hoy.replace(year=hoy.year - anios, day=28)
+
+
+def rango_sql(campo="fecha_nacimiento", hoy=None):
+    """Equivalente en SQL de rango(edad(persona)), para anotar un queryset:
+    compara la fecha de nacimiento contra la fecha de corte de cada rango."""
+    hoy = hoy or date.today()
+    casos = [
+        When(**{f"{campo}__isnull": True}, then=Value("Sin dato")),
+        When(**{f"{campo}__gt": hoy}, then=Value("Sin dato")),
+    ]
+    # Los rangos son contiguos: edad <= hi  ⇔  nació después de cumplir hi + 1
+    for label, _, hi in RANGOS_ETARIOS:
+        casos.append(When(**{f"{campo}__gt": _cumple(hoy, hi + 1)}, then=Value(label)))
+    return Case(*casos, default=Value("Sin dato"), output_field=CharField())
+
+
 def conteo(qs, campo, mapa):
     """Agrupa un queryset por un campo y devuelve filas {label, total}."""
     return [
         {"label": mapa.get(r[campo]) or (r[campo] or "Sin dato"), "total": r["total"]}
         for r in qs.values(campo).annotate(total=Count("id")).order_by("-total")
     ]
-
-
-def normalizar_localidad(texto):
-    """Unifica el texto libre de localidad ("san pedro ", "SAN PEDRO",
-    "San  Pedro") en un único label, para no contar la misma localidad
-    varias veces."""
-    return " ".join((texto or "").split()).title()
-
-
-# ──────────────────────────────────────────────────────────────
-# Helpers de exportación a Excel
-# ──────────────────────────────────────────────────────────────
-
-def write_headers(ws, headers):
-    ws.append(headers)
-    for cell in ws[1]:
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill("solid", fgColor="1B3A6B")
-        cell.alignment = Alignment(horizontal="center")
-
-
-def tabla_resumen(ws, fila, titulo, filas):
-    c1 = ws.cell(row=fila, column=1, value=titulo)
-    c1.font = Font(bold=True, color="FFFFFF")
-    c1.fill = PatternFill("solid", fgColor="2E5FA3")
-    ws.cell(row=fila, column=2).fill = PatternFill("solid", fgColor="2E5FA3")
-    fila += 1
-    for label, total in filas:
-        ws.cell(row=fila, column=1, value=label)
-        ws.cell(row=fila, column=2, value=total)
-        fila += 1
-    return fila + 1
-
-
-def autowidth(ws):
-    for col in ws.columns:
-        max_len = max((len(str(c.value or "")) for c in col), default=10)
-        ws.column_dimensions[get_column_letter(col[0].column)].width = min(max_len + 4, 50)
@@ -9,14 +9,12 @@ from datetime import date
 
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpResponse
-
-import openpyxl
 
 from exencion.models import Exencion, ESTADOS_EXENCION
+from exportaciones.xlsx import LOTE, Hoja, filas_resumen, respuesta_xlsx
 from registro_audiovisual.models import LUGARES_RESIDENCIA
 
-from .comun import conteo, filas_barras, write_headers, tabla_resumen, autowidth
+from .comun import conteo, filas_barras
 
 
 ESTADO_EXENCION_MAP = dict(ESTADOS_EXENCION)
@@ -87,28 +85,15 @@ def dashboard_exencion(request):
     })
 
 
-@staff_member_required
-def exportar_exenciones(request):
-    filtros = _filtros(request)
-    qs = _queryset(filtros).select_related("user")
-
-    wb = openpyxl.Workbook()
-
-    ws1 = wb.active
-    ws1.title = "Solicitudes"
-    write_headers(ws1, [
-        "Constancia", "Nombre / Razón social", "CUIT", "Estado",
-        "Localidad fiscal", "Tipo de solicitante",
-        "Fecha solicitud", "Fecha emisión", "Fecha vencimiento",
-    ])
-    for e in qs.order_by("-fecha_creacion"):
+def _filas_solicitudes(qs):
+    for e in qs.order_by("-fecha_creacion").iterator(chunk_size=LOTE):
         if e.persona_humana_id:
             tipo = "Persona humana"
         elif e.persona_juridica_id:
             tipo = "Persona jurídica"
         else:
             tipo = "Sin vínculo al registro"
-        ws1.append([
+        yield [
             e.numero_constancia,
             e.nombre_razon_social,
             e.cuit,
@@ -118,24 +103,40 @@ def exportar_exenciones(request):
             e.fecha_creacion.strftime("%d/%m/%Y"),
             e.fecha_emision.strftime("%d/%m/%Y") if e.fecha_emision else "",
             e.fecha_vencimiento.strftime("%d/%m/%Y") if e.fecha_vencimiento else "",
-        ])
-    autowidth(ws1)
-
-    ws2 = wb.create_sheet("Resumen")
-    fila = 1
-    fila = tabla_resumen(ws2, fila, "Por estado",
-                         [(r["label"], r["total"]) for r in conteo(qs, "estado", ESTADO_EXENCION_MAP)])
-    fila = tabla_resumen(ws2, fila, "Tipo de solicitante",
-                         [(r["label"], r["total"]) for r in _tipo_solicitante(qs)])
-    fila = tabla_resumen(ws2, fila, "Por año de solicitud",
-                         [(r["label"], r["total"]) for r in conteo(qs, "fecha_creacion__year", {})])
-    fila = tabla_resumen(ws2, fila, "Localidad fiscal",
-                         [(r["label"], r["total"]) for r in conteo(qs, "localidad_fiscal", LUGAR_MAP)])
-    autowidth(ws2)
-
-    resp = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    resp["Content-Disposition"] = 'attachment; filename="estadisticas_exenciones.xlsx"'
-    wb.save(resp)
-    return resp
+        ]
+
+
+def _filas_resumen(qs):
+    yield from filas_resumen("Por estado",
+                             [(r["label"], r["total"]) for r in conteo(qs, "estado", ESTADO_EXENCION_MAP)])
+    yield from filas_resumen("Tipo de solicitante",
+                             [(r["label"], r["total"]) for r in _tipo_solicitante(qs)])
+    yield from filas_resumen("Por año de solicitud",
+                             [(r["label"], r["total"]) for r in conteo(qs, "fecha_creacion__year", {})])
+    yield from filas_resumen("Localidad fiscal",
+                             [(r["label"], r["total"]) for r in conteo(qs, "localidad_fiscal", LUGAR_MAP)])
+
+
+def libro_exenciones(parametros):
+    """(nombre de archivo, hojas) del informe de exenciones, filtrado por
+    anio / estado / loc. Lo usan la descarga directa y las exportaciones en
+    segundo plano."""
+    qs = _queryset({
+        "anio":   parametros.get("anio", ""),
+        "estado": parametros.get("estado", ""),
+        "loc":    parametros.get("loc", ""),
+    }).select_related("user")
+
+    return "estadisticas_exenciones.xlsx", [
+        Hoja("Solicitudes", _filas_solicitudes(qs), total=qs.count, encabezados=[
+            "Constancia", "Nombre / Razón social", "CUIT", "Estado",
+            "Localidad fiscal", "Tipo de solicitante",
+            "Fecha solicitud", "Fecha emisión", "Fecha vencimiento",
+        ]),
+        Hoja("Resumen", _filas_resumen(qs)),
+    ]
+
+
+@staff_member_required
+def exportar_exenciones(request):
+    return respuesta_xlsx(*libro_exenciones(_filtros(request)))
@@ -9,20 +9,15 @@ Filtros: convocatoria, año de inscripción y estado.
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Q
-from django.http import HttpResponse
-
-import openpyxl
 
+from exportaciones.xlsx import LOTE, Hoja, filas_resumen, respuesta_xlsx
 from formacion.models import (
     ConvocatoriaFormacion, InscripcionFormacion,
     ESTADOS as ESTADOS_FORMACION, GENERO as GENERO_FORMACION,
     LOCALIDADES as LOCALIDADES_FORMACION, VINCULO_SECTOR, TIPO_FORMACION,
 )
 
-from .comun import (
-    RANGOS_ETARIOS, conteo, rango, pct, filas_barras,
-    write_headers, tabla_resumen, autowidth,
-)
+from .comun import RANGOS_ETARIOS, conteo, rango, pct, filas_barras
 
 
 ESTADO_FORM_MAP    = dict(ESTADOS_FORMACION)
@@ -118,26 +113,13 @@ def dashboard_formacion(request):
     })
 
 
-@staff_member_required
-def exportar_formacion(request):
-    filtros = _filtros(request)
-    qs = _queryset(filtros).select_related("convocatoria", "user")
-
-    wb = openpyxl.Workbook()
-
-    ws1 = wb.active
-    ws1.title = "Inscripciones"
-    write_headers(ws1, [
-        "Convocatoria", "Tipo de formación", "Nombre", "Apellido", "DNI",
-        "Email", "Estado", "Género", "Edad", "Localidad",
-        "Vínculo con el sector", "Fecha de inscripción",
-    ])
-    for i in qs.order_by("convocatoria", "-fecha"):
+def _filas_inscripciones(qs):
+    for i in qs.order_by("convocatoria", "-fecha").iterator(chunk_size=LOTE):
         if i.localidad == "otro":
             loc = i.otra_localidad or "Otro (sin especificar)"
         else:
             loc = i.get_localidad_display() if i.localidad else "Sin dato"
-        ws1.append([
+        yield [
             i.convocatoria.titulo,
             i.convocatoria.get_tipo_formacion_display(),
             i.nombre, i.apellido, i.dni,
@@ -148,28 +130,44 @@ def exportar_formacion(request):
             loc,
             i.get_vinculo_sector_display() if i.vinculo_sector else "Sin dato",
             i.fecha.strftime("%d/%m/%Y"),
-        ])
-    autowidth(ws1)
-
-    ws2 = wb.create_sheet("Resumen")
-    fila = 1
-    fila = tabla_resumen(ws2, fila, "Por convocatoria",
-                         [(r["label"], r["total"]) for r in conteo(qs, "convocatoria__titulo", {})])
-    fila = tabla_resumen(ws2, fila, "Por estado",
-                         [(r["label"], r["total"]) for r in conteo(qs, "estado", ESTADO_FORM_MAP)])
-    fila = tabla_resumen(ws2, fila, "Por género",
-                         [(r["label"], r["total"]) for r in conteo(qs, "genero", GENERO_FORM_MAP)])
-    fila = tabla_resumen(ws2, fila, "Rango etario",
-                         [(r["label"], r["total"]) for r in _rango_etario(qs)])
-    fila = tabla_resumen(ws2, fila, "Por localidad",
-                         [(r["label"], r["total"]) for r in conteo(qs, "localidad", LOCALIDAD_FORM_MAP)])
-    fila = tabla_resumen(ws2, fila, "Vínculo con el sector",
-                         [(r["label"], r["total"]) for r in conteo(qs, "vinculo_sector", VINCULO_MAP)])
-    autowidth(ws2)
-
-    resp = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    resp["Content-Disposition"] = 'attachment; filename="estadisticas_formacion.xlsx"'
-    wb.save(resp)
-    return resp
+        ]
+
+
+def _filas_resumen(qs):
+    yield from filas_resumen("Por convocatoria",
+                             [(r["label"], r["total"]) for r in conteo(qs, "convocatoria__titulo", {})])
+    yield from filas_resumen("Por estado",
+                             [(r["label"], r["total"]) for r in conteo(qs, "estado", ESTADO_FORM_MAP)])
+    yield from filas_resumen("Por género",
+                             [(r["label"], r["total"]) for r in conteo(qs, "genero", GENERO_FORM_MAP)])
+    yield from filas_resumen("Rango etario",
+                             [(r["label"], r["total"]) for r in _rango_etario(qs)])
+    yield from filas_resumen("Por localidad",
+                             [(r["label"], r["total"]) for r in conteo(qs, "localidad", LOCALIDAD_FORM_MAP)])
+    yield from filas_resumen("Vínculo con el sector",
+                             [(r["label"], r["total"]) for r in conteo(qs, "vinculo_sector", VINCULO_MAP)])
+
+
+def libro_formacion(parametros):
+    """(nombre de archivo, hojas) del informe de formación, filtrado por
+    conv / anio / estado. Lo usan la descarga directa y las exportaciones en
+    segundo plano."""
+    qs = _queryset({
+        "conv":   parametros.get("conv", ""),
+        "anio":   parametros.get("anio", ""),
+        "estado": parametros.get("estado", ""),
+    }).select_related("convocatoria", "user")
+
+    return "estadisticas_formacion.xlsx", [
+        Hoja("Inscripciones", _filas_inscripciones(qs), total=qs.count, encabezados=[
+            "Convocatoria", "Tipo de formación", "Nombre", "Apellido", "DNI",
+            "Email", "Estado", "Género", "Edad", "Localidad",
+            "Vínculo con el sector", "Fecha de inscripción",
+        ]),
+        Hoja("Resumen", _filas_resumen(qs)),
+    ]
+
+
+@staff_member_required
+def exportar_formacion(request):
+    return respuesta_xlsx(*libro_formacion(_filtros(request)))
@@ -7,21 +7,22 @@ Unidades:
   PERSONAS ÚNICAS: cada presentante aparece una sola vez aunque haya
   enviado varias postulaciones.
 """
+from collections import Counter
+
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count, Q, Sum
-from django.http import HttpResponse
-
-import openpyxl
+from django.db.models import Avg, Count, DurationField, Exists, F, OuterRef, Q, Subquery, Sum
 
-from convocatorias.models import Postulacion, Convocatoria, Rendicion
-from registro_audiovisual.models import PersonaHumana, GENERO_CHOICES
+from convocatorias.models import CambioEstadoPostulacion, Postulacion, Convocatoria, Rendicion
+from exportaciones.xlsx import LOTE, Celda, Hoja, filas_resumen, respuesta_xlsx
+from registro_audiovisual.models import PersonaHumana, GENERO_CHOICES, LUGARES_RESIDENCIA
 
 from .comun import (
-    ESTADOS_GANADOR, RANGOS_ETARIOS, edad, rango, normalizar_localidad,
-    pct, filas_barras, write_headers, tabla_resumen, autowidth,
+    ESTADOS_GANADOR, RANGOS_ETARIOS, edad, rango, rango_sql, normalizar_localidad,
+    pct, filas_barras,
 )
 from .impacto import impacto
+from .. import snapshots
 
 
 # Estados que implican haber superado la revisión administrativa.
@@ -31,6 +32,7 @@ TIPO_MAP      = {v: l for v, l in Postulacion.TIPO_PROYECTO if v}
 GENERO_MAP    = {v: l for v, l in Postulacion.GENERO if v}
 ESTADO_MAP    = {v: l for v, l in Postulacion.ESTADOS if v}
 GENERO_PH_MAP = dict(GENERO_CHOICES)
+LUGAR_MAP     = dict(LUGARES_RESIDENCIA)
 
 
 def postulaciones_qs(filtros):
@@ -52,12 +54,44 @@ def postulaciones_qs(filtros):
     return qs
 
 
+def _residencia_label_valores(lugar, localidad_normalizada):
+    if not lugar:
+        return "Sin dato"
+    if lugar == "otro":
+        return localidad_normalizada or "Otro (sin especificar)"
+    return LUGAR_MAP.get(lugar, lugar)
+
+
 def _residencia_label(ph):
-    if not ph or not ph.lugar_residencia:
+    if not ph:
         return "Sin dato"
-    if ph.lugar_residencia == "otro":
-        return normalizar_localidad(ph.otro_lugar_residencia) or "Otro (sin especificar)"
-    return ph.get_lugar_residencia_display()
+    return _residencia_label_valores(ph.lugar_residencia, normalizar_localidad(ph.otro_lugar_residencia))
+
+
+def _demograficos(qs):
+    """Género, rango etario y residencia de los presentantes de `qs` que
+    están en el Registro Audiovisual, en una sola consulta agrupada. Se
+    devuelve una fila por combinación distinta, no por persona."""
+    filas = (
+        PersonaHumana.objects
+        .filter(user_id__in=qs.values("user_id"))
+        .annotate(rango=rango_sql())
+        .values("genero", "rango", "lugar_residencia", "localidad_normalizada")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    genero, rango_etario, residencia = Counter(), Counter(), Counter()
+    for f in filas:
+        g = GENERO_PH_MAP.get(f["genero"], "Sin dato") if f["genero"] else "Sin dato"
+        genero[g] += f["total"]
+        rango_etario[f["rango"]] += f["total"]
+        residencia[_residencia_label_valores(f["lugar_residencia"], f["localidad_normalizada"])] += f["total"]
+    return {
+        "registrados": sum(genero.values()),
+        "genero":      genero,
+        "rango":       rango_etario,
+        "residencia":  residencia,
+    }
 
 
 def agrupar(qs):
@@ -80,43 +114,29 @@ def agrupar(qs):
 
     # Demográficos: se cuenta cada presentante UNA vez, aunque tenga
     # varias postulaciones en el resultado filtrado.
-    user_ids = set(qs.values_list("user_id", flat=True))
-    personas = {
-        p.user_id: p
-        for p in PersonaHumana.objects.filter(user_id__in=user_ids)
-    }
-
-    genero_persona = {}
-    rango_etario   = {}
-    residencia     = {}
-
-    for uid in user_ids:
-        ph = personas.get(uid)
-
-        g_code = getattr(ph, "genero", None) or ""
-        g = GENERO_PH_MAP.get(g_code, "Sin dato") if g_code else "Sin dato"
-        genero_persona[g] = genero_persona.get(g, 0) + 1
-
-        r = rango(edad(ph))
-        rango_etario[r] = rango_etario.get(r, 0) + 1
-
-        loc = _residencia_label(ph)
-        residencia[loc] = residencia.get(loc, 0) + 1
+    presentantes = qs.order_by().values("user_id").distinct().count()
+    demograficos = _demograficos(qs)
+    # Los que no están en el Registro Audiovisual cuentan como "Sin dato",
+    # así cada tabla suma presentantes_unicos.
+    sin_registro = presentantes - demograficos["registrados"]
+    if sin_registro:
+        for clave in ("genero", "rango", "residencia"):
+            demograficos[clave]["Sin dato"] += sin_registro
 
     return {
         "por_tipo":        por_tipo,
         "por_genero_proy": por_genero_proy,
         "por_estado":      por_estado,
         "por_conv":        por_conv,
-        "presentantes_unicos": len(user_ids),
-        "sin_registro":    len(user_ids) - len(personas),
-        "genero_persona":  sorted(genero_persona.items()),
+        "presentantes_unicos": presentantes,
+        "sin_registro":    sin_registro,
+        "genero_persona":  sorted(demograficos["genero"].items()),
         "rango_etario":    [
-            (label, rango_etario[label])
+            (label, demograficos["rango"][label])
             for label in [r[0] for r in RANGOS_ETARIOS] + ["Sin dato"]
-            if label in rango_etario
+            if label in demograficos["rango"]
         ],
-        "residencia":      sorted(residencia.items(), key=lambda x: -x[1]),
+        "residencia":      sorted(demograficos["residencia"].items(), key=lambda x: -x[1]),
     }
 
 
@@ -144,6 +164,51 @@ def tasas(qs):
     ]}
 
 
+# (nombre, estado desde, estado hasta) de los tiempos del embudo
+ETAPAS_EMBUDO = [
+    ("Envío → admisión",             "enviado",           "admitido"),
+    ("Admisión → evaluación",        "admitido",          "evaluacion_jurado"),
+    ("Evaluación → selección",       "evaluacion_jurado", "seleccionado"),
+    ("Observación → nueva revisión", "observado",         "revision_admin"),
+]
+
+
+def _primera_vez(estado):
+    """Fecha en que la postulación llegó por primera vez a `estado`, según
+    el historial (CambioEstadoPostulacion)."""
+    return Subquery(
+        CambioEstadoPostulacion.objects
+        .filter(postulacion=OuterRef("pk"), estado=estado)
+        .order_by("fecha")
+        .values("fecha")[:1]
+    )
+
+
+def tiempos_embudo(qs):
+    """Días promedio entre etapas del embudo y postulaciones que pasaron por
+    `observado`, sobre el resultado filtrado. Todo se agrega en SQL a partir
+    del historial de estados; cada etapa cuenta solo las postulaciones que
+    tienen registradas las dos fechas."""
+    qs = qs.order_by()
+    embudo = []
+    for nombre, desde, hasta in ETAPAS_EMBUDO:
+        r = (
+            qs.annotate(desde=_primera_vez(desde), hasta=_primera_vez(hasta))
+            .filter(desde__isnull=False, hasta__gte=F("desde"))
+            .aggregate(
+                promedio=Avg(F("hasta") - F("desde"), output_field=DurationField()),
+                cantidad=Count("id"),
+            )
+        )
+        dias = round(r["promedio"].total_seconds() / 86400, 1) if r["promedio"] is not None else None
+        embudo.append({"nombre": nombre, "dias": dias, "detalle": f"{r['cantidad']} postulaciones"})
+
+    observadas = qs.filter(
+        Exists(CambioEstadoPostulacion.objects.filter(postulacion=OuterRef("pk"), estado="observado"))
+    ).count()
+    return {"embudo": embudo, "pasaron_por_observado": observadas}
+
+
 def evolucion_anual(filtros):
     """Series anuales para los gráficos de barras. Ignora el filtro de año
     (la evolución compara años entre sí) pero respeta los demás."""
@@ -219,15 +284,39 @@ def _aplicar_linea(qs, cfg, campo="convocatoria__linea"):
     return qs
 
 
-def _filtros(request, linea):
+def filtros_dashboard(linea, conv="", anio="", tipo="", solo_ganadores=False):
     cfg = LINEAS_DASHBOARD[linea]
     return {
         "linea_in":       cfg["linea_in"],
         "linea_out":      cfg["linea_out"],
-        "conv":           request.GET.get("conv", ""),
-        "anio":           request.GET.get("anio", ""),
-        "tipo":           request.GET.get("tipo", ""),
-        "solo_ganadores": request.GET.get("solo_ganadores", "") == "1",
+        "conv":           conv,
+        "anio":           anio,
+        "tipo":           tipo,
+        "solo_ganadores": solo_ganadores,
+    }
+
+
+def _filtros(request, linea):
+    return filtros_dashboard(
+        linea,
+        conv=request.GET.get("conv", ""),
+        anio=request.GET.get("anio", ""),
+        tipo=request.GET.get("tipo", ""),
+        solo_ganadores=request.GET.get("solo_ganadores", "") == "1",
+    )
+
+
+def datos_dashboard(filtros):
+    """Todos los agregados del dashboard para `filtros`. Es lo que se
+    guarda en SnapshotDashboard; el dashboard no lo llama directamente."""
+    qs = postulaciones_qs(filtros)
+    return {
+        "total": qs.count(),
+        **agrupar(qs),
+        **tasas(qs),
+        **tiempos_embudo(qs),
+        **evolucion_anual(filtros),
+        **impacto(filtros),
     }
 
 
@@ -244,24 +333,20 @@ def _dashboard(request, linea):
     )
 
     filtros = _filtros(request, linea)
-
-    qs    = postulaciones_qs(filtros)
-    datos = agrupar(qs)
+    datos, actualizado = snapshots.obtener(linea, filtros)
 
     return render(request, "estadisticas/dashboard.html", {
         "filtros":        filtros,
         "convocatorias":  convocatorias,
         "anios":          anios,
         "tipos":          Postulacion.TIPO_PROYECTO,
-        "total":          qs.count(),
         "nav_activo":     cfg["nav_activo"],
         "hero_subtitulo": cfg["hero_subtitulo"],
         "url_dashboard":  cfg["url_dashboard"],
         "url_exportar":   cfg["url_exportar"],
+        "actualizado":    actualizado,
+        "linea":          linea,
         **datos,
-        **tasas(qs),
-        **evolucion_anual(filtros),
-        **impacto(filtros),
     })
 
 
@@ -275,28 +360,11 @@ def dashboard_cash_rebate(request):
     return _dashboard(request, "cash_rebate")
 
 
-def _exportar(request, linea):
-    cfg = LINEAS_DASHBOARD[linea]
-    filtros = _filtros(request, linea)
-    qs = postulaciones_qs(filtros)
-
-    user_ids = qs.values_list("user_id", flat=True).distinct()
-    personas = {p.user_id: p for p in PersonaHumana.objects.filter(user_id__in=user_ids)}
-
-    wb = openpyxl.Workbook()
-
-    ws1 = wb.active
-    ws1.title = "Postulaciones"
-    write_headers(ws1, [
-        "ID", "Convocatoria", "Proyecto", "Tipo", "Género proyecto",
-        "Estado", "Fecha envío",
-        "Presentante", "CUIT/CUIL", "Género persona",
-        "Rango etario", "Lugar de residencia",
-    ])
-    for p in qs.order_by("convocatoria", "fecha_envio"):
-        ph = personas.get(p.user_id)
-        loc = _residencia_label(ph)
-        ws1.append([
+def _filas_postulaciones(qs):
+    qs = qs.select_related("user__persona_humana").order_by("convocatoria", "fecha_envio")
+    for p in qs.iterator(chunk_size=LOTE):
+        ph = getattr(p.user, "persona_humana", None)
+        yield [
             p.id,
             p.convocatoria.titulo,
             p.nombre_proyecto or "",
@@ -308,48 +376,74 @@ def _exportar(request, linea):
             ph.cuil_cuit if ph else "",
             ph.get_genero_display() if ph and ph.genero else "Sin dato",
             rango(edad(ph)),
-            loc,
-        ])
-    autowidth(ws1)
+            _residencia_label(ph),
+        ]
 
-    ws2 = wb.create_sheet("Resumen")
+
+def _filas_resumen(qs):
     datos = agrupar(qs)
-    fila = 1
-    fila = tabla_resumen(ws2, fila, "Por convocatoria (postulaciones)",
-                         [(r["label"], r["total"]) for r in datos["por_conv"]])
-    fila = tabla_resumen(ws2, fila, "Por tipo de proyecto (postulaciones)",
-                         [(r["label"], r["total"]) for r in datos["por_tipo"]])
-    fila = tabla_resumen(ws2, fila, "Por género del proyecto (postulaciones)",
-                         [(r["label"], r["total"]) for r in datos["por_genero_proy"]])
-    fila = tabla_resumen(ws2, fila, "Por estado (postulaciones)",
-                         [(r["label"], r["total"]) for r in datos["por_estado"]])
-    fila = tabla_resumen(ws2, fila, "Género (presentantes únicos)",  datos["genero_persona"])
-    fila = tabla_resumen(ws2, fila, "Rango etario (presentantes únicos)", datos["rango_etario"])
-    fila = tabla_resumen(ws2, fila, "Lugar de residencia (presentantes únicos)", datos["residencia"])
-    autowidth(ws2)
+    yield from filas_resumen("Por convocatoria (postulaciones)",
+                             [(r["label"], r["total"]) for r in datos["por_conv"]])
+    yield from filas_resumen("Por tipo de proyecto (postulaciones)",
+                             [(r["label"], r["total"]) for r in datos["por_tipo"]])
+    yield from filas_resumen("Por género del proyecto (postulaciones)",
+                             [(r["label"], r["total"]) for r in datos["por_genero_proy"]])
+    yield from filas_resumen("Por estado (postulaciones)",
+                             [(r["label"], r["total"]) for r in datos["por_estado"]])
+    yield from filas_resumen("Género (presentantes únicos)", datos["genero_persona"])
+    yield from filas_resumen("Rango etario (presentantes únicos)", datos["rango_etario"])
+    yield from filas_resumen("Lugar de residencia (presentantes únicos)", datos["residencia"])
+
+
+def _filas_impacto(imp):
+    for fila_imp in imp["impacto_filas"]:
+        yield [fila_imp["label"], Celda(fila_imp["monto"], "miles"),
+               Celda(fila_imp["cantidad"], "miles"), Celda(fila_imp["pct"] / 100, "porcentaje")]
+    yield ["TOTAL", Celda(imp["impacto_total"], "miles"),
+           Celda(imp["impacto_total_cantidad"], "miles"), Celda(1.0, "porcentaje")]
+
+
+def libro_postulaciones(parametros):
+    """(nombre de archivo, hojas) del informe de postulaciones. `parametros`
+    son los del request (linea, conv, anio, tipo, solo_ganadores); lo usan
+    la descarga directa y las exportaciones en segundo plano."""
+    linea = parametros.get("linea")
+    if linea not in LINEAS_DASHBOARD:
+        linea = "fomento"
+    cfg = LINEAS_DASHBOARD[linea]
+    filtros = filtros_dashboard(
+        linea,
+        conv=parametros.get("conv", ""),
+        anio=parametros.get("anio", ""),
+        tipo=parametros.get("tipo", ""),
+        solo_ganadores=parametros.get("solo_ganadores", "") == "1",
+    )
+    qs = postulaciones_qs(filtros)
+
+    hojas = [
+        Hoja("Postulaciones", _filas_postulaciones(qs), total=qs.count, encabezados=[
+            "ID", "Convocatoria", "Proyecto", "Tipo", "Género proyecto",
+            "Estado", "Fecha envío",
+            "Presentante", "CUIT/CUIL", "Género persona",
+            "Rango etario", "Lugar de residencia",
+        ]),
+        Hoja("Resumen", _filas_resumen(qs)),
+    ]
 
     # Hoja 3: impacto económico
     imp = impacto(filtros)
     if imp["impacto_count"] > 0:
-        ws3 = wb.create_sheet("Impacto económico")
-        write_headers(ws3, ["Categoría", "Monto ($)", "Contrataciones / ítems", "%"])
-        for fila_imp in imp["impacto_filas"]:
-            ws3.append([fila_imp["label"], fila_imp["monto"], fila_imp["cantidad"], fila_imp["pct"] / 100])
-        ws3.append(["TOTAL", imp["impacto_total"], imp["impacto_total_cantidad"], 1.0])
-        for col in [2, 3, 4]:
-            for cell in ws3.iter_rows(min_row=2, max_row=ws3.max_row, min_col=col, max_col=col):
-                for c in cell:
-                    c.number_format = '#,##0' if col in (2, 3) else '0.0%'
-        autowidth(ws3)
-
-    resp = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+        hojas.append(Hoja("Impacto económico", _filas_impacto(imp), encabezados=[
+            "Categoría", "Monto ($)", "Contrataciones / ítems", "%",
+        ]))
+
     base = cfg["archivo_label"]
     label = f"{base}_ganadores" if filtros["solo_ganadores"] else base
-    resp["Content-Disposition"] = f'attachment; filename="estadisticas_{label}.xlsx"'
-    wb.save(resp)
-    return resp
+    return f"estadisticas_{label}.xlsx", hojas
+
+
+def _exportar(request, linea):
+    return respuesta_xlsx(*libro_postulaciones({**request.GET.dict(), "linea": linea}))
 
 
 @staff_member_required
@@ -10,20 +10,15 @@ Filtros: localidad (residencia de PH / localidad fiscal de PJ) y
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Count, Q
-from django.http import HttpResponse
-
-import openpyxl
 
+from exportaciones.xlsx import LOTE, Hoja, filas_resumen, respuesta_xlsx
 from registro_audiovisual.models import (
     PersonaHumana, PersonaJuridica, GENERO_CHOICES,
     AREA_DESEMPENO, AREA_DESEMPENO_PPJJ, LUGARES_RESIDENCIA,
     NIVEL_EDUCATIVO_CHOICES, SITUACION_IVA, TIPO_PERSONA_JURIDICA_CHOICES,
 )
 
-from .comun import (
-    conteo, normalizar_localidad, filas_barras,
-    write_headers, tabla_resumen, autowidth, edad, rango,
-)
+from .comun import conteo, filas_barras, edad, rango
 
 
 AREA_MAP      = dict(AREA_DESEMPENO)
@@ -58,12 +53,18 @@ def _residencia(ph_qs):
     cargado (normalizado), en vez de agrupar localidades distintas
     en una sola fila."""
     filas = {}
-    for lugar, otro in ph_qs.values_list("lugar_residencia", "otro_lugar_residencia"):
+    agrupado = (
+        ph_qs.values("lugar_residencia", "localidad_normalizada")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for r in agrupado:
+        lugar = r["lugar_residencia"]
         if lugar == "otro":
-            label = normalizar_localidad(otro) or "Otro (sin especificar)"
+            label = r["localidad_normalizada"] or "Otro (sin especificar)"
         else:
             label = LUGAR_MAP.get(lugar) or (lugar or "Sin dato")
-        filas[label] = filas.get(label, 0) + 1
+        filas[label] = filas.get(label, 0) + r["total"]
     return [
         {"label": label, "total": total}
         for label, total in sorted(filas.items(), key=lambda x: -x[1])
@@ -131,26 +132,13 @@ def dashboard_registro(request):
     })
 
 
-@staff_member_required
-def exportar_registro(request):
-    filtros = _filtros(request)
-    ph, pj = _querysets(filtros)
-
-    wb = openpyxl.Workbook()
-
-    ws1 = wb.active
-    ws1.title = "Personas humanas"
-    write_headers(ws1, [
-        "Nombre", "Apellido", "CUIL/CUIT", "Género", "Rango etario",
-        "Nivel educativo", "Localidad", "Área principal", "Área secundaria",
-        "Área cultural", "Situación IVA", "Email", "Teléfono",
-    ])
-    for p in ph.order_by("apellido", "nombre"):
+def _filas_humanas(ph_qs):
+    for p in ph_qs.order_by("apellido", "nombre").iterator(chunk_size=LOTE):
         if p.lugar_residencia == "otro":
-            loc = normalizar_localidad(p.otro_lugar_residencia) or "Otro (sin especificar)"
+            loc = p.localidad_normalizada or "Otro (sin especificar)"
         else:
             loc = p.get_lugar_residencia_display() if p.lugar_residencia else "Sin dato"
-        ws1.append([
+        yield [
             p.nombre, p.apellido, p.cuil_cuit,
             p.get_genero_display() if p.genero else "Sin dato",
             rango(edad(p)),
@@ -161,16 +149,12 @@ def exportar_registro(request):
             p.get_area_cultural_display() if p.area_cultural else "",
             p.get_situacion_iva_display() if p.situacion_iva else "",
             p.email, p.telefono,
-        ])
-    autowidth(ws1)
-
-    ws2 = wb.create_sheet("Personas jurídicas")
-    write_headers(ws2, [
-        "Razón social", "Nombre comercial", "CUIT", "Tipo", "Área principal",
-        "Localidad fiscal", "Situación IVA", "Fecha constitución", "Email", "Teléfono",
-    ])
-    for p in pj.order_by("razon_social"):
-        ws2.append([
+        ]
+
+
+def _filas_juridicas(pj_qs):
+    for p in pj_qs.order_by("razon_social").iterator(chunk_size=LOTE):
+        yield [
             p.razon_social, p.nombre_comercial or "", p.cuil_cuit,
             p.get_tipo_persona_juridica_display(),
             p.get_area_desempeno_JJPP_1_display() if p.area_desempeno_JJPP_1 else "",
@@ -178,28 +162,43 @@ def exportar_registro(request):
             p.get_situacion_iva_display() if p.situacion_iva else "",
             p.fecha_constitucion.strftime("%d/%m/%Y") if p.fecha_constitucion else "",
             p.email, p.telefono,
-        ])
-    autowidth(ws2)
-
-    ws3 = wb.create_sheet("Resumen")
-    fila = 1
-    fila = tabla_resumen(ws3, fila, "Roles predominantes (área principal)",
-                         [(r["label"], r["total"]) for r in conteo(ph, "area_desempeno_1", AREA_MAP)])
-    fila = tabla_resumen(ws3, fila, "Técnicos disponibles por área",
-                         [(r["label"], r["total"]) for r in _tecnicos_por_area(ph)])
-    fila = tabla_resumen(ws3, fila, "Ubicación territorial",
-                         [(r["label"], r["total"]) for r in _residencia(ph)])
-    fila = tabla_resumen(ws3, fila, "Género",
-                         [(r["label"], r["total"]) for r in conteo(ph, "genero", GENERO_PH_MAP)])
-    fila = tabla_resumen(ws3, fila, "Nivel educativo",
-                         [(r["label"], r["total"]) for r in conteo(ph, "nivel_educativo", NIVEL_MAP)])
-    fila = tabla_resumen(ws3, fila, "Tipo de persona jurídica",
-                         [(r["label"], r["total"]) for r in conteo(pj, "tipo_persona_juridica", TIPO_PJ_MAP)])
-    autowidth(ws3)
-
-    resp = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    resp["Content-Disposition"] = 'attachment; filename="estadisticas_registro.xlsx"'
-    wb.save(resp)
-    return resp
+        ]
+
+
+def _filas_resumen(ph, pj):
+    yield from filas_resumen("Roles predominantes (área principal)",
+                             [(r["label"], r["total"]) for r in conteo(ph, "area_desempeno_1", AREA_MAP)])
+    yield from filas_resumen("Técnicos disponibles por área",
+                             [(r["label"], r["total"]) for r in _tecnicos_por_area(ph)])
+    yield from filas_resumen("Ubicación territorial",
+                             [(r["label"], r["total"]) for r in _residencia(ph)])
+    yield from filas_resumen("Género",
+                             [(r["label"], r["total"]) for r in conteo(ph, "genero", GENERO_PH_MAP)])
+    yield from filas_resumen("Nivel educativo",
+                             [(r["label"], r["total"]) for r in conteo(ph, "nivel_educativo", NIVEL_MAP)])
+    yield from filas_resumen("Tipo de persona jurídica",
+                             [(r["label"], r["total"]) for r in conteo(pj, "tipo_persona_juridica", TIPO_PJ_MAP)])
+
+
+def libro_registro(parametros):
+    """(nombre de archivo, hojas) del informe del registro, filtrado por
+    loc / area. Lo usan la descarga directa y las exportaciones en segundo plano."""
+    ph, pj = _querysets({"loc": parametros.get("loc", ""), "area": parametros.get("area", "")})
+
+    return "estadisticas_registro.xlsx", [
+        Hoja("Personas humanas", _filas_humanas(ph), total=ph.count, encabezados=[
+            "Nombre", "Apellido", "CUIL/CUIT", "Género", "Rango etario",
+            "Nivel educativo", "Localidad", "Área principal", "Área secundaria",
+            "Área cultural", "Situación IVA", "Email", "Teléfono",
+        ]),
+        Hoja("Personas jurídicas", _filas_juridicas(pj), total=pj.count, encabezados=[
+            "Razón social", "Nombre comercial", "CUIT", "Tipo", "Área principal",
+            "Localidad fiscal", "Situación IVA", "Fecha constitución", "Email", "Teléfono",
+        ]),
+        Hoja("Resumen", _filas_resumen(ph, pj)),
+    ]
+
+
+@staff_member_required
+def exportar_registro(request):
+    return respuesta_xlsx(*libro_registro(_filtros(request)))
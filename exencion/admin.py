@@ -7,7 +7,9 @@ from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.html import format_html, format_html_join
 
-from . import depuracion
+from correos import cola
+
+from . import constancias, depuracion
 from .models import Exencion, ExencionDocumento, ObservacionAdministrativaExencion
 
 
@@ -82,9 +84,10 @@ class ExencionAdmin(admin.ModelAdmin):
         "cuit",
         "email",
         "convocatoria_display",
+        "constancia_display",
     )
 
-    list_filter = (ArchivadaFilter, "estado", "fecha_creacion")
+    list_filter = (ArchivadaFilter, "estado", "constancia_estado", "fecha_creacion")
     search_fields = ("nombre_razon_social", "cuit", "email")
 
     actions = [
@@ -102,6 +105,9 @@ class ExencionAdmin(admin.ModelAdmin):
         "fecha_emision",
         "fecha_vencimiento",
         "certificado_pdf",
+        "constancia_estado",
+        "constancia_error",
+        "constancia_enviada",
 
         # ✅ presentante como en Postulación
         "presentante",
@@ -130,6 +136,9 @@ class ExencionAdmin(admin.ModelAdmin):
                 "estado",
                 "convocatoria",
                 "certificado_pdf",
+                "constancia_estado",
+                "constancia_error",
+                "constancia_enviada",
                 "fecha_emision",
                 "fecha_vencimiento",
                 "documentacion_depurada",
@@ -206,6 +215,20 @@ class ExencionAdmin(admin.ModelAdmin):
     convocatoria_display.short_description = "Convocatoria"
     convocatoria_display.admin_order_field = "convocatoria__titulo"
 
+    # -------------------------------------------------
+    # ESTADO DE LA CONSTANCIA (emisión en segundo plano)
+    # -------------------------------------------------
+    def constancia_display(self, obj):
+        if not obj.constancia_estado:
+            return "—"
+        etiqueta = obj.get_constancia_estado_display()
+        if obj.constancia_estado == "ERROR":
+            return format_html('<span title="{}" style="color:#b02a37;">{}</span>', obj.constancia_error, etiqueta)
+        return etiqueta
+
+    constancia_display.short_description = "Constancia"
+    constancia_display.admin_order_field = "constancia_estado"
+
     # -------------------------------------------------
     # RESUMEN DE DOCUMENTACIÓN (HTML REAL, no texto)
     # -------------------------------------------------
@@ -261,32 +284,19 @@ class ExencionAdmin(admin.ModelAdmin):
     # -------------------------------------------------
     @admin.action(description="Aprobar exención y emitir constancia PDF")
     def aprobar_exencion_y_emitir_pdf(self, request, queryset):
-
-        procesadas = 0
+        # Solo aprueba y encola: el PDF y el mail los hace el comando
+        # emitir_constancias (exencion/constancias.py). Volver a correrla
+        # sobre una aprobada con la constancia en error la reintenta.
+        encoladas = 0
         saltadas = 0
 
         for exencion in queryset:
 
-            if exencion.estado != "ENVIADA":
+            if not constancias.se_puede_encolar(exencion):
                 saltadas += 1
                 continue
 
-            faltan = []
-            if not exencion.domicilio_fiscal:
-                faltan.append("domicilio_fiscal")
-            if not exencion.codigo_postal_fiscal:
-                faltan.append("codigo_postal_fiscal")
-            if not exencion.localidad_fiscal:
-                faltan.append("localidad_fiscal")
-            if not exencion.actividad_dgr:
-                faltan.append("actividad_dgr")
-            if not exencion.cuit:
-                faltan.append("cuit")
-            if not exencion.nombre_razon_social:
-                faltan.append("nombre_razon_social")
-            if not exencion.email:
-                faltan.append("email")
-
+            faltan = constancias.datos_faltantes(exencion)
             if faltan:
                 self.message_user(
                     request,
@@ -295,25 +305,13 @@ class ExencionAdmin(admin.ModelAdmin):
                 )
                 continue
 
-            try:
-                exencion.aprobar_y_generar_pdf()
-                self.message_user(
-                    request,
-                    f"OK Exención #{exencion.id}: PDF generado y (si correspondía) email enviado.",
-                    level=messages.SUCCESS
-                )
-                procesadas += 1
-
-            except Exception as e:
-                self.message_user(
-                    request,
-                    f"ERROR al generar/enviar Exención #{exencion.id}: {type(e).__name__} - {e}",
-                    level=messages.ERROR
-                )
+            constancias.encolar(exencion)
+            encoladas += 1
 
         self.message_user(
             request,
-            f"{procesadas} exención/es aprobada/s y procesadas. {saltadas} saltada/s (no estaban ENVIADAS).",
+            f"{encoladas} exención/es aprobada/s; la constancia se genera y envía en segundo plano "
+            f"(columna «Constancia»). {saltadas} saltada/s (no estaban ENVIADAS ni con la constancia en error).",
             level=messages.SUCCESS
         )
 
@@ -356,9 +354,9 @@ class ExencionAdmin(admin.ModelAdmin):
                     email = EmailMultiAlternatives(subject=asunto, body=texto, to=[destinatario])
                     if html:
                         email.attach_alternative(html, "text/html")
-                    email.send(fail_silently=True)
+                    cola.encolar(email, origen="exencion.rechazo")
                 except Exception as e:
-                    self.message_user(request, f"Error enviando email para #{exencion.id}: {e}", level=messages.WARNING)
+                    self.message_user(request, f"Error encolando email para #{exencion.id}: {e}", level=messages.WARNING)
 
             self.message_user(request, f"Exención #{exencion.id} rechazada.", level=messages.SUCCESS)
             procesadas += 1
@@ -530,8 +528,8 @@ class ObservacionAdministrativaExencionAdmin(admin.ModelAdmin):
             )
             if html:
                 email.attach_alternative(html, "text/html")
-            email.send(fail_silently=False)
+            cola.encolar(email, origen="exencion.subsanacion")
 
-            messages.success(request, f"Email de subsanación (Exención) enviado a {destinatario}.")
+            messages.success(request, f"Email de subsanación (Exención) encolado para {destinatario}.")
         except Exception as e:
-            messages.error(request, f"No se pudo enviar el email de subsanación (Exención): {e}")
+            messages.error(request, f"No se pudo encolar el email de subsanación (Exención): {e}")
@@ -0,0 +1,174 @@
+"""Emisión de constancias de exención en segundo plano.
+
+Aprobar una tanda de exenciones a principio de año generaba cada PDF con
+WeasyPrint y mandaba cada mail dentro del request del admin, una tras otra.
+Ahora la acción del admin solo aprueba y deja la constancia PENDIENTE; el
+comando emitir_constancias la genera y la manda por mail.
+
+Reparto del trabajo:
+- El HTML de la constancia se arma en el proceso principal (usa la base y
+  los templates de Django).
+- El paso HTML → PDF, que es lo que consume CPU, corre en un pool de
+  procesos (`renderizar_pdf` no toca Django).
+- Guardar el archivo y encolar el mail (correos/cola.py) vuelve a hacerse
+  en el proceso principal, a medida que terminan los PDF.
+
+Reintentos: volver a aprobar (o re-encolar) una exención con la constancia en
+ERROR la deja PENDIENTE otra vez. Si el mail ya había salido
+(`constancia_enviada`), el reintento solo regenera el PDF y no lo reenvía.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+from .models import Exencion
+from .utils import html_constancia, renderizar_pdf
+
+logger = logging.getLogger(__name__)
+
+# una constancia EN_PROCESO sin terminar después de esto se considera
+# abandonada (comando cortado a mitad de camino) y vuelve a la cola
+ABANDONO = timedelta(minutes=30)
+
+CAMPOS_OBLIGATORIOS = (
+    "domicilio_fiscal",
+    "codigo_postal_fiscal",
+    "localidad_fiscal",
+    "actividad_dgr",
+    "cuit",
+    "nombre_razon_social",
+    "email",
+)
+
+
+def datos_faltantes(exencion):
+    return [campo for campo in CAMPOS_OBLIGATORIOS if not getattr(exencion, campo)]
+
+
+def procesos_por_defecto():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+# ──────────────────────────────────────────────────────────────
+# Pedido (admin)
+# ──────────────────────────────────────────────────────────────
+
+def se_puede_encolar(exencion):
+    """ENVIADA (se aprueba al encolar) o ya APROBADA con la constancia sin
+    emitir o con error (reintento)."""
+    if exencion.estado == "ENVIADA":
+        return True
+    return exencion.estado == "APROBADA" and exencion.constancia_estado in ("", "ERROR")
+
+
+def encolar(exencion):
+    """Aprueba `exencion` si hace falta y deja su constancia PENDIENTE."""
+    if exencion.estado != "APROBADA":
+        exencion.marcar_aprobada()
+    exencion.constancia_estado = "PENDIENTE"
+    exencion.constancia_error = ""
+    exencion.constancia_solicitada = timezone.now()
+    exencion.save(update_fields=["constancia_estado", "constancia_error", "constancia_solicitada"])
+
+
+# ──────────────────────────────────────────────────────────────
+# Emisión (comando)
+# ──────────────────────────────────────────────────────────────
+
+def tomar_pendientes(limite=None):
+    """Marca como EN_PROCESO las constancias pendientes y las devuelve. El
+    update condicional evita que dos comandos tomen la misma."""
+    ids = list(
+        Exencion.objects.filter(constancia_estado="PENDIENTE")
+        .order_by("constancia_solicitada", "pk")
+        .values_list("pk", flat=True)[:limite]
+    )
+    tomadas = []
+    for pk in ids:
+        if Exencion.objects.filter(pk=pk, constancia_estado="PENDIENTE").update(
+            constancia_estado="EN_PROCESO", constancia_iniciada=timezone.now(),
+        ):
+            tomadas.append(pk)
+    return list(Exencion.objects.filter(pk__in=tomadas).select_related("user").order_by("pk"))
+
+
+def _fallar(exencion, exc):
+    logger.exception("Falló la constancia de la exención %s", exencion.pk)
+    Exencion.objects.filter(pk=exencion.pk).update(
+        constancia_estado="ERROR", constancia_error=f"{type(exc).__name__}: {exc}",
+    )
+
+
+def _terminar(exencion, pdf_content):
+    """Guarda el PDF, manda el mail si todavía no salió y la deja LISTA."""
+    exencion.guardar_constancia(pdf_content)
+    if exencion.constancia_enviada is None:
+        exencion.enviar_constancia(pdf_content)
+        exencion.constancia_enviada = timezone.now()
+    exencion.constancia_estado = "LISTA"
+    exencion.constancia_error = ""
+    exencion.save(update_fields=["constancia_estado", "constancia_error", "constancia_enviada"])
+
+
+def emitir(exenciones, procesos=1):
+    """Genera y envía las constancias de `exenciones` (ya tomadas). Con
+    procesos > 1 los PDF se renderizan en un pool de procesos. Devuelve
+    (emitidas, con_error)."""
+    emitidas = errores = 0
+
+    preparadas = []
+    for exencion in exenciones:
+        try:
+            preparadas.append((exencion, html_constancia(exencion)))
+        except Exception as exc:
+            _fallar(exencion, exc)
+            errores += 1
+
+    def cerrar(exencion, obtener_pdf):
+        nonlocal emitidas, errores
+        try:
+            _terminar(exencion, obtener_pdf())
+            emitidas += 1
+        except Exception as exc:
+            _fallar(exencion, exc)
+            errores += 1
+
+    if procesos <= 1 or len(preparadas) <= 1:
+        for exencion, (html, css) in preparadas:
+            cerrar(exencion, lambda: renderizar_pdf(html, css))
+        return emitidas, errores
+
+    # Los hijos no usan la base; se cierran las conexiones para que no
+    # hereden el socket abierto del proceso principal.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [
+            (exencion, pool.submit(renderizar_pdf, html, css))
+            for exencion, (html, css) in preparadas
+        ]
+        for exencion, futuro in futuros:
+            cerrar(exencion, futuro.result)
+    return emitidas, errores
+
+
+def procesar_pendientes(procesos=1, lote=50):
+    """Emite todas las constancias en cola, de a `lote`. Devuelve
+    (emitidas, con_error)."""
+    emitidas = errores = 0
+    while exenciones := tomar_pendientes(lote):
+        hechas, fallidas = emitir(exenciones, procesos=procesos)
+        emitidas += hechas
+        errores += fallidas
+    return emitidas, errores
+
+
+def reencolar_abandonadas():
+    """Vuelve a PENDIENTE las constancias EN_PROCESO que quedaron colgadas."""
+    limite = timezone.now() - ABANDONO
+    return Exencion.objects.filter(
+        constancia_estado="EN_PROCESO", constancia_iniciada__lt=limite,
+    ).update(constancia_estado="PENDIENTE")
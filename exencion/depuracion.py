@@ -16,6 +16,8 @@ Quedan protegidas: las vigentes (aprobadas sin vencer) y las en trámite
 from django.db.models import Q
 from django.utils import timezone
 
+from convocatorias import archivos
+
 from .models import Exencion, ExencionDocumento
 
 
@@ -40,7 +42,9 @@ def exenciones_depurables(hoy=None):
 def resumen(qs, incluir_constancia=True):
     """Qué borraría la depuración, sin borrar nada."""
     docs = ExencionDocumento.objects.filter(exencion__in=qs)
-    total_bytes = sum(_tamano(d.archivo) for d in docs)
+    # Documentos subidos: tamaño registrado al subir. La constancia se
+    # genera acá mismo y no lo registra, así que se mide en disco.
+    total_bytes = archivos.total_bytes(docs)
     constancias = 0
     if incluir_constancia:
         for ex in qs.exclude(certificado_pdf="").exclude(certificado_pdf__isnull=True):
@@ -49,6 +53,7 @@ def resumen(qs, incluir_constancia=True):
     return {
         "exenciones": qs.count(),
         "documentos": docs.count(),
+        "sin_tamano": archivos.sin_tamano(docs),
         "constancias": constancias,
         "total_bytes": total_bytes,
     }
@@ -45,6 +45,11 @@ class Command(BaseCommand):
             f"Exenciones: {info['exenciones']} · Documentos: {info['documentos']} · "
             f"Constancias: {info['constancias']} · Espacio a liberar: {depuracion.mb(info['total_bytes'])}"
         )
+        if info["sin_tamano"]:
+            self.stdout.write(self.style.NOTICE(
+                f"{info['sin_tamano']} documentos sin tamaño registrado no suman al espacio "
+                "(correr completar_huellas_archivos)."
+            ))
 
         if info["exenciones"] == 0:
             self.stdout.write("Nada para depurar.")
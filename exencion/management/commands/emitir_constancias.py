@@ -0,0 +1,55 @@
+"""
+Genera y envía por mail las constancias de exención pendientes.
+
+La acción "Aprobar exención y emitir constancia PDF" del admin solo aprueba
+y deja la constancia PENDIENTE; este comando renderiza los PDF en un pool de
+procesos (--procesos), los guarda y manda cada mail. En cada corrida también
+reencola las constancias que quedaron colgadas a mitad de camino.
+
+La lógica vive en exencion/constancias.py.
+
+Uso manual:
+    python manage.py emitir_constancias
+    python manage.py emitir_constancias --procesos 4
+
+Configurar en cron (ej. cada minuto):
+    * * * * * /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py emitir_constancias
+"""
+from django.core.management.base import BaseCommand
+
+from exencion import constancias
+
+
+class Command(BaseCommand):
+    help = "Genera y envía las constancias de exención pendientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--procesos",
+            type=int,
+            default=constancias.procesos_por_defecto(),
+            help="Procesos para renderizar los PDF (default: núcleos - 1).",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=50,
+            help="Constancias que se toman por vuelta (default: 50).",
+        )
+
+    def handle(self, *args, **opts):
+        reencoladas = constancias.reencolar_abandonadas()
+        if reencoladas:
+            self.stdout.write(f"Reencoladas (abandonadas): {reencoladas}.")
+
+        emitidas, errores = constancias.procesar_pendientes(
+            procesos=opts["procesos"], lote=opts["lote"],
+        )
+        if not emitidas and not errores:
+            self.stdout.write("No hay constancias pendientes.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Constancias emitidas: {emitidas}."))
+        if errores:
+            self.stdout.write(self.style.ERROR(
+                f"Constancias con error: {errores} (ver el detalle en el admin)."
+            ))
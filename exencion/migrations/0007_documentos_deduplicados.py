@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:05
+
+import convocatorias.archivos
+import exencion.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exencion', '0006_huellas_archivos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exenciondocumento',
+            name='archivo',
+            field=models.FileField(storage=convocatorias.archivos.almacenamiento_documentos, upload_to='exencion/documentos/', validators=[exencion.models.validar_pdf, exencion.models.validar_tamano_5mb]),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exencion', '0007_documentos_deduplicados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exencion',
+            name='constancia_enviada',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Constancia enviada por mail el'),
+        ),
+        migrations.AddField(
+            model_name='exencion',
+            name='constancia_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='exencion',
+            name='constancia_estado',
+            field=models.CharField(blank=True, choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'Generándose'), ('LISTA', 'Emitida'), ('ERROR', 'Error')], db_index=True, max_length=20, verbose_name='Constancia'),
+        ),
+        migrations.AddField(
+            model_name='exencion',
+            name='constancia_iniciada',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exencion',
+            name='constancia_solicitada',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
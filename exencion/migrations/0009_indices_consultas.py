@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exencion', '0008_constancia_en_segundo_plano'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exencion',
+            index=models.Index(fields=['estado', 'fecha_vencimiento'], name='exencion_estado_vencimiento'),
+        ),
+    ]
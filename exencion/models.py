@@ -9,7 +9,9 @@ from django.core.exceptions import ValidationError
 from django.db.models.signals import post_delete, pre_save
 from django.dispatch import receiver
 
+from convocatorias import archivos
 from convocatorias.models import Convocatoria
+from correos import cola
 from registro_audiovisual.models import PersonaHumana, PersonaJuridica, LUGARES_RESIDENCIA
 from .utils import generar_pdf_exencion
 import uuid
@@ -41,6 +43,13 @@ ESTADOS_EXENCION = [
     ("RECHAZADA", "Rechazada"),
 ]
 
+ESTADOS_CONSTANCIA = [
+    ("PENDIENTE", "Pendiente"),
+    ("EN_PROCESO", "Generándose"),
+    ("LISTA", "Emitida"),
+    ("ERROR", "Error"),
+]
+
 
 class Exencion(models.Model):
     user = models.ForeignKey(
@@ -100,6 +109,21 @@ class Exencion(models.Model):
         null=True
     )
 
+    # Emisión de la constancia en segundo plano (exencion/constancias.py):
+    # aprobar la deja PENDIENTE y el comando emitir_constancias genera el
+    # PDF y lo manda por mail. `constancia_enviada` evita reenviar el mail
+    # si hay que reintentar.
+    constancia_estado = models.CharField(
+        max_length=20, choices=ESTADOS_CONSTANCIA, blank=True, db_index=True,
+        verbose_name="Constancia",
+    )
+    constancia_error      = models.TextField(blank=True)
+    constancia_solicitada = models.DateTimeField(null=True, blank=True)
+    constancia_iniciada   = models.DateTimeField(null=True, blank=True)
+    constancia_enviada    = models.DateTimeField(
+        null=True, blank=True, verbose_name="Constancia enviada por mail el",
+    )
+
     # Fecha en que se depuró la documentación (documentos subidos y
     # constancia). Los datos de la exención se conservan: es el histórico.
     # Al estar seteada, la exención se considera archivada.
@@ -116,6 +140,10 @@ class Exencion(models.Model):
         ordering = ["-fecha_creacion"]
         verbose_name = "Exención impositiva"
         verbose_name_plural = "Exenciones impositivas"
+        indexes = [
+            # vigentes (estadísticas) y vencidas a depurar (depuracion.py)
+            models.Index(fields=["estado", "fecha_vencimiento"], name="exencion_estado_vencimiento"),
+        ]
 
     def __str__(self):
         return f"Exención #{self.id} – {self.nombre_razon_social}"
@@ -136,50 +164,42 @@ class Exencion(models.Model):
         self.fecha_vencimiento = datetime.date(hoy.year + 1, 1, 1)
         self.save(update_fields=["estado", "fecha_emision", "fecha_vencimiento"])
 
-    def aprobar_y_generar_pdf(self):
-        """
-        Aprueba la exención, genera el PDF y lo envía por mail.
-        """
-        # 1) Aprobar
-        self.marcar_aprobada()
-
-        # 2) Generar PDF
-        pdf_content = generar_pdf_exencion(self)
-        filename = f"Constancia_{self.numero_constancia}.pdf"
+    @property
+    def nombre_constancia(self):
+        return f"Constancia_{self.numero_constancia}.pdf"
 
-        self.certificado_pdf.save(
-            filename,
-            ContentFile(pdf_content),
-            save=True
-        )
+    def guardar_constancia(self, pdf_content):
+        self.certificado_pdf.save(self.nombre_constancia, ContentFile(pdf_content), save=True)
 
-        # 3) Enviar correo
+    def enviar_constancia(self, pdf_content):
+        """Encola el mail con la constancia para el presentante (si hay a quién)."""
         destinatario = self.user.email or self.email
-        if destinatario:
-            asunto = f"Constancia de exención {self.numero_constancia}"
-            texto = (
-                f"Hola {self.nombre_razon_social},\n\n"
-                "Tu solicitud de exención impositiva fue aprobada.\n"
-                "Adjuntamos la constancia en formato PDF.\n\n"
-                "Dirección de Audiovisuales · Secretaría de Cultura · Provincia de Salta"
-            )
-            try:
-                html = render_to_string(
-                    "exencion/aprobacion_email.html",
-                    {"exencion": self, "user": self.user},
-                )
-            except Exception:
-                html = None
-
-            email = EmailMultiAlternatives(
-                subject=asunto,
-                body=texto,
-                to=[destinatario],
+        if not destinatario:
+            return
+        asunto = f"Constancia de exención {self.numero_constancia}"
+        texto = (
+            f"Hola {self.nombre_razon_social},\n\n"
+            "Tu solicitud de exención impositiva fue aprobada.\n"
+            "Adjuntamos la constancia en formato PDF.\n\n"
+            "Dirección de Audiovisuales · Secretaría de Cultura · Provincia de Salta"
+        )
+        try:
+            html = render_to_string(
+                "exencion/aprobacion_email.html",
+                {"exencion": self, "user": self.user},
             )
-            if html:
-                email.attach_alternative(html, "text/html")
-            email.attach(filename, pdf_content, "application/pdf")
-            email.send()
+        except Exception:
+            html = None
+
+        email = EmailMultiAlternatives(
+            subject=asunto,
+            body=texto,
+            to=[destinatario],
+        )
+        if html:
+            email.attach_alternative(html, "text/html")
+        email.attach(self.nombre_constancia, pdf_content, "application/pdf")
+        cola.encolar(email, origen="exencion.constancia")
 
     def regenerar_pdf(self):
         """
@@ -187,9 +207,7 @@ class Exencion(models.Model):
         sin re-aprobar ni enviar mail. Sirve para recuperar una constancia
         cuya copia en disco fue depurada.
         """
-        pdf_content = generar_pdf_exencion(self)
-        filename = f"Constancia_{self.numero_constancia}.pdf"
-        self.certificado_pdf.save(filename, ContentFile(pdf_content), save=True)
+        self.guardar_constancia(generar_pdf_exencion(self))
 
 
 # ============================================================
@@ -279,8 +297,12 @@ class ExencionDocumento(models.Model):
 
     archivo = models.FileField(
         upload_to="exencion/documentos/",
+        storage=archivos.almacenamiento_documentos,
         validators=[validar_pdf, validar_tamano_5mb],
     )
+    # Tamaño y huella al subir (convocatorias/archivos.py)
+    archivo_bytes  = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    archivo_sha256 = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
 
     fecha_subida = models.DateTimeField(auto_now_add=True)
 
@@ -355,3 +377,9 @@ def borrar_constancia_anterior_al_regenerar(sender, instance, **kwargs):
         return
     if anterior and anterior != instance.certificado_pdf:
         anterior.delete(save=False)
+
+
+@receiver(pre_save, sender=ExencionDocumento)
+def registrar_huella_documento_exencion(sender, instance, **kwargs):
+    # Tamaño y huella al subir (convocatorias/archivos.py)
+    archivos.registrar(instance, "archivo")
@@ -3,6 +3,7 @@ import shutil
 import tempfile
 from datetime import date, timedelta
 from io import StringIO
+from unittest import mock
 
 from django.contrib.auth.models import Permission, User
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -11,7 +12,8 @@ from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
-from exencion import depuracion
+from exencion import constancias, depuracion
+from correos.models import CorreoSaliente
 from exencion.models import Exencion, ExencionDocumento
 
 MEDIA_TEST = tempfile.mkdtemp(prefix="test_exencion_")
@@ -219,3 +221,78 @@ class AdminExencionTest(TestCase):
         r2 = self.client.get(self.URL + "?archivada=archivadas")
         ids2 = [e.pk for e in r2.context["cl"].result_list]
         self.assertIn(self.vencida.pk, ids2)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEST)
+class ConstanciasEnSegundoPlanoTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEST, ignore_errors=True)
+
+    def setUp(self):
+        for destino, valor in (("html_constancia", ("<p>c</p>", "c.css")),
+                               ("renderizar_pdf", b"%PDF- generada")):
+            patcher = mock.patch.object(constancias, destino, return_value=valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_encolar_aprueba_sin_generar(self):
+        ex = crear_exencion(estado="ENVIADA", con_constancia=False)
+        constancias.encolar(ex)
+        ex.refresh_from_db()
+        self.assertEqual(ex.estado, "APROBADA")
+        self.assertEqual(ex.constancia_estado, "PENDIENTE")
+        self.assertFalse(ex.certificado_pdf)
+        self.assertFalse(CorreoSaliente.objects.exists())
+
+    def test_comando_genera_y_envia_una_vez(self):
+        ex = crear_exencion(estado="ENVIADA", con_constancia=False)
+        constancias.encolar(ex)
+        call_command("emitir_constancias", procesos=1, stdout=StringIO())
+        ex.refresh_from_db()
+        self.assertEqual(ex.constancia_estado, "LISTA")
+        self.assertTrue(ex.certificado_pdf)
+        self.assertIsNotNone(ex.constancia_enviada)
+        self.assertEqual(CorreoSaliente.objects.filter(origen="exencion.constancia").count(), 1)
+
+        # Reintento (p. ej. el PDF se perdió): regenera sin reenviar el mail
+        ex.constancia_estado = "ERROR"
+        ex.save(update_fields=["constancia_estado"])
+        self.assertTrue(constancias.se_puede_encolar(ex))
+        constancias.encolar(ex)
+        constancias.procesar_pendientes()
+        ex.refresh_from_db()
+        self.assertEqual(ex.constancia_estado, "LISTA")
+        self.assertEqual(CorreoSaliente.objects.count(), 1, "no se reenvía la constancia")
+
+    def test_error_queda_registrado_y_no_bloquea_las_demas(self):
+        mala = crear_exencion(estado="ENVIADA", con_constancia=False)
+        buena = crear_exencion(estado="ENVIADA", con_constancia=False)
+        constancias.encolar(mala)
+        constancias.encolar(buena)
+
+        def renderizar(html, css):
+            if "mala" in html:
+                raise RuntimeError("weasyprint")
+            return b"%PDF- ok"
+
+        constancias.html_constancia.side_effect = [("<p>mala</p>", "c.css"), ("<p>buena</p>", "c.css")]
+        constancias.renderizar_pdf.side_effect = renderizar
+        emitidas, errores = constancias.procesar_pendientes()
+        self.assertEqual((emitidas, errores), (1, 1))
+        mala.refresh_from_db()
+        buena.refresh_from_db()
+        self.assertEqual(mala.constancia_estado, "ERROR")
+        self.assertIn("weasyprint", mala.constancia_error)
+        self.assertEqual(buena.constancia_estado, "LISTA")
+
+    def test_reencola_abandonadas(self):
+        ex = crear_exencion(estado="APROBADA", con_constancia=False)
+        Exencion.objects.filter(pk=ex.pk).update(
+            constancia_estado="EN_PROCESO",
+            constancia_iniciada=timezone.now() - constancias.ABANDONO - timedelta(minutes=1),
+        )
+        self.assertEqual(constancias.reencolar_abandonadas(), 1)
+        ex.refresh_from_db()
+        self.assertEqual(ex.constancia_estado, "PENDIENTE")
@@ -6,8 +6,9 @@ import os
 
 
 
-def generar_pdf_exencion(exencion):
-
+def html_constancia(exencion):
+    """(html, ruta del css) de la constancia. Usa la base: va en el proceso
+    principal."""
     base_static = os.path.join(settings.BASE_DIR, "static")
 
     logo_path = "file://" + os.path.join(
@@ -29,12 +30,19 @@ def generar_pdf_exencion(exencion):
             "firma_path": firma_path,
         }
     )
+    return html_string, css_path
+
 
-    pdf = HTML(string=html_string).write_pdf(
+def renderizar_pdf(html_string, css_path):
+    """HTML → PDF con WeasyPrint. Sin acceso a la base ni a Django: se puede
+    correr en otro proceso (exencion/constancias.py)."""
+    return HTML(string=html_string).write_pdf(
         stylesheets=[CSS(css_path)]
     )
 
-    return pdf
+
+def generar_pdf_exencion(exencion):
+    return renderizar_pdf(*html_constancia(exencion))
 
 # exencion/utils.py
 def _valor_valido(valor):
@@ -4,14 +4,11 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 
-from django.http import HttpResponse
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Q
 
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-
 from django.urls import reverse
+from exportaciones.xlsx import LOTE, Hoja, respuesta_xlsx
 from convocatorias.models import Convocatoria
 from registro_audiovisual.models import PersonaHumana, PersonaJuridica
 
@@ -319,9 +316,9 @@ def confirmar_documentacion(request, exencion_id):
 @login_required(login_url="/usuarios/login/")
 def eliminar_documento(request, documento_id):
 
-    doc = get_object_or_404(ExencionDocumento, id=documento_id)
+    doc = get_object_or_404(ExencionDocumento.objects.select_related("exencion"), id=documento_id)
 
-    if doc.exencion.user != request.user:
+    if doc.exencion.user_id != request.user.id:
         return redirect("usuarios:panel_usuario")
 
     if doc.estado != "PENDIENTE":
@@ -568,10 +565,6 @@ def padron_exenciones_excel(request):
             Q(nombre_razon_social__icontains=q)
         )
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Exenciones Aprobadas"
-
     def fmt_value(v):
         if v is None:
             return ""
@@ -591,21 +584,14 @@ def padron_exenciones_excel(request):
         return str(v)
 
     field_names = [getattr(f, "attname", f.name) for f in Exencion._meta.fields]
-    ws.append(field_names)
 
-    for obj in qs:
-        ws.append([fmt_value(getattr(obj, n, "")) for n in field_names])
+    def filas():
+        for obj in qs.iterator(chunk_size=LOTE):
+            yield [fmt_value(getattr(obj, n, "")) for n in field_names]
 
-    for col_idx, h in enumerate(field_names, start=1):
-        ws.column_dimensions[get_column_letter(col_idx)].width = min(max(len(str(h)) + 2, 14), 45)
-
-    filename = "padron_exenciones_aprobadas_completo.xlsx"
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+    return respuesta_xlsx("padron_exenciones_aprobadas_completo.xlsx", [
+        Hoja("Exenciones Aprobadas", filas(), encabezados=field_names),
+    ])
 
 
 @staff_member_required
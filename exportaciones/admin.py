@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import TrabajoExportacion
+
+
+@admin.register(TrabajoExportacion)
+class TrabajoExportacionAdmin(admin.ModelAdmin):
+    list_display  = ("id", "tipo", "estado", "usuario", "filas", "total_filas", "creado", "finalizado", "expira")
+    list_filter   = ("estado", "tipo")
+    search_fields = ("usuario__email", "nombre_archivo")
+    readonly_fields = [f.name for f in TrabajoExportacion._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
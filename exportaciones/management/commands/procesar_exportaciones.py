@@ -0,0 +1,49 @@
+"""
+Genera las exportaciones a Excel pedidas desde el sitio (TrabajoExportacion).
+
+Por defecto queda corriendo: procesa la cola, espera un aviso de trabajo
+nuevo (EXPORTACIONES_REDIS_URL) o --intervalo segundos, y vuelve a empezar.
+Con --una-vez procesa lo pendiente y termina, para usarlo desde cron. En
+cada vuelta también borra los archivos vencidos (EXPORTACIONES_TTL_HORAS) y
+reencola los trabajos que quedaron colgados.
+
+Uso manual:
+    python manage.py procesar_exportaciones
+    python manage.py procesar_exportaciones --una-vez
+
+Configurar en cron (si no corre como servicio; ej. cada minuto):
+    * * * * * /ruta/al/venv/bin/python /ruta/al/proyecto/manage.py procesar_exportaciones --una-vez
+"""
+from django.core.management.base import BaseCommand
+
+from exportaciones import trabajos
+
+
+class Command(BaseCommand):
+    help = "Procesa la cola de exportaciones a Excel en segundo plano."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Procesa lo pendiente y termina.",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=5.0,
+            help="Segundos de espera entre vueltas cuando no hay trabajos (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            trabajos.reencolar_abandonados()
+            trabajos.purgar_vencidos()
+            cantidad = trabajos.procesar_pendientes()
+            if cantidad:
+                self.stdout.write(self.style.SUCCESS(f"Exportaciones generadas: {cantidad}."))
+            if options["una_vez"]:
+                if not cantidad:
+                    self.stdout.write("No hay exportaciones pendientes.")
+                return
+            trabajos.esperar_aviso(options["intervalo"])
@@ -0,0 +1,160 @@
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+
+from .tipos import FUENTES
+
+
+class AlmacenamientoExportaciones(FileSystemStorage):
+    """Fuera de MEDIA_ROOT: los archivos tienen datos personales y solo se
+    descargan por la vista, con permiso de staff. El directorio se lee de
+    settings en cada uso (así lo pueden cambiar los tests)."""
+
+    @property
+    def base_location(self):
+        return getattr(settings, "EXPORTACIONES_DIR", settings.BASE_DIR / "exportaciones_privadas")
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def almacenamiento_exportaciones():
+    return AlmacenamientoExportaciones()
+
+
+class TrabajoExportacion(models.Model):
+    """
+    Exportación generada en segundo plano por el comando
+    procesar_exportaciones (ver exportaciones/trabajos.py).
+
+    `clave` identifica el resultado: tipo + parámetros normalizados + versión
+    de los datos de origen. Un trabajo LISTO y vigente con la misma clave se
+    reutiliza sin volver a generar el archivo.
+    """
+    ESTADOS = [
+        ("PENDIENTE", "Pendiente"),
+        ("EN_PROCESO", "En proceso"),
+        ("LISTO", "Listo"),
+        ("ERROR", "Error"),
+    ]
+
+    tipo       = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    clave      = models.CharField(max_length=64, db_index=True)
+    estado     = models.CharField(max_length=20, choices=ESTADOS, default="PENDIENTE")
+    usuario    = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="exportaciones",
+    )
+
+    filas       = models.PositiveIntegerField(default=0)
+    total_filas = models.PositiveIntegerField(null=True, blank=True)
+
+    archivo        = models.FileField(upload_to="", storage=almacenamiento_exportaciones, blank=True)
+    nombre_archivo = models.CharField(max_length=200, blank=True)
+    error          = models.TextField(blank=True)
+
+    creado     = models.DateTimeField(auto_now_add=True)
+    iniciado   = models.DateTimeField(null=True, blank=True)
+    finalizado = models.DateTimeField(null=True, blank=True)
+    expira     = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo de exportación"
+        verbose_name_plural = "Trabajos de exportación"
+        ordering = ["-creado"]
+        indexes = [models.Index(fields=["estado", "creado"])]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.get_estado_display()})"
+
+    @property
+    def progreso(self):
+        """Porcentaje (0-100), o None si no se conoce el total."""
+        if self.estado == "LISTO":
+            return 100
+        if not self.total_filas:
+            return None
+        return min(99, self.filas * 100 // self.total_filas)
+
+
+_local = threading.local()
+
+
+def _pendientes():
+    """Fuentes a incrementar en el próximo commit (una por conexión/hilo)."""
+    if not hasattr(_local, "pendientes"):
+        _local.pendientes = set()
+    return _local.pendientes
+
+
+class VersionDatos(models.Model):
+    """Contador por modelo de origen ("app.Modelo"). Cambia con cada alta,
+    modificación o baja, e invalida así las exportaciones ya generadas."""
+    fuente  = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Versión de datos"
+        verbose_name_plural = "Versiones de datos"
+
+    def __str__(self):
+        return f"{self.fuente} v{self.version}"
+
+    @classmethod
+    def incrementar(cls, fuente):
+        if not cls.objects.filter(fuente=fuente).update(version=F("version") + 1):
+            cls.objects.get_or_create(fuente=fuente)
+            cls.objects.filter(fuente=fuente).update(version=F("version") + 1)
+
+    @classmethod
+    def incrementar_al_confirmar(cls, fuente):
+        """
+        Incrementa una sola vez por transacción, al confirmarla: una carga
+        que guarda cientos de filas no bloquea la fila del contador en cada
+        save, y un rollback no incrementa. Fuera de una transacción
+        incrementa en el momento.
+
+        Cada llamada agenda el mismo callback; el primero que corre al
+        confirmar incrementa todas las fuentes pendientes y los demás no
+        encuentran nada. Lo anotado en una transacción revertida se
+        incrementa en el próximo commit del hilo: una versión de más solo
+        regenera una exportación, nunca sirve una vieja.
+        """
+        _pendientes().add(fuente)
+        transaction.on_commit(cls._confirmar)
+
+    @classmethod
+    def _confirmar(cls):
+        pendientes = _pendientes()
+        while pendientes:
+            fuente = next(iter(pendientes))
+            cls.incrementar(fuente)
+            pendientes.discard(fuente)
+
+    @classmethod
+    def de(cls, fuentes):
+        versiones = dict(cls.objects.filter(fuente__in=fuentes).values_list("fuente", "version"))
+        return [versiones.get(f, 0) for f in sorted(fuentes)]
+
+
+# ==========================================
+# SEÑALES — versión de los datos de origen
+# ==========================================
+# Los .update() masivos no disparan señales; el TTL de los archivos
+# (EXPORTACIONES_TTL_HORAS) acota cuánto puede durar un resultado viejo.
+
+def _incrementar_version(sender, **kwargs):
+    VersionDatos.incrementar_al_confirmar(sender._meta.label)
+
+
+for _fuente in FUENTES:
+    # sender como "app.Modelo": se conecta cuando el modelo termina de cargarse
+    post_save.connect(_incrementar_version, sender=_fuente, dispatch_uid=f"exportaciones_{_fuente}_save")
+    post_delete.connect(_incrementar_version, sender=_fuente, dispatch_uid=f"exportaciones_{_fuente}_delete")
@@ -0,0 +1,264 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from convocatorias.models import Convocatoria
+
+from . import trabajos
+from .models import TrabajoExportacion, VersionDatos
+from .xlsx import Celda, Hoja, filas_resumen, generar_xlsx, respuesta_xlsx
+from .zips import Entrada, generar_zip, respuesta_zip
+
+
+def leer(hojas):
+    return openpyxl.load_workbook(io.BytesIO(b"".join(generar_xlsx(hojas))))
+
+
+class GenerarXlsxTest(SimpleTestCase):
+    def test_valores_tipos_y_escapes(self):
+        wb = leer([Hoja("Datos", [
+            [1, Decimal("1234.50"), 2.5, True, None, "<a & b>", "ctrl\x01"],
+        ], encabezados=["n", "d", "f", "b", "vacío", "texto", "control"])])
+        ws = wb["Datos"]
+        self.assertEqual([c.value for c in ws[1]],
+                         ["n", "d", "f", "b", "vacío", "texto", "control"])
+        self.assertEqual([c.value for c in ws[2]],
+                         [1, 1234.5, 2.5, True, None, "<a & b>", "ctrl"])
+        self.assertTrue(ws["A1"].font.b)
+        self.assertEqual(ws["A1"].fill.fgColor.rgb, "FF1B3A6B")
+
+    def test_estilos_y_resumen(self):
+        filas = [*filas_resumen("Por estado", [("Aprobada", 3)]),
+                 ["TOTAL", Celda(1000, "miles"), Celda(0.25, "porcentaje")]]
+        ws = leer([Hoja("Resumen", filas)])["Resumen"]
+        self.assertEqual(ws["A1"].value, "Por estado")
+        self.assertEqual(ws["B1"].fill.fgColor.rgb, "FF2E5FA3")
+        self.assertEqual(ws["B2"].value, 3)
+        self.assertEqual(ws["B4"].number_format, "#,##0")
+        self.assertEqual(ws["C4"].number_format, "0.0%")
+
+    def test_fechas_como_numero_con_formato(self):
+        aware = timezone.make_aware(datetime(2026, 3, 1, 9, 30))
+        ws = leer([Hoja("Datos", [
+            [date(2026, 3, 1), datetime(2026, 3, 1, 18, 45), aware],
+        ])])["Datos"]
+        self.assertEqual(ws["A1"].value, datetime(2026, 3, 1))
+        self.assertEqual(ws["A1"].number_format, "dd/mm/yyyy")
+        self.assertEqual(ws["B1"].value, datetime(2026, 3, 1, 18, 45))
+        self.assertEqual(ws["B1"].number_format, "dd/mm/yyyy hh:mm")
+        self.assertEqual(ws["C1"].value, datetime(2026, 3, 1, 9, 30))
+
+    def test_nan_e_infinito_quedan_vacios(self):
+        ws = leer([Hoja("Datos", [
+            [float("nan"), float("inf"), Decimal("NaN"), Celda(float("-inf"), "miles"), 1.5],
+        ])])["Datos"]
+        self.assertEqual([c.value for c in ws[1]], [None, None, None, None, 1.5])
+
+    def test_anchos_por_muestra(self):
+        filas = [["corto"]] * 3 + [["x" * 40]]
+        ws = leer([Hoja("Datos", filas, muestra=3)])["Datos"]
+        # La fila larga quedó fuera de la muestra
+        self.assertEqual(ws.column_dimensions["A"].width, len("corto") + 4)
+
+    def test_titulos_invalidos_y_varias_hojas(self):
+        wb = leer([Hoja("a/b: c", [["x"]]), Hoja("y" * 40, [])])
+        self.assertEqual(wb.sheetnames, ["a b  c", "y" * 31])
+
+    def test_entrega_bytes_antes_de_consumir_todas_las_filas(self):
+        consumidas = []
+
+        def filas():
+            for i in range(5000):
+                consumidas.append(i)
+                yield [i, f"fila {i}"]
+
+        partes = generar_xlsx([Hoja("Datos", filas(), muestra=10)])
+        next(partes)
+        next(partes)
+        self.assertLess(len(consumidas), 5000)
+        list(partes)
+        self.assertEqual(len(consumidas), 5000)
+
+    def test_respuesta_streaming(self):
+        resp = respuesta_xlsx("datos.xlsx", [Hoja("Datos", [[1]])])
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp["Content-Disposition"], 'attachment; filename="datos.xlsx"')
+
+
+
+class GenerarZipTest(SimpleTestCase):
+    def test_contenido_y_compresion(self):
+        zf = zipfile.ZipFile(io.BytesIO(b"".join(generar_zip([
+            Entrada("LEAME.txt", "hola ñ"),
+            Entrada("docs/a.PDF", io.BytesIO(b"%PDF- a" * 1000)),
+            Entrada("docs/b.csv", io.BytesIO(b"x;y\n" * 1000)),
+        ]))))
+        self.assertIsNone(zf.testzip())
+        self.assertEqual(zf.read("LEAME.txt").decode(), "hola ñ")
+        self.assertEqual(zf.read("docs/a.PDF"), b"%PDF- a" * 1000)
+        self.assertEqual(zf.getinfo("docs/a.PDF").compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(zf.getinfo("docs/b.csv").compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_lee_por_bloques_y_cierra(self):
+        origen = io.BytesIO(b"0" * (3 * 1024 * 1024))
+        partes = generar_zip([Entrada("grande.pdf", origen)])
+        next(partes)
+        # Ya salió el primer bloque sin haber leído todo el archivo
+        self.assertLess(origen.tell(), 3 * 1024 * 1024)
+        list(partes)
+        self.assertTrue(origen.closed)
+
+    def test_respuesta_streaming(self):
+        resp = respuesta_zip("docs.zip", [Entrada("a.txt", b"a")])
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp["Content-Type"], "application/zip")
+
+
+def crear_convocatoria(titulo="Convocatoria test"):
+    return Convocatoria.objects.create(
+        titulo=titulo,
+        slug=titulo.lower().replace(" ", "-"),
+        categoria="CONCURSO",
+        linea="fomento",
+        fecha_inicio=date(2026, 1, 1),
+        fecha_fin=date(2026, 12, 31),
+    )
+
+
+class TrabajosExportacionTest(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(EXPORTACIONES_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.staff = User.objects.create(username="staff", is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_pedidos_iguales_comparten_trabajo(self):
+        a = trabajos.solicitar("registro", {"loc": "SC", "area": "", "otro": "x"})
+        b = trabajos.solicitar("registro", {"loc": " SC ", "page": "2"})
+        self.assertEqual(a.pk, b.pk)
+        self.assertEqual(a.parametros, {"loc": "SC"})
+        c = trabajos.solicitar("registro", {"loc": "CA"})
+        self.assertNotEqual(a.pk, c.pk)
+
+    def test_worker_genera_archivo_y_se_reutiliza(self):
+        crear_convocatoria()
+        trabajo = trabajos.solicitar("postulaciones", {"linea": "fomento"}, usuario=self.staff)
+        self.assertEqual(trabajos.procesar_pendientes(), 1)
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, "LISTO")
+        self.assertEqual(trabajo.progreso, 100)
+        self.assertEqual(trabajo.nombre_archivo, "estadisticas_postulaciones.xlsx")
+        with trabajo.archivo.open("rb") as f:
+            wb = openpyxl.load_workbook(io.BytesIO(f.read()))
+        self.assertIn("Postulaciones", wb.sheetnames)
+
+        # Mismo pedido, mismos datos: el archivo ya generado
+        self.assertEqual(trabajos.solicitar("postulaciones", {"linea": "fomento"}).pk, trabajo.pk)
+        self.assertEqual(trabajos.procesar_pendientes(), 0)
+
+    def test_cambio_en_los_datos_invalida(self):
+        trabajo = trabajos.solicitar("postulaciones", {})
+        trabajos.procesar_pendientes()
+        antes = VersionDatos.de(["convocatorias.Convocatoria"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_convocatoria()
+        self.assertEqual(VersionDatos.de(["convocatorias.Convocatoria"])[0], antes[0] + 1)
+        nuevo = trabajos.solicitar("postulaciones", {})
+        self.assertNotEqual(nuevo.pk, trabajo.pk)
+        self.assertEqual(nuevo.estado, "PENDIENTE")
+
+    def test_una_version_por_transaccion(self):
+        antes = VersionDatos.de(["convocatorias.Convocatoria"])[0]
+        with self.captureOnCommitCallbacks() as callbacks:
+            for titulo in ("Una", "Otra", "Tercera"):
+                crear_convocatoria(titulo)
+        self.assertEqual(VersionDatos.de(["convocatorias.Convocatoria"])[0], antes)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(VersionDatos.de(["convocatorias.Convocatoria"])[0], antes + 1)
+
+    def test_rollback_no_incrementa(self):
+        antes = VersionDatos.de(["convocatorias.Convocatoria"])[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    crear_convocatoria()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(VersionDatos.de(["convocatorias.Convocatoria"])[0], antes)
+
+    def test_error_queda_registrado(self):
+        trabajo = TrabajoExportacion.objects.create(tipo="inexistente", clave="x")
+        with self.assertLogs("exportaciones.trabajos", "ERROR"):
+            trabajos.procesar_pendientes()
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, "ERROR")
+        self.assertIn("KeyError", trabajo.error)
+
+    def test_purgar_vencidos_borra_archivo(self):
+        trabajo = trabajos.solicitar("exenciones", {})
+        trabajos.procesar_pendientes()
+        trabajo.refresh_from_db()
+        storage, nombre = trabajo.archivo.storage, trabajo.archivo.name
+        self.assertTrue(storage.exists(nombre))
+
+        TrabajoExportacion.objects.filter(pk=trabajo.pk).update(expira=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(trabajos.purgar_vencidos(), 1)
+        self.assertFalse(storage.exists(nombre))
+        self.assertFalse(TrabajoExportacion.objects.exists())
+
+    def test_reencolar_abandonados(self):
+        trabajo = TrabajoExportacion.objects.create(
+            tipo="registro", clave="x", estado="EN_PROCESO",
+            iniciado=timezone.now() - timedelta(hours=2),
+        )
+        self.assertEqual(trabajos.reencolar_abandonados(), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, "PENDIENTE")
+
+    def test_vistas(self):
+        self.assertEqual(self.client.post("/exportaciones/inexistente/").status_code, 404)
+        # GET no crea trabajos
+        self.assertEqual(self.client.get("/exportaciones/formacion/?anio=2026").status_code, 405)
+        self.assertFalse(TrabajoExportacion.objects.exists())
+
+        r = self.client.post("/exportaciones/formacion/", {"anio": "2026"})
+        trabajo = TrabajoExportacion.objects.get()
+        self.assertRedirects(r, f"/exportaciones/trabajo/{trabajo.pk}/")
+        self.assertEqual(self.client.get(f"/exportaciones/trabajo/{trabajo.pk}/descargar/").status_code, 404)
+        self.assertEqual(self.client.get(f"/exportaciones/trabajo/{trabajo.pk}/estado/").json()["estado"], "PENDIENTE")
+
+        trabajos.procesar_pendientes()
+        estado = self.client.get(f"/exportaciones/trabajo/{trabajo.pk}/estado/").json()
+        self.assertEqual(estado["estado"], "LISTO")
+        self.assertEqual(estado["descarga"], f"/exportaciones/trabajo/{trabajo.pk}/descargar/")
+
+        # Ya generado: el pedido va directo a la descarga
+        r = self.client.post("/exportaciones/formacion/", {"anio": "2026"})
+        self.assertRedirects(r, estado["descarga"], fetch_redirect_response=False)
+        r = self.client.get(estado["descarga"])
+        self.assertEqual(r["Content-Disposition"], 'attachment; filename="estadisticas_formacion.xlsx"')
+        wb = openpyxl.load_workbook(io.BytesIO(b"".join(r.streaming_content)))
+        self.assertIn("Inscripciones", wb.sheetnames)
+
+    def test_solo_staff(self):
+        self.client.force_login(User.objects.create(username="comun"))
+        r = self.client.post("/exportaciones/registro/")
+        self.assertEqual(r.status_code, 302)
+        self.assertFalse(TrabajoExportacion.objects.exists())
@@ -0,0 +1,68 @@
+"""
+Exportaciones que se pueden generar en segundo plano.
+
+Cada tipo declara:
+- parametros: los únicos filtros que se toman del request (el resto se
+  descarta, así dos pedidos iguales comparten archivo).
+- libro: función (ruta importable) que recibe el dict de parámetros y
+  devuelve (nombre_archivo, [Hoja, ...]). Es la misma que usa la vista de
+  descarga directa.
+- fuentes: modelos de los que salen los datos. Un cambio en cualquiera de
+  ellos invalida los archivos ya generados (ver VersionDatos).
+"""
+from collections import namedtuple
+
+from django.utils.module_loading import import_string
+
+TipoExportacion = namedtuple("TipoExportacion", ["titulo", "parametros", "libro", "fuentes"])
+
+TIPOS = {
+    "postulaciones": TipoExportacion(
+        titulo="Estadísticas de postulaciones",
+        parametros=("linea", "conv", "anio", "tipo", "solo_ganadores"),
+        libro="estadisticas.views.postulaciones.libro_postulaciones",
+        fuentes=("convocatorias.Convocatoria", "convocatorias.Postulacion",
+                 "convocatorias.Rendicion", "registro_audiovisual.PersonaHumana"),
+    ),
+    "registro": TipoExportacion(
+        titulo="Estadísticas del Registro Audiovisual",
+        parametros=("loc", "area"),
+        libro="estadisticas.views.registro.libro_registro",
+        fuentes=("registro_audiovisual.PersonaHumana", "registro_audiovisual.PersonaJuridica"),
+    ),
+    "exenciones": TipoExportacion(
+        titulo="Estadísticas de exenciones",
+        parametros=("anio", "estado", "loc"),
+        libro="estadisticas.views.exenciones.libro_exenciones",
+        fuentes=("exencion.Exencion",),
+    ),
+    "formacion": TipoExportacion(
+        titulo="Estadísticas de formación",
+        parametros=("conv", "anio", "estado"),
+        libro="estadisticas.views.formacion.libro_formacion",
+        fuentes=("formacion.ConvocatoriaFormacion", "formacion.InscripcionFormacion"),
+    ),
+    "padron_registro": TipoExportacion(
+        titulo="Padrón completo del Registro Audiovisual",
+        parametros=("q",),
+        libro="backoffice.views.libro_padron_registro",
+        # Sin auth.User: cada login lo guarda. Un cambio de email se ve al vencer el TTL.
+        fuentes=("registro_audiovisual.PersonaHumana", "registro_audiovisual.PersonaJuridica"),
+    ),
+}
+
+FUENTES = sorted({fuente for tipo in TIPOS.values() for fuente in tipo.fuentes})
+
+
+def normalizar_parametros(tipo, datos):
+    """Solo los parámetros declarados, sin espacios de más ni valores vacíos."""
+    parametros = {}
+    for nombre in TIPOS[tipo].parametros:
+        valor = (datos.get(nombre) or "").strip()
+        if valor:
+            parametros[nombre] = valor
+    return parametros
+
+
+def libro(tipo, parametros):
+    return import_string(TIPOS[tipo].libro)(parametros)
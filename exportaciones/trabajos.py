@@ -0,0 +1,211 @@
+"""
+Exportaciones en segundo plano.
+
+La vista solo registra un TrabajoExportacion (solicitar) y redirige a una
+página que consulta el progreso; el comando procesar_exportaciones genera el
+.xlsx con el mismo libro que usa la descarga directa y lo guarda en
+EXPORTACIONES_DIR. Así un padrón de decenas de miles de filas no ocupa un
+worker web durante minutos ni se corta por el timeout del proxy.
+
+Reutilización:
+- `clave` = tipo + parámetros normalizados + versión de cada modelo de
+  origen (VersionDatos). Mientras los datos no cambien, el mismo pedido
+  devuelve el archivo ya generado, sin recalcular.
+- Un pedido igual a otro que todavía está en cola o en proceso se suma a
+  ese trabajo en vez de crear uno nuevo.
+
+Con EXPORTACIONES_REDIS_URL el worker espera el aviso de un trabajo nuevo
+(BLPOP) en vez de sondear la base cada `intervalo` segundos.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from . import tipos
+from .models import TrabajoExportacion, VersionDatos
+from .xlsx import generar_xlsx
+
+logger = logging.getLogger(__name__)
+
+_CLAVE_REDIS = "exportaciones:pendientes"
+# cada cuántas filas se guarda el progreso en la base
+PASO_PROGRESO = 1000
+# un trabajo EN_PROCESO sin terminar después de esto se considera abandonado
+# (worker reiniciado a mitad de camino) y vuelve a la cola
+ABANDONO = timedelta(hours=1)
+
+
+def _ttl():
+    return timedelta(hours=getattr(settings, "EXPORTACIONES_TTL_HORAS", 24))
+
+
+def _redis():
+    url = getattr(settings, "EXPORTACIONES_REDIS_URL", None)
+    if not url:
+        return None
+    import redis
+    return redis.Redis.from_url(url)
+
+
+# ──────────────────────────────────────────────────────────────
+# Pedido (vista)
+# ──────────────────────────────────────────────────────────────
+
+def calcular_clave(tipo, parametros):
+    versiones = VersionDatos.de(tipos.TIPOS[tipo].fuentes)
+    texto = json.dumps([tipo, sorted(parametros.items()), versiones])
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def _avisar():
+    try:
+        conexion = _redis()
+        if conexion is not None:
+            conexion.lpush(_CLAVE_REDIS, 1)
+    except Exception:
+        # Sin aviso el worker lo toma igual en la próxima vuelta
+        logger.exception("No se pudo avisar del trabajo de exportación por Redis")
+
+
+def solicitar(tipo, datos, usuario=None):
+    """Trabajo para exportar `tipo` con los filtros de `datos` (p. ej.
+    request.GET). Devuelve uno LISTO si ya hay un archivo vigente con los
+    mismos datos, uno en curso si alguien lo pidió antes, o uno nuevo."""
+    parametros = tipos.normalizar_parametros(tipo, datos)
+    clave = calcular_clave(tipo, parametros)
+    ahora = timezone.now()
+
+    existente = (
+        TrabajoExportacion.objects
+        .filter(clave=clave)
+        .filter(estado__in=["PENDIENTE", "EN_PROCESO"])
+        .first()
+    ) or (
+        TrabajoExportacion.objects
+        .filter(clave=clave, estado="LISTO", expira__gt=ahora)
+        .first()
+    )
+    if existente is not None:
+        return existente
+
+    trabajo = TrabajoExportacion.objects.create(
+        tipo=tipo, parametros=parametros, clave=clave, usuario=usuario,
+    )
+    transaction.on_commit(_avisar)
+    return trabajo
+
+
+# ──────────────────────────────────────────────────────────────
+# Ejecución (worker)
+# ──────────────────────────────────────────────────────────────
+
+def tomar_siguiente():
+    """Marca como EN_PROCESO el trabajo pendiente más antiguo y lo devuelve.
+    El update condicional evita que dos workers tomen el mismo."""
+    while True:
+        trabajo = TrabajoExportacion.objects.filter(estado="PENDIENTE").order_by("creado").first()
+        if trabajo is None:
+            return None
+        tomado = TrabajoExportacion.objects.filter(pk=trabajo.pk, estado="PENDIENTE").update(
+            estado="EN_PROCESO", iniciado=timezone.now(),
+        )
+        if tomado:
+            trabajo.refresh_from_db()
+            return trabajo
+
+
+def _contar(filas, trabajo):
+    for fila in filas:
+        yield fila
+        trabajo.filas += 1
+        if trabajo.filas % PASO_PROGRESO == 0:
+            TrabajoExportacion.objects.filter(pk=trabajo.pk).update(filas=trabajo.filas)
+
+
+def ejecutar(trabajo):
+    """Genera el archivo de `trabajo` (ya tomado) y lo deja LISTO o ERROR."""
+    try:
+        nombre_archivo, hojas = tipos.libro(trabajo.tipo, trabajo.parametros)
+
+        totales = [hoja.total_filas() for hoja in hojas]
+        conocidos = [t for t in totales if t is not None]
+        trabajo.total_filas = sum(conocidos) if conocidos else None
+        trabajo.filas = 0
+        TrabajoExportacion.objects.filter(pk=trabajo.pk).update(total_filas=trabajo.total_filas, filas=0)
+        for hoja, total in zip(hojas, totales):
+            # Solo se cuentan las hojas con total conocido (las de detalle);
+            # los resúmenes son unas pocas filas
+            if total is not None:
+                hoja.filas = _contar(hoja.filas, trabajo)
+
+        with tempfile.TemporaryFile() as tmp:
+            for bloque in generar_xlsx(hojas):
+                tmp.write(bloque)
+            tmp.seek(0)
+            trabajo.archivo.save(f"{trabajo.tipo}_{trabajo.pk}.xlsx", File(tmp), save=False)
+
+        trabajo.nombre_archivo = nombre_archivo
+        trabajo.estado = "LISTO"
+        trabajo.expira = timezone.now() + _ttl()
+    except Exception as exc:
+        logger.exception("Falló la exportación %s", trabajo.pk)
+        trabajo.estado = "ERROR"
+        trabajo.error = f"{type(exc).__name__}: {exc}"
+    trabajo.finalizado = timezone.now()
+    trabajo.save()
+    return trabajo
+
+
+def procesar_pendientes():
+    """Ejecuta todos los trabajos en cola. Devuelve cuántos."""
+    cantidad = 0
+    while (trabajo := tomar_siguiente()) is not None:
+        ejecutar(trabajo)
+        cantidad += 1
+    return cantidad
+
+
+def esperar_aviso(segundos):
+    """Bloquea hasta que llegue un aviso de trabajo nuevo o pasen `segundos`."""
+    conexion = _redis()
+    if conexion is None:
+        import time
+        time.sleep(segundos)
+        return
+    conexion.blpop(_CLAVE_REDIS, timeout=max(1, int(segundos)))
+
+
+# ──────────────────────────────────────────────────────────────
+# Mantenimiento
+# ──────────────────────────────────────────────────────────────
+
+def reencolar_abandonados():
+    """Vuelve a PENDIENTE los trabajos EN_PROCESO que quedaron colgados."""
+    limite = timezone.now() - ABANDONO
+    return TrabajoExportacion.objects.filter(estado="EN_PROCESO", iniciado__lt=limite).update(
+        estado="PENDIENTE", filas=0,
+    )
+
+
+def purgar_vencidos():
+    """Borra los archivos vencidos y sus trabajos, y los errores viejos.
+    Devuelve cuántos trabajos se borraron."""
+    ahora = timezone.now()
+    vencidos = TrabajoExportacion.objects.filter(estado="LISTO", expira__lte=ahora)
+    cantidad = 0
+    for trabajo in vencidos.iterator():
+        if trabajo.archivo:
+            trabajo.archivo.delete(save=False)
+        trabajo.delete()
+        cantidad += 1
+    cantidad += TrabajoExportacion.objects.filter(
+        estado="ERROR", finalizado__lte=ahora - _ttl(),
+    ).delete()[0]
+    return cantidad
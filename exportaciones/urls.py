@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = "exportaciones"
+
+urlpatterns = [
+    path("trabajo/<int:pk>/",           views.trabajo, name="trabajo"),
+    path("trabajo/<int:pk>/estado/",    views.estado, name="estado"),
+    path("trabajo/<int:pk>/descargar/", views.descargar, name="descargar"),
+    path("<str:tipo>/",                 views.solicitar, name="solicitar"),
+]
@@ -0,0 +1,56 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from . import trabajos
+from .models import TrabajoExportacion
+from .tipos import TIPOS
+
+
+def _estado(trabajo):
+    return {
+        "id":          trabajo.pk,
+        "estado":      trabajo.estado,
+        "filas":       trabajo.filas,
+        "total_filas": trabajo.total_filas,
+        "progreso":    trabajo.progreso,
+        "error":       trabajo.error,
+        "descarga":    (reverse("exportaciones:descargar", args=[trabajo.pk])
+                        if trabajo.estado == "LISTO" else None),
+    }
+
+
+@staff_member_required
+@require_POST
+def solicitar(request, tipo):
+    # POST: crea un trabajo; los prefetch de links y los bots no lo disparan
+    if tipo not in TIPOS:
+        raise Http404("Tipo de exportación desconocido")
+    trabajo = trabajos.solicitar(tipo, request.POST, usuario=request.user)
+    if trabajo.estado == "LISTO":
+        return redirect("exportaciones:descargar", pk=trabajo.pk)
+    return redirect("exportaciones:trabajo", pk=trabajo.pk)
+
+
+@staff_member_required
+def trabajo(request, pk):
+    trabajo = get_object_or_404(TrabajoExportacion, pk=pk)
+    return render(request, "exportaciones/trabajo.html", {
+        "trabajo": trabajo,
+        "titulo":  TIPOS[trabajo.tipo].titulo if trabajo.tipo in TIPOS else trabajo.tipo,
+    })
+
+
+@staff_member_required
+def estado(request, pk):
+    return JsonResponse(_estado(get_object_or_404(TrabajoExportacion, pk=pk)))
+
+
+@staff_member_required
+def descargar(request, pk):
+    trabajo = get_object_or_404(TrabajoExportacion, pk=pk, estado="LISTO")
+    if not trabajo.archivo or not trabajo.archivo.storage.exists(trabajo.archivo.name):
+        raise Http404("El archivo ya no está disponible")
+    return FileResponse(trabajo.archivo.open("rb"), as_attachment=True, filename=trabajo.nombre_archivo)
@@ -0,0 +1,342 @@
+"""
+Generador de archivos .xlsx en streaming, compartido por todas las
+exportaciones a Excel.
+
+openpyxl arma el libro completo en memoria antes de guardarlo. Acá cada hoja
+se escribe fila por fila, directo dentro del ZIP del .xlsx, y los bytes se
+entregan a medida que salen: la descarga empieza enseguida y la memoria no
+crece con la cantidad de filas.
+
+- Los textos van como inline strings (sin tabla de strings compartidos, que
+  obligaría a conocer todos los valores antes de escribir).
+- El ancho de cada columna se calcula con las primeras `muestra` filas.
+- Los estilos son un juego fijo (ver ESTILOS), los mismos que usaban las
+  exportaciones con openpyxl.
+- Fechas y fechas con hora van como número de serie de Excel con estilo
+  "fecha"/"fecha_hora" (ordenables y filtrables como fecha); las aware se
+  pasan a la hora local. NaN e infinito quedan como celda vacía.
+
+Uso:
+    return respuesta_xlsx("postulaciones.xlsx", [
+        Hoja("Postulaciones", filas, encabezados=["ID", "Proyecto"]),
+    ])
+
+donde `filas` es cualquier iterable de listas (idealmente un generador sobre
+`queryset.iterator(chunk_size=...)`). Una celda puede ser un valor simple o
+`Celda(valor, "estilo")`.
+"""
+import math
+import re
+import zipfile
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .zips import SalidaStreaming
+
+
+CONTENT_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+ANCHO_MAXIMO = 50
+MUESTRA_ANCHOS = 200
+# chunk_size sugerido para los queryset.iterator() que alimentan las hojas
+LOTE = 2000
+
+Celda = namedtuple("Celda", ["valor", "estilo"])
+
+# Índice de cada estilo en cellXfs de styles.xml
+ESTILOS = {
+    None:             0,
+    "encabezado":     1,  # negrita blanca sobre azul oscuro, centrado
+    "titulo":         2,  # negrita blanca sobre azul (títulos de tablas resumen)
+    "titulo_relleno": 3,  # solo el fondo azul, para completar la fila del título
+    "miles":          4,  # #,##0
+    "porcentaje":     5,  # 0.0%
+    "fecha":          6,  # dd/mm/yyyy
+    "fecha_hora":     7,  # dd/mm/yyyy hh:mm
+}
+
+# Día 0 de los números de serie de Excel (sistema 1900, con su 29/02/1900)
+_EPOCA = datetime(1899, 12, 30)
+
+_CARACTERES_INVALIDOS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_CARACTERES_TITULO = re.compile(r"[\[\]:*?/\\]")
+
+
+# ──────────────────────────────────────────────────────────────
+# Hojas
+# ──────────────────────────────────────────────────────────────
+
+class Hoja:
+    """Una hoja del libro. Las filas se consumen una sola vez, al escribir.
+
+    `total` (int o callable, p. ej. qs.count) es la cantidad de filas
+    esperada; solo se usa para mostrar el progreso de las exportaciones en
+    segundo plano.
+    """
+
+    def __init__(self, titulo, filas, encabezados=None, muestra=MUESTRA_ANCHOS, total=None):
+        self.titulo = _CARACTERES_TITULO.sub(" ", titulo)[:31]
+        self.filas = filas
+        self.encabezados = encabezados
+        self.muestra = muestra
+        self.total = total
+
+    def total_filas(self):
+        return self.total() if callable(self.total) else self.total
+
+    def _todas_las_filas(self):
+        if self.encabezados:
+            yield [Celda(h, "encabezado") for h in self.encabezados]
+        yield from self.filas
+
+    def xml(self):
+        """Fragmentos (bytes) del XML de la hoja."""
+        filas = iter(self._todas_las_filas())
+        primeras = []
+        for fila in filas:
+            primeras.append(fila)
+            if len(primeras) >= self.muestra:
+                break
+
+        yield (
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        )
+        anchos = _anchos(primeras)
+        if anchos:
+            yield b"<cols>" + "".join(
+                f'<col min="{i}" max="{i}" width="{ancho}" customWidth="1"/>'
+                for i, ancho in enumerate(anchos, 1)
+            ).encode() + b"</cols>"
+
+        yield b"<sheetData>"
+        numero = 0
+        for lote in (primeras, filas):
+            partes = []
+            for fila in lote:
+                numero += 1
+                partes.append(_fila_xml(numero, fila))
+                if len(partes) >= 500:
+                    yield "".join(partes).encode("utf-8")
+                    partes = []
+            if partes:
+                yield "".join(partes).encode("utf-8")
+        yield b"</sheetData></worksheet>"
+
+
+def filas_resumen(titulo, filas):
+    """Tabla resumen (título + pares label/total + fila en blanco), para
+    apilar varias en una misma hoja."""
+    yield [Celda(titulo, "titulo"), Celda(None, "titulo_relleno")]
+    for label, total in filas:
+        yield [label, total]
+    yield []
+
+
+# ──────────────────────────────────────────────────────────────
+# Celdas y filas
+# ──────────────────────────────────────────────────────────────
+
+def _columna(indice):
+    """1 → A, 27 → AA."""
+    letras = ""
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _texto(valor):
+    return _CARACTERES_INVALIDOS.sub("", str(valor))
+
+
+def _serie(valor):
+    """Número de serie de Excel de una fecha o fecha con hora."""
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.make_naive(valor)
+        delta = valor - _EPOCA
+        return delta.days + (delta.seconds + delta.microseconds / 1_000_000) / 86400
+    return (valor - _EPOCA.date()).days
+
+
+def _finito(valor):
+    return valor.is_finite() if isinstance(valor, Decimal) else math.isfinite(valor)
+
+
+def _celda_xml(ref, celda):
+    if isinstance(celda, Celda):
+        valor, estilo = celda.valor, ESTILOS[celda.estilo]
+    else:
+        valor, estilo = celda, 0
+
+    if isinstance(valor, date):
+        if not estilo:
+            estilo = ESTILOS["fecha_hora" if isinstance(valor, datetime) else "fecha"]
+        valor = _serie(valor)
+    elif isinstance(valor, (float, Decimal)) and not _finito(valor):
+        valor = None
+    s = f' s="{estilo}"' if estilo else ""
+
+    if valor is None or valor == "":
+        return f'<c r="{ref}"{s}/>' if estilo else ""
+    if isinstance(valor, bool):
+        return f'<c r="{ref}"{s} t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c r="{ref}"{s}><v>{valor}</v></c>'
+    return (
+        f'<c r="{ref}"{s} t="inlineStr"><is><t xml:space="preserve">'
+        f"{escape(_texto(valor))}</t></is></c>"
+    )
+
+
+def _fila_xml(numero, fila):
+    celdas = "".join(
+        _celda_xml(f"{_columna(i)}{numero}", celda) for i, celda in enumerate(fila, 1)
+    )
+    return f'<row r="{numero}">{celdas}</row>'
+
+
+def _anchos(filas):
+    """Ancho por columna según las filas de muestra (como el viejo autowidth)."""
+    maximos = []
+    for fila in filas:
+        for i, celda in enumerate(fila):
+            valor = celda.valor if isinstance(celda, Celda) else celda
+            if isinstance(valor, date):
+                largo = 16 if isinstance(valor, datetime) else 10
+            else:
+                largo = len(str(valor)) if valor is not None else 0
+            if i >= len(maximos):
+                maximos.append(largo)
+            elif largo > maximos[i]:
+                maximos[i] = largo
+    return [min(largo + 4, ANCHO_MAXIMO) for largo in maximos]
+
+
+# ──────────────────────────────────────────────────────────────
+# Libro
+# ──────────────────────────────────────────────────────────────
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "{hojas}"
+    "</Types>"
+)
+_CONTENT_TYPE_HOJA = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    "<sheets>{hojas}</sheets></workbook>"
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    "{hojas}"
+    '<Relationship Id="rIdEstilos" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    "</Relationships>"
+)
+_WORKBOOK_REL_HOJA = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="3">'
+    '<numFmt numFmtId="164" formatCode="0.0%"/>'
+    '<numFmt numFmtId="165" formatCode="dd/mm/yyyy"/>'
+    '<numFmt numFmtId="166" formatCode="dd/mm/yyyy hh:mm"/>'
+    "</numFmts>"
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+    "</fonts>"
+    '<fills count="4">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF1B3A6B"/></patternFill></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF2E5FA3"/></patternFill></fill>'
+    "</fills>"
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="8">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" '
+    'applyAlignment="1"><alignment horizontal="center"/></xf>'
+    '<xf numFmtId="0" fontId="1" fillId="3" borderId="0" xfId="0" applyFont="1" applyFill="1"/>'
+    '<xf numFmtId="0" fontId="0" fillId="3" borderId="0" xfId="0" applyFill="1"/>'
+    '<xf numFmtId="3" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="166" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    "</cellXfs>"
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+
+
+def generar_xlsx(hojas):
+    """Bytes del .xlsx en bloques, a medida que se generan las filas."""
+    hojas = list(hojas)
+    salida = SalidaStreaming()
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as zf:
+        n_hojas = range(1, len(hojas) + 1)
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES.format(
+            hojas="".join(_CONTENT_TYPE_HOJA.format(n=n) for n in n_hojas)))
+        zf.writestr("_rels/.rels", _RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK.format(hojas="".join(
+            f'<sheet name={quoteattr(hoja.titulo)} sheetId="{n}" r:id="rId{n}"/>'
+            for n, hoja in zip(n_hojas, hojas)
+        )))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(
+            hojas="".join(_WORKBOOK_REL_HOJA.format(n=n) for n in n_hojas)))
+        zf.writestr("xl/styles.xml", _STYLES)
+        yield salida.retirar()
+
+        for n, hoja in zip(n_hojas, hojas):
+            with zf.open(f"xl/worksheets/sheet{n}.xml", "w") as destino:
+                for fragmento in hoja.xml():
+                    destino.write(fragmento)
+                    datos = salida.retirar()
+                    if datos:
+                        yield datos
+    yield salida.retirar()
+
+
+def respuesta_xlsx(nombre_archivo, hojas):
+    """StreamingHttpResponse que descarga `hojas` como `nombre_archivo`."""
+    resp = StreamingHttpResponse(generar_xlsx(hojas), content_type=CONTENT_TYPE_XLSX)
+    resp["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    return resp
@@ -0,0 +1,119 @@
+"""
+Generador de archivos .zip en streaming.
+
+Mismo enfoque que xlsx.py: el ZipFile escribe sobre un destino sin seek(),
+así que cada archivo sale con data descriptor y los bytes se pueden entregar
+a medida que se generan. La memoria queda acotada a un bloque de lectura,
+sin importar cuántos documentos tenga el paquete.
+
+- Los formatos que ya vienen comprimidos (PDF, XLSX, imágenes, ...) se
+  guardan tal cual (ZIP_STORED): recomprimirlos cuesta CPU y no achica nada.
+- Un paquete con varias partes (p. ej. varias postulaciones) no mete un
+  .zip dentro de otro: cada parte va en su carpeta del mismo ZIP.
+
+Uso:
+    return respuesta_zip("documentacion.zip", [
+        Entrada("README.txt", "texto"),
+        Entrada("documentacion/guion.pdf", archivo.open("rb")),
+    ])
+
+`datos` puede ser str, bytes o un archivo abierto (se lee por bloques y se
+cierra al terminar).
+"""
+import os
+import zipfile
+from collections import namedtuple
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+CONTENT_TYPE_ZIP = "application/zip"
+
+# Bytes leídos por vez de cada archivo
+BLOQUE = 1024 * 1024
+
+SIN_COMPRIMIR = {
+    ".pdf", ".xlsx", ".docx", ".pptx", ".ods", ".odt",
+    ".zip", ".gz", ".rar", ".7z",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp",
+    ".mp3", ".mp4", ".mov",
+}
+
+Entrada = namedtuple("Entrada", ["nombre", "datos"])
+
+
+class SalidaStreaming:
+    """Destino del ZipFile: acumula lo escrito hasta que se retira.
+
+    No implementa tell()/seek(), así que zipfile escribe en modo streaming
+    (tamaños y CRC al final de cada archivo, en un data descriptor)."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def metodo_compresion(nombre):
+    ext = os.path.splitext(nombre)[1].lower()
+    return zipfile.ZIP_STORED if ext in SIN_COMPRIMIR else zipfile.ZIP_DEFLATED
+
+
+def _info(nombre):
+    info = zipfile.ZipInfo(nombre, date_time=timezone.localtime().timetuple()[:6])
+    info.compress_type = metodo_compresion(nombre)
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def _tamanio(datos):
+    try:
+        return datos.size
+    except Exception:
+        return None
+
+
+def generar_zip(entradas):
+    """Bytes del .zip en bloques, a medida que se leen los archivos."""
+    salida = SalidaStreaming()
+    with zipfile.ZipFile(salida, "w") as zf:
+        for entrada in entradas:
+            origen = entrada.datos
+            if isinstance(origen, str):
+                origen = origen.encode("utf-8")
+            if isinstance(origen, bytes):
+                zf.writestr(_info(entrada.nombre), origen)
+                yield salida.retirar()
+                continue
+
+            tamanio = _tamanio(origen)
+            try:
+                with zf.open(_info(entrada.nombre), "w",
+                             force_zip64=bool(tamanio and tamanio > zipfile.ZIP64_LIMIT)) as destino:
+                    while bloque := origen.read(BLOQUE):
+                        destino.write(bloque)
+                        datos = salida.retirar()
+                        if datos:
+                            yield datos
+            finally:
+                origen.close()
+            yield salida.retirar()
+    yield salida.retirar()
+
+
+def respuesta_zip(nombre_archivo, entradas):
+    """StreamingHttpResponse que descarga `entradas` como `nombre_archivo`."""
+    resp = StreamingHttpResponse(generar_zip(entradas), content_type=CONTENT_TYPE_ZIP)
+    resp["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    return resp
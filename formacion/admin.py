@@ -6,8 +6,8 @@ from django.urls import reverse
 from django.utils import timezone
 from django.conf import settings
 
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+from correos import cola
+from exportaciones.xlsx import LOTE, Hoja, respuesta_xlsx
 
 from .models import (
     ConvocatoriaFormacion,
@@ -147,9 +147,9 @@ class InscripcionFormacionAdmin(admin.ModelAdmin):
                 to=[destinatario],
             )
             email.attach_alternative(html, "text/html")
-            email.send(fail_silently=True)
+            cola.encolar(email, origen="formacion.estado")
         except Exception as e:
-            messages.warning(request, f"No se pudo enviar email a {destinatario}: {e}")
+            messages.warning(request, f"No se pudo encolar email a {destinatario}: {e}")
 
     def _cambiar_estado(self, request, queryset, nuevo_estado):
         actualizadas = 0
@@ -178,41 +178,35 @@ class InscripcionFormacionAdmin(admin.ModelAdmin):
         self._cambiar_estado(request, queryset, "lista_espera")
 
     def exportar_excel(self, request, queryset):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Formación"
         headers = [
             "Fecha", "Usuario", "Convocatoria", "Estado",
             "Email", "Teléfono", "Vínculo con el sector",
             "Nombre", "Apellido", "DNI", "Localidad",
             "Tiene Registro Audiovisual",
         ]
-        ws.append(headers)
         qs = queryset.select_related("user", "convocatoria", "persona_humana", "persona_juridica")
-        for ins in qs:
-            tiene_registro = bool(ins.persona_humana_id or ins.persona_juridica_id)
-            ws.append([
-                ins.fecha.strftime("%d/%m/%Y %H:%M") if ins.fecha else "",
-                ins.user.username,
-                ins.convocatoria.titulo if ins.convocatoria else "",
-                ins.get_estado_display(),
-                ins.user.email or ins.email or "",
-                self.contacto_telefono(ins),
-                ins.get_vinculo_sector_display() if ins.vinculo_sector else "",
-                ins.nombre or "",
-                ins.apellido or "",
-                ins.dni or "",
-                ins.get_localidad_display() if ins.localidad else "",
-                "SI" if tiene_registro else "NO",
-            ])
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 25
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        response["Content-Disposition"] = 'attachment; filename="inscripciones_formacion.xlsx"'
-        wb.save(response)
-        return response
+
+        def filas():
+            for ins in qs.iterator(chunk_size=LOTE):
+                tiene_registro = bool(ins.persona_humana_id or ins.persona_juridica_id)
+                yield [
+                    ins.fecha.strftime("%d/%m/%Y %H:%M") if ins.fecha else "",
+                    ins.user.username,
+                    ins.convocatoria.titulo if ins.convocatoria else "",
+                    ins.get_estado_display(),
+                    ins.user.email or ins.email or "",
+                    self.contacto_telefono(ins),
+                    ins.get_vinculo_sector_display() if ins.vinculo_sector else "",
+                    ins.nombre or "",
+                    ins.apellido or "",
+                    ins.dni or "",
+                    ins.get_localidad_display() if ins.localidad else "",
+                    "SI" if tiene_registro else "NO",
+                ]
+
+        return respuesta_xlsx("inscripciones_formacion.xlsx", [
+            Hoja("Formación", filas(), encabezados=headers),
+        ])
     exportar_excel.short_description = "📤 Exportar seleccionadas a Excel (.xlsx)"
 
     @admin.action(description="📦 Descargar documentación seleccionada (ZIP)")
@@ -345,7 +339,7 @@ class ObservacionFormacionAdmin(admin.ModelAdmin):
                 to=[user.email],
             )
             email.attach_alternative(html, "text/html")
-            email.send(fail_silently=False)
-            messages.success(request, f"Email de observación enviado a {user.email}.")
+            cola.encolar(email, origen="formacion.observacion")
+            messages.success(request, f"Email de observación encolado para {user.email}.")
         except Exception as e:
-            messages.error(request, f"No se pudo enviar el email: {e}")
+            messages.error(request, f"No se pudo encolar el email: {e}")
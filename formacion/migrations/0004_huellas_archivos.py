@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formacion', '0003_cupo_maximo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inscripcionformacion',
+            name='documentacion_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='inscripcionformacion',
+            name='documentacion_sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:05
+
+import convocatorias.archivos
+import formacion.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formacion', '0004_huellas_archivos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inscripcionformacion',
+            name='documentacion',
+            field=models.FileField(blank=True, null=True, storage=convocatorias.archivos.almacenamiento_documentos, upload_to='formacion/documentacion/', validators=[formacion.validators.validar_documento_admitido, formacion.validators.validar_tamano_archivo], verbose_name='Documentación'),
+        ),
+    ]
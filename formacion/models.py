@@ -3,7 +3,10 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 from django.utils import timezone
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
 
+from convocatorias import archivos
 from registro_audiovisual.models import PersonaHumana, PersonaJuridica
 from .validators import validar_documento_admitido, validar_tamano_archivo
 
@@ -240,10 +243,14 @@ class InscripcionFormacion(models.Model):
 
     documentacion = models.FileField(
         upload_to="formacion/documentacion/",
+        storage=archivos.almacenamiento_documentos,
         blank=True, null=True,
         validators=[validar_documento_admitido, validar_tamano_archivo],
         verbose_name="Documentación",
     )
+    # Tamaño y huella al subir (convocatorias/archivos.py)
+    documentacion_bytes  = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    documentacion_sha256 = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
 
     declaracion_jurada = models.BooleanField(default=False)
     estado = models.CharField(max_length=20, choices=ESTADOS, default="inscripto")
@@ -301,3 +308,12 @@ class ObservacionFormacion(models.Model):
 
     def __str__(self):
         return f"Inscripción {self.inscripcion_id} · {'OK' if self.subsanada else 'Pendiente'}"
+
+
+# ==========================================
+# SEÑALES
+# ==========================================
+@receiver(pre_save, sender=InscripcionFormacion)
+def registrar_huella_documentacion(sender, instance, **kwargs):
+    # Tamaño y huella al subir (convocatorias/archivos.py)
+    archivos.registrar(instance, "documentacion")
@@ -6,6 +6,8 @@ from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
 
+from correos import cola
+
 from registro_audiovisual.models import PersonaHumana, PersonaJuridica
 
 from .models import (
@@ -43,7 +45,7 @@ def _enviar_email_inscripcion(request, inscripcion):
             to=[destinatario],
         )
         email.attach_alternative(html, "text/html")
-        email.send(fail_silently=True)
+        cola.encolar(email, origen="formacion.inscripcion")
     except Exception:
         pass
 
@@ -0,0 +1,109 @@
+"""
+Medición de consultas SQL por request.
+
+Los N+1 no se ven en el código: un {% for %} del template o una propiedad
+que consulta la base alcanzan para que un listado haga una consulta por
+fila. Para que se noten:
+
+- `MedicionConsultas` es un context manager que registra cada consulta de
+  la conexión (SQL, duración). Sirve suelto en tests y comandos:
+
+      with MedicionConsultas() as medicion:
+          ...
+      medicion.cantidad, medicion.milisegundos, medicion.duplicadas
+
+- `MedicionConsultasMiddleware` mide cada request. Con CONSULTAS_HEADER
+  (desarrollo) agrega el resumen en el header X-Consultas-SQL; pasados
+  CONSULTAS_UMBRAL consultas o CONSULTAS_UMBRAL_MS milisegundos lo deja en
+  el log con el SQL más repetido.
+
+"Duplicadas" cuenta las ejecuciones repetidas del mismo SQL con cualquier
+parámetro: un N+1 sobre 30 filas son 29 duplicadas. Las consultas de una
+respuesta en streaming (exportaciones XLSX) que corren mientras se envía el
+archivo quedan afuera de la medición del middleware.
+
+Los presupuestos por URL están en nueva_web_dav/tests.py.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Consultas-SQL"
+
+
+class MedicionConsultas:
+    def __init__(self):
+        self.consultas = []  # (sql, segundos)
+        self._wrapper = None
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+        return False
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, time.perf_counter() - inicio))
+
+    @property
+    def cantidad(self):
+        return len(self.consultas)
+
+    @property
+    def milisegundos(self):
+        return sum(segundos for _, segundos in self.consultas) * 1000
+
+    def repetidas(self):
+        """{sql: veces} de las consultas ejecutadas más de una vez."""
+        conteo = Counter(sql for sql, _ in self.consultas)
+        return {sql: veces for sql, veces in conteo.items() if veces > 1}
+
+    @property
+    def duplicadas(self):
+        return sum(veces - 1 for veces in self.repetidas().values())
+
+    def resumen(self):
+        return f"consultas={self.cantidad}; ms={self.milisegundos:.1f}; duplicadas={self.duplicadas}"
+
+
+class MedicionConsultasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, "CONSULTAS_HEADER", settings.DEBUG)
+        self.umbral = getattr(settings, "CONSULTAS_UMBRAL", None)
+        self.umbral_ms = getattr(settings, "CONSULTAS_UMBRAL_MS", None)
+
+    def __call__(self, request):
+        with MedicionConsultas() as medicion:
+            response = self.get_response(request)
+
+        if self.header:
+            response[HEADER] = medicion.resumen()
+
+        excedido = (
+            (self.umbral is not None and medicion.cantidad > self.umbral)
+            or (self.umbral_ms is not None and medicion.milisegundos > self.umbral_ms)
+        )
+        if excedido:
+            repetidas = medicion.repetidas()
+            mas_repetida = max(repetidas, key=repetidas.get) if repetidas else ""
+            logger.warning(
+                "%s %s: %s%s",
+                request.method,
+                request.path,
+                medicion.resumen(),
+                f" — más repetida ({repetidas[mas_repetida]}×): {mas_repetida[:300]}" if mas_repetida else "",
+            )
+        return response
@@ -41,6 +41,8 @@ INSTALLED_APPS = [
     "backoffice",
     'chatbot',
     'estadisticas',
+    'exportaciones',
+    'correos',
 ]
 
 
@@ -0,0 +1,458 @@
+"""
+Presupuesto de consultas SQL por URL.
+
+Cada URL de los urls.py del proyecto (menos el admin de Django) tiene un
+máximo de consultas en PRESUPUESTOS. El test la pide con el usuario que
+corresponde sobre un set de datos con varias filas por listado, así que un
+N+1 nuevo se pasa del presupuesto y falla. Una URL nueva sin presupuesto
+también falla: hay que agregarla acá.
+"""
+import shutil
+import tempfile
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from chatbot.models import Nodo, Opcion
+from convocatorias.models import (
+    AsignacionJuradoConvocatoria, ConfiguracionPostulacion, Convocatoria, CriterioEvaluacion,
+    DocumentoIntegrante, DocumentoPostulacion, EvaluacionPostulacion, IntegrantePostulacion,
+    ObservacionAdministrativa, Postulacion, Rendicion,
+)
+from exencion.models import Exencion, ExencionDocumento
+from exportaciones.models import TrabajoExportacion
+from formacion.models import ConvocatoriaFormacion
+from registro_audiovisual.models import PersonaHumana
+
+from nueva_web_dav.consultas import HEADER, MedicionConsultas
+
+MEDIA_TEST = tempfile.mkdtemp(prefix="test_consultas_")
+
+# nombre de la URL → máximo de consultas
+PRESUPUESTOS = {
+    # Sitio público
+    "sitio_publico:inicio":        10,
+    "sitio_publico:institucional": 6,
+    "sitio_publico:programas":     6,
+
+    # Usuarios
+    "usuarios:registro":                 8,
+    "usuarios:login":                    8,
+    "usuarios:logout":                   8,
+    "usuarios:panel_usuario":            25,
+    "usuarios:panel_jurado":             15,
+    "usuarios:redireccion_post_login":   8,
+    "usuarios:activar":                  8,
+    "usuarios:reenviar_activacion":      8,
+    "usuarios:cambiar_email":            10,
+    "usuarios:confirmar_cambio_email":   10,
+    "usuarios:password_reset":           8,
+    "usuarios:password_reset_done":      8,
+    "usuarios:password_reset_confirm":   8,
+    "usuarios:password_reset_complete":  8,
+    "usuarios:jurado_ver_documentacion":       20,
+    "usuarios:jurado_descargar_documentacion": 25,
+    "usuarios:jurado_descargar_convocatoria":  25,
+    "usuarios:perfil_integrante":        10,
+    "usuarios:evaluacion_lista":         20,
+    "usuarios:evaluacion_postulacion":   20,
+
+    # Registro audiovisual
+    "registro_audiovisual:seleccionar_tipo_registro": 12,
+    "registro_audiovisual:editar_persona_humana":     15,
+    "registro_audiovisual:editar_persona_juridica":   15,
+    "registro_audiovisual:inscripcion_exitosa":       12,
+    "registro_audiovisual:confirmar_datos":           15,
+
+    # Convocatorias
+    "convocatorias:convocatorias_home":             10,
+    "convocatorias:convocatoria_detalle":           12,
+    "convocatorias:inscribirse_convocatoria":       12,
+    "convocatorias:subir_documento_subsanado":      15,
+    "convocatorias:agregar_documento_subsanado":    15,
+    "convocatorias:confirmar_documento_subsanado":  15,
+    "convocatorias:postular_convocatoria":          15,
+    "convocatorias:wizard_paso":                    20,
+    "convocatorias:subir_doc_integrante":           12,
+    "convocatorias:eliminar_documento_postulacion": 10,
+    "convocatorias:postulacion_confirmada":         15,
+    "convocatorias:crear_convocatoria":             12,
+    "convocatorias:rendicion_detalle":              15,
+    "convocatorias:descargar_planilla_oficial":     15,
+
+    # Formación
+    "formacion:crear_convocatoria": 12,
+    "formacion:detalle":            12,
+    "formacion:inscribirse":        15,
+
+    # Exención
+    "exencion:iniciar":                                15,
+    "exencion:iniciar_convocatoria":                   15,
+    "exencion:documentacion":                          15,
+    "exencion:agregar_documentacion":                  15,
+    "exencion:confirmar_documentacion":                15,
+    "exencion:eliminar_documento":                     12,
+    "exencion:subir_documento_subsanado_exencion":     15,
+    "exencion:agregar_documento_subsanado_exencion":   15,
+    "exencion:confirmar_documento_subsanado_exencion": 15,
+    "exencion:completada":                             12,
+    "exencion:padron_publico_exenciones":              12,
+    "exencion:padron_exenciones_excel":                15,
+
+    # Backoffice
+    "backoffice:nomina_registro":       15,
+    "backoffice:nomina_registro_excel": 15,
+    "backoffice:convocatorias":         30,
+    "backoffice:exenciones":            25,
+
+    # Chatbot
+    "chatbot_inicio":  10,
+    "ver_nodo":        10,
+    "chatbot_volver":  10,
+    "chatbot_buscar":  10,
+    "chatbot_widget":  10,
+
+    # Estadísticas (el primer acceso materializa el snapshot)
+    "estadisticas:dashboard":             60,
+    "estadisticas:exportar":              30,
+    "estadisticas:dashboard_cash_rebate": 60,
+    "estadisticas:exportar_cash_rebate":  30,
+    "estadisticas:dashboard_registro":    40,
+    "estadisticas:exportar_registro":     30,
+    "estadisticas:dashboard_exencion":    40,
+    "estadisticas:exportar_exenciones":   30,
+    "estadisticas:dashboard_formacion":   40,
+    "estadisticas:exportar_formacion":    30,
+
+    # Exportaciones
+    "exportaciones:trabajo":   10,
+    "exportaciones:estado":    10,
+    "exportaciones:descargar": 10,
+    "exportaciones:solicitar": 15,
+}
+
+# Vistas que solo aceptan POST: se miden con un POST sin datos
+SOLO_POST = {"exportaciones:solicitar"}
+
+# Filas por listado: un N+1 sobre estas cantidades se pasa de cualquier presupuesto
+ASIGNACIONES_JURADO = 25
+POSTULACIONES_USUARIO = 10
+
+
+def nombres_de_urls(patrones=None, prefijo=""):
+    """Nombres ("namespace:nombre") de todas las URLs, sin el admin."""
+    if patrones is None:
+        patrones = get_resolver().url_patterns
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            if patron.namespace == "admin":
+                continue
+            espacio = f"{prefijo}{patron.namespace}:" if patron.namespace else prefijo
+            yield from nombres_de_urls(patron.url_patterns, espacio)
+        elif patron.name:
+            yield prefijo + patron.name
+
+
+def crear_persona(user):
+    return PersonaHumana.objects.create(
+        user=user,
+        nombre="Nombre",
+        apellido=user.username,
+        cuil_cuit="20123456789",
+        fecha_nacimiento=date(1990, 5, 1),
+        genero="F",
+        nivel_educativo="Uc",
+        lugar_residencia="SC",
+        domicilio_real="Calle 123",
+        codigo_postal_real="4400",
+        telefono="387000000",
+        email=f"{user.username}@test.com",
+        area_desempeno_1="Director",
+        area_cultural="ninguna",
+    )
+
+
+def crear_convocatoria(titulo):
+    hoy = timezone.localdate()
+    return Convocatoria.objects.create(
+        titulo=titulo,
+        slug=titulo.lower().replace(" ", "-"),
+        categoria="CONCURSO",
+        linea="fomento",
+        fecha_inicio=hoy - timedelta(days=30),
+        fecha_fin=hoy + timedelta(days=30),
+    )
+
+
+def archivo(nombre):
+    return SimpleUploadedFile(nombre, b"%PDF- " + nombre.encode())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEST)
+class PresupuestoConsultasTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEST, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        cls.staff = User.objects.create(username="staff", is_staff=True, is_superuser=True)
+
+        # Usuario con registro, postulaciones y exención
+        cls.usuario = User.objects.create(username="ana", email="ana@test.com")
+        cls.persona = crear_persona(cls.usuario)
+        cls.conv = crear_convocatoria("Conv usuario")
+        ConfiguracionPostulacion.objects.create(convocatoria=cls.conv)
+
+        cls.borrador = Postulacion.objects.create(user=cls.usuario, convocatoria=cls.conv, estado="borrador")
+        productor = IntegrantePostulacion.objects.create(
+            postulacion=cls.borrador, rol="PRODUCTOR", persona_humana=cls.persona, verificado=True,
+        )
+        for tipo in ("DNI", "CONSTANCIA_ARCA", "CV_BIOFILMOGRAFIA"):
+            DocumentoIntegrante.objects.create(integrante=productor, tipo=tipo, archivo=archivo(f"{tipo}.pdf"))
+        DocumentoPostulacion.objects.create(
+            postulacion=cls.borrador, tipo="COMPROBANTE_CBU", archivo=archivo("cbu.pdf"),
+        )
+
+        convs_usuario = [crear_convocatoria(f"Conv historial {i}") for i in range(POSTULACIONES_USUARIO)]
+        cls.observada = None
+        for i, conv in enumerate(convs_usuario):
+            postulacion = Postulacion.objects.create(
+                user=cls.usuario, convocatoria=conv,
+                estado="observado" if i % 2 else "seleccionado",
+                fecha_envio=timezone.now(), nombre_proyecto=f"Proyecto {i}",
+            )
+            ObservacionAdministrativa.objects.create(
+                postulacion=postulacion, tipo_documento="CBU", descripcion="Falta CBU",
+            )
+            if postulacion.estado == "seleccionado":
+                cls.rendicion = Rendicion.objects.create(postulacion=postulacion, user=cls.usuario)
+            else:
+                cls.observada = postulacion
+        cls.doc_subsanado = DocumentoPostulacion.objects.create(
+            postulacion=cls.observada, tipo="SUBSANADO", archivo=archivo("subsanado.pdf"),
+        )
+
+        cls.exencion = Exencion.objects.create(
+            user=cls.usuario, persona_humana=cls.persona, nombre_razon_social="Ana",
+            email="ana@test.com", cuit="27123456789", domicilio_fiscal="Calle 1",
+            actividad_dgr="591110", estado="BORRADOR",
+        )
+        cls.doc_exencion = ExencionDocumento.objects.create(
+            exencion=cls.exencion, tipo="DNI", archivo=archivo("dni_exencion.pdf"),
+        )
+        Exencion.objects.bulk_create([
+            Exencion(user=cls.staff, nombre_razon_social=f"Empresa {i}", email="e@test.com",
+                     cuit=f"30{i:09d}", domicilio_fiscal="Calle 1", actividad_dgr="591110",
+                     estado="APROBADA", fecha_emision=hoy, fecha_vencimiento=hoy + timedelta(days=90))
+            for i in range(20)
+        ])
+
+        cls.formacion = ConvocatoriaFormacion.objects.create(
+            titulo="Curso", slug="curso",
+            fecha_inicio=hoy - timedelta(days=10), fecha_fin=hoy + timedelta(days=10),
+        )
+
+        # Jurado con muchas convocatorias asignadas
+        cls.jurado = User.objects.create(username="jurado")
+        cls.jurado.groups.add(Group.objects.create(name="jurado"))
+        presentante = User.objects.create(username="beto")
+        cls.integrante = crear_persona(presentante)
+        for i in range(ASIGNACIONES_JURADO):
+            conv = crear_convocatoria(f"Conv jurado {i}")
+            AsignacionJuradoConvocatoria.objects.create(jurado=cls.jurado, convocatoria=conv)
+            for j in range(2):
+                postulacion = Postulacion.objects.create(
+                    user=presentante, convocatoria=conv, estado="evaluacion_jurado",
+                    fecha_envio=timezone.now(), nombre_proyecto=f"Proyecto {i}-{j}",
+                )
+            if i == 0:
+                cls.conv_jurado, cls.postulacion_jurado = conv, postulacion
+                for orden in range(3):
+                    CriterioEvaluacion.objects.create(convocatoria=conv, nombre=f"Criterio {orden}", orden=orden)
+                EvaluacionPostulacion.objects.create(postulacion=postulacion)
+
+        # Chatbot y exportaciones
+        inicio = Nodo.objects.create(nombre="Inicio", slug="inicio", mensaje="Hola", es_inicio=True)
+        destino = Nodo.objects.create(nombre="Requisitos", slug="requisitos", mensaje="Requisitos")
+        cls.opcion = Opcion.objects.create(nodo_origen=inicio, texto="Requisitos", nodo_destino=destino)
+        cls.trabajo = TrabajoExportacion.objects.create(tipo="postulaciones", clave="x", usuario=cls.staff)
+
+    # ──────────────────────────────────────────────────────────
+    # Cada URL: (usuario, kwargs)
+    # ──────────────────────────────────────────────────────────
+
+    def caso(self, nombre):
+        app, _, vista = nombre.rpartition(":")
+        usuario = self.usuario
+        if app in ("backoffice", "estadisticas", "exportaciones") or nombre in (
+            "convocatorias:crear_convocatoria", "formacion:crear_convocatoria", "exencion:padron_exenciones_excel",
+        ):
+            usuario = self.staff
+        elif vista.startswith(("jurado_", "evaluacion_", "perfil_integrante", "panel_jurado")):
+            usuario = self.jurado
+        elif app == "sitio_publico" or vista.startswith(("password_reset", "activar", "reenviar", "registro", "login")):
+            usuario = None
+
+        kwargs = {
+            "usuarios:activar":                       {"uidb64": "MQ", "token": "token-invalido"},
+            "usuarios:password_reset_confirm":        {"uidb64": "MQ", "token": "token-invalido"},
+            "usuarios:confirmar_cambio_email":        {"token": "token-invalido"},
+            "usuarios:jurado_ver_documentacion":       {"postulacion_id": self.postulacion_jurado.pk},
+            "usuarios:jurado_descargar_documentacion": {"postulacion_id": self.postulacion_jurado.pk},
+            "usuarios:evaluacion_postulacion":         {"postulacion_id": self.postulacion_jurado.pk},
+            "usuarios:jurado_descargar_convocatoria":  {"convocatoria_id": self.conv_jurado.pk},
+            "usuarios:evaluacion_lista":               {"convocatoria_id": self.conv_jurado.pk},
+            "usuarios:perfil_integrante":              {"persona_id": self.integrante.pk},
+            "convocatorias:convocatoria_detalle":          {"slug": self.conv.slug},
+            "convocatorias:inscribirse_convocatoria":      {"slug": self.conv.slug},
+            "convocatorias:subir_documento_subsanado":     {"postulacion_id": self.observada.pk},
+            "convocatorias:agregar_documento_subsanado":   {"postulacion_id": self.observada.pk},
+            "convocatorias:confirmar_documento_subsanado": {"postulacion_id": self.observada.pk},
+            "convocatorias:postular_convocatoria":         {"convocatoria_id": self.conv.pk},
+            "convocatorias:wizard_paso":                   {"postulacion_id": self.borrador.pk, "paso": "productor"},
+            "convocatorias:subir_doc_integrante":          {"postulacion_id": self.borrador.pk, "rol": "productor"},
+            "convocatorias:eliminar_documento_postulacion": {"documento_id": self.doc_subsanado.pk},
+            "convocatorias:postulacion_confirmada":        {"postulacion_id": self.observada.pk},
+            "convocatorias:rendicion_detalle":             {"rendicion_id": self.rendicion.pk},
+            "convocatorias:descargar_planilla_oficial":    {"postulacion_id": self.borrador.pk},
+            "formacion:detalle":                           {"slug": self.formacion.slug},
+            "formacion:inscribirse":                       {"convocatoria_id": self.formacion.pk},
+            "exencion:iniciar_convocatoria":               {"convocatoria_id": self.conv.pk},
+            "exencion:eliminar_documento":                 {"documento_id": self.doc_exencion.pk},
+            "ver_nodo":                                    {"opcion_id": self.opcion.pk},
+            "exportaciones:trabajo":                       {"pk": self.trabajo.pk},
+            "exportaciones:estado":                        {"pk": self.trabajo.pk},
+            "exportaciones:descargar":                     {"pk": self.trabajo.pk},
+            "exportaciones:solicitar":                     {"tipo": "postulaciones"},
+        }.get(nombre)
+        if kwargs is None and app == "exencion" and vista not in ("iniciar", "padron_publico_exenciones",
+                                                                  "padron_exenciones_excel"):
+            kwargs = {"exencion_id": self.exencion.pk}
+        return usuario, kwargs or {}
+
+    def medir(self, nombre):
+        """Consultas de un GET (o POST, ver SOLO_POST) a `nombre`, dentro de
+        un savepoint: algunas vistas escriben (crean borradores, snapshots,
+        trabajos)."""
+        usuario, kwargs = self.caso(nombre)
+        url = reverse(nombre, kwargs=kwargs)
+        sid = transaction.savepoint()
+        try:
+            cliente = Client()
+            if usuario is not None:
+                cliente.force_login(usuario)
+            with MedicionConsultas() as medicion:
+                response = cliente.post(url) if nombre in SOLO_POST else cliente.get(url)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            return medicion, response
+        finally:
+            transaction.savepoint_rollback(sid)
+
+    # ──────────────────────────────────────────────────────────
+
+    def test_todas_las_urls_tienen_presupuesto(self):
+        nombres = set(nombres_de_urls())
+        self.assertEqual(nombres - set(PRESUPUESTOS), set(), "URLs sin presupuesto de consultas")
+        self.assertEqual(set(PRESUPUESTOS) - nombres, set(), "Presupuestos de URLs que ya no existen")
+
+    def test_ninguna_url_excede_su_presupuesto(self):
+        for nombre, presupuesto in PRESUPUESTOS.items():
+            with self.subTest(url=nombre):
+                medicion, response = self.medir(nombre)
+                self.assertLess(response.status_code, 500)
+                self.assertLessEqual(
+                    medicion.cantidad, presupuesto,
+                    f"{nombre}: {medicion.resumen()}\n" + "\n".join(
+                        f"{veces}× {sql[:200]}" for sql, veces in medicion.repetidas().items()
+                    ),
+                )
+
+    # N+1 corregidos: la cantidad de consultas no depende de las filas
+
+    def test_panel_jurado_una_consulta_de_postulaciones(self):
+        cliente = Client()
+        cliente.force_login(self.jurado)
+        with CaptureQueriesContext(connection) as ctx:
+            response = cliente.get(reverse("usuarios:panel_jurado"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["grupos"]), ASIGNACIONES_JURADO)
+        self.assertEqual(sum(len(g["postulaciones"]) for g in response.context["grupos"]), 2 * ASIGNACIONES_JURADO)
+        consultas = [q for q in ctx.captured_queries if 'FROM "convocatorias_postulacion"' in q["sql"]]
+        self.assertEqual(len(consultas), 1)
+
+    def test_paso_productor_una_consulta_de_documentos(self):
+        cliente = Client()
+        cliente.force_login(self.usuario)
+        url = reverse("convocatorias:wizard_paso", kwargs={"postulacion_id": self.borrador.pk, "paso": "productor"})
+        with CaptureQueriesContext(connection) as ctx:
+            response = cliente.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["docs_dni"].tipo, "DNI")
+        self.assertEqual(response.context["docs_cv"].tipo, "CV_BIOFILMOGRAFIA")
+        self.assertIsNone(response.context["docs_estatuto"])
+        consultas = [q for q in ctx.captured_queries if 'FROM "convocatorias_documentointegrante"' in q["sql"]]
+        self.assertEqual(len(consultas), 1)
+
+    def test_acta_de_jurado_no_consulta_por_evaluacion(self):
+        def acta(cantidad):
+            conv = crear_convocatoria(f"Conv acta {cantidad}")
+            ids = []
+            for i in range(cantidad):
+                user = User.objects.create(username=f"acta{cantidad}-{i}")
+                if i % 2:
+                    crear_persona(user)
+                postulacion = Postulacion.objects.create(
+                    user=user, convocatoria=conv, estado="evaluacion_jurado", nombre_proyecto=f"P{i}",
+                )
+                ids.append(EvaluacionPostulacion.objects.create(postulacion=postulacion).pk)
+            cliente = Client()
+            cliente.force_login(self.staff)
+            with CaptureQueriesContext(connection) as ctx:
+                response = cliente.post(
+                    reverse("admin:convocatorias_evaluacionpostulacion_changelist"),
+                    {"action": "descargar_acta_jurado", "_selected_action": ids},
+                )
+            self.assertEqual(response["Content-Type"], "application/pdf")
+            return len(ctx.captured_queries)
+
+        self.assertEqual(acta(2), acta(8))
+
+
+class MedicionConsultasTest(TestCase):
+    def test_cuenta_consultas_y_duplicadas(self):
+        with MedicionConsultas() as medicion:
+            for _ in range(3):
+                list(User.objects.filter(username="nadie"))
+            User.objects.count()
+        self.assertEqual(medicion.cantidad, 4)
+        self.assertEqual(medicion.duplicadas, 2)
+        self.assertEqual(list(medicion.repetidas().values()), [3])
+        self.assertGreaterEqual(medicion.milisegundos, 0)
+
+    @override_settings(CONSULTAS_HEADER=True, CONSULTAS_UMBRAL=None, CONSULTAS_UMBRAL_MS=None)
+    def test_header_en_desarrollo(self):
+        response = self.client.get(reverse("sitio_publico:inicio"))
+        self.assertRegex(response[HEADER], r"^consultas=\d+; ms=[\d.]+; duplicadas=\d+$")
+
+    @override_settings(CONSULTAS_HEADER=False, CONSULTAS_UMBRAL=0, CONSULTAS_UMBRAL_MS=None)
+    def test_produccion_loguea_pasado_el_umbral_sin_header(self):
+        with self.assertLogs("nueva_web_dav.consultas", "WARNING") as logs:
+            response = self.client.get(reverse("sitio_publico:inicio"))
+        self.assertNotIn(HEADER, response)
+        self.assertIn("GET /: consultas=", logs.output[0])
+
+    @override_settings(CONSULTAS_HEADER=False, CONSULTAS_UMBRAL=1000, CONSULTAS_UMBRAL_MS=None)
+    def test_produccion_no_loguea_bajo_el_umbral(self):
+        with self.assertNoLogs("nueva_web_dav.consultas", "WARNING"):
+            self.client.get(reverse("sitio_publico:inicio"))
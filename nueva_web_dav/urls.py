@@ -33,6 +33,9 @@ urlpatterns = [
 
     # Estadísticas (solo staff)
     path('estadisticas/', include('estadisticas.urls')),
+
+    # Exportaciones en segundo plano (solo staff)
+    path('exportaciones/', include('exportaciones.urls')),
 ]
 
 if settings.DEBUG:
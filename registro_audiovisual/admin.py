@@ -1,6 +1,6 @@
 from django.contrib import admin
-from django.http import HttpResponse
-import openpyxl
+
+from exportaciones.xlsx import LOTE, Hoja, respuesta_xlsx
 
 from .models import PersonaHumana, PersonaJuridica
 
@@ -15,44 +15,34 @@ def exportar_excel(modeladmin, request, queryset):
     Muestra los valores legibles de choices cuando corresponde.
     """
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Datos"
-
     # Campos del modelo
     campos = [field.name for field in modeladmin.model._meta.fields]
 
-    # Encabezados
-    for col, campo in enumerate(campos, start=1):
-        ws.cell(row=1, column=col, value=campo)
+    def filas():
+        # Encabezados
+        yield campos
 
-    # Filas
-    for row, obj in enumerate(queryset, start=2):
-        for col, campo in enumerate(campos, start=1):
-            valor = getattr(obj, campo)
+        for obj in queryset.iterator(chunk_size=LOTE):
+            fila = []
+            for campo in campos:
+                valor = getattr(obj, campo)
 
-            # Si es campo con choices → mostrar display
-            try:
-                display_method = f"get_{campo}_display"
-                if hasattr(obj, display_method):
-                    valor = getattr(obj, display_method)()
-            except Exception:
-                pass
+                # Si es campo con choices → mostrar display
+                try:
+                    display_method = f"get_{campo}_display"
+                    if hasattr(obj, display_method):
+                        valor = getattr(obj, display_method)()
+                except Exception:
+                    pass
 
-            if valor is None:
-                valor = ""
+                if valor is None:
+                    valor = ""
 
-            ws.cell(row=row, column=col, value=str(valor))
+                fila.append(str(valor))
+            yield fila
 
     nombre = modeladmin.model.__name__.lower()
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = f'attachment; filename="{nombre}.xlsx"'
-
-    wb.save(response)
-    return response
+    return respuesta_xlsx(f"{nombre}.xlsx", [Hoja("Datos", filas())])
 
 
 exportar_excel.short_description = "📤 Exportar selección a Excel (.xlsx)"
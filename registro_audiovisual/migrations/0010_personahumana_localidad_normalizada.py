@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+def normalizar_localidad(texto):
+    # Copia de registro_audiovisual.models.normalizar_localidad al momento de
+    # esta migración: si la función cambia, el backfill no debe cambiar.
+    return " ".join((texto or "").split()).title()
+
+
+def backfill_localidad_normalizada(apps, schema_editor):
+    """Completa la localidad normalizada de las personas ya cargadas."""
+    PersonaHumana = apps.get_model("registro_audiovisual", "PersonaHumana")
+    personas = PersonaHumana.objects.exclude(otro_lugar_residencia=None).exclude(otro_lugar_residencia="")
+    for p in personas.only("id", "otro_lugar_residencia").iterator():
+        p.localidad_normalizada = normalizar_localidad(p.otro_lugar_residencia)
+        p.save(update_fields=["localidad_normalizada"])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro_audiovisual', '0009_alter_personahumana_apellido_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='personahumana',
+            name='localidad_normalizada',
+            field=models.CharField(blank=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(backfill_localidad_normalizada, migrations.RunPython.noop),
+    ]
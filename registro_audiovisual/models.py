@@ -168,6 +168,13 @@ TIPO_PERSONA_JURIDICA_CHOICES = [
 ]
 
 
+def normalizar_localidad(texto):
+    """Unifica el texto libre de localidad ("san pedro ", "SAN PEDRO",
+    "San  Pedro") en un único label, para no contar la misma localidad
+    varias veces."""
+    return " ".join((texto or "").split()).title()
+
+
 # -------------------------------
 # PERSONA HUMANA
 # -------------------------------
@@ -200,6 +207,15 @@ class PersonaHumana(models.Model):
         null=True
     )
 
+    # otro_lugar_residencia normalizado (ver normalizar_localidad), para
+    # agrupar localidades en la base de datos. Se completa en save().
+    localidad_normalizada = models.CharField(
+        max_length=150,
+        blank=True,
+        default="",
+        editable=False
+    )
+
     domicilio_real = models.CharField(max_length=250)
     codigo_postal_real = models.CharField(max_length=10)
 
@@ -325,6 +341,13 @@ class PersonaHumana(models.Model):
             - ((hoy.month, hoy.day) < (self.fecha_nacimiento.month, self.fecha_nacimiento.day))
         )
 
+    def save(self, *args, **kwargs):
+        self.localidad_normalizada = normalizar_localidad(self.otro_lugar_residencia)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "otro_lugar_residencia" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "localidad_normalizada"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.nombre_completo
 
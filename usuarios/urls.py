@@ -83,6 +83,16 @@ urlpatterns += [
         views.jurado_ver_documentacion,
         name="jurado_ver_documentacion",
     ),
+    path(
+        "jurado/postulacion/<int:postulacion_id>/documentacion/zip/",
+        views.jurado_descargar_documentacion,
+        name="jurado_descargar_documentacion",
+    ),
+    path(
+        "jurado/convocatoria/<int:convocatoria_id>/documentacion/zip/",
+        views.jurado_descargar_convocatoria,
+        name="jurado_descargar_convocatoria",
+    ),
     path(
         "jurado/integrante/<int:persona_id>/",
         views.perfil_integrante,
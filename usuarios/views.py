@@ -11,10 +11,10 @@ from django.utils import timezone
 from django.db.models import Q
 from django.http import JsonResponse
 from django.conf import settings
+from collections import defaultdict
 import json
 
 JURADO_GROUP = "jurado"
-ESTADOS_JURADO = ["admitido", "evaluacion_jurado", "seleccionado", "no_seleccionado"]
 
 
 # Formularios
@@ -28,10 +28,13 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import EmailMultiAlternatives
 
+from correos import cola
+
 # Modelos
 from registro_audiovisual.models import PersonaHumana, PersonaJuridica
 from exencion.models import Exencion
 from convocatorias.models import (
+    ESTADOS_JURADO,
     Postulacion,
     AsignacionJuradoConvocatoria,
     IntegrantePostulacion,
@@ -42,6 +45,7 @@ from convocatorias.models import (
     EvaluacionPostulacion,
     PuntajeCriterio,
 )
+from convocatorias import documentacion, paquetes
 from formacion.models import InscripcionFormacion
 
 
@@ -94,7 +98,7 @@ def registro(request):
             )
             email.attach_alternative(html_message, "text/html")
             try:
-                email.send()
+                cola.encolar(email, origen="usuarios.activacion")
                 messages.success(request, "Tu cuenta fue creada. Revisá tu correo para activarla.")
             except Exception:
                 messages.warning(
@@ -280,24 +284,27 @@ def panel_jurado(request):
     if not user.groups.filter(name__iexact=JURADO_GROUP).exists():
         return redirect("usuarios:panel_usuario")
 
-    asignaciones = (
+    asignaciones = list(
         AsignacionJuradoConvocatoria.objects
         .filter(jurado=user)
         .select_related("convocatoria")
         .order_by("convocatoria__titulo")
     )
 
+    # Las postulaciones de todas las convocatorias asignadas en una consulta
+    por_convocatoria = defaultdict(list)
+    for p in (
+        Postulacion.objects
+        .filter(convocatoria__in=[a.convocatoria_id for a in asignaciones], estado__in=ESTADOS_JURADO)
+        .select_related("convocatoria")
+        .order_by("nombre_proyecto")
+    ):
+        por_convocatoria[p.convocatoria_id].append(p)
 
-
-    grupos = []
-    for asig in asignaciones:
-        postulaciones = (
-            Postulacion.objects
-            .filter(convocatoria=asig.convocatoria, estado__in=ESTADOS_JURADO)
-            .select_related("convocatoria")
-            .order_by("nombre_proyecto")
-        )
-        grupos.append({"convocatoria": asig.convocatoria, "postulaciones": postulaciones})
+    grupos = [
+        {"convocatoria": asig.convocatoria, "postulaciones": por_convocatoria[asig.convocatoria_id]}
+        for asig in asignaciones
+    ]
 
     return render(
         request,
@@ -309,13 +316,8 @@ def panel_jurado(request):
 # ============================================================
 # DETALLE DE POSTULACIÓN (JURADO)
 # ============================================================
-@login_required(login_url="/usuarios/login/")
-def jurado_ver_documentacion(request, postulacion_id):
-    user = request.user
-
-    if not user.groups.filter(name__iexact=JURADO_GROUP).exists():
-        return redirect("usuarios:panel_usuario")
-
+def _postulacion_de_jurado(user, postulacion_id):
+    """(postulación visible para el jurado, doble ciego) o 404."""
     convocatorias_asignadas = (
         AsignacionJuradoConvocatoria.objects
         .filter(jurado=user)
@@ -332,7 +334,17 @@ def jurado_ver_documentacion(request, postulacion_id):
     asignacion = AsignacionJuradoConvocatoria.objects.filter(
         jurado=user, convocatoria=postulacion.convocatoria
     ).first()
-    doble_ciego = asignacion.doble_ciego if asignacion else False
+    return postulacion, asignacion.doble_ciego if asignacion else False
+
+
+@login_required(login_url="/usuarios/login/")
+def jurado_ver_documentacion(request, postulacion_id):
+    user = request.user
+
+    if not user.groups.filter(name__iexact=JURADO_GROUP).exists():
+        return redirect("usuarios:panel_usuario")
+
+    postulacion, doble_ciego = _postulacion_de_jurado(user, postulacion_id)
 
     documentos_postulacion = (
         DocumentoPostulacion.objects
@@ -372,6 +384,34 @@ def jurado_ver_documentacion(request, postulacion_id):
     )
 
 
+@login_required(login_url="/usuarios/login/")
+def jurado_descargar_documentacion(request, postulacion_id):
+    """ZIP con la misma documentación que muestra jurado_ver_documentacion."""
+    if not request.user.groups.filter(name__iexact=JURADO_GROUP).exists():
+        return redirect("usuarios:panel_usuario")
+
+    postulacion, doble_ciego = _postulacion_de_jurado(request.user, postulacion_id)
+    return paquetes.respuesta(
+        postulacion.convocatoria, postulacion, documentacion.variante_jurado(doble_ciego),
+    )
+
+
+@login_required(login_url="/usuarios/login/")
+def jurado_descargar_convocatoria(request, convocatoria_id):
+    """ZIP con la documentación de todas las postulaciones que el jurado
+    evalúa en la convocatoria, una carpeta por postulación."""
+    if not request.user.groups.filter(name__iexact=JURADO_GROUP).exists():
+        return redirect("usuarios:panel_usuario")
+
+    asignacion = get_object_or_404(
+        AsignacionJuradoConvocatoria.objects.select_related("convocatoria"),
+        jurado=request.user, convocatoria_id=convocatoria_id,
+    )
+    return paquetes.respuesta(
+        asignacion.convocatoria, variante=documentacion.variante_jurado(asignacion.doble_ciego),
+    )
+
+
 @login_required(login_url="/usuarios/login/")
 def perfil_integrante(request, persona_id):
     if not request.user.groups.filter(name__iexact=JURADO_GROUP).exists():
@@ -544,7 +584,7 @@ def reenviar_activacion(request):
             )
             email_msg.attach_alternative(html_message, "text/html")
             try:
-                email_msg.send()
+                cola.encolar(email_msg, origen="usuarios.activacion")
             except Exception:
                 pass
         except User.DoesNotExist:
@@ -606,7 +646,7 @@ def cambiar_email(request):
         )
         email_obj.attach_alternative(html_message, "text/html")
         try:
-            email_obj.send()
+            cola.encolar(email_obj, origen="usuarios.cambio_email")
             messages.success(
                 request,
                 f"Te enviamos un enlace de confirmación a {nuevo_email}. "